@@ -1,3 +1,45 @@
-from django.test import TestCase
+import datetime
+import io
+from decimal import Decimal
 
-# Create your tests here.
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db import models
+from django.test import SimpleTestCase
+
+from utils.columnar_export import get_model_schema, stream_columnar_export
+
+
+def model_field(name, field):
+    field.set_attributes_from_name(name)
+    return field
+
+
+class ColumnarExportTestCase(SimpleTestCase):
+    def setUp(self):
+        self.fields = [
+            model_field(
+                "labse_score", models.DecimalField(max_digits=4, decimal_places=2)
+            ),
+            model_field("duration", models.TimeField()),
+        ]
+        self.rows = [
+            {"labse_score": Decimal("0.87"), "duration": datetime.time(0, 1, 30)},
+            {"labse_score": None, "duration": None},
+        ]
+
+    def test_decimal_and_time_types(self):
+        schema = get_model_schema(self.fields)
+        self.assertEqual(schema.field("labse_score").type, pa.decimal128(4, 2))
+        self.assertEqual(schema.field("duration").type, pa.time64("us"))
+
+    def test_batch_with_decimal_and_time_values(self):
+        schema = get_model_schema(self.fields)
+        batch = pa.RecordBatch.from_pylist(self.rows, schema=schema)
+        self.assertEqual(batch.to_pylist(), self.rows)
+
+    def test_parquet_export_with_decimal_and_time_values(self):
+        schema = get_model_schema(self.fields)
+        data = b"".join(stream_columnar_export(schema, self.rows, "parquet"))
+        table = pq.read_table(io.BytesIO(data))
+        self.assertEqual(table.to_pylist(), self.rows)
@@ -3,6 +3,14 @@ import json
 import re
 from base64 import b64encode
 from urllib.parse import parse_qsl
+from utils.columnar_export import (
+    COLUMNAR_EXPORT_TYPES,
+    get_model_fields,
+    get_model_schema,
+    is_columnar_export_type,
+    iter_queryset_rows,
+    stream_columnar_export,
+)
 from utils.pagination import paginate_queryset
 from django.apps import apps
 from django.db.models import Q
@@ -301,7 +309,7 @@ class DatasetInstanceViewSet(viewsets.ModelViewSet):
     @action(methods=["GET"], detail=True, name="Download Dataset in CSV format")
     def download(self, request, pk):
         """
-        View to download a dataset in CSV format
+        View to download a dataset in CSV, TSV, Parquet or Arrow format
         URL: /data/instances/<instance-id>/download/
         Accepted methods: GET
         """
@@ -327,6 +335,23 @@ class DatasetInstanceViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
+        if is_columnar_export_type(export_type):
+            # the fields exported by the resources of the dataset types
+            fields = get_model_fields(dataset_model, exclude=["datasetbase_ptr"])
+            extension, content_type = COLUMNAR_EXPORT_TYPES[export_type.upper()]
+            response = StreamingHttpResponse(
+                stream_columnar_export(
+                    get_model_schema(fields),
+                    iter_queryset_rows(data_items, fields),
+                    export_type,
+                ),
+                status=status.HTTP_200_OK,
+                content_type=content_type,
+            )
+            filename = f"dataset-instance-{pk}.{extension}"
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+
         dataset_resource = resources.RESOURCE_MAP[dataset_instance.dataset_type]
         exported_items = dataset_resource().export_as_generator(export_type, data_items)
         if export_type == "tsv":
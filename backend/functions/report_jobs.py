@@ -0,0 +1,419 @@
+"""
+Asynchronous report jobs.
+
+A report request is hashed with its kind, its parameters and the requesting
+user to a job key. Starting a job while an identical one is still pending or
+running returns that job instead of queuing the report again, the key is freed
+once the job finishes so that a later request computes a fresh report.
+
+The state of a job (status, progress, result) is kept in the cache for
+REPORT_JOB_TTL. The report tasks, run on the reports queue, are decorated with
+`report_job_task`, which gives them the job id as `job_id`, and report their
+progress with `set_report_job_progress`. The progress is kept under its own
+key, so that progress reports never overwrite the status of the job, which is
+only updated by the task running it. Their result is stored with
+`save_report_job_result` in the blob container of the downloads when one is
+configured, in REPORT_JOBS_DIR otherwise, and can be fetched through the
+report job download endpoint until it expires. REPORT_JOBS_DIR must then be a
+volume shared by the web and worker containers (the `report_jobs` volume of
+the compose files), the results are served by the web containers. Expired results are deleted by the
+`delete_expired_report_job_results` beat task.
+
+Reports made of several items computed in parallel (the projects of a
+download) list them with `set_report_job_items`, each item has its own state
+in the cache so that the tasks computing them never overwrite each other's.
+Intermediate files of a job are written and read with `open_report_job_file`
+and `iter_report_job_file`, in the same storage as the results.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from base64 import b64encode
+from contextlib import contextmanager
+from functools import wraps
+
+from azure.storage.blob import BlobSasPermissions, BlobServiceClient, generate_blob_sas
+from django.core.cache import cache
+
+from utils.blob_functions import (
+    extract_account_key,
+    extract_account_name,
+    extract_endpoint_suffix,
+)
+
+# how long the state and the result of a job are kept
+REPORT_JOB_TTL = int(os.getenv("REPORT_JOB_TTL", 60 * 60 * 24))
+# how long identical requests are coalesced onto a job which never finishes
+REPORT_JOB_TIMEOUT = int(os.getenv("DEFAULT_CELERY_LOCK_TIMEOUT", 60 * 60))
+
+REPORT_JOBS_DIR = os.getenv("REPORT_JOBS_DIR", "/var/lib/shoonya/report_jobs")
+REPORT_JOBS_BLOB_PREFIX = "report_jobs/"
+# size of the blocks of the files uploaded to the blob container
+REPORT_JOBS_BLOCK_SIZE = 4 * 1024 * 1024
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+
+def _job_key(job_id):
+    return f"report_job:{job_id}"
+
+
+def _request_key(request_hash):
+    return f"report_job_request:{request_hash}"
+
+
+def _progress_key(job_id):
+    return f"report_job:{job_id}:progress"
+
+
+def _item_key(job_id, item_id):
+    return f"report_job:{job_id}:item:{item_id}"
+
+
+def get_report_request_hash(kind, user_id, params):
+    """
+    Canonical hash of a report request, identical requests of a user share it
+    """
+    return hashlib.sha1(
+        json.dumps(
+            {"kind": kind, "user_id": user_id, "params": params},
+            sort_keys=True,
+            default=str,
+        ).encode()
+    ).hexdigest()
+
+
+def get_report_job(job_id):
+    job = cache.get(_job_key(job_id))
+    if job is not None:
+        job.update(cache.get(_progress_key(job_id)) or {})
+    return job
+
+
+def update_report_job(job_id, **fields):
+    """
+    Update the state of a job, returns the updated job or None if it expired
+    """
+    job = cache.get(_job_key(job_id))
+    if job is None:
+        return None
+    job.update(fields, updated_at=time.time())
+    cache.set(_job_key(job_id), job, REPORT_JOB_TTL)
+    job.update(cache.get(_progress_key(job_id)) or {})
+    return job
+
+
+def start_report_job(kind, user_id, params, task, task_kwargs):
+    """
+    Queue `task` with `task_kwargs` and the id of a new job, unless an
+    identical request of the user is already pending or running.
+    Returns the job and whether it was created.
+    """
+    request_hash = get_report_request_hash(kind, user_id, params)
+    job_id = uuid.uuid4().hex
+    for _ in range(2):
+        if cache.add(_request_key(request_hash), job_id, REPORT_JOB_TIMEOUT):
+            break
+        running_job_id = cache.get(_request_key(request_hash))
+        job = get_report_job(running_job_id) if running_job_id else None
+        if job is not None and job["status"] not in FINISHED_STATUSES:
+            return job, False
+        # the key of a lost or finished job is stale
+        cache.delete(_request_key(request_hash))
+    job = {
+        "id": job_id,
+        "kind": kind,
+        "user_id": user_id,
+        "request_hash": request_hash,
+        "status": PENDING,
+        "progress": 0,
+        "total": None,
+        "error": None,
+        "result": None,
+        "created_at": time.time(),
+        "updated_at": time.time(),
+    }
+    cache.set(_job_key(job_id), job, REPORT_JOB_TTL)
+    try:
+        task.apply_async(kwargs={**task_kwargs, "job_id": job_id})
+    except Exception as e:
+        update_report_job(job_id, status=FAILED, error=str(e))
+        cache.delete(_request_key(request_hash))
+        raise
+    return job, True
+
+
+def finish_report_job(job_id, status, **fields):
+    job = update_report_job(job_id, status=status, **fields)
+    if job is not None and cache.get(_request_key(job["request_hash"])) == job_id:
+        cache.delete(_request_key(job["request_hash"]))
+    return job
+
+
+@contextmanager
+def running_report_job(job_id):
+    """
+    Mark the job as running while the block runs and as failed if it raises.
+    Does nothing when the report is not run as a job (`job_id` is None).
+    """
+    if job_id is None:
+        yield
+        return
+    update_report_job(job_id, status=RUNNING)
+    try:
+        yield
+    except Exception as e:
+        finish_report_job(job_id, FAILED, error=str(e))
+        raise
+    job = get_report_job(job_id)
+    if job is not None and job["status"] not in FINISHED_STATUSES:
+        finish_report_job(job_id, SUCCEEDED)
+
+
+def report_job_task(task_function):
+    """
+    Run a report task, called with the `job_id` of its job or without one,
+    inside `running_report_job`
+    """
+
+    @wraps(task_function)
+    def wrapper(*args, job_id=None, **kwargs):
+        with running_report_job(job_id):
+            return task_function(*args, job_id=job_id, **kwargs)
+
+    return wrapper
+
+
+def set_report_job_progress(job_id, progress, total=None):
+    if job_id is None:
+        return
+    state = cache.get(_progress_key(job_id)) or {}
+    state["progress"] = progress
+    if total is not None:
+        state["total"] = total
+    cache.set(_progress_key(job_id), state, REPORT_JOB_TTL)
+
+
+def _blob_settings():
+    connection_string = os.getenv("AZURE_CONNECTION_STRING")
+    container_name = os.getenv("CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS")
+    if not (connection_string and container_name):
+        return None
+    return connection_string, container_name
+
+
+def _container_client(connection_string, container_name):
+    return BlobServiceClient.from_connection_string(
+        connection_string
+    ).get_container_client(container_name)
+
+
+def set_report_job_items(job_id, item_ids):
+    """
+    Set the items of the job, which are pending until `set_report_job_item`
+    """
+    if job_id is None:
+        return
+    item_ids = list(item_ids)
+    update_report_job(job_id, items=item_ids, total=len(item_ids))
+
+
+def set_report_job_item(job_id, item_id, status, **fields):
+    if job_id is None:
+        return
+    cache.set(
+        _item_key(job_id, item_id),
+        {"id": item_id, "status": status, **fields, "updated_at": time.time()},
+        REPORT_JOB_TTL,
+    )
+
+
+def get_report_job_items(job):
+    """
+    States of the items of the job, in their order
+    """
+    item_ids = job.get("items") or []
+    states = cache.get_many([_item_key(job["id"], item_id) for item_id in item_ids])
+    return [
+        states.get(_item_key(job["id"], item_id), {"id": item_id, "status": PENDING})
+        for item_id in item_ids
+    ]
+
+
+class _BlockBlobWriter:
+    """
+    Write-only file uploading what is written to a block blob, in blocks of
+    REPORT_JOBS_BLOCK_SIZE. The blob is committed when the file is closed.
+    """
+
+    def __init__(self, blob_client):
+        self.blob_client = blob_client
+        self.block_ids = []
+        self.buffer = bytearray()
+
+    def _stage_block(self):
+        block_id = b64encode(f"{len(self.block_ids):08d}".encode()).decode()
+        self.blob_client.stage_block(block_id, bytes(self.buffer))
+        self.block_ids.append(block_id)
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= REPORT_JOBS_BLOCK_SIZE:
+            self._stage_block()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.buffer or not self.block_ids:
+            self._stage_block()
+        self.blob_client.commit_block_list(self.block_ids)
+
+
+def _stored_name(job_id, filename):
+    return f"{job_id}/{filename}"
+
+
+@contextmanager
+def open_report_job_file(job_id, filename):
+    """
+    Open a file of the job for writing in binary mode, the file is stored
+    when the block exits
+    """
+    name = _stored_name(job_id, filename)
+    blob_settings = _blob_settings()
+    if blob_settings:
+        stored_file = _BlockBlobWriter(
+            _container_client(*blob_settings).get_blob_client(
+                REPORT_JOBS_BLOB_PREFIX + name
+            )
+        )
+    else:
+        path = os.path.join(REPORT_JOBS_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stored_file = open(path, "wb")
+    try:
+        yield stored_file
+    except BaseException:
+        # the blocks of an unfinished blob are never committed
+        if not blob_settings:
+            stored_file.close()
+        raise
+    stored_file.close()
+
+
+def iter_report_job_file(job_id, filename):
+    """
+    Yields the content of a file of the job in chunks of bytes
+    """
+    name = _stored_name(job_id, filename)
+    blob_settings = _blob_settings()
+    if blob_settings:
+        downloader = _container_client(*blob_settings).download_blob(
+            REPORT_JOBS_BLOB_PREFIX + name
+        )
+        yield from downloader.chunks()
+        return
+    with open(os.path.join(REPORT_JOBS_DIR, name), "rb") as stored_file:
+        yield from iter(lambda: stored_file.read(REPORT_JOBS_BLOCK_SIZE), b"")
+
+
+def delete_report_job_file(job_id, filename):
+    name = _stored_name(job_id, filename)
+    blob_settings = _blob_settings()
+    if blob_settings:
+        _container_client(*blob_settings).delete_blob(REPORT_JOBS_BLOB_PREFIX + name)
+    else:
+        os.remove(os.path.join(REPORT_JOBS_DIR, name))
+
+
+def get_report_job_file_result(job_id, filename, content_type):
+    """
+    Result of the job made of one of its files
+    """
+    return {
+        "storage": "blob" if _blob_settings() else "local",
+        "name": _stored_name(job_id, filename),
+        "filename": filename,
+        "content_type": content_type,
+    }
+
+
+def save_report_job_result(job_id, report_file, filename, content_type):
+    """
+    Store the report (a file opened in binary mode) as the result of the job
+    and mark the job as succeeded. Does nothing when `job_id` is None.
+    """
+    if job_id is None:
+        return
+    filename = filename.replace("/", "_")
+    with open_report_job_file(job_id, filename) as stored_file:
+        shutil.copyfileobj(report_file, stored_file)
+    finish_report_job(
+        job_id,
+        SUCCEEDED,
+        result=get_report_job_file_result(job_id, filename, content_type),
+    )
+
+
+def get_report_job_result_path(result):
+    """
+    Path of a result stored locally
+    """
+    return os.path.join(REPORT_JOBS_DIR, result["name"])
+
+
+def get_report_job_result_url(result, expiry_hours=1):
+    """
+    Link to a result stored in the blob container, valid for `expiry_hours`
+    """
+    connection_string, container_name = _blob_settings()
+    account_name = extract_account_name(connection_string)
+    blob_name = REPORT_JOBS_BLOB_PREFIX + result["name"]
+    sas_token = generate_blob_sas(
+        container_name=container_name,
+        blob_name=blob_name,
+        account_name=account_name,
+        account_key=extract_account_key(connection_string),
+        permission=BlobSasPermissions(read=True),
+        expiry=datetime.datetime.now() + datetime.timedelta(hours=expiry_hours),
+    )
+    return (
+        f"https://{account_name}.blob.{extract_endpoint_suffix(connection_string)}"
+        f"/{container_name}/{blob_name}?{sas_token}"
+    )
+
+
+def delete_expired_results():
+    """
+    Delete the stored results older than REPORT_JOB_TTL, returns their number
+    """
+    deleted = 0
+    expired_before = time.time() - REPORT_JOB_TTL
+    if os.path.isdir(REPORT_JOBS_DIR):
+        for entry in os.scandir(REPORT_JOBS_DIR):
+            if entry.is_dir() and entry.stat().st_mtime < expired_before:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                deleted += 1
+    blob_settings = _blob_settings()
+    if blob_settings:
+        container_client = _container_client(*blob_settings)
+        for blob in container_client.list_blobs(
+            name_starts_with=REPORT_JOBS_BLOB_PREFIX
+        ):
+            if blob.last_modified.timestamp() < expired_before:
+                container_client.delete_blob(blob.name)
+                deleted += 1
+    return deleted
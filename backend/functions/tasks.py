@@ -1,23 +1,29 @@
+import csv
 import datetime
 import time
 import zipfile
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+import numpy as np
 import pandas as pd
-from celery import shared_task
+from celery import chord, shared_task
 from dataset import models as dataset_models
 from organizations.models import Organization
 from projects.models import Project
 from projects.utils import (
     convert_seconds_to_hours,
     get_audio_project_types,
-    get_audio_transcription_duration,
     calculate_word_error_rate_between_two_audio_transcription_annotation,
-    ocr_word_count,
-    get_not_null_audio_transcription_duration,
 )
-from projects.views import get_task_count_unassigned, ProjectViewSet
+from projects.metrics import character_edit_distances, get_segment_text_pairs
+from projects.export_stream import stream_project_export
+from projects.views import get_task_count_unassigned
 from shoonya_backend import settings
+from tasks.annotation_metrics import (
+    PENDING_RESULT,
+    RESULT_METRIC_FUNCTIONS,
+    get_result_metric,
+)
 from tasks.models import (
     Annotation,
     ANNOTATOR_ANNOTATION,
@@ -27,8 +33,9 @@ from tasks.models import (
     SUPER_CHECKED,
     Task,
     ANNOTATED,
+    EXPORTED,
+    INCOMPLETE,
 )
-from tasks.views import SentenceOperationViewSet
 from users.models import User
 from django.core.mail import EmailMessage
 
@@ -46,16 +53,33 @@ from .utils import (
     get_batch_ocr_predictions,
     get_batch_asr_predictions,
 )
-from django.db import transaction, DataError, IntegrityError
+from django.db import connection, transaction, DataError, IntegrityError
+from django.db.models.fields.json import KeyTransform
 from dataset.models import DatasetInstance
 from django.apps import apps
-from rest_framework.test import APIRequestFactory
-from django.http import QueryDict
-from rest_framework.request import Request
 import os
 import tempfile
 
 from shoonya_backend.locks import Lock
+from .report_jobs import (
+    FAILED,
+    RUNNING,
+    SUCCEEDED,
+    delete_expired_results,
+    delete_report_job_file,
+    finish_report_job,
+    get_report_job_file_result,
+    get_report_job_result_url,
+    iter_report_job_file,
+    open_report_job_file,
+    report_job_task,
+    running_report_job,
+    save_report_job_result,
+    set_report_job_item,
+    set_report_job_items,
+    set_report_job_progress,
+    update_report_job,
+)
 from utils.constants import LANG_CHOICES
 from projects.tasks import filter_data_items
 from projects.models import BATCH
@@ -66,6 +90,22 @@ import logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+REPORT_CHUNK_SIZE = 2000
+# number of projects whose reports are computed at once
+REPORT_WORKERS = 4
+# larger reports are uploaded and linked in the email instead of attached
+REPORT_ATTACHMENT_MAX_SIZE = 10 * 1024 * 1024
+
+# the score lists of get_stats_definitions, in order
+COMPARISON_SCORE_LISTS = (
+    "ann_vs_rev_ced",
+    "ann_vs_rev_wer",
+    "rev_vs_sup_ced",
+    "rev_vs_sup_wer",
+    "ann_vs_sup_ced",
+    "ann_vs_sup_wer",
+)
+
 
 ## CELERY SHARED TASKS
 @shared_task(bind=True)
@@ -794,10 +834,11 @@ def populate_draft_data_json(
     return f"successfully populated {cnt} dataset items with draft_data_json"
 
 
-# The flow for project_reports- schedule_mail_for_project_reports -> get_proj_objs, get_stats ->
-# get_modified_stats_result, get_stats_helper -> update_meta_stats -> calculate_ced_between_two_annotations,
-# calculate_wer_between_two_annotations, get_most_recent_annotation.
+# The flow for project_reports- schedule_mail_for_project_reports -> get_proj_objs, write_project_reports ->
+# get_project_stats -> get_stats_helper -> update_meta_stats, score_comparisons -> calculate_ced_between_two_annotations,
+# calculate_wer_between_two_annotations, get_modified_stats_result.
 @shared_task(queue="reports")
+@report_job_task
 def schedule_mail_for_project_reports(
     project_type,
     user_id,
@@ -811,21 +852,8 @@ def schedule_mail_for_project_reports(
     oid,
     did,
     language,
+    job_id=None,
 ):
-    task_name = (
-        "schedule_mail_for_project_reports"
-        + str(project_type)
-        + str(anno_stats)
-        + str(meta_stats)
-        + str(complete_stats)
-        + str(workspace_level_reports)
-        + str(organization_level_reports)
-        + str(dataset_level_reports)
-        + str(wid)
-        + str(oid)
-        + str(did)
-        + str(language)
-    )
     proj_objs = get_proj_objs(
         workspace_level_reports,
         organization_level_reports,
@@ -838,24 +866,11 @@ def schedule_mail_for_project_reports(
     )
 
     if len(proj_objs) == 0:
-        celery_lock = Lock(user_id, task_name)
-        try:
-            celery_lock.releaseLock()
-        except Exception as e:
-            print(f"Error while releasing the lock for {task_name}: {str(e)}")
         print("No projects found")
         return 0
 
     user = User.objects.get(id=user_id)
     if len(proj_objs) != 0:
-        result = get_stats(
-            proj_objs, anno_stats, meta_stats, complete_stats, project_type, user
-        )
-        df = pd.DataFrame.from_dict(result)
-        transposed_df = df.transpose()
-        content = transposed_df.to_csv(index=True)
-        content_type = "text/csv"
-
         if workspace_level_reports:
             workspace = Workspace.objects.filter(id=wid)
             name = workspace[0].workspace_name
@@ -879,15 +894,45 @@ def schedule_mail_for_project_reports(
             + " are ready."
             + "\nProject Type: "
             + f"{project_type}"
-            + "\n Thanks for contributing on Shoonya!"
-        )
-        email = EmailMessage(
-            f"{name}-" + " Project Reports",
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            attachments=[(filename, content, content_type)],
         )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            report_path = os.path.join(temp_dir, filename)
+            with open(report_path, "w", newline="") as report_file:
+                write_project_reports(
+                    proj_objs,
+                    anno_stats,
+                    meta_stats,
+                    complete_stats,
+                    project_type,
+                    user,
+                    report_file,
+                    job_id,
+                )
+            with open(report_path, "rb") as report_file:
+                save_report_job_result(job_id, report_file, filename, "text/csv")
+            url = None
+            if os.path.getsize(report_path) > REPORT_ATTACHMENT_MAX_SIZE:
+                url = upload_file_to_blob_and_get_url(
+                    report_path,
+                    f"{name}_project_reports - "
+                    + datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+                    + ".csv",
+                )
+            email = EmailMessage(
+                f"{name}-" + " Project Reports",
+                message,
+                settings.DEFAULT_FROM_EMAIL,
+                [user.email],
+            )
+            if url and url.startswith("https://"):
+                email.body += (
+                    "\nYou can download the reports by clicking on- "
+                    + f"{url}"
+                    + " This link is active only for 1 hour."
+                )
+            else:
+                email.attach_file(report_path, "text/csv")
+            email.body += "\n Thanks for contributing on Shoonya!"
     else:
         message = (
             "Dear "
@@ -929,117 +974,176 @@ def schedule_mail_for_project_reports(
         logger.info(message, extra=extra_data)
 
     except Exception as e:
-        celery_lock = Lock(user_id, task_name)
-        try:
-            celery_lock.releaseLock()
-        except Exception as e:
-            print(f"Error while releasing the lock for {task_name}: {str(e)}")
         print(f"An error occurred while sending email: {e}")
-    celery_lock = Lock(user_id, task_name)
-    try:
-        celery_lock.releaseLock()
-    except Exception as e:
-        print(f"Error while releasing the lock for {task_name}: {str(e)}")
     print(f"Email sent successfully - {user_id}")
 
 
-def get_stats(proj_objs, anno_stats, meta_stats, complete_stats, project_type, user):
-    result = {}
-    for proj in proj_objs:
-        annotations = Annotation.objects.filter(task__project_id=proj.id)
-        (
-            result_ann_anno_stats,
-            result_rev_anno_stats,
-            result_sup_anno_stats,
-            result_ann_meta_stats,
-            result_rev_meta_stats,
-            result_sup_meta_stats,
-            average_ann_vs_rev_CED,
-            average_ann_vs_rev_WER,
-            average_rev_vs_sup_CED,
-            average_rev_vs_sup_WER,
-            average_ann_vs_sup_CED,
-            average_ann_vs_sup_WER,
-        ) = get_stats_definitions()
-        for ann_obj in annotations:
-            if ann_obj.annotation_type == ANNOTATOR_ANNOTATION:
-                try:
-                    get_stats_helper(
-                        anno_stats,
-                        meta_stats,
-                        complete_stats,
-                        result_ann_anno_stats,
-                        result_ann_meta_stats,
-                        ann_obj,
-                        project_type,
-                        average_ann_vs_rev_CED,
-                        average_ann_vs_rev_WER,
-                        average_rev_vs_sup_CED,
-                        average_rev_vs_sup_WER,
-                        average_ann_vs_sup_CED,
-                        average_ann_vs_sup_WER,
-                    )
-                except:
-                    continue
-            elif ann_obj.annotation_type == REVIEWER_ANNOTATION:
-                try:
-                    get_stats_helper(
-                        anno_stats,
-                        meta_stats,
-                        complete_stats,
-                        result_rev_anno_stats,
-                        result_rev_meta_stats,
-                        ann_obj,
-                        project_type,
-                        average_ann_vs_rev_CED,
-                        average_ann_vs_rev_WER,
-                        average_rev_vs_sup_CED,
-                        average_rev_vs_sup_WER,
-                        average_ann_vs_sup_CED,
-                        average_ann_vs_sup_WER,
+def get_latest_annotation_ids(proj_id):
+    """
+    Returns a dict of (task id, annotation type) to the id of the most
+    recently updated annotation of the project
+    """
+    latest_annotation_ids = {}
+    annotations = (
+        Annotation.objects.filter(task__project_id=proj_id)
+        .order_by("updated_at", "id")
+        .values_list("id", "task_id", "annotation_type")
+    )
+    for annotation_id, task_id, annotation_type in annotations.iterator(
+        chunk_size=REPORT_CHUNK_SIZE
+    ):
+        latest_annotation_ids[(task_id, annotation_type)] = annotation_id
+    return latest_annotation_ids
+
+
+def score_comparisons(comparisons, comparison_scores, project_type):
+    """
+    Compute the CED or WER of the (score list, metric, annotation id, annotation id)
+    comparisons and append them to their list of comparison_scores
+    """
+    for start in range(0, len(comparisons), REPORT_CHUNK_SIZE):
+        chunk = comparisons[start : start + REPORT_CHUNK_SIZE]
+        annotation_ids = {
+            annotation_id for _, _, id1, id2 in chunk for annotation_id in (id1, id2)
+        }
+        results = dict(
+            Annotation.objects.filter(id__in=annotation_ids).values_list("id", "result")
+        )
+        for score_list, metric, id1, id2 in chunk:
+            try:
+                if metric == "ced":
+                    score = get_average_of_a_list(
+                        calculate_ced_between_two_annotations(
+                            results[id1], results[id2]
+                        )
                     )
-                except:
-                    continue
-            elif ann_obj.annotation_type == SUPER_CHECKER_ANNOTATION:
-                try:
-                    get_stats_helper(
-                        anno_stats,
-                        meta_stats,
-                        complete_stats,
-                        result_sup_anno_stats,
-                        result_sup_meta_stats,
-                        ann_obj,
-                        project_type,
-                        average_ann_vs_rev_CED,
-                        average_ann_vs_rev_WER,
-                        average_rev_vs_sup_CED,
-                        average_rev_vs_sup_WER,
-                        average_ann_vs_sup_CED,
-                        average_ann_vs_sup_WER,
+                else:
+                    score = calculate_wer_between_two_annotations(
+                        results[id1], results[id2], project_type
                     )
-                except:
-                    continue
-        result[f"{proj.id} - {proj.title}"] = get_modified_stats_result(
-            result_ann_meta_stats,
-            result_rev_meta_stats,
-            result_sup_meta_stats,
-            result_ann_anno_stats,
-            result_rev_anno_stats,
-            result_sup_anno_stats,
-            anno_stats,
-            meta_stats,
-            complete_stats,
-            average_ann_vs_rev_CED,
-            average_ann_vs_rev_WER,
-            average_rev_vs_sup_CED,
-            average_rev_vs_sup_WER,
-            average_ann_vs_sup_CED,
-            average_ann_vs_sup_WER,
-            proj.id,
-            user,
-        )
+            except Exception:
+                continue
+            comparison_scores[score_list].append(score)
 
-    return result
+
+def get_project_stats(
+    proj_id, anno_stats, meta_stats, complete_stats, project_type, user
+):
+    """
+    Report row of a project, its annotations are read in chunks
+    """
+    (
+        result_ann_anno_stats,
+        result_rev_anno_stats,
+        result_sup_anno_stats,
+        result_ann_meta_stats,
+        result_rev_meta_stats,
+        result_sup_meta_stats,
+        *score_lists,
+    ) = get_stats_definitions()
+    comparison_scores = dict(zip(COMPARISON_SCORE_LISTS, score_lists))
+    result_stats = {
+        ANNOTATOR_ANNOTATION: (result_ann_anno_stats, result_ann_meta_stats),
+        REVIEWER_ANNOTATION: (result_rev_anno_stats, result_rev_meta_stats),
+        SUPER_CHECKER_ANNOTATION: (result_sup_anno_stats, result_sup_meta_stats),
+    }
+    needs_result = (meta_stats or complete_stats) and (
+        "OCRTranscription" in project_type or project_type in get_audio_project_types()
+    )
+    fields = [
+        "id",
+        "task_id",
+        "annotation_type",
+        "annotation_status",
+        "parent_annotation__annotation_type",
+        "parent_annotation__parent_annotation__annotation_type",
+        "task__task_status",
+    ]
+    expressions = {}
+    if needs_result:
+        # the metrics are read from the annotations, the result is only
+        # loaded for the annotations whose metrics are not stored yet
+        fields.extend(["result_metrics_computed", *RESULT_METRIC_FUNCTIONS])
+        expressions["result"] = PENDING_RESULT
+    annotations = Annotation.objects.filter(task__project_id=proj_id).values(
+        *fields,
+        task_word_count=KeyTransform("word_count", "task__data"),
+        task_audio_duration=KeyTransform("audio_duration", "task__data"),
+        **expressions,
+    )
+    latest_annotation_ids = get_latest_annotation_ids(proj_id) if not anno_stats else {}
+    comparisons = []
+    for ann in annotations.iterator(chunk_size=REPORT_CHUNK_SIZE):
+        if ann["annotation_type"] not in result_stats:
+            continue
+        result_anno_stats, result_meta_stats = result_stats[ann["annotation_type"]]
+        try:
+            get_stats_helper(
+                anno_stats,
+                meta_stats,
+                complete_stats,
+                result_anno_stats,
+                result_meta_stats,
+                ann,
+                project_type,
+                latest_annotation_ids,
+                comparisons,
+            )
+        except:
+            continue
+    score_comparisons(comparisons, comparison_scores, project_type)
+    return get_modified_stats_result(
+        result_ann_meta_stats,
+        result_rev_meta_stats,
+        result_sup_meta_stats,
+        result_ann_anno_stats,
+        result_rev_anno_stats,
+        result_sup_anno_stats,
+        anno_stats,
+        meta_stats,
+        complete_stats,
+        *score_lists,
+        proj_id,
+        user,
+    )
+
+
+def write_project_reports(
+    proj_objs,
+    anno_stats,
+    meta_stats,
+    complete_stats,
+    project_type,
+    user,
+    report_file,
+    job_id=None,
+):
+    """
+    Write the report row of every project to the CSV file as soon as it is
+    computed. Projects are processed in parallel by a bounded pool of threads,
+    the number of projects done is reported as the progress of the report job.
+    """
+    projects = list(proj_objs.values_list("id", "title"))
+
+    def project_stats(project):
+        try:
+            return get_project_stats(
+                project[0], anno_stats, meta_stats, complete_stats, project_type, user
+            )
+        finally:
+            connection.close()
+
+    writer = None
+    with ThreadPoolExecutor(max_workers=REPORT_WORKERS) as executor:
+        # projects are submitted in chunks so that only a few rows are held at once
+        for start in range(0, len(projects), REPORT_WORKERS * 4):
+            chunk = projects[start : start + REPORT_WORKERS * 4]
+            for (proj_id, title), row in zip(chunk, executor.map(project_stats, chunk)):
+                if writer is None:
+                    writer = csv.DictWriter(report_file, fieldnames=["", *row.keys()])
+                    writer.writeheader()
+                writer.writerow({"": f"{proj_id} - {title}", **row})
+            set_report_job_progress(job_id, start + len(chunk), len(projects))
 
 
 def get_stats_definitions():
@@ -1385,204 +1489,173 @@ def get_stats_helper(
     complete_stats,
     result_anno_stats,
     result_meta_stats,
-    ann_obj,
+    ann,
     project_type,
-    average_ann_vs_rev_CED,
-    average_ann_vs_rev_WER,
-    average_rev_vs_sup_CED,
-    average_rev_vs_sup_WER,
-    average_ann_vs_sup_CED,
-    average_ann_vs_sup_WER,
+    latest_annotation_ids,
+    comparisons,
 ):
+    """
+    Count the annotation (a dict of the fields read by get_project_stats) in the
+    stats, and queue the comparisons with its parent annotations
+    """
     ced_project_type_choices = ["ContextualTranslationEditing"]
-    task_obj = ann_obj.task
-    task_data = task_obj.data
+    task_data = {
+        key: ann[f"task_{key}"]
+        for key in ("word_count", "audio_duration")
+        if ann[f"task_{key}"] is not None
+    }
 
     if anno_stats or complete_stats:
-        update_anno_stats(result_anno_stats, ann_obj, anno_stats)
+        update_anno_stats(result_anno_stats, ann, anno_stats)
         if anno_stats:
             return 0
     update_meta_stats(
         result_meta_stats,
-        ann_obj,
+        ann,
         task_data,
         project_type,
         ced_project_type_choices,
     )
-    if task_obj.task_status == REVIEWED:
-        if ann_obj.annotation_type == REVIEWER_ANNOTATION:
-            if project_type in ced_project_type_choices:
-                try:
-                    average_ann_vs_rev_CED.append(
-                        get_average_of_a_list(
-                            calculate_ced_between_two_annotations(
-                                get_most_recent_annotation(ann_obj.parent_annotation),
-                                get_most_recent_annotation(ann_obj),
-                            )
-                        )
-                    )
-                except Exception as error:
-                    pass
-            elif project_type in get_audio_project_types():
-                try:
-                    # we pass the reviewer first has the reference sentence and annotator second which
-                    # has the hypothesis sentence.
-                    # A higher grade has the reference sentence and the lower has the hypothesis sentence
-                    average_ann_vs_rev_WER.append(
-                        calculate_wer_between_two_annotations(
-                            get_most_recent_annotation(ann_obj).result,
-                            get_most_recent_annotation(
-                                ann_obj.parent_annotation
-                            ).result,
-                            project_type,
-                        )
-                    )
-                except Exception as error:
-                    pass
-    elif task_obj.task_status == SUPER_CHECKED:
-        if ann_obj.annotation_type == SUPER_CHECKER_ANNOTATION:
-            if project_type in ced_project_type_choices:
-                try:
-                    average_ann_vs_rev_CED.append(
-                        get_average_of_a_list(
-                            calculate_ced_between_two_annotations(
-                                get_most_recent_annotation(
-                                    ann_obj.parent_annotation.parent_annotation
-                                ),
-                                get_most_recent_annotation(ann_obj.parent_annotation),
-                            )
-                        )
-                    )
-                except Exception as error:
-                    pass
-                try:
-                    average_rev_vs_sup_CED.append(
-                        get_average_of_a_list(
-                            calculate_ced_between_two_annotations(
-                                get_most_recent_annotation(ann_obj.parent_annotation),
-                                get_most_recent_annotation(ann_obj),
-                            )
-                        )
-                    )
-                except Exception as error:
-                    pass
-                try:
-                    average_ann_vs_sup_CED.append(
-                        get_average_of_a_list(
-                            calculate_ced_between_two_annotations(
-                                get_most_recent_annotation(
-                                    ann_obj.parent_annotation.parent_annotation
-                                ),
-                                get_most_recent_annotation(ann_obj),
-                            )
-                        )
+    if project_type in ced_project_type_choices:
+        metric = "ced"
+    elif project_type in get_audio_project_types():
+        metric = "wer"
+    else:
+        return 0
+
+    def latest(annotation_type):
+        return latest_annotation_ids[(ann["task_id"], annotation_type)]
+
+    task_status = ann["task__task_status"]
+    parent_type = ann["parent_annotation__annotation_type"]
+    grandparent_type = ann["parent_annotation__parent_annotation__annotation_type"]
+    if (
+        task_status == REVIEWED
+        and ann["annotation_type"] == REVIEWER_ANNOTATION
+        and parent_type is not None
+    ):
+        if metric == "ced":
+            comparisons.append(
+                (
+                    "ann_vs_rev_ced",
+                    metric,
+                    latest(parent_type),
+                    latest(REVIEWER_ANNOTATION),
+                )
+            )
+        else:
+            # we pass the reviewer first has the reference sentence and annotator second which
+            # has the hypothesis sentence.
+            # A higher grade has the reference sentence and the lower has the hypothesis sentence
+            comparisons.append(
+                (
+                    "ann_vs_rev_wer",
+                    metric,
+                    latest(REVIEWER_ANNOTATION),
+                    latest(parent_type),
+                )
+            )
+    elif (
+        task_status == SUPER_CHECKED
+        and ann["annotation_type"] == SUPER_CHECKER_ANNOTATION
+        and parent_type is not None
+    ):
+        if grandparent_type is not None:
+            if metric == "ced":
+                comparisons.append(
+                    (
+                        "ann_vs_rev_ced",
+                        metric,
+                        latest(grandparent_type),
+                        latest(parent_type),
                     )
-                except Exception as error:
-                    pass
-            elif project_type in get_audio_project_types():
-                try:
-                    average_ann_vs_rev_WER.append(
-                        calculate_wer_between_two_annotations(
-                            get_most_recent_annotation(
-                                ann_obj.parent_annotation
-                            ).result,
-                            get_most_recent_annotation(
-                                ann_obj.parent_annotation.parent_annotation
-                            ).result,
-                            project_type,
-                        )
+                )
+            else:
+                comparisons.append(
+                    (
+                        "ann_vs_rev_wer",
+                        metric,
+                        latest(parent_type),
+                        latest(grandparent_type),
                     )
-                except Exception as error:
-                    pass
-                try:
-                    average_rev_vs_sup_WER.append(
-                        calculate_wer_between_two_annotations(
-                            get_most_recent_annotation(ann_obj).result,
-                            get_most_recent_annotation(
-                                ann_obj.parent_annotation
-                            ).result,
-                            project_type,
-                        )
+                )
+        if metric == "ced":
+            comparisons.append(
+                (
+                    "rev_vs_sup_ced",
+                    metric,
+                    latest(parent_type),
+                    latest(SUPER_CHECKER_ANNOTATION),
+                )
+            )
+        else:
+            comparisons.append(
+                (
+                    "rev_vs_sup_wer",
+                    metric,
+                    latest(SUPER_CHECKER_ANNOTATION),
+                    latest(parent_type),
+                )
+            )
+        if grandparent_type is not None:
+            if metric == "ced":
+                comparisons.append(
+                    (
+                        "ann_vs_sup_ced",
+                        metric,
+                        latest(grandparent_type),
+                        latest(SUPER_CHECKER_ANNOTATION),
                     )
-                except Exception as error:
-                    pass
-                try:
-                    average_ann_vs_sup_WER.append(
-                        calculate_wer_between_two_annotations(
-                            get_most_recent_annotation(ann_obj).result,
-                            get_most_recent_annotation(
-                                ann_obj.parent_annotation.parent_annotation
-                            ).result,
-                            project_type,
-                        )
+                )
+            else:
+                comparisons.append(
+                    (
+                        "ann_vs_sup_wer",
+                        metric,
+                        latest(SUPER_CHECKER_ANNOTATION),
+                        latest(grandparent_type),
                     )
-                except Exception as error:
-                    pass
+                )
     return 0
 
 
-def update_anno_stats(result_anno_stats, ann_obj, anno_stats):
-    result_anno_stats[ann_obj.annotation_status] += 1
+def update_anno_stats(result_anno_stats, ann, anno_stats):
+    result_anno_stats[ann["annotation_status"]] += 1
     return 0 if anno_stats else None
 
 
 def update_meta_stats(
-    result_meta_stats, ann_obj, task_data, project_type, ced_project_type_choices
+    result_meta_stats, ann, task_data, project_type, ced_project_type_choices
 ):
+    annotation_status = ann["annotation_status"]
     if project_type in ced_project_type_choices:
         try:
-            result_meta_stats[ann_obj.annotation_status]["Word Count"] += task_data[
+            result_meta_stats[annotation_status]["Word Count"] += task_data[
                 "word_count"
             ]
         except Exception as e:
             return 0
     elif "OCRTranscription" in project_type:
-        result_meta_stats[ann_obj.annotation_status]["Word Count"] += ocr_word_count(
-            ann_obj.result
+        result_meta_stats[annotation_status]["Word Count"] += get_result_metric(
+            ann, "result_word_count"
         )
     elif project_type in get_audio_project_types():
-        result_meta_stats[ann_obj.annotation_status]["Raw Audio Duration"] += task_data[
+        result_meta_stats[annotation_status]["Raw Audio Duration"] += task_data[
             "audio_duration"
         ]
-        result_meta_stats[ann_obj.annotation_status][
-            "Segment Duration"
-        ] += get_audio_transcription_duration(ann_obj.result)
-        result_meta_stats[ann_obj.annotation_status][
+        result_meta_stats[annotation_status]["Segment Duration"] += get_result_metric(
+            ann, "result_audio_duration"
+        )
+        result_meta_stats[annotation_status][
             "Not Null Segment Duration"
-        ] += get_not_null_audio_transcription_duration(ann_obj.result, ann_obj.id)
+        ] += get_result_metric(ann, "result_not_null_audio_duration")
 
 
-def calculate_ced_between_two_annotations(annotation1, annotation2):
-    sentence_operation = SentenceOperationViewSet()
-    ced_list = []
-    for i in range(len(annotation1.result)):
-        if "value" in annotation1.result[i]:
-            if "text" in annotation1.result[i]["value"]:
-                str1 = annotation1.result[i]["value"]["text"]
-            else:
-                continue
-        else:
-            continue
-        if "value" in annotation2.result[i]:
-            if "text" in annotation2.result[i]["value"]:
-                str2 = annotation2.result[i]["value"]["text"]
-            else:
-                continue
-        else:
-            continue
-        data = {"sentence1": str1, "sentence2": str2}
-        try:
-            char_level_distance = (
-                sentence_operation.calculate_normalized_character_level_edit_distance(
-                    data
-                )
-            )
-            ced_list.append(
-                char_level_distance.data["normalized_character_level_edit_distance"]
-            )
-        except Exception as e:
-            continue
-    return ced_list
+def calculate_ced_between_two_annotations(annotation_result1, annotation_result2):
+    ced_scores = character_edit_distances(
+        get_segment_text_pairs(annotation_result1, annotation_result2)
+    )
+    return ced_scores[~np.isnan(ced_scores)].tolist()
 
 
 def calculate_wer_between_two_annotations(annotation1, annotation2, project_type):
@@ -1594,116 +1667,143 @@ def calculate_wer_between_two_annotations(annotation1, annotation2, project_type
         return 0
 
 
-def get_most_recent_annotation(annotation):
-    duplicate_ann = Annotation.objects.filter(
-        task=annotation.task, annotation_type=annotation.annotation_type
-    )
-    for ann in duplicate_ann:
-        if annotation.updated_at < ann.updated_at:
-            annotation = ann
-    return annotation
+# statuses of the tasks in the downloads of all the projects
+DOWNLOAD_ALL_PROJECTS_TASK_STATUSES = [
+    INCOMPLETE,
+    ANNOTATED,
+    REVIEWED,
+    SUPER_CHECKED,
+    EXPORTED,
+]
 
 
-@shared_task(bind=True)
+@shared_task(queue="reports")
 def schedule_mail_to_download_all_projects(
-    self, workspace_level_projects, dataset_level_projects, wid, did, user_id
+    workspace_level_projects, dataset_level_projects, wid, did, user_id, job_id
 ):
-    task_name = (
-        "schedule_mail_to_download_all_projects"
-        + str(workspace_level_projects)
-        + str(dataset_level_projects)
-        + str(wid)
-        + str(did)
-    )
-    download_lock = threading.Lock()
-    download_lock.acquire()
-    proj_objs = get_proj_objs(
-        workspace_level_projects,
-        False,
-        dataset_level_projects,
-        None,
-        wid,
-        0,
-        did,
-    )
-    if len(proj_objs) == 0 and workspace_level_projects:
-        print(f"No projects found for workspace id- {wid}")
-        celery_lock = Lock(user_id, task_name)
-        try:
-            celery_lock.releaseLock()
-        except Exception as e:
-            print(f"Error while releasing the lock for {task_name}: {str(e)}")
-        return 0
-    elif len(proj_objs) == 0 and dataset_level_projects:
-        print(f"No projects found for dataset id- {did}")
-        celery_lock = Lock(user_id, task_name)
-        try:
-            celery_lock.releaseLock()
-        except Exception as e:
-            print(f"Error while releasing the lock for {task_name}: {str(e)}")
-        return 0
-    user = User.objects.get(id=user_id)
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for proj in proj_objs:
-            proj_view_set_obj = ProjectViewSet()
-            factory = APIRequestFactory()
-            url = f"/projects/{proj.id}/download"
-            query_params = QueryDict(mutable=True)
-            query_params["include_input_data_metadata_json"] = "true"
-            query_params["export_type"] = "CSV"
-            query_params[
-                "task_status"
-            ] = "incomplete,annotated,reviewed,super_checked,exported"
-            custom_request = Request(factory.get(url, data=query_params, timeout=15))
-            custom_request.user = user
-            try:
-                proj_file = proj_view_set_obj.download(custom_request, proj.id)
-            except Exception as e:
-                print(f"Downloading project timed out, Project id- {proj.id}")
-                continue
-            file_path = os.path.join(temp_dir, f"{proj.id} - {proj.title}.csv")
-            with open(file_path, "wb") as f:
-                f.write(proj_file.content)
-        url = upload_all_projects_to_blob_and_get_url(temp_dir)
-    if url:
-        message = (
-            "Dear "
-            + str(user.username)
-            + f",\nYou can download all the projects by clicking on- "
-            + f"{url}"
-            + " This link is active only for 1 hour.\n Thanks for contributing on Shoonya!"
-        )
-        email = EmailMessage(
-            f"{user.username}" + "- Link to download all projects",
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
+    """
+    Export the projects of a workspace or a dataset in parallel, one
+    `export_project_for_download_all` task per project, and zip them in
+    `zip_projects_for_download_all` once they are all exported
+    """
+    try:
+        proj_objs = get_proj_objs(
+            workspace_level_projects,
+            False,
+            dataset_level_projects,
+            None,
+            wid,
+            0,
+            did,
+            None,
         )
-        try:
-            email.send()
-        except Exception as e:
-            print(f"An error occurred while sending email: {e}")
+        if len(proj_objs) == 0:
+            if workspace_level_projects:
+                print(f"No projects found for workspace id- {wid}")
+            else:
+                print(f"No projects found for dataset id- {did}")
+            finish_report_job(job_id, SUCCEEDED)
             return 0
-        download_lock.release()
-        celery_lock = Lock(user_id, task_name)
-        try:
-            celery_lock.releaseLock()
-        except Exception as e:
-            print(f"Error while releasing the lock for {task_name}: {str(e)}")
-        print(f"Email sent successfully - {user_id}")
-    else:
-        celery_lock = Lock(user_id, task_name)
-        try:
-            celery_lock.releaseLock()
-        except Exception as e:
-            print(f"Error while releasing the lock for {task_name}: {str(e)}")
-        download_lock.release()
-        print(url)
+        project_ids = [proj.id for proj in proj_objs]
+        update_report_job(job_id, status=RUNNING)
+        set_report_job_items(job_id, project_ids)
+        chord(
+            export_project_for_download_all.s(job_id, project_id)
+            for project_id in project_ids
+        )(zip_projects_for_download_all.s(job_id, user_id))
+    except Exception as e:
+        # the job is finished by the chord once it runs
+        finish_report_job(job_id, FAILED, error=str(e))
+        raise
+    return len(project_ids)
+
+
+def _get_project_part_filename(project_id):
+    return f"projects/{project_id}.csv"
+
+
+@shared_task(name="export_project_for_download_all", queue="reports")
+def export_project_for_download_all(job_id, project_id):
+    """
+    Write the CSV download of a project to a file of the job, returns the
+    file and its name in the zip, or None if the project is not exported
+    """
+    set_report_job_item(job_id, project_id, RUNNING)
+    try:
+        project = Project.objects.get(id=project_id)
+        tasks = Task.objects.filter(
+            project_id=project, task_status__in=DOWNLOAD_ALL_PROJECTS_TASK_STATUSES
+        )
+        if not tasks.exists():
+            set_report_job_item(job_id, project_id, SUCCEEDED)
+            return None
+        part_filename = _get_project_part_filename(project_id)
+        with open_report_job_file(job_id, part_filename) as part_file:
+            for piece in stream_project_export(project, tasks, "CSV", True):
+                part_file.write(piece.encode())
+    except Exception as e:
+        print(f"Downloading project failed, Project id- {project_id}: {e}")
+        set_report_job_item(job_id, project_id, FAILED, error=str(e))
+        return None
+    set_report_job_item(job_id, project_id, SUCCEEDED)
+    return {"file": part_filename, "name": f"{project.id} - {project.title}.csv"}
 
 
-def upload_all_projects_to_blob_and_get_url(csv_files_directory):
+@shared_task(name="zip_projects_for_download_all", queue="reports")
+def zip_projects_for_download_all(parts, job_id, user_id):
+    """
+    Write the exported projects one after the other into the zip which is
+    the result of the job, and mail a link to it to the user
+    """
     date_time_string = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     zip_file_name = f"output_all_projects - {date_time_string}.zip"
+    with running_report_job(job_id):
+        with open_report_job_file(job_id, zip_file_name) as zip_file:
+            # the zip is written to the storage as it is built
+            with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as zipf:
+                for part in parts:
+                    if part is None:
+                        continue
+                    with zipf.open(part["name"], "w", force_zip64=True) as entry:
+                        for chunk in iter_report_job_file(job_id, part["file"]):
+                            entry.write(chunk)
+                    delete_report_job_file(job_id, part["file"])
+        result = get_report_job_file_result(job_id, zip_file_name, "application/zip")
+        finish_report_job(job_id, SUCCEEDED, result=result)
+
+    user = User.objects.get(id=user_id)
+    if result["storage"] == "blob":
+        download = (
+            f"clicking on- {get_report_job_result_url(result)}"
+            + " This link is active only for 1 hour."
+        )
+    else:
+        download = f"from the report job {job_id}."
+    message = (
+        "Dear "
+        + str(user.username)
+        + f",\nYou can download all the projects by {download}"
+        + "\n Thanks for contributing on Shoonya!"
+    )
+    email = EmailMessage(
+        f"{user.username}" + "- Link to download all projects",
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+    )
+    try:
+        email.send()
+    except Exception as e:
+        print(f"An error occurred while sending email: {e}")
+        return 0
+    print(f"Email sent successfully - {user_id}")
+
+
+def upload_file_to_blob_and_get_url(file_path, blob_name):
+    """
+    Upload a file to the download container and return a link to it,
+    valid for an hour, or an error message
+    """
     AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_CONNECTION_STRING")
     CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS = os.getenv(
         "CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS"
@@ -1722,42 +1822,24 @@ def upload_all_projects_to_blob_and_get_url(csv_files_directory):
     ):
         print("Azure Blob Storage connection test failed. Exiting...")
         return "test_container_connection failed"
-    blob_url = ""
-    if os.path.exists(csv_files_directory):
-        zip_file_path_on_disk = csv_files_directory + "/" + f"{zip_file_name}"
-        try:
-            with zipfile.ZipFile(
-                zip_file_path_on_disk, "w", zipfile.ZIP_DEFLATED
-            ) as zipf:
-                for root, dirs, files in os.walk(csv_files_directory):
-                    for file in files:
-                        if file.endswith(".csv"):
-                            file_path = os.path.join(root, file)
-                            zipf.write(
-                                file_path,
-                                os.path.relpath(file_path, csv_files_directory),
-                            )
-        except Exception as e:
-            return "Error in creating zip file"
-        blob_client = container_client.get_blob_client(zip_file_name)
-        with open(zip_file_path_on_disk, "rb") as file:
-            blob_client.upload_blob(file, blob_type="BlockBlob")
-        try:
-            expiry = datetime.datetime.now() + datetime.timedelta(hours=1)
-            account_name = extract_account_name(AZURE_STORAGE_CONNECTION_STRING)
-            endpoint_suffix = extract_endpoint_suffix(AZURE_STORAGE_CONNECTION_STRING)
-            sas_token = generate_blob_sas(
-                container_name=CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS,
-                blob_name=blob_client.blob_name,
-                account_name=account_name,
-                account_key=extract_account_key(AZURE_STORAGE_CONNECTION_STRING),
-                permission=BlobSasPermissions(read=True),
-                expiry=expiry,
-            )
-        except Exception as e:
-            return "Error in generating url"
-        blob_url = f"https://{account_name}.blob.{endpoint_suffix}/{CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS}/{blob_client.blob_name}?{sas_token}"
-    return blob_url
+    blob_client = container_client.get_blob_client(blob_name)
+    with open(file_path, "rb") as file:
+        blob_client.upload_blob(file, blob_type="BlockBlob")
+    try:
+        expiry = datetime.datetime.now() + datetime.timedelta(hours=1)
+        account_name = extract_account_name(AZURE_STORAGE_CONNECTION_STRING)
+        endpoint_suffix = extract_endpoint_suffix(AZURE_STORAGE_CONNECTION_STRING)
+        sas_token = generate_blob_sas(
+            container_name=CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS,
+            blob_name=blob_client.blob_name,
+            account_name=account_name,
+            account_key=extract_account_key(AZURE_STORAGE_CONNECTION_STRING),
+            permission=BlobSasPermissions(read=True),
+            expiry=expiry,
+        )
+    except Exception as e:
+        return "Error in generating url"
+    return f"https://{account_name}.blob.{endpoint_suffix}/{CONTAINER_NAME_FOR_DOWNLOAD_ALL_PROJECTS}/{blob_client.blob_name}?{sas_token}"
 
 
 def get_filtered_items(
@@ -1793,3 +1875,10 @@ def get_filtered_items(
     else:
         sampled_items = filtered_items
     return sampled_items
+
+
+@shared_task(name="delete_expired_report_job_results", queue="reports")
+def delete_expired_report_job_results():
+    deleted = delete_expired_results()
+    print(f"Deleted {deleted} expired report job results")
+    return deleted
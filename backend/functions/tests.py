@@ -1,3 +1,88 @@
-from django.test import TestCase
+import time
 
-# Create your tests here.
+import fakeredis
+from django.test import SimpleTestCase
+
+from shoonya_backend.locks import Lock, LockException
+
+
+class LockTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis_connection = fakeredis.FakeStrictRedis()
+
+    def get_lock(self, user_id=1, task_name="test_task", **kwargs):
+        return Lock(
+            user_id, task_name, redis_connection=self.redis_connection, **kwargs
+        )
+
+    def test_set_and_release_lock(self):
+        lock = self.get_lock()
+        self.assertEqual(lock.lockStatus(), 0)
+        self.assertTrue(lock.setLock(30))
+        self.assertEqual(lock.lockStatus(), 1)
+        self.assertTrue(lock.releaseLock())
+        self.assertEqual(lock.lockStatus(), 0)
+
+    def test_lock_is_exclusive(self):
+        self.assertTrue(self.get_lock().setLock(30))
+        self.assertFalse(self.get_lock().setLock(30))
+        # locks of other tasks and users are independent
+        self.assertTrue(self.get_lock(task_name="other_task").setLock(30))
+        self.assertTrue(self.get_lock(user_id=2).setLock(30))
+
+    def test_lock_expires(self):
+        lock = self.get_lock()
+        lock.setLock(0.05)
+        time.sleep(0.1)
+        self.assertEqual(lock.lockStatus(), 0)
+        self.assertIsNone(lock.getRemainingTimeForLock())
+
+    def test_remaining_time(self):
+        lock = self.get_lock()
+        self.assertIsNone(lock.getRemainingTimeForLock())
+        lock.setLock(100)
+        remaining_time = lock.getRemainingTimeForLock()
+        self.assertGreater(remaining_time, 90)
+        self.assertLessEqual(remaining_time, 100)
+
+    def test_release_from_another_instance(self):
+        # celery tasks release the locks set by the views scheduling them
+        self.get_lock().setLock(30)
+        self.assertTrue(self.get_lock().releaseLock())
+        self.assertEqual(self.get_lock().lockStatus(), 0)
+
+    def test_expired_holder_does_not_release_new_lock(self):
+        stale_lock = self.get_lock()
+        stale_lock.setLock(0.05)
+        time.sleep(0.1)
+        new_lock = self.get_lock()
+        self.assertTrue(new_lock.setLock(30))
+        self.assertFalse(stale_lock.releaseLock())
+        self.assertFalse(stale_lock.extendLock(30))
+        self.assertEqual(new_lock.lockStatus(), 1)
+
+    def test_extend_lock(self):
+        lock = self.get_lock()
+        lock.setLock(1)
+        self.assertTrue(lock.extendLock(100))
+        self.assertGreater(lock.getRemainingTimeForLock(), 90)
+
+    def test_context_manager(self):
+        with self.get_lock(timeout=30) as lock:
+            self.assertEqual(lock.lockStatus(), 1)
+            with self.assertRaises(LockException):
+                with self.get_lock(timeout=30):
+                    pass
+        self.assertEqual(self.get_lock().lockStatus(), 0)
+
+    def test_context_manager_releases_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.get_lock(timeout=30):
+                raise ValueError
+        self.assertEqual(self.get_lock().lockStatus(), 0)
+
+    def test_heartbeat_keeps_lock_alive(self):
+        with self.get_lock(timeout=0.2, heartbeat_interval=0.05) as lock:
+            time.sleep(0.5)
+            self.assertEqual(lock.lockStatus(), 1)
+        self.assertEqual(lock.lockStatus(), 0)
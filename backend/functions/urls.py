@@ -29,6 +29,8 @@ urlpatterns = [
     ),
     path("schedule_project_reports_email", schedule_project_reports_email),
     path("download_all_projects", download_all_projects),
+    path("report_jobs/<str:job_id>", report_job_status),
+    path("report_jobs/<str:job_id>/download", download_report_job_result),
 ]
 
 # urlpatterns = format_suffix_patterns(urlpatterns)
@@ -1,5 +1,5 @@
 import ast
-from shoonya_backend.locks import Lock
+from django.http import FileResponse, HttpResponseRedirect
 from dataset import models as dataset_models
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -24,6 +24,14 @@ from .tasks import (
     schedule_mail_for_project_reports,
     schedule_mail_to_download_all_projects,
 )
+from .report_jobs import (
+    FINISHED_STATUSES,
+    get_report_job,
+    get_report_job_items,
+    get_report_job_result_path,
+    get_report_job_result_url,
+    start_report_job,
+)
 from .utils import (
     check_conversation_translation_function_inputs,
     check_if_particular_organization_owner,
@@ -747,70 +755,110 @@ def schedule_project_reports_email(request):
     except KeyError:
         language = "NULL"
 
-    # name of the task is the same as the name of the celery function
-    uid = request.user.id
-    task_name = (
-        "schedule_mail_for_project_reports"
-        + str(project_type)
-        + str(anno_stats)
-        + str(meta_stats)
-        + str(complete_stats)
-        + str(workspace_level_reports)
-        + str(organization_level_reports)
-        + str(dataset_level_reports)
-        + str(wid)
-        + str(oid)
-        + str(did)
-        + str(language)
+    task_kwargs = {
+        "project_type": project_type,
+        "user_id": request.user.id,
+        "anno_stats": anno_stats,
+        "meta_stats": meta_stats,
+        "complete_stats": complete_stats,
+        "workspace_level_reports": workspace_level_reports,
+        "organization_level_reports": organization_level_reports,
+        "dataset_level_reports": dataset_level_reports,
+        "wid": wid,
+        "oid": oid,
+        "did": did,
+        "language": language,
+    }
+    job, created = start_report_job(
+        "project_reports",
+        request.user.id,
+        task_kwargs,
+        schedule_mail_for_project_reports,
+        task_kwargs,
     )
-    celery_lock = Lock(uid, task_name)
-    try:
-        lock_status = celery_lock.lockStatus()
-    except Exception as e:
-        print(
-            f"Error while retrieving the status of the lock for {task_name} : {str(e)}"
+    if created:
+        message = "You will receive an email with the reports shortly"
+    else:
+        message = "Your request is already being worked upon"
+    return Response(
+        {"message": message, "job_id": job["id"]},
+        status=status.HTTP_200_OK,
+    )
+
+
+def _serialize_report_job(job):
+    serialized = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "total": job["total"],
+        "error": job["error"],
+        "has_result": job["result"] is not None,
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job.get("items") is not None:
+        # the progress of the jobs made of items is the number of finished items
+        items = get_report_job_items(job)
+        serialized["items"] = items
+        serialized["progress"] = sum(
+            item["status"] in FINISHED_STATUSES for item in items
         )
-        lock_status = 0  # if lock status is not received successfully, it is assumed that the lock doesn't exist
-    if lock_status == 0:
-        celery_lock_timeout = int(os.getenv("DEFAULT_CELERY_LOCK_TIMEOUT"))
-        try:
-            celery_lock.setLock(celery_lock_timeout)
-        except Exception as e:
-            print(f"Error while setting the lock for {task_name}: {str(e)}")
-
-        schedule_mail_for_project_reports.delay(
-            project_type=project_type,
-            user_id=uid,
-            anno_stats=anno_stats,
-            meta_stats=meta_stats,
-            complete_stats=complete_stats,
-            workspace_level_reports=workspace_level_reports,
-            organization_level_reports=organization_level_reports,
-            dataset_level_reports=dataset_level_reports,
-            wid=wid,
-            oid=oid,
-            did=did,
-            language=language,
+    return serialized
+
+
+def _get_own_report_job(request, job_id):
+    job = get_report_job(job_id)
+    if job is None or not (
+        request.user.is_superuser or job["user_id"] == request.user.id
+    ):
+        return None
+    return job
+
+
+@api_view(["GET"])
+def report_job_status(request, job_id):
+    """
+    Status and progress of a report job of the user
+    """
+    job = _get_own_report_job(request, job_id)
+    if job is None:
+        return Response(
+            {"message": "Report job not found"}, status=status.HTTP_404_NOT_FOUND
         )
+    return Response(_serialize_report_job(job), status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def download_report_job_result(request, job_id):
+    """
+    Download the report of a finished report job of the user
+    """
+    job = _get_own_report_job(request, job_id)
+    if job is None:
         return Response(
-            {"message": "You will receive an email with the reports shortly"},
-            status=status.HTTP_200_OK,
+            {"message": "Report job not found"}, status=status.HTTP_404_NOT_FOUND
         )
-    else:
-        try:
-            remaining_time = celery_lock.getRemainingTimeForLock()
-        except Exception as e:
-            print(f"Error while retrieving the lock remaining time for {task_name}")
-            return Response(
-                {"message": f"Your request is already being worked upon"},
-                status=status.HTTP_200_OK,
-            )
+    result = job["result"]
+    if result is None:
         return Response(
-            {
-                "message": f"Your request is already being worked upon, you can try again after {remaining_time}"
-            },
-            status=status.HTTP_200_OK,
+            {"message": "The report is not ready", **_serialize_report_job(job)},
+            status=status.HTTP_404_NOT_FOUND,
         )
+    if result["storage"] == "blob":
+        return HttpResponseRedirect(get_report_job_result_url(result))
+    path = get_report_job_result_path(result)
+    if not os.path.exists(path):
+        return Response(
+            {"message": "The report has expired"}, status=status.HTTP_404_NOT_FOUND
+        )
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename=result["filename"],
+        content_type=result["content_type"],
+    )
 
 
 @api_view(["POST"])
@@ -855,55 +903,24 @@ def download_all_projects(request):
         }
         return Response(final_response, status=status.HTTP_401_UNAUTHORIZED)
 
-    # Checking lock status, name parameter of the lock is the name of the celery function
-    task_name = (
-        "schedule_mail_to_download_all_projects"
-        + str(workspace_level_projects)
-        + str(dataset_level_projects)
-        + str(wid)
-        + str(did)
+    task_kwargs = {
+        "workspace_level_projects": workspace_level_projects,
+        "dataset_level_projects": dataset_level_projects,
+        "wid": wid,
+        "did": did,
+    }
+    job, created = start_report_job(
+        "download_all_projects",
+        user.id,
+        task_kwargs,
+        schedule_mail_to_download_all_projects,
+        {**task_kwargs, "user_id": user.id},
     )
-
-    celery_lock = Lock(user_id, task_name)
-    try:
-        lock_status = celery_lock.lockStatus()
-    except Exception as e:
-        print(
-            f"Error while retrieving the status of the lock for {task_name} : {str(e)}"
-        )
-        lock_status = 0  # if lock status is not received successfully, it is assumed that the lock doesn't exist
-    if lock_status == 0:
-        celery_lock_timeout = int(os.getenv("DEFAULT_CELERY_LOCK_TIMEOUT"))
-        try:
-            celery_lock.setLock(celery_lock_timeout)
-        except Exception as e:
-            print(f"Error while setting the lock for {task_name}: {str(e)}")
-
-        schedule_mail_to_download_all_projects.delay(
-            workspace_level_projects=workspace_level_projects,
-            dataset_level_projects=dataset_level_projects,
-            wid=wid,
-            did=did,
-            user_id=user_id,
-        )
-
-        return Response(
-            {"message": "You will receive an email with the download link shortly"},
-            status=status.HTTP_200_OK,
-        )
-        pass
+    if created:
+        message = "You will receive an email with the download link shortly"
     else:
-        try:
-            remaining_time = celery_lock.getRemainingTimeForLock()
-        except Exception as e:
-            print(f"Error while retrieving the lock remaining time for {task_name}")
-            return Response(
-                {"message": f"Your request is already being worked upon"},
-                status=status.HTTP_200_OK,
-            )
-        return Response(
-            {
-                "message": f"Your request is already being worked upon, you can try again after {remaining_time}"
-            },
-            status=status.HTTP_200_OK,
-        )
+        message = "Your request is already being worked upon"
+    return Response(
+        {"message": message, "job_id": job["id"]},
+        status=status.HTTP_200_OK,
+    )
@@ -1,4 +1,10 @@
-from projects.serializers import ProjectSerializer
+from projects.membership import (
+    ANNOTATORS,
+    FROZEN_USERS,
+    REVIEWERS,
+    SUPERCHECKERS,
+    get_project_members,
+)
 from projects.models import Project
 
 """
@@ -18,29 +24,22 @@ def get_userids_from_project_id(
 ):
     try:
         project = Project.objects.get(pk=project_id)
-        serializer = ProjectSerializer(project, many=False)
+        members = get_project_members(project.id)
         ids = []
         if annotators_bool:
-            annotators = serializer.data["annotators"]
-            annotators_ids = [a.get("id") for a in annotators]
-            ids += annotators_ids
+            ids += members[ANNOTATORS]
         if reviewers_bool:
-            reviewers = serializer.data["annotation_reviewers"]
-            reviewers_ids = [r.get("id") for r in reviewers]
-            ids += reviewers_ids
+            ids += members[REVIEWERS]
         if super_checkers_bool:
-            super_checkers = serializer.data["review_supercheckers"]
-            super_checkers_ids = [s.get("id") for s in super_checkers]
-            ids += super_checkers_ids
+            ids += members[SUPERCHECKERS]
         if project_manager_bool:
             project_workspace = project.workspace_id
-            project_workspace_managers = project_workspace.managers.all()
-            project_workspace_managers_ids = [p.id for p in project_workspace_managers]
+            project_workspace_managers_ids = list(
+                project_workspace.managers.values_list("id", flat=True)
+            )
             ids += project_workspace_managers_ids
         if frozen_users_bool:
-            frozen_users = serializer.data["frozen_users"]
-            frozen_users_ids = [s.get("id") for s in frozen_users]
-            ids += frozen_users_ids
+            ids += members[FROZEN_USERS]
 
         return list(set(ids))
     except Project.DoesNotExist:
@@ -0,0 +1,83 @@
+# Generated by Django 3.2.14 on 2026-10-18 14:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("organizations", "0008_auto_20220930_0451"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrganizationTaskSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("project_type", models.CharField(max_length=100)),
+                (
+                    "language",
+                    models.CharField(
+                        blank=True,
+                        help_text="Target language of the projects",
+                        max_length=50,
+                        null=True,
+                    ),
+                ),
+                (
+                    "public_analytics",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Whether the workspace of the projects has public analytics",
+                    ),
+                ),
+                ("project_stage", models.PositiveSmallIntegerField()),
+                ("task_status", models.CharField(max_length=100)),
+                ("task_count", models.PositiveIntegerField(default=0)),
+                ("word_count", models.BigIntegerField(default=0)),
+                ("sentence_count", models.BigIntegerField(default=0)),
+                (
+                    "audio_duration",
+                    models.FloatField(
+                        default=0.0,
+                        help_text="Duration of the transcribed segments in seconds",
+                    ),
+                ),
+                (
+                    "raw_audio_duration",
+                    models.FloatField(
+                        default=0.0,
+                        help_text="Duration of the audio of the tasks in seconds",
+                    ),
+                ),
+                (
+                    "refreshed_at",
+                    models.DateTimeField(verbose_name="summary_refreshed_at"),
+                ),
+                (
+                    "organization",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="task_summaries",
+                        to="organizations.organization",
+                        verbose_name="organization",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="organizationtasksummary",
+            index=models.Index(
+                fields=["organization", "project_type"],
+                name="org_task_summary_type_idx",
+            ),
+        ),
+    ]
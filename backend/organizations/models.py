@@ -283,3 +283,54 @@ class Invite(models.Model):
         return "".join(
             secrets.choice(string.ascii_uppercase + string.digits) for i in range(10)
         )
+
+
+class OrganizationTaskSummary(models.Model):
+    """
+    Totals of the tasks of the projects of an organization per project type,
+    target language, workspace visibility, project stage and task status.
+    Backs the public dashboard, see organizations.task_summary.
+    """
+
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="task_summaries",
+        verbose_name="organization",
+    )
+    project_type = models.CharField(max_length=100)
+    language = models.CharField(
+        max_length=50,
+        null=True,
+        blank=True,
+        help_text=("Target language of the projects"),
+    )
+    public_analytics = models.BooleanField(
+        default=False,
+        help_text=("Whether the workspace of the projects has public analytics"),
+    )
+    project_stage = models.PositiveSmallIntegerField()
+    task_status = models.CharField(max_length=100)
+    task_count = models.PositiveIntegerField(default=0)
+    word_count = models.BigIntegerField(default=0)
+    sentence_count = models.BigIntegerField(default=0)
+    audio_duration = models.FloatField(
+        default=0.0,
+        help_text=("Duration of the transcribed segments in seconds"),
+    )
+    raw_audio_duration = models.FloatField(
+        default=0.0,
+        help_text=("Duration of the audio of the tasks in seconds"),
+    )
+    refreshed_at = models.DateTimeField(verbose_name="summary_refreshed_at")
+
+    def __str__(self):
+        return f"{self.organization_id}-{self.project_type}-{self.language}"
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["organization", "project_type"],
+                name="org_task_summary_type_idx",
+            ),
+        ]
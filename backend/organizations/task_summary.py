@@ -0,0 +1,411 @@
+"""
+Summary of the task counts of the organizations for the public dashboard.
+
+`OrganizationTaskSummary` holds, for every organization, the number of tasks
+and their word counts and audio durations per project type, target language,
+workspace visibility, project stage and task status. It is rebuilt
+periodically by the `refresh_organization_task_summaries` celery beat task and
+on demand by the organization owners, and the `cumulative_tasks_count`
+endpoint of the public organization viewset is served from it. Refreshes of an
+organization are serialized by a lock on its row.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Q
+from django.db.models.fields.json import KeyTransform
+from django.utils import timezone
+
+from projects.models import Project, ANNOTATION_STAGE, REVIEW_STAGE, SUPERCHECK_STAGE
+from projects.utils import (
+    convert_seconds_to_hours,
+    get_audio_project_types,
+    get_translation_dataset_project_types,
+)
+from tasks.annotation_metrics import PENDING_RESULT, get_result_metric
+from tasks.models import (
+    Annotation,
+    Task,
+    ANNOTATOR_ANNOTATION,
+    REVIEWER_ANNOTATION,
+    SUPER_CHECKER_ANNOTATION,
+    ANNOTATED,
+    EXPORTED,
+    REVIEWED,
+    SUPER_CHECKED,
+)
+from .models import Organization, OrganizationTaskSummary
+
+SUMMARY_BATCH_SIZE = 2000
+SUMMARY_CACHE_TTL = 60 * 60 * 24
+SUMMARY_SCHEDULED_TTL = 60 * 10
+
+SUMMARY_TASK_STATUSES = (ANNOTATED, REVIEWED, SUPER_CHECKED, EXPORTED)
+
+# the annotation whose result is measured for a task in each status
+MEASURED_ANNOTATION_TYPES = {
+    ANNOTATED: ANNOTATOR_ANNOTATION,
+    REVIEWED: REVIEWER_ANNOTATION,
+    SUPER_CHECKED: SUPER_CHECKER_ANNOTATION,
+}
+
+SUMMARY_FIELDS = (
+    "task_count",
+    "word_count",
+    "sentence_count",
+    "audio_duration",
+    "raw_audio_duration",
+)
+
+DASHBOARD_PROJECT_TYPES = [
+    "AcousticNormalisedTranscriptionEditing",
+    "VerbatimTranscriptionCharacterTagging",
+    "AudioSegmentation",
+    "AudioTranscription",
+    "AudioTranscriptionEditing",
+    "StandardisedTranscriptionEditing",
+    "ContextualSentenceVerification",
+    "ContextualSentenceVerificationAndDomainClassification",
+    "ContextualTranslationEditing",
+    "ConversationTranslation",
+    "ConversationTranslationEditing",
+    "ConversationVerification",
+    "MonolingualTranslation",
+    "OCRTranscriptionEditing",
+    "SemanticTextualSimilarity_Scale5",
+    "SentenceSplitting",
+    "TranslationEditing",
+]
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else 0
+
+
+def get_measured_annotation_metrics(project_id, project_type, audio_project_types):
+    """
+    Returns a dict of task id to the (word count, audio duration) of the
+    measured annotation of the audio and OCR tasks of the project
+    """
+    is_audio_project = project_type in audio_project_types
+    if not (is_audio_project or "OCRTranscription" in project_type):
+        return {}
+    status_filter = Q()
+    for task_status, annotation_type in MEASURED_ANNOTATION_TYPES.items():
+        status_filter |= Q(
+            task__task_status=task_status, annotation_type=annotation_type
+        )
+    annotations = (
+        Annotation.objects.filter(status_filter, task__project_id=project_id)
+        .order_by("task_id", "id")
+        .values(
+            "id",
+            "task_id",
+            "result_metrics_computed",
+            "result_word_count",
+            "result_audio_duration",
+            result=PENDING_RESULT,
+        )
+    )
+    metrics = {}
+    for annotation in annotations.iterator(chunk_size=SUMMARY_BATCH_SIZE):
+        # the first annotation of the task is measured
+        if annotation["task_id"] in metrics:
+            continue
+        try:
+            metrics[annotation["task_id"]] = (
+                get_result_metric(annotation, "result_word_count"),
+                (
+                    get_result_metric(annotation, "result_audio_duration")
+                    if is_audio_project
+                    else 0
+                ),
+            )
+        except Exception:
+            metrics[annotation["task_id"]] = None
+    return metrics
+
+
+def compute_task_summary(organization_id):
+    """
+    Returns a dict of (project type, language, public analytics, project stage,
+    task status) to the totals of the tasks of the organization
+    """
+    audio_project_types = get_audio_project_types()
+    summaries = {}
+    projects = Project.objects.filter(organization_id=organization_id).values_list(
+        "id",
+        "project_type",
+        "tgt_language",
+        "project_stage",
+        "workspace_id__public_analytics",
+    )
+    for project_id, project_type, language, stage, public_analytics in projects:
+        project_key = (project_type, language, bool(public_analytics), stage)
+        # the languages of the projects without any task are listed as well
+        summaries.setdefault(
+            project_key + (ANNOTATED,), dict.fromkeys(SUMMARY_FIELDS, 0)
+        )
+        measured = get_measured_annotation_metrics(
+            project_id, project_type, audio_project_types
+        )
+        is_audio_project = project_type in audio_project_types
+        tasks = Task.objects.filter(
+            project_id=project_id, task_status__in=SUMMARY_TASK_STATUSES
+        ).values_list(
+            "id",
+            "task_status",
+            KeyTransform("word_count", "data"),
+            KeyTransform("sentence_count", "data"),
+            KeyTransform("audio_duration", "data"),
+        )
+        for (
+            task_id,
+            task_status,
+            word_count,
+            sentence_count,
+            duration,
+        ) in tasks.iterator(chunk_size=SUMMARY_BATCH_SIZE):
+            totals = summaries.setdefault(
+                project_key + (task_status,), dict.fromkeys(SUMMARY_FIELDS, 0)
+            )
+            totals["task_count"] += 1
+            if task_status == EXPORTED:
+                continue
+            if task_id in measured:
+                if measured[task_id] is not None:
+                    annotation_word_count, audio_duration = measured[task_id]
+                    totals["word_count"] += annotation_word_count
+                    totals["audio_duration"] += audio_duration
+                    if is_audio_project:
+                        totals["raw_audio_duration"] += _number(duration)
+            elif not is_audio_project and "OCRTranscription" not in project_type:
+                totals["word_count"] += _number(word_count)
+                totals["sentence_count"] += _number(sentence_count)
+    return summaries
+
+
+def refresh_task_summary(organization_id):
+    """
+    Rebuild the task summary of the organization.
+    Returns the time of the refresh.
+    """
+    summaries = compute_task_summary(organization_id)
+    refreshed_at = timezone.now()
+    with transaction.atomic():
+        # concurrent refreshes would otherwise both insert their rows
+        list(Organization.objects.select_for_update().filter(pk=organization_id))
+        OrganizationTaskSummary.objects.filter(organization_id=organization_id).delete()
+        OrganizationTaskSummary.objects.bulk_create(
+            [
+                OrganizationTaskSummary(
+                    organization_id=organization_id,
+                    project_type=project_type,
+                    language=language,
+                    public_analytics=public_analytics,
+                    project_stage=project_stage,
+                    task_status=task_status,
+                    refreshed_at=refreshed_at,
+                    **totals,
+                )
+                for (
+                    project_type,
+                    language,
+                    public_analytics,
+                    project_stage,
+                    task_status,
+                ), totals in summaries.items()
+            ],
+            batch_size=SUMMARY_BATCH_SIZE,
+        )
+    return refreshed_at
+
+
+def get_last_refreshed(organization_id):
+    return OrganizationTaskSummary.objects.filter(
+        organization_id=organization_id
+    ).aggregate(last_refreshed=Max("refreshed_at"))["last_refreshed"]
+
+
+def _sum(rows, statuses, stages=None):
+    totals = dict.fromkeys(SUMMARY_FIELDS, 0)
+    for row in rows:
+        if row["task_status"] in statuses and (
+            stages is None or row["project_stage"] in stages
+        ):
+            for field in SUMMARY_FIELDS:
+                totals[field] += row[field]
+    return totals
+
+
+def get_metainfo_kind(project_type, audio_project_types, translation_project_types):
+    if project_type in audio_project_types:
+        return "audio"
+    if project_type in translation_project_types:
+        return "translation"
+    if "ConversationTranslation" in project_type:
+        return "conversation_translation"
+    if "OCRTranscription" in project_type:
+        return "ocr"
+    return None
+
+
+def get_language_result(language, rows, metainfo_kind):
+    """
+    Cumulative counts of the tasks of a language given its summary rows,
+    `metainfo_kind` being None for the task counts
+    """
+    work_statuses = (ANNOTATED, REVIEWED, SUPER_CHECKED)
+    annotation = _sum(rows, work_statuses)
+    review = _sum(rows, (REVIEWED, SUPER_CHECKED), (REVIEW_STAGE, SUPERCHECK_STAGE))
+    if metainfo_kind is None:
+        supercheck = _sum(rows, (SUPER_CHECKED,), (SUPERCHECK_STAGE,))
+        exported = {
+            stage: _sum(rows, (EXPORTED,), (stage,))["task_count"]
+            for stage in (ANNOTATION_STAGE, REVIEW_STAGE, SUPERCHECK_STAGE)
+        }
+        return {
+            "language": language,
+            "ann_cumulative_tasks_count": annotation["task_count"]
+            + sum(exported.values()),
+            "rew_cumulative_tasks_count": review["task_count"]
+            + exported[REVIEW_STAGE]
+            + exported[SUPERCHECK_STAGE],
+            "sup_cumulative_tasks_count": supercheck["task_count"]
+            + exported[SUPERCHECK_STAGE],
+        }
+    if metainfo_kind == "audio":
+        return {
+            "language": language,
+            "ann_cumulative_aud_duration": convert_seconds_to_hours(
+                annotation["audio_duration"]
+            ),
+            "rew_cumulative_aud_duration": convert_seconds_to_hours(
+                review["audio_duration"]
+            ),
+            "ann_raw_aud_duration": convert_seconds_to_hours(
+                annotation["raw_audio_duration"]
+            ),
+            "rew_raw_aud_duration": convert_seconds_to_hours(
+                review["raw_audio_duration"]
+            ),
+            "ann_audio_word_count": annotation["word_count"],
+            "rev_audio_word_count": review["word_count"],
+        }
+    if metainfo_kind == "ocr":
+        # the totals of the other languages were always reported as word counts
+        key = "word_count" if language == "Others" else "tasks_count"
+        return {
+            "language": language,
+            f"ann_ocr_cumulative_{key}": annotation["word_count"],
+            f"rew_ocr_cumulative_{key}": review["word_count"],
+        }
+    result = {
+        "language": language,
+        "ann_cumulative_word_count": annotation["word_count"],
+        "rew_cumulative_word_count": review["word_count"],
+    }
+    if metainfo_kind == "conversation_translation":
+        result["total_rev_sentance_count"] = review["sentence_count"]
+        result["total_ann_sentance_count"] = annotation["sentence_count"]
+    return result
+
+
+def build_cumulative_tasks_count(organization_id, project_types, metainfo, public_only):
+    """
+    Cumulative task counts (or their word counts and audio durations with
+    `metainfo`) of every project type, per target language
+    """
+    audio_project_types = get_audio_project_types()
+    translation_project_types = get_translation_dataset_project_types()
+    summaries = OrganizationTaskSummary.objects.filter(
+        organization_id=organization_id, project_type__in=project_types
+    )
+    if public_only:
+        summaries = summaries.filter(public_analytics=True)
+    rows_by_type = {}
+    for row in summaries.values(
+        "project_type", "language", "project_stage", "task_status", *SUMMARY_FIELDS
+    ):
+        language = row["language"] or "Others"
+        rows_by_type.setdefault(row["project_type"], {}).setdefault(
+            language, []
+        ).append(row)
+
+    final_result_for_all_types = {}
+    for project_type in project_types:
+        metainfo_kind = None
+        if metainfo:
+            metainfo_kind = get_metainfo_kind(
+                project_type, audio_project_types, translation_project_types
+            )
+            if metainfo_kind is None:
+                continue
+        final_result_for_all_types[project_type] = sorted(
+            (
+                get_language_result(language, rows, metainfo_kind)
+                for language, rows in rows_by_type.get(project_type, {}).items()
+            ),
+            key=lambda x: x["language"],
+        )
+    return final_result_for_all_types
+
+
+def _payload_key(organization_id, last_refreshed, project_types, metainfo, public_only):
+    variant = hashlib.md5(
+        json.dumps([project_types, metainfo, public_only]).encode()
+    ).hexdigest()
+    return (
+        f"org_cumulative_tasks_count:{organization_id}:"
+        f"{last_refreshed.timestamp()}:{variant}"
+    )
+
+
+def _etag(payload):
+    etag = hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return f'"{etag}"'
+
+
+def schedule_task_summary_refresh(organization_id):
+    """
+    Schedule a refresh of the task summary of the organization, unless one was
+    scheduled recently
+    """
+    from .tasks import refresh_organization_task_summaries
+
+    if cache.add(
+        f"org_task_summary_scheduled:{organization_id}", True, SUMMARY_SCHEDULED_TTL
+    ):
+        refresh_organization_task_summaries.delay([organization_id])
+
+
+def get_cumulative_tasks_count(organization_id, project_types, metainfo, public_only):
+    """
+    Returns the cumulative task counts of the organization along with their
+    ETag and the time the summary was last refreshed. The counts are cached
+    until the next refresh of the summary. The summary of an organization is
+    built in the background on its first request, which gets empty counts and
+    no refresh time.
+    """
+    last_refreshed = get_last_refreshed(organization_id)
+    if last_refreshed is None:
+        schedule_task_summary_refresh(organization_id)
+        payload = build_cumulative_tasks_count(
+            organization_id, project_types, metainfo, public_only
+        )
+        return payload, _etag(payload), None
+    key = _payload_key(
+        organization_id, last_refreshed, project_types, metainfo, public_only
+    )
+    cached = cache.get(key)
+    if cached is None:
+        payload = build_cumulative_tasks_count(
+            organization_id, project_types, metainfo, public_only
+        )
+        cached = (payload, _etag(payload))
+        cache.set(key, cached, SUMMARY_CACHE_TTL)
+    payload, etag = cached
+    return payload, etag, last_refreshed
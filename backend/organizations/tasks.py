@@ -1,10 +1,11 @@
 import datetime
+import io
 from dateutil.relativedelta import relativedelta
 from celery import shared_task
+import numpy as np
 import pandas as pd
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
-from tasks.views import SentenceOperationViewSet
 from utils.email_template import send_email_template_with_attachment
 
 from tasks.models import (
@@ -18,11 +19,17 @@ from tasks.models import (
     ACCEPTED_WITH_MAJOR_CHANGES,
     VALIDATED,
     VALIDATED_WITH_CHANGES,
+    DRAFT,
+    SKIPPED,
+    UNLABELED,
 )
+from tasks.annotation_rollup import get_annotation_rollups, get_rollup_status_counts
 from .models import Organization
+from .task_summary import refresh_task_summary
 from users.models import User
 from projects.models import Project, ANNOTATION_STAGE, REVIEW_STAGE
 from users.utils import get_role_name
+from projects.metrics import compute_text_metrics
 from projects.utils import (
     convert_seconds_to_hours,
     get_audio_project_types,
@@ -32,555 +39,29 @@ from projects.utils import (
     calculate_word_error_rate_between_two_audio_transcription_annotation,
 )
 from workspaces.tasks import (
+    get_all_annotation_reports,
+    get_all_review_reports,
+    get_all_supercheck_reports,
+    get_labeled_annotation_summary,
+    get_report_review_outcome_counts,
     un_pack_annotation_tasks,
 )
 from django.db.models import Q
+from functions.report_jobs import (
+    report_job_task,
+    save_report_job_result,
+    set_report_job_progress,
+)
 
 
-def get_all_annotation_reports(
-    proj_ids,
-    userid,
-    project_type,
-    start_date=None,
-    end_date=None,
-):
-    user = User.objects.get(pk=userid)
-    participation_type = user.participation_type
-    participation_type = (
-        "Full Time"
-        if participation_type == 1
-        else "Part Time"
-        if participation_type == 2
-        else "Contract Basis"
-        if participation_type == 4
-        else "N/A"
-    )
-    role = get_role_name(user.role)
-    userName = user.username
-    email = user.email
-    user_lang = user.languages
-
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status="labeled",
-            task__project_id__in=proj_ids,
-            annotation_type=ANNOTATOR_ANNOTATION,
-            completed_by=userid,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status="labeled",
-            task__project_id__in=proj_ids,
-            annotation_type=ANNOTATOR_ANNOTATION,
-            completed_by=userid,
-            updated_at__range=[start_date, end_date],
-        )
-    (
-        number_of_tasks_contributed_for_ar_wer,
-        number_of_tasks_contributed_for_as_wer,
-        number_of_tasks_contributed_for_ar_bleu,
-    ) = (
-        0,
-        0,
-        0,
-    )
-    ar_wer_score, as_wer_score, ar_bleu_score = 0, 0, 0
-    tasks_and_rejection_count_map_ar, number_of_tasks_that_has_review_annotations = (
-        {},
-        0,
-    )
-    for ann in submitted_tasks:
-        all_annotations = Annotation.objects.filter(task_id=ann.task_id)
-        try:
-            task = ann.task
-            revision_loop_count = task.revision_loop_count
-            r_count = revision_loop_count["review_count"]
-            tasks_and_rejection_count_map_ar[r_count] = (
-                tasks_and_rejection_count_map_ar.get(r_count, 0) + 1
-            )
-        except Exception as e:
-            pass
-        ar_done, as_done = False, False
-        ann_ann, rev_ann, sup_ann = "", "", ""
-        for a in all_annotations:
-            if a.annotation_type == REVIEWER_ANNOTATION and a.annotation_status in [
-                ACCEPTED,
-                ACCEPTED_WITH_MINOR_CHANGES,
-                ACCEPTED_WITH_MAJOR_CHANGES,
-            ]:
-                rev_ann = a
-            elif (
-                a.annotation_type == SUPER_CHECKER_ANNOTATION
-                and a.annotation_status in [VALIDATED, VALIDATED_WITH_CHANGES]
-            ):
-                sup_ann = a
-            elif a.annotation_type == ANNOTATOR_ANNOTATION:
-                ann_ann = a
-            if a.annotation_type == REVIEWER_ANNOTATION:
-                number_of_tasks_that_has_review_annotations += 1
-            if ann_ann and rev_ann and not ar_done:
-                try:
-                    ar_wer_score += calculate_word_error_rate_between_two_audio_transcription_annotation(
-                        rev_ann.result, ann_ann.result, project_type
-                    )
-                    number_of_tasks_contributed_for_ar_wer += 1
-                    ar_done = True
-                except Exception as e:
-                    pass
-                try:
-                    s1 = SentenceOperationViewSet()
-                    sampleRequest = {
-                        "annotation_result1": rev_ann.result,
-                        "annotation_result2": ann_ann.result,
-                    }
-                    ar_bleu_score += float(
-                        s1.calculate_bleu_score(sampleRequest).data["bleu_score"]
-                    )
-                    number_of_tasks_contributed_for_ar_bleu += 1
-                except Exception as e:
-                    pass
-            if ann_ann and sup_ann and not as_done:
-                try:
-                    as_wer_score += calculate_word_error_rate_between_two_audio_transcription_annotation(
-                        sup_ann.result, ann_ann.result, project_type
-                    )
-                    number_of_tasks_contributed_for_as_wer += 1
-                    as_done = True
-                except Exception as e:
-                    pass
-
-    submitted_tasks_count = submitted_tasks.count()
-
-    project_type_lower = project_type.lower()
-    is_translation_project = True if "translation" in project_type_lower else False
-    is_CT_OR_CTE = (
-        True
-        if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
-        else False
-    )
-    total_audio_duration_list = []
-    total_raw_audio_duration_list = []
-    total_word_count_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                total_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            total_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                total_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                total_raw_audio_duration_list.append(anno.task.data["audio_duration"])
-            except:
-                pass
-    else:
-        only_tasks = True
-
-    total_word_count = sum(total_word_count_list)
-    total_audio_duration = convert_seconds_to_hours(sum(total_audio_duration_list))
-    total_raw_audio_duration = convert_seconds_to_hours(
-        sum(total_raw_audio_duration_list)
-    )
-    cumulative_rejection_score_ar = 0
-    if tasks_and_rejection_count_map_ar:
-        for task, rc in tasks_and_rejection_count_map_ar.items():
-            cumulative_rejection_score_ar += task * rc
-    result = {
-        "Name": userName,
-        "Email": email,
-        "Participation Type": participation_type,
-        "Role": role,
-        "Type of Work": "Annotator",
-        "Total Segments Duration": total_audio_duration,
-        "Total Raw Audio Duration": total_raw_audio_duration,
-        "Word Count": total_word_count,
-        "Submitted Tasks": submitted_tasks_count,
-        "Language": user_lang,
-        "Average Word Error Rate Annotator Vs Reviewer": ar_wer_score
-        / number_of_tasks_contributed_for_ar_wer
-        if number_of_tasks_contributed_for_ar_wer
-        else 0,
-        "Cumulative Word Error Rate Annotator Vs Reviewer": ar_wer_score
-        if number_of_tasks_contributed_for_ar_wer
-        else 0,
-        "Average Word Error Rate Annotator Vs Superchecker": as_wer_score
-        / number_of_tasks_contributed_for_as_wer
-        if number_of_tasks_contributed_for_as_wer
-        else 0,
-        "Cumulative Word Error Rate Annotator Vs Superchecker": as_wer_score
-        if number_of_tasks_contributed_for_as_wer
-        else 0,
-        "Average Bleu Score Annotator Vs Reviewer": ar_bleu_score
-        / number_of_tasks_contributed_for_ar_bleu
-        if number_of_tasks_contributed_for_ar_bleu
-        else 0,
-        "Average Rejection Count Annotator Vs Reviewer": cumulative_rejection_score_ar
-        / number_of_tasks_that_has_review_annotations
-        if number_of_tasks_that_has_review_annotations
-        else 0,
-    }
-
-    if project_type in get_audio_project_types() or project_type == "AllAudioProjects":
-        del result["Word Count"]
-    elif only_tasks:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    elif is_CT_OR_CTE:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    else:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-
-    return result
-
-
-def get_all_review_reports(
-    proj_ids,
-    userid,
-    project_type,
-    start_date=None,
-    end_date=None,
-):
-    user = User.objects.get(pk=userid)
-    participation_type = user.participation_type
-    participation_type = (
-        "Full Time"
-        if participation_type == 1
-        else "Part Time"
-        if participation_type == 2
-        else "Contract Basis"
-        if participation_type == 4
-        else "N/A"
-    )
-    role = get_role_name(user.role)
-    userName = user.username
-    email = user.email
-    user_lang = user.languages
-
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=[
-                "accepted",
-                "to_be_revised",
-                "accepted_with_minor_changes",
-                "accepted_with_major_changes",
-            ],
-            task__project_id__in=proj_ids,
-            task__review_user=userid,
-            annotation_type=REVIEWER_ANNOTATION,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=[
-                "accepted",
-                "to_be_revised",
-                "accepted_with_minor_changes",
-                "accepted_with_major_changes",
-            ],
-            task__project_id__in=proj_ids,
-            task__review_user=userid,
-            annotation_type=REVIEWER_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-        )
-    number_of_tasks_contributed_for_rs_wer, number_of_tasks_contributed_for_rs_bleu = (
-        0,
-        0,
-    )
-    rs_wer_score, rs_bleu_score = 0, 0
-    (
-        tasks_and_rejection_count_map_ar,
-        tasks_and_rejection_count_map_rs,
-        number_of_tasks_that_has_sup_annotations,
-    ) = ({}, {}, 0)
-    for ann in submitted_tasks:
-        all_annotations = Annotation.objects.filter(task_id=ann.task_id)
-        task = ann.task
-        revision_loop_count = task.revision_loop_count
-        try:
-            r_count = revision_loop_count["review_count"]
-            tasks_and_rejection_count_map_ar[r_count] = (
-                tasks_and_rejection_count_map_ar.get(r_count, 0) + 1
-            )
-        except Exception as e:
-            pass
-        try:
-            s_count = revision_loop_count["super_check_count"]
-            tasks_and_rejection_count_map_rs[s_count] = (
-                tasks_and_rejection_count_map_rs.get(s_count, 0) + 1
-            )
-        except Exception as e:
-            pass
-        rs_done = False  # for duplicate annotations
-        sup_ann, rev_ann = "", ""
-        for a in all_annotations:
-            if (
-                a.annotation_type == SUPER_CHECKER_ANNOTATION
-                and a.annotation_status in [VALIDATED, VALIDATED_WITH_CHANGES]
-            ):
-                sup_ann = a
-            elif a.annotation_type == REVIEWER_ANNOTATION:
-                rev_ann = a
-            if a.annotation_type == SUPER_CHECKER_ANNOTATION:
-                number_of_tasks_that_has_sup_annotations += 1
-            if rev_ann and sup_ann and not rs_done:
-                try:
-                    rs_wer_score += calculate_word_error_rate_between_two_audio_transcription_annotation(
-                        sup_ann.result, rev_ann.result, project_type
-                    )
-                    number_of_tasks_contributed_for_rs_wer += 1
-                    rs_done = True
-                except Exception as e:
-                    pass
-                try:
-                    s1 = SentenceOperationViewSet()
-                    sampleRequest = {
-                        "annotation_result1": sup_ann.result,
-                        "annotation_result2": rev_ann.result,
-                    }
-                    rs_bleu_score += float(
-                        s1.calculate_bleu_score(sampleRequest).data["bleu_score"]
-                    )
-                    number_of_tasks_contributed_for_rs_bleu += 1
-                except Exception as e:
-                    pass
-    submitted_tasks_count = submitted_tasks.count()
-
-    project_type_lower = project_type.lower()
-    is_translation_project = True if "translation" in project_type_lower else False
-    is_CT_OR_CTE = (
-        True
-        if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
-        else False
-    )
-    total_audio_duration_list = []
-    total_raw_audio_duration_list = []
-    total_word_count_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                total_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            total_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                total_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                total_raw_audio_duration_list.append(anno.task.data["audio_duration"])
-            except:
-                pass
-    else:
-        only_tasks = True
-
-    total_word_count = sum(total_word_count_list)
-    total_audio_duration = convert_seconds_to_hours(sum(total_audio_duration_list))
-    total_raw_audio_duration = convert_seconds_to_hours(
-        sum(total_raw_audio_duration_list)
-    )
-    cumulative_rejection_score_ar = 0
-    if tasks_and_rejection_count_map_ar:
-        for task, rc in tasks_and_rejection_count_map_ar.items():
-            cumulative_rejection_score_ar += task * rc
-
-    cumulative_rejection_score_rs = 0
-    if tasks_and_rejection_count_map_rs:
-        for task, rc in tasks_and_rejection_count_map_rs.items():
-            cumulative_rejection_score_rs += task * rc
-
-    result = {
-        "Name": userName,
-        "Email": email,
-        "Participation Type": participation_type,
-        "Role": role,
-        "Type of Work": "Review",
-        "Total Segments Duration": total_audio_duration,
-        "Total Raw Audio Duration": total_raw_audio_duration,
-        "Word Count": total_word_count,
-        "Submitted Tasks": submitted_tasks_count,
-        "Language": user_lang,
-        "Average Word Error Rate Reviewer Vs Superchecker": rs_wer_score
-        / number_of_tasks_contributed_for_rs_wer
-        if number_of_tasks_contributed_for_rs_wer
-        else 0,
-        "Cumulative Word Error Rate Reviewer Vs Superchecker": rs_wer_score
-        if number_of_tasks_contributed_for_rs_wer
-        else 0,
-        "Average Bleu Score Reviewer Vs Superchecker": rs_bleu_score
-        / number_of_tasks_contributed_for_rs_bleu
-        if number_of_tasks_contributed_for_rs_bleu
-        else 0,
-        "Average Rejection Count Annotator Vs Reviewer": cumulative_rejection_score_ar
-        / submitted_tasks_count
-        if submitted_tasks_count
-        else 0,
-        "Average Rejection Count Reviewer Vs Superchecker": cumulative_rejection_score_rs
-        / number_of_tasks_that_has_sup_annotations
-        if number_of_tasks_that_has_sup_annotations
-        else 0,
-    }
-
-    if project_type in get_audio_project_types() or project_type == "AllAudioProjects":
-        del result["Word Count"]
-    elif only_tasks:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    elif is_CT_OR_CTE:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    else:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-
-    return result
-
-
-def get_all_supercheck_reports(
-    proj_ids, userid, project_type, start_date=None, end_date=None
-):
-    user = User.objects.get(pk=userid)
-    participation_type = (
-        "Full Time"
-        if user.participation_type == 1
-        else "Part Time"
-        if user.participation_type == 2
-        else "Contract Basis"
-        if user.participation_type == 4
-        else "N/A"
-    )
-    role = get_role_name(user.role)
-    userName = user.username
-    email = user.email
-    user_lang = user.languages
-
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=["validated", "validated_with_changes", "rejected"],
-            task__project_id__in=proj_ids,
-            task__super_check_user=userid,
-            annotation_type=SUPER_CHECKER_ANNOTATION,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=["validated", "validated_with_changes", "rejected"],
-            task__project_id__in=proj_ids,
-            task__super_check_user=userid,
-            annotation_type=SUPER_CHECKER_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-        )
-    tasks_and_rejection_count_map_rs = {}
-    for ann in submitted_tasks:
-        task = ann.task
-        revision_loop_count = task.revision_loop_count
-        try:
-            s_count = revision_loop_count["super_check_count"]
-            tasks_and_rejection_count_map_rs[s_count] = (
-                tasks_and_rejection_count_map_rs.get(s_count, 0) + 1
-            )
-        except Exception as e:
-            pass
-    submitted_tasks_count = submitted_tasks.count()
-
-    project_type_lower = project_type.lower()
-    is_translation_project = True if "translation" in project_type_lower else False
-    is_CT_OR_CTE = (
-        True
-        if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
-        else False
-    )
-    validated_word_count_list = []
-    validated_audio_duration_list = []
-    validated_raw_audio_duration_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                validated_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            validated_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                validated_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                validated_raw_audio_duration_list.append(
-                    anno.task.data["audio_duration"]
-                )
-            except:
-                pass
-    else:
-        only_tasks = True
-
-    validated_word_count = sum(validated_word_count_list)
-    validated_audio_duration = convert_seconds_to_hours(
-        sum(validated_audio_duration_list)
-    )
-    validated_raw_audio_duration = convert_seconds_to_hours(
-        sum(validated_raw_audio_duration_list)
-    )
-    cumulative_rejection_score_rs = 0
-    if tasks_and_rejection_count_map_rs:
-        for task, rc in tasks_and_rejection_count_map_rs.items():
-            cumulative_rejection_score_rs += task * rc
-
-    result = {
-        "Name": userName,
-        "Email": email,
-        "Participation Type": participation_type,
-        "Role": role,
-        "Type of Work": "Supercheck",
-        "Total Segments Duration": validated_audio_duration,
-        "Total Raw Audio Duration": validated_raw_audio_duration,
-        "Word Count": validated_word_count,
-        "Submitted Tasks": submitted_tasks_count,
-        "Language": user_lang,
-        "Average Rejection Count Reviewer Vs Superchecker": cumulative_rejection_score_rs
-        / submitted_tasks_count
-        if submitted_tasks_count
-        else 0,
-    }
-
-    if project_type in get_audio_project_types() or project_type == "AllAudioProjects":
-        del result["Word Count"]
-    elif only_tasks:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    elif is_CT_OR_CTE:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    else:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-
-    return result
+@shared_task(name="refresh_organization_task_summaries", queue="reports")
+def refresh_organization_task_summaries(org_ids=None):
+    """Rebuild the task summaries backing the public dashboard,
+    of every organization by default"""
+    if org_ids is None:
+        org_ids = Organization.objects.values_list("id", flat=True)
+    for org_id in org_ids:
+        refresh_task_summary(org_id)
 
 
 @shared_task(queue="reports")
@@ -776,6 +257,7 @@ def get_counts(
     is_translation_project,
     project_progress_stage,
     tgt_language=None,
+    review_counts=None,
 ):
     annotated_tasks = 0
     accepted = 0
@@ -845,92 +327,36 @@ def get_counts(
             end_date,
             is_translation_project,
             project_type,
+            review_counts,
         )
 
     else:
-        labeled_annotations = Annotation.objects.filter(
-            task__project_id__in=proj_ids,
-            annotation_status="labeled",
-            annotation_type=ANNOTATOR_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-            completed_by=annotator,
+        (
+            annotated_tasks,
+            avg_lead_time,
+            total_word_count,
+            total_duration,
+            total_raw_duration,
+            avg_segment_duration,
+            avg_segments_per_task,
+        ) = get_labeled_annotation_summary(
+            proj_ids,
+            annotator,
+            start_date,
+            end_date,
+            is_translation_project,
+            project_type,
         )
 
-        annotated_tasks = labeled_annotations.count()
-        lead_time_annotated_tasks = [
-            eachtask.lead_time for eachtask in labeled_annotations
-        ]
-        avg_lead_time = 0
-        if len(lead_time_annotated_tasks) > 0:
-            avg_lead_time = sum(lead_time_annotated_tasks) / len(
-                lead_time_annotated_tasks
-            )
-        total_word_count = 0
-        if is_translation_project or project_type == "SemanticTextualSimilarity_Scale5":
-            total_word_count_list = []
-            for each_task in labeled_annotations:
-                try:
-                    total_word_count_list.append(each_task.task.data["word_count"])
-                except:
-                    pass
-
-            total_word_count = sum(total_word_count_list)
-        elif "OCRTranscription" in project_type:
-            total_word_count = 0
-            for each_anno in labeled_annotations:
-                total_word_count += ocr_word_count(each_anno.result)
-
-        total_duration = "0:00:00"
-        avg_segment_duration = 0
-        avg_segments_per_task = 0
-        if project_type in get_audio_project_types():
-            total_duration_list = []
-            total_raw_duration_list = []
-            total_audio_segments_list = []
-            for each_task in labeled_annotations:
-                try:
-                    total_duration_list.append(
-                        get_audio_transcription_duration(each_task.result)
-                    )
-                    total_audio_segments_list.append(
-                        get_audio_segments_count(each_task.result)
-                    )
-                    total_raw_duration_list.append(
-                        each_task.task.data["audio_duration"]
-                    )
-                except:
-                    pass
-            total_duration = convert_seconds_to_hours(sum(total_duration_list))
-            total_raw_duration = convert_seconds_to_hours(sum(total_raw_duration_list))
-            total_audio_segments = sum(total_audio_segments_list)
-            try:
-                avg_segment_duration = total_duration / total_audio_segments
-                avg_segments_per_task = total_audio_segments / len(labeled_annotations)
-            except:
-                avg_segment_duration = 0
-                avg_segments_per_task = 0
-
-    total_skipped_tasks = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="skipped",
-        annotation_type=ANNOTATOR_ANNOTATION,
-        updated_at__range=[start_date, end_date],
-        completed_by=annotator,
-    )
-    all_pending_tasks_in_project = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="unlabeled",
-        annotation_type=ANNOTATOR_ANNOTATION,
-        updated_at__range=[start_date, end_date],
-        completed_by=annotator,
-    )
-
-    all_draft_tasks_in_project = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="draft",
-        annotation_type=ANNOTATOR_ANNOTATION,
-        updated_at__range=[start_date, end_date],
-        completed_by=annotator,
+    status_counts = get_rollup_status_counts(
+        get_annotation_rollups(
+            annotator,
+            proj_ids,
+            ANNOTATOR_ANNOTATION,
+            [SKIPPED, UNLABELED, DRAFT],
+            start_date,
+            end_date,
+        )
     )
 
     return (
@@ -942,9 +368,9 @@ def get_counts(
         accepted_wt_major_changes,
         labeled,
         avg_lead_time,
-        total_skipped_tasks.count(),
-        all_pending_tasks_in_project.count(),
-        all_draft_tasks_in_project.count(),
+        status_counts.get(SKIPPED, 0),
+        status_counts.get(UNLABELED, 0),
+        status_counts.get(DRAFT, 0),
         project_count,
         no_of_workspaces_objs,
         total_word_count,
@@ -964,7 +390,6 @@ def get_translation_quality_reports(
     project_progress_stage=None,
     tgt_language=None,
 ):
-    sentence_operation = SentenceOperationViewSet()
     if tgt_language == None:
         projects_objs = Project.objects.filter(
             organization_id_id=pk,
@@ -1070,12 +495,8 @@ def get_translation_quality_reports(
         minor_changes_annotations_of_user
     )
 
-    total_bleu_score = 0
-    total_char_score = 0
-
-    bleu_score_error_count = 0
-    char_score_error_count = 0
     total_lead_time = []
+    sentence_pairs = []
     for annot in accepted_with_changes_tasks:
         annotator_obj = annot
         reviewer_obj = Annotation.objects.filter(
@@ -1088,23 +509,13 @@ def get_translation_quality_reports(
         lead_time = reviewer_obj[0].lead_time
         total_lead_time.append(lead_time)
 
-        data = {"sentence1": str1[0], "sentence2": str2[0]}
-        try:
-            bleu_score = sentence_operation.calculate_bleu_score(data)
-            total_bleu_score += float(bleu_score.data["bleu_score"])
-        except:
-            bleu_score_error_count += 1
-        try:
-            char_level_distance = (
-                sentence_operation.calculate_normalized_character_level_edit_distance(
-                    data
-                )
-            )
-            total_char_score += float(
-                char_level_distance.data["normalized_character_level_edit_distance"]
-            )
-        except:
-            char_score_error_count += 1
+        sentence_pairs.append((str1[0], str2[0]))
+
+    scores = compute_text_metrics(sentence_pairs, ("bleu", "ced"))
+    total_bleu_score = float(np.nansum(scores["bleu"]))
+    total_char_score = float(np.nansum(scores["ced"]))
+    bleu_score_error_count = int(np.isnan(scores["bleu"]).sum())
+    char_score_error_count = int(np.isnan(scores["ced"]).sum())
 
     if len(accepted_with_changes_tasks) + accepted_count > 0:
         accepted_with_change_minus_bleu_score_error = (
@@ -1479,6 +890,7 @@ def send_project_analytics_mail_org(
 
 
 @shared_task(queue="reports")
+@report_job_task
 def send_user_analytics_mail_org(
     org_id,
     tgt_language,
@@ -1492,6 +904,7 @@ def send_user_analytics_mail_org(
     is_translation_project,
     project_progress_stage,
     final_reports,
+    job_id=None,
 ):
     organization = Organization.objects.get(pk=org_id)
     user = User.objects.get(id=user_id)
@@ -1519,8 +932,18 @@ def send_user_analytics_mail_org(
             if (ann_user.participation_type in [1, 2, 4])
         ]
 
+        review_counts = get_report_review_outcome_counts(
+            Project.objects.filter(organization_id_id=pk),
+            annotators,
+            project_type,
+            project_progress_stage,
+            tgt_language,
+            start_date,
+            end_date,
+        )
         result = []
-        for annotator in annotators:
+        for index, annotator in enumerate(annotators):
+            set_report_job_progress(job_id, index, len(annotators))
             participation_type = annotator.participation_type
             participation_type = (
                 "Full Time"
@@ -1570,6 +993,7 @@ def send_user_analytics_mail_org(
                 is_translation_project,
                 project_progress_stage,
                 None if tgt_language == None else tgt_language,
+                review_counts,
             )
 
             if (
@@ -1663,6 +1087,7 @@ def send_user_analytics_mail_org(
     content = df.to_csv(index=False)
     content_type = "text/csv"
     filename = f"{organization.title}_user_analytics.csv"
+    save_report_job_result(job_id, io.BytesIO(content.encode()), filename, content_type)
 
     project_progress_stage_name = "All Stage"
     if project_progress_stage == ANNOTATION_STAGE:
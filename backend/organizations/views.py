@@ -23,6 +23,7 @@ from regex import R
 from tasks.models import Annotation
 from projects.utils import is_valid_date, no_of_words, ocr_word_count
 from datetime import datetime, timezone, timedelta
+import numpy as np
 import pandas as pd
 from dateutil import relativedelta
 import calendar
@@ -34,8 +35,11 @@ from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 import csv
 from django.http import StreamingHttpResponse
-from tasks.views import SentenceOperationViewSet
+from django.utils.http import http_date
 from users.utils import get_role_name
+from projects.metrics import compute_text_metrics
+from projects.report_cache import ORGANIZATION_SCOPE, cached_report
+from functions.report_jobs import start_report_job
 from projects.utils import (
     minor_major_accepted_task,
     convert_seconds_to_hours,
@@ -46,11 +50,18 @@ from projects.utils import (
     audio_word_count,
     get_audio_segments_count,
 )
+from workspaces.tasks import get_report_review_outcome_counts
 from .tasks import (
     get_counts,
     send_user_reports_mail_org,
     send_project_analytics_mail_org,
     send_user_analytics_mail_org,
+    refresh_organization_task_summaries,
+)
+from .task_summary import (
+    DASHBOARD_PROJECT_TYPES,
+    get_cumulative_tasks_count,
+    get_last_refreshed,
 )
 from utils.filter_tasks_by_ann_type import filter_tasks_by_ann_type
 
@@ -119,7 +130,6 @@ def get_translation_quality_reports(
             },
             status=status.HTTP_404_NOT_FOUND,
         )
-    sentence_operation = SentenceOperationViewSet()
     if tgt_language == None:
         projects_objs = Project.objects.filter(
             organization_id_id=pk,
@@ -225,12 +235,8 @@ def get_translation_quality_reports(
         minor_changes_annotations_of_user
     )
 
-    total_bleu_score = 0
-    total_char_score = 0
-
-    bleu_score_error_count = 0
-    char_score_error_count = 0
     total_lead_time = []
+    sentence_pairs = []
     for annot in accepted_with_changes_tasks:
         annotator_obj = annot
         reviewer_obj = Annotation.objects.filter(
@@ -243,23 +249,13 @@ def get_translation_quality_reports(
         lead_time = reviewer_obj[0].lead_time
         total_lead_time.append(lead_time)
 
-        data = {"sentence1": str1[0], "sentence2": str2[0]}
-        try:
-            bleu_score = sentence_operation.calculate_bleu_score(data)
-            total_bleu_score += float(bleu_score.data["bleu_score"])
-        except:
-            bleu_score_error_count += 1
-        try:
-            char_level_distance = (
-                sentence_operation.calculate_normalized_character_level_edit_distance(
-                    data
-                )
-            )
-            total_char_score += float(
-                char_level_distance.data["normalized_character_level_edit_distance"]
-            )
-        except:
-            char_score_error_count += 1
+        sentence_pairs.append((str1[0], str2[0]))
+
+    scores = compute_text_metrics(sentence_pairs, ("bleu", "ced"))
+    total_bleu_score = float(np.nansum(scores["bleu"]))
+    total_char_score = float(np.nansum(scores["ced"]))
+    bleu_score_error_count = int(np.isnan(scores["bleu"]).sum())
+    char_score_error_count = int(np.isnan(scores["ced"]).sum())
 
     if len(accepted_with_changes_tasks) + accepted_count > 0:
         accepted_with_change_minus_bleu_score_error = (
@@ -526,6 +522,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
         name="Get Organization level  users analytics ",
         url_name="user_analytics",
     )
+    @cached_report("organization_user_analytics", ORGANIZATION_SCOPE)
     def user_analytics(self, request, pk=None):
         try:
             organization = Organization.objects.get(pk=pk)
@@ -732,22 +729,37 @@ class OrganizationViewSet(viewsets.ModelViewSet):
         user = User.objects.get(id=user_id)
 
         if send_mail == True:
-            send_user_analytics_mail_org.delay(
-                org_id=organization.id,
-                tgt_language=tgt_language,
-                project_type=project_type,
-                user_id=user_id,
-                sort_by_column_name=sort_by_column_name,
-                descending_order=descending_order,
-                pk=pk,
-                start_date=start_date,
-                end_date=end_date,
-                is_translation_project=is_translation_project,
-                project_progress_stage=project_progress_stage,
-                final_reports=final_reports,
+            task_kwargs = {
+                "org_id": organization.id,
+                "tgt_language": tgt_language,
+                "project_type": project_type,
+                "user_id": user_id,
+                "sort_by_column_name": sort_by_column_name,
+                "descending_order": descending_order,
+                "pk": pk,
+                "start_date": start_date,
+                "end_date": end_date,
+                "is_translation_project": is_translation_project,
+                "project_progress_stage": project_progress_stage,
+            }
+            job, created = start_report_job(
+                "organization_user_analytics",
+                request.user.id,
+                # the reports of the different types are different requests
+                {**task_kwargs, "reports_type": reports_type},
+                send_user_analytics_mail_org,
+                {**task_kwargs, "final_reports": final_reports},
             )
             return Response(
-                {"message": "Email scheduled successfully"}, status=status.HTTP_200_OK
+                {
+                    "message": (
+                        "Email scheduled successfully"
+                        if created
+                        else "Your request is already being worked upon"
+                    ),
+                    "job_id": job["id"],
+                },
+                status=status.HTTP_200_OK,
             )
         else:
             if tgt_language == None:
@@ -773,6 +785,15 @@ class OrganizationViewSet(viewsets.ModelViewSet):
                 if (ann_user.participation_type in [1, 2, 4])
             ]
 
+            review_counts = get_report_review_outcome_counts(
+                Project.objects.filter(organization_id_id=pk),
+                annotators,
+                project_type,
+                project_progress_stage,
+                tgt_language,
+                start_date,
+                end_date,
+            )
             result = []
             for annotator in annotators:
                 participation_type = annotator.participation_type
@@ -824,6 +845,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
                     is_translation_project,
                     project_progress_stage,
                     None if tgt_language == None else tgt_language,
+                    review_counts,
                 )
 
                 if (
@@ -949,6 +971,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
         name="Get Organization level  Project analytics ",
         url_name="project_analytics",
     )
+    @cached_report("organization_project_analytics", ORGANIZATION_SCOPE)
     def project_analytics(self, request, pk=None):
         try:
             organization = Organization.objects.get(pk=pk)
@@ -2678,6 +2701,24 @@ class OrganizationViewSet(viewsets.ModelViewSet):
             {"message": "Email scheduled successfully"}, status=status.HTTP_200_OK
         )
 
+    @action(
+        detail=True,
+        methods=["POST"],
+        name="Refresh the cumulative task counts of the public dashboard",
+        url_name="refresh_cumulative_tasks_count",
+    )
+    @is_particular_organization_owner
+    def refresh_cumulative_tasks_count(self, request, pk=None):
+        last_refreshed = get_last_refreshed(pk)
+        refresh_organization_task_summaries.delay([int(pk)])
+        return Response(
+            {
+                "message": "Refresh of the cumulative task counts scheduled",
+                "last_refreshed": last_refreshed,
+            },
+            status=status.HTTP_200_OK,
+        )
+
 
 class OrganizationPublicViewSet(viewsets.ModelViewSet):
     """
@@ -2709,451 +2750,21 @@ class OrganizationPublicViewSet(viewsets.ModelViewSet):
         if "project_type_filter" in dict(request.query_params):
             project_types = [request.query_params["project_type_filter"]]
         else:
-            project_types = [
-                "AcousticNormalisedTranscriptionEditing",
-                "VerbatimTranscriptionCharacterTagging",
-                "AudioSegmentation",
-                "AudioTranscription",
-                "AudioTranscriptionEditing",
-                "StandardisedTranscriptionEditing",
-                "ContextualSentenceVerification",
-                "ContextualSentenceVerificationAndDomainClassification",
-                "ContextualTranslationEditing",
-                "ConversationTranslation",
-                "ConversationTranslationEditing",
-                "ConversationVerification",
-                "MonolingualTranslation",
-                "OCRTranscriptionEditing",
-                "SemanticTextualSimilarity_Scale5",
-                "SentenceSplitting",
-                "TranslationEditing",
-            ]
+            project_types = DASHBOARD_PROJECT_TYPES
         if "project_type" in dict(request.query_params):
             project_type = request.query_params["project_type"]
             project_types = [project_type]
-        final_result_for_all_types = {}
-        for project_type in project_types:
-            proj_objs = []
-            proj_objs = Project.objects.filter(
-                organization_id=pk, project_type=project_type
-            )
-            if not request.user.is_authenticated:
-                proj_objs = proj_objs.filter(workspace_id__public_analytics=True)
-
-            languages = list(set([proj.tgt_language for proj in proj_objs]))
-            general_lang = []
-            other_lang = []
-            for lang in languages:
-                proj_lang_filter = proj_objs.filter(tgt_language=lang)
-                annotation_tasks = Task.objects.filter(
-                    project_id__in=proj_lang_filter,
-                    task_status__in=[
-                        "annotated",
-                        "reviewed",
-                        "super_checked",
-                    ],
-                )
-                reviewer_tasks = Task.objects.filter(
-                    project_id__in=proj_lang_filter,
-                    project_id__project_stage__in=[REVIEW_STAGE, SUPERCHECK_STAGE],
-                    task_status__in=["reviewed", "super_checked"],
-                )
-                supercheck_tasks = Task.objects.filter(
-                    project_id__in=proj_lang_filter,
-                    project_id__project_stage__in=[SUPERCHECK_STAGE],
-                    task_status__in=["super_checked"],
-                )
-                annotation_tasks_exported = Task.objects.filter(
-                    project_id__in=proj_lang_filter,
-                    project_id__project_stage__in=[ANNOTATION_STAGE],
-                    task_status__in=[
-                        "exported",
-                    ],
-                )
-                reviewer_tasks_exported = Task.objects.filter(
-                    project_id__in=proj_lang_filter,
-                    project_id__project_stage__in=[REVIEW_STAGE],
-                    task_status__in=["exported"],
-                )
-                supercheck_tasks_exported = Task.objects.filter(
-                    project_id__in=proj_lang_filter,
-                    project_id__project_stage__in=[SUPERCHECK_STAGE],
-                    task_status__in=["exported"],
-                )
-                if metainfo == True:
-                    result = {}
-
-                    if project_type in get_audio_project_types():
-                        # review audio duration calclation
-                        total_rev_duration_list = []
-                        raw_audio_duration = 0
-                        audio_segment_word_count_list = []
-
-                        for each_task in reviewer_tasks:
-                            try:
-                                if each_task.task_status == "reviewed":
-                                    anno = Annotation.objects.filter(
-                                        task=each_task,
-                                        annotation_type=REVIEWER_ANNOTATION,
-                                    )[0]
-                                elif each_task.task_status == "super_checked":
-                                    anno = Annotation.objects.filter(
-                                        task=each_task,
-                                        annotation_type=SUPER_CHECKER_ANNOTATION,
-                                    )[0]
-                                else:
-                                    anno = each_task.correct_annotation
-                                total_rev_duration_list.append(
-                                    get_audio_transcription_duration(anno.result)
-                                )
-                                raw_audio_duration += each_task.data["audio_duration"]
-                                audio_segment_word_count_list.append(
-                                    audio_word_count(anno.result)
-                                )
-                            except:
-                                pass
-                        rev_total_duration = sum(total_rev_duration_list)
-                        rev_total_time = convert_seconds_to_hours(rev_total_duration)
-                        rev_raw_time = convert_seconds_to_hours(raw_audio_duration)
-                        rev_audio_word_count = sum(audio_segment_word_count_list)
-
-                        # annotation audio duration calculation
-
-                        total_ann_duration_list = []
-                        raw_audio_duration = 0
-                        audio_segment_word_count_list = []
-
-                        for each_task in annotation_tasks:
-                            try:
-                                if each_task.task_status == "reviewed":
-                                    anno = Annotation.objects.filter(
-                                        task=each_task,
-                                        annotation_type=REVIEWER_ANNOTATION,
-                                    )[0]
-                                elif each_task.task_status == "exported":
-                                    anno = each_task.correct_annotation
-                                elif each_task.task_status == "super_checked":
-                                    anno = Annotation.objects.filter(
-                                        task=each_task,
-                                        annotation_type=SUPER_CHECKER_ANNOTATION,
-                                    )[0]
-                                else:
-                                    anno = Annotation.objects.filter(
-                                        task=each_task,
-                                        annotation_type=ANNOTATOR_ANNOTATION,
-                                    )[0]
-                                total_ann_duration_list.append(
-                                    get_audio_transcription_duration(anno.result)
-                                )
-                                raw_audio_duration += each_task.data["audio_duration"]
-                                audio_segment_word_count_list.append(
-                                    audio_word_count(anno.result)
-                                )
-                            except:
-                                pass
-                        ann_total_duration = sum(total_ann_duration_list)
-                        ann_total_time = convert_seconds_to_hours(ann_total_duration)
-                        ann_raw_time = convert_seconds_to_hours(raw_audio_duration)
-                        ann_audio_word_count = sum(audio_segment_word_count_list)
-
-                        result = {
-                            "language": lang,
-                            "ann_cumulative_aud_duration": ann_total_time,
-                            "rew_cumulative_aud_duration": rev_total_time,
-                            "ann_raw_aud_duration": ann_raw_time,
-                            "rew_raw_aud_duration": rev_raw_time,
-                            "ann_audio_word_count": ann_audio_word_count,
-                            "rev_audio_word_count": rev_audio_word_count,
-                        }
-
-                    elif project_type in get_translation_dataset_project_types():
-                        total_rev_word_count_list = []
-                        for reviewer_tas in reviewer_tasks:
-                            try:
-                                total_rev_word_count_list.append(
-                                    reviewer_tas.data["word_count"]
-                                )
-                            except:
-                                pass
 
-                        total_ann_word_count_list = []
-
-                        for annotation_tas in annotation_tasks:
-                            try:
-                                total_ann_word_count_list.append(
-                                    annotation_tas.data["word_count"]
-                                )
-                            except:
-                                pass
-
-                        result = {
-                            "language": lang,
-                            "ann_cumulative_word_count": sum(total_ann_word_count_list),
-                            "rew_cumulative_word_count": sum(total_rev_word_count_list),
-                        }
-                    elif (
-                        "ConversationTranslation" in project_type
-                        or "ConversationTranslationEditing" in project_type
-                        or "ContextualTranslationEditing" in project_type
-                    ):
-                        total_rev_word_count_list = []
-                        total_rev_sentance_count = 0
-                        for reviewer_tas in reviewer_tasks:
-                            try:
-                                total_rev_word_count_list.append(
-                                    reviewer_tas.data["word_count"]
-                                )
-                                if "ContextualTranslationEditing" not in project_type:
-                                    total_rev_sentance_count += reviewer_tas.data[
-                                        "sentence_count"
-                                    ]
-                            except:
-                                pass
-
-                        total_ann_word_count_list = []
-                        total_ann_sentance_count = 0
-
-                        for annotation_tas in annotation_tasks:
-                            try:
-                                total_ann_word_count_list.append(
-                                    annotation_tas.data["word_count"]
-                                )
-                                if "ContextualTranslationEditing" not in project_type:
-                                    total_ann_sentance_count += annotation_tas.data[
-                                        "sentence_count"
-                                    ]
-                            except:
-                                pass
-                        if "ContextualTranslationEditing" not in project_type:
-                            result = {
-                                "language": lang,
-                                "ann_cumulative_word_count": sum(
-                                    total_ann_word_count_list
-                                ),
-                                "rew_cumulative_word_count": sum(
-                                    total_rev_word_count_list
-                                ),
-                                "total_rev_sentance_count": total_rev_sentance_count,
-                                "total_ann_sentance_count": total_ann_sentance_count,
-                            }
-                        else:
-                            result = {
-                                "language": lang,
-                                "ann_cumulative_word_count": sum(
-                                    total_ann_word_count_list
-                                ),
-                                "rew_cumulative_word_count": sum(
-                                    total_rev_word_count_list
-                                ),
-                            }
-
-                    elif "OCRTranscription" in project_type:
-                        total_rev_word_count = 0
-
-                        for each_task in reviewer_tasks:
-                            if each_task.task_status == "reviewed":
-                                anno = Annotation.objects.filter(
-                                    task=each_task,
-                                    annotation_type=REVIEWER_ANNOTATION,
-                                )[0]
-                            elif each_task.task_status == "super_checked":
-                                anno = Annotation.objects.filter(
-                                    task=each_task,
-                                    annotation_type=SUPER_CHECKER_ANNOTATION,
-                                )[0]
-                            else:
-                                anno = each_task.correct_annotation
-                            total_rev_word_count += ocr_word_count(anno.result)
-
-                        total_anno_word_count = 0
-
-                        for each_task in annotation_tasks:
-                            if each_task.task_status == "reviewed":
-                                anno = Annotation.objects.filter(
-                                    task=each_task,
-                                    annotation_type=REVIEWER_ANNOTATION,
-                                )[0]
-                            elif each_task.task_status == "exported":
-                                anno = each_task.correct_annotation
-                            elif each_task.task_status == "super_checked":
-                                anno = Annotation.objects.filter(
-                                    task=each_task,
-                                    annotation_type=SUPER_CHECKER_ANNOTATION,
-                                )[0]
-                            else:
-                                anno = Annotation.objects.filter(
-                                    task=each_task,
-                                    annotation_type=ANNOTATOR_ANNOTATION,
-                                )[0]
-                            total_anno_word_count += ocr_word_count(anno.result)
-
-                        result = {
-                            "language": lang,
-                            "ann_ocr_cumulative_tasks_count": total_anno_word_count,
-                            "rew_ocr_cumulative_tasks_count": total_rev_word_count,
-                        }
-
-                else:
-                    reviewer_task_count = (
-                        reviewer_tasks.count()
-                        + reviewer_tasks_exported.count()
-                        + supercheck_tasks_exported.count()
-                    )
-
-                    annotation_tasks_count = (
-                        annotation_tasks.count()
-                        + annotation_tasks_exported.count()
-                        + reviewer_tasks_exported.count()
-                        + supercheck_tasks_exported.count()
-                    )
-
-                    supercheck_tasks_count = (
-                        supercheck_tasks.count() + supercheck_tasks_exported.count()
-                    )
-
-                    result = {
-                        "language": lang,
-                        "ann_cumulative_tasks_count": annotation_tasks_count,
-                        "rew_cumulative_tasks_count": reviewer_task_count,
-                        "sup_cumulative_tasks_count": supercheck_tasks_count,
-                    }
-
-                if lang == None or lang == "":
-                    other_lang.append(result)
-                else:
-                    general_lang.append(result)
-
-            ann_task_count = 0
-            rew_task_count = 0
-            sup_task_count = 0
-            ann_word_count = 0
-            rew_word_count = 0
-            ann_aud_dur = 0
-            rew_aud_dur = 0
-            ann_raw_aud_dur = 0
-            rew_raw_aud_dur = 0
-            ann_audio_word_cnt = 0
-            rev_audio_word_cnt = 0
-            ann_sentance_count = 0
-            rev_sentance_count = 0
-            for dat in other_lang:
-                if metainfo != True:
-                    ann_task_count += dat["ann_cumulative_tasks_count"]
-                    rew_task_count += dat["rew_cumulative_tasks_count"]
-                    sup_task_count += dat["sup_cumulative_tasks_count"]
-                else:
-                    if project_type in get_audio_project_types():
-                        ann_aud_dur += convert_hours_to_seconds(
-                            dat["ann_cumulative_aud_duration"]
-                        )
-                        rew_aud_dur += convert_hours_to_seconds(
-                            dat["rew_cumulative_aud_duration"]
-                        )
-                        ann_raw_aud_dur += convert_hours_to_seconds(
-                            dat["ann_raw_aud_duration"]
-                        )
-                        rew_raw_aud_dur += convert_hours_to_seconds(
-                            dat["rew_raw_aud_duration"]
-                        )
-                        ann_audio_word_cnt += dat["ann_audio_word_count"]
-                        rev_audio_word_cnt += dat["rev_audio_word_count"]
-                    elif project_type in get_translation_dataset_project_types():
-                        ann_word_count += dat["ann_cumulative_word_count"]
-                        rew_word_count += dat["rew_cumulative_word_count"]
-                    elif (
-                        "ConversationTranslation" in project_type
-                        or "ConversationTranslationEditing" in project_type
-                        or "ContextualTranslationEditing" in project_type
-                    ):
-                        if "ContextualTranslationEditing" not in project_type:
-                            ann_sentance_count += dat["total_ann_sentance_count"]
-                            rev_sentance_count += dat["total_rev_sentance_count"]
-                            ann_word_count += dat["ann_cumulative_word_count"]
-                            rew_word_count += dat["rew_cumulative_word_count"]
-                        else:
-                            ann_word_count += dat["ann_cumulative_word_count"]
-                            rew_word_count += dat["rew_cumulative_word_count"]
-                    elif "OCRTranscription" in project_type:
-                        ann_word_count += dat["ann_ocr_cumulative_tasks_count"]
-                        rew_word_count += dat["rew_ocr_cumulative_tasks_count"]
-
-            if len(other_lang) > 0:
-                if metainfo != True:
-                    other_language = {
-                        "language": "Others",
-                        "ann_cumulative_tasks_count": ann_task_count,
-                        "rew_cumulative_tasks_count": rew_task_count,
-                        "sup_cumulative_tasks_count": sup_task_count,
-                    }
-                else:
-                    if project_type in get_audio_project_types():
-                        other_language = {
-                            "language": "Others",
-                            "ann_cumulative_aud_duration": convert_seconds_to_hours(
-                                ann_aud_dur
-                            ),
-                            "rew_cumulative_aud_duration": convert_seconds_to_hours(
-                                rew_aud_dur
-                            ),
-                            "ann_raw_aud_duration": convert_seconds_to_hours(
-                                ann_raw_aud_dur
-                            ),
-                            "rew_raw_aud_duration": convert_seconds_to_hours(
-                                rew_raw_aud_dur
-                            ),
-                            "ann_audio_word_count": ann_audio_word_cnt,
-                            "rev_audio_word_count": rev_audio_word_cnt,
-                        }
-
-                    elif project_type in get_translation_dataset_project_types():
-                        other_language = {
-                            "language": "Others",
-                            "ann_cumulative_word_count": ann_word_count,
-                            "rew_cumulative_word_count": rew_word_count,
-                        }
-                    elif (
-                        "ConversationTranslation" in project_type
-                        or "ConversationTranslationEditing" in project_type
-                        or "ContextualTranslationEditing" in project_type
-                    ):
-                        if "ContextualTranslationEditing" not in project_type:
-                            other_language = {
-                                "language": "Others",
-                                "ann_cumulative_word_count": ann_word_count,
-                                "rew_cumulative_word_count": rew_word_count,
-                                "total_ann_sentance_count": ann_sentance_count,
-                                "total_rev_sentance_count": rev_sentance_count,
-                            }
-                        else:
-                            other_language = {
-                                "language": "Others",
-                                "ann_cumulative_word_count": ann_word_count,
-                                "rew_cumulative_word_count": rew_word_count,
-                            }
-                    elif "OCRTranscription" in project_type:
-                        other_language = {
-                            "language": "Others",
-                            "ann_ocr_cumulative_word_count": ann_word_count,
-                            "rew_ocr_cumulative_word_count": rew_word_count,
-                        }
-
-                general_lang.append(other_language)
-            try:
-                final_result = sorted(
-                    general_lang, key=lambda x: x["language"], reverse=False
-                )
-            except:
-                final_result = []
-
-            if metainfo == True and not (
-                (project_type in get_audio_project_types())
-                or (
-                    project_type in get_translation_dataset_project_types()
-                    or "ConversationTranslation" in project_type
-                )
-                or "OCRTranscription" in project_type
-            ):
-                pass
-            else:
-                final_result_for_all_types[project_type] = final_result
-        return Response(final_result_for_all_types)
+        final_result_for_all_types, etag, last_refreshed = get_cumulative_tasks_count(
+            organization.id,
+            project_types,
+            metainfo == True,
+            not request.user.is_authenticated,
+        )
+        headers = {"ETag": etag}
+        if last_refreshed is not None:
+            headers["Last-Modified"] = http_date(last_refreshed.timestamp())
+            headers["X-Last-Refreshed"] = last_refreshed.isoformat()
+        if etag in request.headers.get("If-None-Match", ""):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(final_result_for_all_types, headers=headers)
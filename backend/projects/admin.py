@@ -1,7 +1,6 @@
 from django.contrib import admin
 
-from .models import Project, ProjectTaskRequestLock
+from .models import Project
 
 # Register your models here.
 admin.site.register(Project)
-admin.site.register(ProjectTaskRequestLock)
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ProjectsConfig(AppConfig):
     name = "projects"
+
+    def ready(self):
+        # Register the signal handlers invalidating the cached memberships
+        # and reports
+        from . import membership, report_cache  # noqa: F401
@@ -0,0 +1,413 @@
+"""
+Streaming project downloads.
+
+The CSV, TSV, JSON and JSONL downloads of a project are generated while they
+are sent: the tasks are read in chunks of EXPORT_CHUNK_SIZE along with their
+correct annotation, annotator and input data metadata, and every exported task
+is written out as soon as it is processed. No file is written and the memory
+used does not grow with the size of the project.
+
+The rows of the CSV and TSV files are the ones of the label studio converter,
+with a header listing the task data keys of the project, the keys added by the
+export, the output tags of the label config and the annotation columns.
+
+The Parquet and Arrow downloads have a row per task with the same task data
+columns, as strings (JSON strings for the JSON values), and typed columns for
+the task id and the correct annotation.
+"""
+
+import csv
+import json
+from datetime import datetime
+
+import pyarrow as pa
+from django.db import connection
+from django.db.models import Q
+from label_studio_converter import Converter
+from label_studio_tools.core.label_config import parse_config
+
+from dataset import models as dataset_models
+from tasks.models import (
+    Annotation,
+    Task,
+    ANNOTATOR_ANNOTATION,
+    REVIEWER_ANNOTATION,
+    ANNOTATED,
+    REVIEWED,
+)
+from utils.columnar_export import (
+    COLUMNAR_EXPORT_TYPES,
+    is_columnar_export_type,
+    stream_columnar_export,
+    to_json_string,
+)
+
+from .utils import (
+    build_export_task,
+    get_audio_project_types,
+    get_processed_task_data_keys,
+    process_exported_task,
+)
+
+EXPORT_CHUNK_SIZE = 500
+# size of the pieces of the file sent to the client
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+STREAMING_EXPORT_TYPES = ("CSV", "TSV", "JSON", "JSONL")
+
+ANNOTATION_COLUMNS = ["annotator", "annotation_id", "created_at", "updated_at"]
+
+# columns of the correct annotation in the Parquet and Arrow downloads
+COLUMNAR_ANNOTATION_COLUMNS = {
+    "annotation_id": ("id", pa.int64()),
+    "annotation_status": ("annotation_status", pa.string()),
+    "annotation_result": ("result", pa.string()),
+    "annotation_lead_time": ("lead_time", pa.float64()),
+    "annotation_created_at": ("created_at", pa.string()),
+    "annotation_updated_at": ("updated_at", pa.string()),
+}
+
+# annotation types whose first annotation is exported for the tasks of a
+# status which have no correct annotation
+FALLBACK_ANNOTATION_TYPES = {
+    ANNOTATED: ANNOTATOR_ANNOTATION,
+    REVIEWED: REVIEWER_ANNOTATION,
+}
+
+
+class _Echo:
+    """
+    File-like object returning what is written, for csv writers
+    """
+
+    def write(self, value):
+        return value
+
+
+def _serialize_datetime(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+
+
+def _buffered(pieces):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def get_export_filename(project, export_type):
+    return (
+        f"project-{project.id}-at-{datetime.now():%Y-%m-%d-%H-%M}"
+        f".{export_type.lower()}"
+    )
+
+
+def get_export_content_type(export_type):
+    if is_columnar_export_type(export_type):
+        return COLUMNAR_EXPORT_TYPES[export_type.upper()][1]
+    # same as the files generated by DataExport.generate_export_file
+    return f"application/.{export_type.lower()}"
+
+
+def _get_fallback_annotations(tasks):
+    """
+    Returns a dict of task id to the annotation exported for the tasks of the
+    chunk which have no correct annotation
+    """
+    condition = Q()
+    for task_status, annotation_type in FALLBACK_ANNOTATION_TYPES.items():
+        condition |= Q(task__task_status=task_status, annotation_type=annotation_type)
+    task_ids = [
+        task.id
+        for task in tasks
+        if task.correct_annotation_id is None
+        and task.task_status in FALLBACK_ANNOTATION_TYPES
+    ]
+    if not task_ids:
+        return {}
+    fallback_annotations = {}
+    annotations = (
+        Annotation.objects.filter(condition, task_id__in=task_ids)
+        .select_related("completed_by")
+        .order_by("id")
+    )
+    for annotation in annotations:
+        fallback_annotations.setdefault(annotation.task_id, annotation)
+    return fallback_annotations
+
+
+def iter_export_tasks(
+    project,
+    tasks,
+    export_type,
+    include_input_data_metadata_json,
+    chunk_size=EXPORT_CHUNK_SIZE,
+):
+    """
+    Yields the exported dict of every task in the order of their ids, tasks
+    which can not be exported are skipped
+    """
+    project_type = project.project_type
+    dataset_type = project.dataset_id.all()[0].dataset_type
+    dataset_model = (
+        getattr(dataset_models, dataset_type)
+        if include_input_data_metadata_json
+        else None
+    )
+    is_audio_project_type = project_type in get_audio_project_types()
+    tasks = tasks.select_related("correct_annotation__completed_by").order_by("id")
+    last_id = 0
+    while True:
+        chunk = list(tasks.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1].id
+        fallback_annotations = _get_fallback_annotations(chunk)
+        metadata_jsons = {}
+        if dataset_model is not None:
+            metadata_jsons = dict(
+                dataset_model.objects.filter(
+                    pk__in={task.input_data_id for task in chunk}
+                ).values_list("pk", "metadata_json")
+            )
+        for task in chunk:
+            correct_annotation = task.correct_annotation
+            if correct_annotation is None and task.task_status in (
+                FALLBACK_ANNOTATION_TYPES
+            ):
+                correct_annotation = fallback_annotations.get(task.id)
+                if correct_annotation is None:
+                    continue
+            if dataset_model is not None and task.input_data_id not in metadata_jsons:
+                continue
+            try:
+                task_dict = build_export_task(
+                    task,
+                    export_type,
+                    correct_annotation,
+                    is_audio_project_type,
+                    dataset_model is not None,
+                    metadata_jsons.get(task.input_data_id),
+                )
+                process_exported_task(task_dict, project_type, dataset_type)
+            except Exception:
+                continue
+            yield task_dict
+
+
+def get_task_data_keys(tasks):
+    """
+    Keys of the data of the tasks, in the order of their first appearance
+    """
+    tasks_sql, params = tasks.values("id").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT data_key.key
+            FROM {Task._meta.db_table} task
+            CROSS JOIN LATERAL jsonb_object_keys(task.data)
+                WITH ORDINALITY AS data_key(key, position)
+            WHERE task.id IN ({tasks_sql}) AND jsonb_typeof(task.data) = 'object'
+            GROUP BY data_key.key
+            ORDER BY MIN(task.id), MIN(data_key.position)
+            """,
+            params,
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_export_data_columns(project, tasks, include_input_data_metadata_json):
+    """
+    Keys of the data of the exported tasks
+    """
+    project_type = project.project_type
+    dataset_type = project.dataset_id.all()[0].dataset_type
+    data_columns = [
+        *get_task_data_keys(tasks),
+        "task_status",
+        "annotator_email",
+    ]
+    if include_input_data_metadata_json:
+        data_columns.append("input_data_metadata_json")
+    data_columns += get_processed_task_data_keys(project_type, dataset_type)
+    if project_type in get_audio_project_types():
+        data_columns = [column for column in data_columns if column != "audio_url"]
+    return data_columns
+
+
+def get_export_columns(project, tasks, schema, include_input_data_metadata_json):
+    """
+    Header of the CSV and TSV downloads, the columns of the records built by
+    the label studio converter for the exported tasks
+    """
+    columns = [
+        *get_export_data_columns(project, tasks, include_input_data_metadata_json),
+        "id",
+        *schema,
+        *ANNOTATION_COLUMNS,
+        "lead_time",
+    ]
+    return list(dict.fromkeys(columns))
+
+
+def _flatten_output(values):
+    """
+    Value of an output tag in the CSV export of the label studio converter: the
+    choice or the text of a single choice or text area, the list of the values
+    without their type otherwise
+    """
+    flattened = []
+    tag_type = None
+    for value in values:
+        tag_type = value["type"]
+        value = {key: item for key, item in value.items() if key != "type"}
+        if tag_type == "Choices" and len(value["choices"]) == 1:
+            flattened.append(value["choices"][0])
+        elif tag_type == "TextArea" and len(value["text"]) == 1:
+            flattened.append(value["text"][0])
+        else:
+            flattened.append(value)
+    if tag_type in ("Choices", "TextArea") and len(flattened) == 1:
+        return flattened[0]
+    return flattened
+
+
+def get_export_record(item):
+    """
+    Record of an annotation result of the label studio converter, as written
+    by its CSV export
+    """
+    record = dict(item["input"])
+    if item.get("id") is not None:
+        record["id"] = item["id"]
+    for name, value in item["output"].items():
+        pretty_value = _flatten_output(value)
+        record[name] = (
+            pretty_value
+            if isinstance(pretty_value, str)
+            else json.dumps(pretty_value, ensure_ascii=False)
+        )
+    annotator = item["completed_by"]
+    record["annotator"] = (
+        annotator.get("email") if isinstance(annotator, dict) else str(annotator)
+    )
+    record["annotation_id"] = item["annotation_id"]
+    record["created_at"] = item["created_at"]
+    record["updated_at"] = item["updated_at"]
+    record["lead_time"] = item["lead_time"]
+    return record
+
+
+def _iter_delimited(project, tasks, task_dicts, delimiter, include_metadata_json):
+    schema = parse_config(project.label_config)
+    converter = Converter(config=schema, project_dir=None, download_resources=False)
+    columns = get_export_columns(project, tasks, schema, include_metadata_json)
+    writer = csv.writer(_Echo(), delimiter=delimiter, lineterminator="\n")
+    yield writer.writerow(columns)
+    for task_dict in task_dicts:
+        for item in converter.annotation_result_from_task(task_dict):
+            record = get_export_record(item)
+            yield writer.writerow([record.get(column) for column in columns])
+
+
+def _iter_json(task_dicts):
+    # the same output as json.dumps of the list of the tasks
+    yield "["
+    separator = ""
+    for task_dict in task_dicts:
+        yield separator + json.dumps(
+            task_dict, default=_serialize_datetime, ensure_ascii=False
+        )
+        separator = ", "
+    yield "]"
+
+
+def _iter_json_lines(task_dicts):
+    for task_dict in task_dicts:
+        yield json.dumps(
+            task_dict, default=_serialize_datetime, ensure_ascii=False
+        ) + "\n"
+
+
+def _iter_columnar_rows(task_dicts, data_columns):
+    for task_dict in task_dicts:
+        row = {"id": task_dict["id"]}
+        for column in data_columns:
+            row[column] = to_json_string(task_dict["data"].get(column))
+        annotation = task_dict["annotations"][0]
+        for column, (key, _) in COLUMNAR_ANNOTATION_COLUMNS.items():
+            value = annotation.get(key)
+            row[column] = value if key in ("id", "lead_time") else to_json_string(value)
+        yield row
+
+
+def stream_project_columnar_export(
+    project, tasks, export_type, include_input_data_metadata_json
+):
+    """
+    Yields the pieces of the download of the tasks of the project in one of
+    the COLUMNAR_EXPORT_TYPES
+    """
+    data_columns = [
+        column
+        for column in dict.fromkeys(
+            get_export_data_columns(project, tasks, include_input_data_metadata_json)
+        )
+        if column != "id" and column not in COLUMNAR_ANNOTATION_COLUMNS
+    ]
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            *[(column, pa.string()) for column in data_columns],
+            *[
+                (column, column_type)
+                for column, (_, column_type) in COLUMNAR_ANNOTATION_COLUMNS.items()
+            ],
+        ]
+    )
+    task_dicts = iter_export_tasks(
+        project, tasks, export_type.upper(), include_input_data_metadata_json
+    )
+    return stream_columnar_export(
+        schema, _iter_columnar_rows(task_dicts, data_columns), export_type
+    )
+
+
+def stream_project_export(
+    project, tasks, export_type, include_input_data_metadata_json
+):
+    """
+    Yields the pieces of the download of the tasks of the project in one of
+    the STREAMING_EXPORT_TYPES or the COLUMNAR_EXPORT_TYPES
+    """
+    if is_columnar_export_type(export_type):
+        return stream_project_columnar_export(
+            project, tasks, export_type, include_input_data_metadata_json
+        )
+    task_dicts = iter_export_tasks(
+        project,
+        tasks,
+        "JSON" if export_type == "JSONL" else export_type,
+        include_input_data_metadata_json,
+    )
+    if export_type == "JSON":
+        pieces = _iter_json(task_dicts)
+    elif export_type == "JSONL":
+        pieces = _iter_json_lines(task_dicts)
+    else:
+        pieces = _iter_delimited(
+            project,
+            tasks,
+            task_dicts,
+            "\t" if export_type == "TSV" else ",",
+            include_input_data_metadata_json,
+        )
+    return _buffered(pieces)
@@ -0,0 +1,114 @@
+"""
+Incremental project exports.
+
+An incremental export only exports the tasks whose correct annotation changed
+since the previous incremental export of the project into the same dataset.
+The last exported annotation is recorded in a ProjectExportWatermark, as its
+`updated_at` and id. The changed tasks are exported in chunks in the order of
+these two values, and the watermark is moved past every chunk in the
+transaction which writes it, so an interrupted export resumes after the last
+committed chunk.
+
+The changed tasks are the accepted tasks of the project as well as the
+exported ones, whose data items are written again (upserted).
+
+The watermark follows the `updated_at` of the correct annotations, tasks do
+not record when they change. A task is therefore missed when its correct
+annotation is committed after the watermark moved past its `updated_at` (a
+long transaction) or when the task is switched to an older annotation. A full
+export (`reset_export_watermark`) resets the watermark, so that the next
+incremental export exports every accepted task again.
+"""
+
+from django.db.models import Q
+from django.utils import timezone
+
+from tasks.models import Task, ANNOTATED, REVIEWED, SUPER_CHECKED, EXPORTED
+
+from .models import ProjectExportWatermark, REVIEW_STAGE, SUPERCHECK_STAGE
+
+EXPORT_WATERMARK_CHUNK_SIZE = 500
+
+
+def get_accepted_task_status(project):
+    """
+    Status of the tasks of the project which are ready to be exported
+    """
+    if project.project_stage == REVIEW_STAGE:
+        return REVIEWED
+    if project.project_stage == SUPERCHECK_STAGE:
+        return SUPER_CHECKED
+    return ANNOTATED
+
+
+def get_export_watermark(project, export_dataset_instance=None):
+    watermark, _ = ProjectExportWatermark.objects.get_or_create(
+        project=project, export_dataset_instance=export_dataset_instance
+    )
+    return watermark
+
+
+def reset_export_watermark(project, export_dataset_instance_id=None):
+    ProjectExportWatermark.objects.filter(
+        project=project, export_dataset_instance_id=export_dataset_instance_id
+    ).update(
+        last_annotation_updated_at=None,
+        last_annotation_id=0,
+        exported_count=0,
+        updated_at=timezone.now(),
+    )
+
+
+def get_changed_tasks(project, watermark):
+    """
+    Tasks of the project whose correct annotation changed after the watermark,
+    in the order of the export
+    """
+    tasks = Task.objects.filter(
+        project_id=project,
+        task_status__in=[get_accepted_task_status(project), EXPORTED],
+        correct_annotation__isnull=False,
+    )
+    if watermark.last_annotation_updated_at is not None:
+        tasks = tasks.filter(
+            Q(correct_annotation__updated_at__gt=watermark.last_annotation_updated_at)
+            | Q(
+                correct_annotation__updated_at=watermark.last_annotation_updated_at,
+                correct_annotation_id__gt=watermark.last_annotation_id,
+            )
+        )
+    return tasks.order_by("correct_annotation__updated_at", "correct_annotation_id")
+
+
+def has_changed_tasks(project, export_dataset_instance_id=None):
+    """
+    Whether an incremental export of the project has any task to export
+    """
+    watermark = ProjectExportWatermark.objects.filter(
+        project=project, export_dataset_instance_id=export_dataset_instance_id
+    ).first()
+    return get_changed_tasks(project, watermark or ProjectExportWatermark()).exists()
+
+
+def get_next_changed_tasks(project, watermark, chunk_size=EXPORT_WATERMARK_CHUNK_SIZE):
+    """
+    The next chunk of changed tasks, with their correct annotation
+    """
+    return list(
+        get_changed_tasks(project, watermark).select_related("correct_annotation")[
+            :chunk_size
+        ]
+    )
+
+
+def advance_export_watermark(watermark, tasks):
+    """
+    Move the watermark past a chunk of exported tasks, from
+    `get_next_changed_tasks`. Called in the transaction of the export of the
+    chunk.
+    """
+    last_annotation = tasks[-1].correct_annotation
+    watermark.last_annotation_updated_at = last_annotation.updated_at
+    watermark.last_annotation_id = last_annotation.id
+    watermark.exported_count += len(tasks)
+    watermark.save()
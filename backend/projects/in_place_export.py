@@ -0,0 +1,408 @@
+"""
+Export of the annotations of a project into the data items of its dataset.
+
+The accepted tasks of the project are exported in chunks of increasing ids.
+For every chunk the results of the correct annotations are mapped to the
+fields of the output dataset listed in the project registry
+(`output_dataset.fields.annotations`), and the data items are written with
+`bulk_update` in the same transaction which marks the tasks of the chunk as
+exported. The status of the tasks is the checkpoint of the export: when an
+export is interrupted, running it again only exports the tasks of the chunks
+which were not committed.
+
+An incremental export (see export_watermark) only exports the tasks whose
+correct annotation changed since the previous one, its watermark being
+advanced in the transaction of every chunk.
+"""
+
+import json
+import logging
+from copy import deepcopy
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import F
+from django.forms.models import model_to_dict
+from label_studio_converter import Converter
+from label_studio_tools.core.label_config import parse_config
+
+from dataset import models as dataset_models
+from tasks.models import Task, EXPORTED
+from tasks.ready_queue import refresh_ready_queue
+
+from .export_stream import get_export_record
+from .export_watermark import (
+    advance_export_watermark,
+    get_accepted_task_status,
+    get_export_watermark,
+    get_next_changed_tasks,
+)
+from .registry_helper import ProjectRegistry
+from .report_cache import bump_report_versions
+from .utils import ANNOTATION_EXPORT_EXCLUDED_FIELDS, ann_result_for_ste
+
+logger = logging.getLogger(__name__)
+
+EXPORT_IN_PLACE_CHUNK_SIZE = 500
+
+ACOUSTIC_PROJECT_TYPES = (
+    "AcousticNormalisedTranscriptionEditing",
+    "VerbatimTranscriptionCharacterTagging",
+)
+
+
+class ExcludedTask(Exception):
+    """
+    The annotation of the task can not be exported
+    """
+
+
+def get_accepted_tasks(project):
+    """
+    The tasks of the project which are ready to be exported at its stage
+    """
+    return Task.objects.filter(
+        project_id__exact=project, task_status=get_accepted_task_status(project)
+    )
+
+
+def _parse_json_list(ta, key, default):
+    try:
+        return json.loads(ta[key])
+    except json.JSONDecodeError:
+        return [ta[key]]
+    except KeyError:
+        return default
+
+
+def get_speech_transcriptions(ta, is_acoustic):
+    """
+    Returns the labels of the segments of a speech annotation record with
+    their transcriptions, and their acoustic normalised transcriptions for the
+    acoustic projects. Raises ExcludedTask if they do not match.
+    """
+    try:
+        ta_labels = json.loads(ta["labels"])
+    except Exception as error:
+        raise ExcludedTask(str(error))
+    empty_transcriptions = len(ta_labels) * [""]
+    if is_acoustic:
+        ta_transcribed_json = _parse_json_list(
+            ta, "verbatim_transcribed_json", empty_transcriptions
+        )
+        ta_acoustic_transcribed_json = _parse_json_list(
+            ta, "acoustic_normalised_transcribed_json", empty_transcriptions
+        )
+        if len(ta_labels) != len(ta_acoustic_transcribed_json):
+            raise ExcludedTask("acoustic normalised transcriptions do not match")
+    else:
+        ta_transcribed_json = _parse_json_list(
+            ta, "transcribed_json", empty_transcriptions
+        )
+        ta_acoustic_transcribed_json = None
+    if len(ta_labels) != len(ta_transcribed_json):
+        raise ExcludedTask("transcriptions do not match")
+    return ta_labels, ta_transcribed_json, ta_acoustic_transcribed_json
+
+
+def _get_speech_field(data_item, transcriptions, is_acoustic):
+    ta_labels, ta_transcribed_json, ta_acoustic_transcribed_json = transcriptions
+    speakers_details = data_item.speakers_json
+    for idx in range(len(ta_transcribed_json)):
+        ta_labels[idx]["text"] = ta_transcribed_json[idx]
+        speaker_id = next(
+            speaker
+            for speaker in speakers_details
+            if speaker["name"] == ta_labels[idx]["labels"][0]
+        )["speaker_id"]
+        ta_labels[idx]["speaker_id"] = speaker_id
+        del ta_labels[idx]["labels"]
+        if is_acoustic:
+            temp = deepcopy(ta_labels[idx])
+            temp["text"] = ta_acoustic_transcribed_json[idx]
+            ta_acoustic_transcribed_json[idx] = temp
+    if is_acoustic:
+        return {
+            "verbatim_transcribed_json": ta_labels,
+            "acoustic_normalised_transcribed_json": ta_acoustic_transcribed_json,
+            "standardised_transcription": "",
+        }
+    return ta_labels
+
+
+def _get_conversation_json(data_item, tl, is_verification):
+    if is_verification:
+        conversation_json = data_item.unverified_conversation_json
+    else:
+        conversation_json = data_item.machine_translated_conversation_json
+    for idx1 in range(len(conversation_json)):
+        for idx2 in range(len(conversation_json[idx1]["sentences"])):
+            conversation_json[idx1]["sentences"][idx2] = ""
+    for result in tl["annotations"][0]["result"]:
+        if result["to_name"] != "quality_status":
+            to_name_list = result["to_name"].split("_")
+            idx1 = int(to_name_list[1])
+            idx2 = int(to_name_list[2])
+            conversation_json[idx1]["sentences"][idx2] = ".".join(
+                map(str, result["value"]["text"])
+            )
+    return conversation_json
+
+
+def _set_ocr_fields(data_item, field, task, ta, tl):
+    """
+    Set the OCR transcriptions of the data item, along with the relations of
+    its bounding boxes and its document details, returns the fields set
+    """
+    ta_ocr_transcribed_json = []
+    ann = (
+        json.loads(tl["annotations"])
+        if isinstance(tl["annotations"], str)
+        else tl["annotations"]
+    )
+    annotation_bboxes = json.loads(ta["annotation_bboxes"])
+    annotation_labels = (
+        json.loads(ta["annotation_labels"])
+        if ta.get("annotation_labels") is not None
+        else None
+    )
+    ta["annotation_transcripts"] = ta.get("ocr_transcribed_json") or ""
+    for idx in range(len(annotation_bboxes)):
+        if isinstance(annotation_labels, list):
+            ta_ocr_transcribed_json.append(annotation_labels[idx])
+        else:
+            ta_ocr_transcribed_json.append(annotation_bboxes[idx])
+        result = ann[0]["result"][idx * 2]
+        if (
+            len(annotation_bboxes) > 1
+            and ta["annotation_transcripts"]
+            and type(json.loads(ta["annotation_transcripts"])) == list
+        ):
+            try:
+                ta_ocr_transcribed_json[-1]["text"] = json.loads(
+                    ta["annotation_transcripts"]
+                )[idx]
+            except:
+                ta_ocr_transcribed_json[-1]["text"] = ""
+            ta_ocr_transcribed_json[-1]["id"] = result["id"] if "id" in result else ""
+        else:
+            ta_ocr_transcribed_json[-1]["text"] = ta["annotation_transcripts"]
+            ta_ocr_transcribed_json[-1]["id"] = result["id"] if "id" in result else ""
+            ta_ocr_transcribed_json[-1]["parentID"] = (
+                result["parentID"] if "parentID" in result else ""
+            )
+    fields = {field}
+    bboxes_relation_json = [
+        r for r in ann[0]["result"] if "type" in r and r["type"] == "relation"
+    ]
+    task_data = json.loads(task.data) if isinstance(task.data, str) else task.data
+    if "language" in task_data or "ocr_domain" in task_data:
+        data_item.annotated_document_details_json = {
+            "language": task_data.get("language", []),
+            "ocr_domain": task_data.get("ocr_domain", ""),
+        }
+        fields.add("annotated_document_details_json")
+    if bboxes_relation_json:
+        data_item.bboxes_relation_json = bboxes_relation_json
+        fields.add("bboxes_relation_json")
+    setattr(data_item, field, ta_ocr_transcribed_json)
+    return fields
+
+
+def set_exported_fields(
+    data_item, annotation_fields, task, ta, tl, transcriptions, export_flags
+):
+    """
+    Set the annotation fields of the data item from the annotation record `ta`
+    and the exported task `tl`, returns the fields set
+    """
+    is_acoustic, is_conversation_verification = export_flags
+    fields = set()
+    for field in annotation_fields:
+        # Check being done for rating as Label studio stores all the data in string format
+        # We need to store the rating in integer format
+        if field == "rating":
+            setattr(data_item, field, int(ta[field]))
+        elif field == "transcribed_json" or field == "prediction_json":
+            setattr(
+                data_item,
+                field,
+                _get_speech_field(data_item, transcriptions, is_acoustic),
+            )
+        elif field == "conversation_json":
+            setattr(
+                data_item,
+                field,
+                _get_conversation_json(data_item, tl, is_conversation_verification),
+            )
+        elif field == "domain":
+            setattr(data_item, field, ",".join(json.loads(ta[field])[0]["taxonomy"][0]))
+        elif field == "conversation_quality_status":
+            conversation_quality_status = ""
+            for result in tl["annotations"][0]["result"]:
+                if result["to_name"] == "quality_status":
+                    conversation_quality_status = result["value"]["choices"][0]
+                    break
+            setattr(data_item, field, conversation_quality_status)
+        elif field == "ocr_transcribed_json":
+            fields |= _set_ocr_fields(data_item, field, task, ta, tl)
+            continue
+        elif field == "final_transcribed_json":
+            setattr(
+                data_item, field, ann_result_for_ste(task.correct_annotation.result)
+            )
+        else:
+            # fields missing from the annotation are exported as null
+            setattr(data_item, field, ta.get(field))
+        fields.add(field)
+    return fields
+
+
+def _get_exported_task(task):
+    tl = model_to_dict(task, exclude=["annotation_users", "review_user"])
+    annotation_dict = model_to_dict(
+        task.correct_annotation, exclude=ANNOTATION_EXPORT_EXCLUDED_FIELDS
+    )
+    tl["annotations"] = [OrderedDict(annotation_dict)]
+    return OrderedDict(tl)
+
+
+def export_chunk_in_place(
+    tasks,
+    dataset_model,
+    annotation_fields,
+    converter,
+    export_flags,
+    is_speech,
+    watermark=None,
+):
+    """
+    Export the annotations of a chunk of tasks into their data items and mark
+    the tasks as exported, in a single transaction which also advances the
+    `watermark` of an incremental export. Returns the number of data items
+    exported and the ids of the tasks excluded from the export.
+    """
+    data_items = dataset_model.objects.in_bulk(
+        {task.input_data_id for task in tasks if task.correct_annotation_id}
+    )
+    updated_items = {}
+    update_fields = set(annotation_fields)
+    output_task_ids = []
+    excluded_task_ids = []
+    for task in tasks:
+        if task.correct_annotation is None:
+            continue
+        try:
+            tl = _get_exported_task(task)
+            if converter is None:
+                ta = tl
+            else:
+                ta = get_export_record(next(converter.annotation_result_from_task(tl)))
+            transcriptions = (
+                get_speech_transcriptions(ta, export_flags[0]) if is_speech else None
+            )
+        except Exception:
+            excluded_task_ids.append(task.id)
+            continue
+        output_task_ids.append(task.id)
+        data_item = data_items.get(task.input_data_id)
+        try:
+            update_fields |= set_exported_fields(
+                data_item, annotation_fields, task, ta, tl, transcriptions, export_flags
+            )
+        except Exception:
+            excluded_task_ids.append(task.id)
+            continue
+        updated_items[data_item.pk] = data_item
+
+    excluded = set(excluded_task_ids)
+    exported_task_ids = [task.id for task in tasks if task.id not in excluded]
+    with transaction.atomic():
+        if updated_items:
+            dataset_model.objects.bulk_update(
+                list(updated_items.values()), sorted(update_fields)
+            )
+        Task.objects.filter(id__in=output_task_ids).update(output_data=F("input_data"))
+        Task.objects.filter(id__in=exported_task_ids).update(task_status=EXPORTED)
+        if watermark is not None:
+            advance_export_watermark(watermark, tasks)
+    refresh_ready_queue(exported_task_ids)
+    return len(updated_items), excluded_task_ids
+
+
+def _iter_task_chunks(project, chunk_size, watermark):
+    """
+    Yields the chunks of tasks to export, the changed tasks after the
+    watermark, which is advanced past every exported chunk, when given
+    """
+    if watermark is None:
+        tasks = (
+            get_accepted_tasks(project)
+            .select_related("correct_annotation")
+            .order_by("id")
+        )
+    last_id = 0
+    while True:
+        if watermark is None:
+            chunk = list(tasks.filter(id__gt=last_id)[:chunk_size])
+        else:
+            chunk = get_next_changed_tasks(project, watermark, chunk_size)
+        if not chunk:
+            return
+        last_id = chunk[-1].id
+        yield chunk
+
+
+def export_tasks_in_place(
+    project,
+    project_type,
+    annotation_fields,
+    chunk_size=EXPORT_IN_PLACE_CHUNK_SIZE,
+    incremental=False,
+):
+    """
+    Export the accepted tasks of the project into its output dataset in
+    chunks, only the tasks changed since the last incremental export when
+    `incremental`. Returns the number of data items exported.
+    """
+    output_dataset_info = ProjectRegistry.get_instance().get_output_dataset_and_fields(
+        project_type
+    )
+    dataset_type = output_dataset_info["dataset_type"]
+    dataset_model = getattr(dataset_models, dataset_type)
+    # the annotations of the conversations are read from their result, the
+    # others from the records of the label studio converter
+    converter = None
+    if dataset_type != "Conversation":
+        converter = Converter(
+            config=parse_config(project.label_config),
+            project_dir=None,
+            download_resources=False,
+        )
+    export_flags = (
+        project_type in ACOUSTIC_PROJECT_TYPES,
+        project.project_type == "ConversationVerification",
+    )
+    is_speech = dataset_type == "SpeechConversation"
+
+    watermark = get_export_watermark(project) if incremental else None
+    exported = 0
+    for chunk in _iter_task_chunks(project, chunk_size, watermark):
+        chunk_exported, excluded_task_ids = export_chunk_in_place(
+            chunk,
+            dataset_model,
+            annotation_fields,
+            converter,
+            export_flags,
+            is_speech,
+            watermark,
+        )
+        exported += chunk_exported
+        if excluded_task_ids:
+            logger.warning(
+                "Tasks of project %s excluded from the export: %s",
+                project.id,
+                excluded_task_ids,
+            )
+    bump_report_versions([project.id])
+    return exported
@@ -0,0 +1,93 @@
+"""
+Project level locks for the task pull contexts built on Postgres advisory locks.
+
+The lock of a (project, context) pair is a transaction level advisory lock, so
+it has to be taken inside `transaction.atomic()` and is released by Postgres
+when the transaction commits or rolls back, including when the worker dies.
+Waiting for a busy lock is bounded by `lock_timeout` on the server instead of
+polling from the application.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from .models import ANNOTATION_LOCK, REVIEW_LOCK, SUPERCHECK_LOCK
+
+logger = logging.getLogger(__name__)
+
+# Second key of the advisory lock for each lock context
+LOCK_CONTEXT_KEYS = {
+    ANNOTATION_LOCK: 1,
+    REVIEW_LOCK: 2,
+    SUPERCHECK_LOCK: 3,
+}
+
+# SQLSTATE of the error raised when lock_timeout expires
+LOCK_NOT_AVAILABLE = "55P03"
+
+# Waits longer than this (seconds) are logged as warnings
+SLOW_LOCK_WAIT = 1
+
+
+class ProjectLockTimeout(Exception):
+    pass
+
+
+def _record_lock_wait(project_id, context, wait_time, acquired):
+    extra_data = {
+        "project_id": project_id,
+        "lock_context": context,
+        "lock_wait_ms": round(wait_time * 1000, 2),
+        "lock_acquired": acquired,
+    }
+    message = (
+        f"Project lock {context} for project {project_id} "
+        f"{'acquired' if acquired else 'timed out'} after {wait_time:.3f}s"
+    )
+    if not acquired or wait_time >= SLOW_LOCK_WAIT:
+        logger.warning(message, extra=extra_data)
+    else:
+        logger.info(message, extra=extra_data)
+
+
+@contextmanager
+def project_lock(project_id, context, timeout=None):
+    """
+    Hold the `context` lock of the project until the end of the current
+    transaction. Raises ProjectLockTimeout if the lock could not be
+    acquired within `timeout` seconds (defaults to PROJECT_LOCK_TIMEOUT).
+    """
+    if not connection.in_atomic_block:
+        raise RuntimeError("project_lock must be used inside transaction.atomic()")
+    if timeout is None:
+        timeout = settings.PROJECT_LOCK_TIMEOUT
+    lock_key = (project_id, LOCK_CONTEXT_KEYS[context])
+
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", lock_key)
+        acquired = cursor.fetchone()[0]
+        if not acquired:
+            try:
+                # the savepoint resets lock_timeout and keeps the transaction
+                # usable if the wait times out
+                with transaction.atomic():
+                    cursor.execute(
+                        "SELECT set_config('lock_timeout', %s, true)",
+                        [f"{int(timeout * 1000)}ms"],
+                    )
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", lock_key)
+                    cursor.execute("SET LOCAL lock_timeout = DEFAULT")
+                acquired = True
+            except OperationalError as e:
+                if getattr(e.__cause__, "pgcode", None) != LOCK_NOT_AVAILABLE:
+                    raise
+    _record_lock_wait(project_id, context, time.perf_counter() - started, acquired)
+    if not acquired:
+        raise ProjectLockTimeout(
+            f"Could not acquire {context} for project {project_id} in {timeout}s"
+        )
+    yield
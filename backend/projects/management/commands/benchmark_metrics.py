@@ -0,0 +1,98 @@
+import random
+import string
+import time
+
+import numpy as np
+import sacrebleu
+from django.core.management.base import BaseCommand
+from jiwer import wer
+from rapidfuzz.distance import Levenshtein
+
+from projects.metrics import compute_text_metrics
+
+
+def generate_pairs(count, seed):
+    """
+    Random sentence pairs, the second sentence being the first one with some
+    words substituted, dropped or inserted
+    """
+    rng = random.Random(seed)
+    vocabulary = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9)))
+        for _ in range(5000)
+    ]
+    pairs = []
+    for _ in range(count):
+        words = rng.choices(vocabulary, k=rng.randint(5, 30))
+        corrected = []
+        for word in words:
+            edit = rng.random()
+            if edit < 0.05:
+                continue
+            corrected.append(rng.choice(vocabulary) if edit < 0.15 else word)
+            if edit > 0.97:
+                corrected.append(rng.choice(vocabulary))
+        pairs.append((" ".join(words), " ".join(corrected)))
+    return pairs
+
+
+def score_pairs_one_by_one(pairs):
+    """
+    The scores computed one pair at a time, the way the reports used to
+    """
+    ced, wer_scores, bleu = [], [], []
+    for text1, text2 in pairs:
+        ced.append(Levenshtein.distance(text1, text2) / len(text1))
+        wer_scores.append(wer(text1, text2))
+        bleu.append(sacrebleu.corpus_bleu([text1], [[text2]]).score)
+    return {"ced": np.array(ced), "wer": np.array(wer_scores), "bleu": np.array(bleu)}
+
+
+class Command(BaseCommand):
+    """
+    Scores random sentence pairs with the batch metrics of projects.metrics and
+    one pair at a time, and reports the timings and the largest difference
+    between the scores of both.
+    """
+
+    help = "Benchmark the batch CED, WER and BLEU computation"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pairs", type=int, default=100000)
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Size of the process pool of the batch computation",
+        )
+        parser.add_argument(
+            "--skip-baseline",
+            action="store_true",
+            help="Do not score the pairs one at a time",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        pairs = generate_pairs(options["pairs"], options["seed"])
+
+        started = time.perf_counter()
+        scores = compute_text_metrics(
+            pairs, processes=options["processes"], corpus_bleu=True
+        )
+        batch_time = time.perf_counter() - started
+        self.stdout.write(f"Pairs: {len(pairs)}")
+        self.stdout.write(f"Batch: {batch_time:.2f} s")
+        self.stdout.write(f"Corpus BLEU: {scores['corpus_bleu']:.2f}")
+        if options["skip_baseline"]:
+            return
+
+        started = time.perf_counter()
+        baseline = score_pairs_one_by_one(pairs)
+        baseline_time = time.perf_counter() - started
+        self.stdout.write(
+            f"One pair at a time: {baseline_time:.2f} s "
+            f"({baseline_time / batch_time:.1f}x slower)"
+        )
+        for metric, values in baseline.items():
+            difference = np.max(np.abs(values - scores[metric]))
+            self.stdout.write(f"Largest {metric} difference: {difference:.2e}")
@@ -0,0 +1,106 @@
+import statistics
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from projects.models import Project
+from projects.task_pull import claim_annotation_tasks
+from tasks.annotation_rollup import rebuild_annotation_rollup
+from tasks.models import Annotation, Task, ANNOTATOR_ANNOTATION
+from tasks.ready_queue import refresh_ready_queue
+
+
+class Command(BaseCommand):
+    """
+    Fires concurrent annotation task pulls against a project on a local database
+    and reports the pull latencies along with the number of double assignments.
+    The assignments made by the benchmark are reverted unless --keep is passed.
+    """
+
+    help = "Benchmark concurrent annotation task pulls for a project"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="Number of simultaneous pulls (one per project annotator)",
+        )
+        parser.add_argument(
+            "--num-tasks",
+            type=int,
+            default=None,
+            help="Tasks pulled per request, defaults to tasks_pull_count_per_batch",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the assignments made by the benchmark",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options["project_id"])
+        except Project.DoesNotExist:
+            raise CommandError("Project does not exist")
+        if connection.vendor != "postgresql":
+            raise CommandError("The benchmark needs a PostgreSQL database")
+
+        annotators = list(project.annotators.all()[: options["concurrency"]])
+        if len(annotators) < options["concurrency"]:
+            raise CommandError(
+                f"The project has only {len(annotators)} annotators, "
+                f"add more annotators or lower --concurrency"
+            )
+        num_tasks = options["num_tasks"] or project.tasks_pull_count_per_batch
+        started_at = datetime.now(timezone.utc)
+
+        def pull(annotator):
+            try:
+                started = time.perf_counter()
+                task_ids = claim_annotation_tasks(project, annotator, num_tasks)
+                return time.perf_counter() - started, task_ids
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(annotators)) as executor:
+            results = list(executor.map(pull, annotators))
+
+        latencies = sorted(latency for latency, _ in results)
+        claimed_ids = [task_id for _, task_ids in results for task_id in task_ids]
+        double_assigned = (
+            Task.objects.filter(id__in=claimed_ids)
+            .annotate(annotator_count=Count("annotation_users", distinct=True))
+            .filter(annotator_count__gt=project.required_annotators_per_task)
+            .count()
+        )
+
+        self.stdout.write(f"Pulls: {len(latencies)}, tasks claimed: {len(claimed_ids)}")
+        self.stdout.write(f"p50 latency: {statistics.median(latencies) * 1000:.1f} ms")
+        self.stdout.write(
+            f"p99 latency: {latencies[int(0.99 * (len(latencies) - 1))] * 1000:.1f} ms"
+        )
+        self.stdout.write(f"Double assigned tasks: {double_assigned}")
+
+        if not options["keep"]:
+            with transaction.atomic():
+                for annotator, (_, task_ids) in zip(annotators, results):
+                    Annotation.objects.filter(
+                        task_id__in=task_ids,
+                        completed_by=annotator,
+                        annotation_type=ANNOTATOR_ANNOTATION,
+                        created_at__gte=started_at,
+                    ).delete()
+                    Task.annotation_users.through.objects.filter(
+                        task_id__in=task_ids, user_id=annotator.id
+                    ).delete()
+            # the deletes above bypass the signals keeping the ready queue and
+            # the rollup of the project up to date
+            refresh_ready_queue(claimed_ids)
+            rebuild_annotation_rollup(project.id, start_date=started_at.date())
+            self.stdout.write("Benchmark assignments reverted")
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from projects.report_cache import (
+    HIT,
+    MISS,
+    get_report_cache_stats,
+    reset_report_cache_stats,
+)
+
+
+class Command(BaseCommand):
+    """
+    Prints the hits, misses and hit rate of the cached analytics reports of
+    every report kind, counted since the statistics were last reset.
+    """
+
+    help = "Show the hit and miss rates of the analytics report cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the statistics after printing them",
+        )
+
+    def handle(self, *args, **options):
+        stats = get_report_cache_stats()
+        if not stats:
+            self.stdout.write("No cached report has been requested yet")
+        for kind, kind_stats in stats.items():
+            hit_rate = kind_stats["hit_rate"]
+            self.stdout.write(
+                f"{kind}: {kind_stats[HIT]} hits, {kind_stats[MISS]} misses, "
+                f"hit rate {'-' if hit_rate is None else f'{hit_rate:.1%}'}"
+            )
+        if options["reset"]:
+            reset_report_cache_stats()
+            self.stdout.write("Statistics reset")
@@ -0,0 +1,139 @@
+"""
+Cached project membership lookups.
+
+The member ids of every role of a project are cached together under a key
+carrying the project's membership version. Any change to one of the membership
+M2M fields bumps the version through `m2m_changed` once the change is
+committed, so stale entries are never read again and simply expire.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+
+from .models import Project
+from .report_cache import bump_report_versions
+
+ANNOTATORS = "annotators"
+REVIEWERS = "annotation_reviewers"
+SUPERCHECKERS = "review_supercheckers"
+FROZEN_USERS = "frozen_users"
+
+MEMBERSHIP_FIELDS = (ANNOTATORS, REVIEWERS, SUPERCHECKERS, FROZEN_USERS)
+MEMBERSHIP_CACHE_TTL = 60 * 60 * 24
+
+
+def _version_key(project_id):
+    return f"project_membership_version:{project_id}"
+
+
+def _members_key(project_id, version):
+    return f"project_membership:{project_id}:{version}"
+
+
+def get_membership_version(project_id):
+    key = _version_key(project_id)
+    version = cache.get(key)
+    if version is None:
+        # a timestamp never repeats a version lost by an eviction
+        version = time.time_ns()
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_membership_version(project_id):
+    cache.set(_version_key(project_id), time.time_ns(), timeout=None)
+    bump_report_versions([project_id])
+
+
+def get_project_members(project_id):
+    """
+    Returns a dict of membership field to the frozenset of member ids
+    """
+    key = _members_key(project_id, get_membership_version(project_id))
+    members = cache.get(key)
+    if members is None:
+        members = {
+            field: frozenset(
+                getattr(Project, field)
+                .through.objects.filter(project_id=project_id)
+                .values_list("user_id", flat=True)
+            )
+            for field in MEMBERSHIP_FIELDS
+        }
+        cache.set(key, members, MEMBERSHIP_CACHE_TTL)
+    return members
+
+
+def member_ids(project_id, role):
+    """
+    Ids of the project members with the role (one of MEMBERSHIP_FIELDS)
+    """
+    return get_project_members(project_id)[role]
+
+
+def _user_id(user):
+    return user if isinstance(user, int) else user.id
+
+
+def is_annotator(project_id, user):
+    return _user_id(user) in member_ids(project_id, ANNOTATORS)
+
+
+def is_reviewer(project_id, user):
+    return _user_id(user) in member_ids(project_id, REVIEWERS)
+
+
+def is_superchecker(project_id, user):
+    return _user_id(user) in member_ids(project_id, SUPERCHECKERS)
+
+
+def is_frozen(project_id, user):
+    return _user_id(user) in member_ids(project_id, FROZEN_USERS)
+
+
+def is_member(project_id, user):
+    """
+    Whether the user is an annotator, reviewer or superchecker of the project
+    """
+    members = get_project_members(project_id)
+    user_id = _user_id(user)
+    return any(
+        user_id in members[role] for role in (ANNOTATORS, REVIEWERS, SUPERCHECKERS)
+    )
+
+
+def _bump_membership_version_on_commit(project_id):
+    # bumping before the commit would let concurrent reads cache the old
+    # members under the new version
+    transaction.on_commit(lambda: bump_membership_version(project_id))
+
+
+def invalidate_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _bump_membership_version_on_commit(instance.id)
+        return
+    # changes made from the user side, pk_set holds project ids
+    if action == "pre_clear":
+        instance._cleared_membership_project_ids = list(
+            sender.objects.filter(user_id=instance.id).values_list(
+                "project_id", flat=True
+            )
+        )
+    elif action == "post_clear":
+        for project_id in getattr(instance, "_cleared_membership_project_ids", []):
+            _bump_membership_version_on_commit(project_id)
+    elif action in ("post_add", "post_remove"):
+        for project_id in pk_set or []:
+            _bump_membership_version_on_commit(project_id)
+
+
+for field in MEMBERSHIP_FIELDS:
+    m2m_changed.connect(
+        invalidate_membership,
+        sender=getattr(Project, field).through,
+        dispatch_uid=f"invalidate_project_membership_{field}",
+    )
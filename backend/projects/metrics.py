@@ -0,0 +1,216 @@
+"""
+Batch quality metrics between pairs of texts or annotation results.
+
+Every pair is ``(text, corrected_text)``: the text of an annotation and the text
+it was corrected to by the next stage (review or supercheck).
+
+- the character level edit distance (CED) and the word error rate (WER) are
+  normalised by the length of the first text,
+- the BLEU score scores the first text against the second one as reference.
+
+Texts are extracted from the annotation results once, the edit distances are
+computed with rapidfuzz and the scores are returned as numpy arrays holding NaN
+for the pairs whose score could not be computed. Large batches can be spread
+over a process pool with ``processes``, which is not available from inside a
+prefork celery worker, whose processes can not have children.
+"""
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from rapidfuzz.distance import Levenshtein
+from sacrebleu.metrics import BLEU
+
+METRICS = ("ced", "wer", "bleu")
+
+# below this many pairs per process, a pool costs more than it saves
+MIN_PAIRS_PER_PROCESS = 5000
+
+_multiple_spaces = re.compile(r"\s\s+")
+
+
+def get_transcription_text(annotation_result):
+    """
+    Text of the textarea results of an annotation, in the order of the segments.
+    Raises an exception for an empty result.
+    """
+    if "end" in annotation_result[0]["value"]:
+        annotation_result = sorted(annotation_result, key=lambda i: (i["value"]["end"]))
+
+    annotation_result_text = ""
+    for result in annotation_result:
+        if "type" in result and result["type"] == "textarea":
+            if (
+                "from_name" in result
+                and result["from_name"] != "acoustic_normalised_transcribed_json"
+            ):
+                try:
+                    for s in result["value"]["text"]:
+                        annotation_result_text += s
+                except:
+                    pass
+    return annotation_result_text
+
+
+def get_segment_text_pairs(annotation_result1, annotation_result2):
+    """
+    Texts of the segments of two annotation results, paired by position
+    """
+    pairs = []
+    for result1, result2 in zip(annotation_result1, annotation_result2):
+        try:
+            pairs.append((result1["value"]["text"], result2["value"]["text"]))
+        except (KeyError, TypeError):
+            continue
+    return pairs
+
+
+def _words(text):
+    # same tokenisation as the default transformation of jiwer
+    return _multiple_spaces.sub(" ", text).strip().split(" ")
+
+
+def character_edit_distances(pairs):
+    """
+    Normalised character level edit distance of every pair
+    """
+    distance = Levenshtein.distance
+    scores = np.full(len(pairs), np.nan)
+    for i, (text1, text2) in enumerate(pairs):
+        try:
+            if len(text1):
+                scores[i] = distance(text1, text2) / len(text1)
+        except TypeError:
+            pass
+    return scores
+
+
+def word_error_rates(pairs):
+    """
+    Word error rate of every pair, 0 when either text is empty
+    """
+    distance = Levenshtein.distance
+    scores = np.zeros(len(pairs))
+    for i, (text1, text2) in enumerate(pairs):
+        try:
+            if text1 is None or text2 is None:
+                scores[i] = np.nan
+            elif text1 and text2:
+                words1 = _words(text1)
+                if words1 != [""]:
+                    scores[i] = distance(words1, _words(text2)) / len(words1)
+        except (AttributeError, TypeError):
+            scores[i] = np.nan
+    return scores
+
+
+def bleu_scores(pairs):
+    """
+    BLEU score of every pair, computed like a corpus made of the single pair
+    """
+    bleu = BLEU()
+    scores = np.full(len(pairs), np.nan)
+    for i, (text1, text2) in enumerate(pairs):
+        try:
+            scores[i] = bleu.corpus_score([text1], [[text2]]).score
+        except Exception:
+            pass
+    return scores
+
+
+def corpus_bleu_score(pairs):
+    """
+    BLEU score of all the first texts of the pairs against the second ones
+    """
+    if not pairs:
+        return None
+    return (
+        BLEU()
+        .corpus_score([text1 for text1, _ in pairs], [[text2 for _, text2 in pairs]])
+        .score
+    )
+
+
+_METRIC_FUNCTIONS = {
+    "ced": character_edit_distances,
+    "wer": word_error_rates,
+    "bleu": bleu_scores,
+}
+
+
+def _score_chunk(pairs, metrics):
+    return {metric: _METRIC_FUNCTIONS[metric](pairs) for metric in metrics}
+
+
+def compute_text_metrics(pairs, metrics=METRICS, processes=None, corpus_bleu=False):
+    """
+    Compute the metrics of a list of text pairs.
+
+    Returns a dict of metric name to the array of the scores of the pairs, along
+    with the corpus BLEU score under "corpus_bleu" when `corpus_bleu` is set.
+    """
+    pairs = list(pairs)
+    processes = min(processes or 1, len(pairs) // MIN_PAIRS_PER_PROCESS)
+    if processes > 1:
+        chunk_size = -(-len(pairs) // processes)
+        chunks = [
+            pairs[start : start + chunk_size]
+            for start in range(0, len(pairs), chunk_size)
+        ]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunk_scores = list(
+                executor.map(_score_chunk, chunks, [metrics] * len(chunks))
+            )
+        scores = {
+            metric: np.concatenate([chunk[metric] for chunk in chunk_scores])
+            for metric in metrics
+        }
+    else:
+        scores = _score_chunk(pairs, metrics)
+    if corpus_bleu:
+        scores["corpus_bleu"] = corpus_bleu_score(pairs)
+    return scores
+
+
+def compute_annotation_metrics(
+    result_pairs, metrics=METRICS, processes=None, corpus_bleu=False
+):
+    """
+    Compute the metrics of a list of annotation result pairs on their
+    transcription texts, see compute_text_metrics. Pairs whose text can not be
+    extracted are scored NaN.
+    """
+    pairs = []
+    for result1, result2 in result_pairs:
+        try:
+            pairs.append(
+                (get_transcription_text(result1), get_transcription_text(result2))
+            )
+        except Exception:
+            pairs.append((None, None))
+    return compute_text_metrics(pairs, metrics, processes, corpus_bleu)
+
+
+def character_edit_distance(text1, text2):
+    """
+    Normalised character level edit distance of a pair of texts,
+    raises ValueError if it can not be computed
+    """
+    score = character_edit_distances([(text1, text2)])[0]
+    if np.isnan(score):
+        raise ValueError("Character level edit distance needs a non empty text")
+    return float(score)
+
+
+def word_error_rate(text1, text2):
+    return float(word_error_rates([(text1, text2)])[0])
+
+
+def bleu_score(text1, text2):
+    """
+    BLEU score of a pair of texts, raises ValueError if it can not be computed
+    """
+    score = bleu_scores([(text1, text2)])[0]
+    if np.isnan(score):
+        raise ValueError("BLEU score can not be computed for the texts")
+    return float(score)
@@ -0,0 +1,15 @@
+# Generated by Django 3.2.14 on 2026-10-18 11:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0054_alter_project_project_type"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="ProjectTaskRequestLock",
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.2.14 on 2026-10-18 14:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dataset", "0048_ocrdocument_bboxes_relation_prediction_json"),
+        ("projects", "0055_delete_projecttaskrequestlock"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProjectExportWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "last_annotation_updated_at",
+                    models.DateTimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="watermark_last_annotation_updated_at",
+                    ),
+                ),
+                (
+                    "last_annotation_id",
+                    models.IntegerField(
+                        default=0, verbose_name="watermark_last_annotation_id"
+                    ),
+                ),
+                ("exported_count", models.PositiveIntegerField(default=0)),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="watermark_updated_at"
+                    ),
+                ),
+                (
+                    "export_dataset_instance",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Dataset instance of the new records, null for in place exports",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_watermarks",
+                        to="dataset.datasetinstance",
+                        verbose_name="watermark_export_dataset_instance",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_watermarks",
+                        to="projects.project",
+                        verbose_name="watermark_project",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("project", "export_dataset_instance")},
+            },
+        ),
+    ]
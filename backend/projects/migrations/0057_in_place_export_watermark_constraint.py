@@ -0,0 +1,20 @@
+# Generated by Django 3.2.14 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0056_projectexportwatermark"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="projectexportwatermark",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("export_dataset_instance__isnull", True)),
+                fields=("project",),
+                name="unique_in_place_export_watermark",
+            ),
+        ),
+    ]
@@ -6,7 +6,7 @@ from workspaces.models import Workspace
 from dataset.models import DatasetInstance
 from .registry_helper import ProjectRegistry
 from django.utils.timezone import now
-from datetime import datetime, timedelta
+from datetime import datetime
 from utils.constants import LANG_CHOICES
 
 # from dataset import LANG_CHOICES
@@ -275,32 +275,6 @@ class Project(models.Model):
         ),
     )
 
-    def clear_expired_lock(self):
-        self.lock.filter(expires_at__lt=now()).delete()
-
-    def release_lock(self, context):
-        self.lock.filter(lock_context=context).delete()
-
-    def is_locked(self, context):
-        self.clear_expired_lock()
-        return (
-            self.lock.filter(lock_context=context).filter(expires_at__gt=now()).count()
-        )
-
-    def set_lock(self, annotator, context):
-        """
-        Locks the project for an annotator
-        """
-        if not self.is_locked(context):
-            ProjectTaskRequestLock.objects.create(
-                project=self,
-                user=annotator,
-                lock_context=context,
-                expires_at=now() + timedelta(seconds=settings.PROJECT_LOCK_TTL),
-            )
-        else:
-            raise Exception("Project already locked")
-
     src_language = models.CharField(
         choices=LANG_CHOICES,
         null=True,
@@ -322,28 +296,50 @@ class Project(models.Model):
         return str(self.title)
 
 
-class ProjectTaskRequestLock(models.Model):
+class ProjectExportWatermark(models.Model):
     """
-    Basic database lock implementation to handle
-    concurrency in tasks pull requests for same project
+    Last correct annotation exported by the incremental exports of a project,
+    into its input dataset (in place) or into an export dataset instance
     """
 
     project = models.ForeignKey(
         Project,
         on_delete=models.CASCADE,
-        related_name="lock",
-        help_text="Project locked for task pulling",
+        related_name="export_watermarks",
+        verbose_name="watermark_project",
     )
-    user = models.ForeignKey(
-        User,
+    export_dataset_instance = models.ForeignKey(
+        DatasetInstance,
         on_delete=models.CASCADE,
-        related_name="project_lock",
-        help_text="User locking this project to pull tasks",
+        null=True,
+        blank=True,
+        related_name="export_watermarks",
+        verbose_name="watermark_export_dataset_instance",
+        help_text=("Dataset instance of the new records, null for in place exports"),
     )
-    lock_context = models.CharField(
-        choices=LOCK_CONTEXT,
-        max_length=50,
-        default=ANNOTATION_LOCK,
-        verbose_name="lock_context",
+    last_annotation_updated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="watermark_last_annotation_updated_at",
+    )
+    last_annotation_id = models.IntegerField(
+        default=0, verbose_name="watermark_last_annotation_id"
+    )
+    exported_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="watermark_updated_at"
     )
-    expires_at = models.DateTimeField("expires_at")
+
+    def __str__(self):
+        return f"{self.project_id}-{self.export_dataset_instance_id}"
+
+    class Meta:
+        unique_together = ("project", "export_dataset_instance")
+        constraints = [
+            # nulls are distinct in the unique together constraint
+            models.UniqueConstraint(
+                fields=["project"],
+                condition=models.Q(export_dataset_instance__isnull=True),
+                name="unique_in_place_export_watermark",
+            )
+        ]
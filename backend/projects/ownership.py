@@ -0,0 +1,294 @@
+"""
+Set based engine to release or reassign the tasks owned by a user in a project.
+
+The tasks of a user are selected and locked once and every step is applied to
+the whole set with bulk UPDATE/DELETE statements inside a single transaction,
+so the cost of removing a user does not grow with one query per task.
+
+Each function returns the number of tasks and annotations it touched.
+"""
+from django.db import transaction
+from django.db.models import F, Func, JSONField, Q, Value
+
+from tasks.models import (
+    Annotation,
+    Task,
+    ACCEPTED,
+    ANNOTATED,
+    ANNOTATOR_ANNOTATION,
+    INCOMPLETE,
+    LABELED,
+    REJECTED,
+    REVIEWED,
+    REVIEWER_ANNOTATION,
+    SUPER_CHECKER_ANNOTATION,
+    TO_BE_REVISED,
+    default_revision_loop_count_value,
+)
+from tasks.annotation_rollup import get_rollup_keys, schedule_rollup_refresh
+from tasks.ready_queue import refresh_ready_queue
+
+ANNOTATOR = "annotator"
+REVIEWER = "reviewer"
+SUPERCHECKER = "superchecker"
+
+AnnotationUsers = Task.annotation_users.through
+
+
+def empty_counts():
+    return {
+        "tasks_released": 0,
+        "tasks_reassigned": 0,
+        "annotations_deleted": 0,
+        "annotations_updated": 0,
+    }
+
+
+def add_counts(total, counts):
+    for key, value in counts.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def get_owned_tasks(project_id, user, role):
+    """
+    Tasks of the project which are released when the user is removed from the role
+    """
+    tasks = Task.objects.filter(project_id=project_id)
+    if role == ANNOTATOR:
+        return tasks.filter(annotation_users=user.id, task_status=INCOMPLETE)
+    if role == REVIEWER:
+        return tasks.filter(review_user=user.id, task_status=ANNOTATED)
+    if role == SUPERCHECKER:
+        return tasks.filter(super_check_user=user.id, task_status=REVIEWED)
+    raise ValueError(f"Unknown role {role}")
+
+
+def _deleted_annotations(deleted):
+    return deleted[1].get(Annotation._meta.label, 0)
+
+
+def _split_for_reassignment(task_ids, to_user):
+    """
+    Split the tasks into the ones which can be handed over to `to_user` and the
+    ones `to_user` already works on, which are released instead
+    """
+    if to_user is None:
+        return [], task_ids
+    conflicting_task_ids = set(
+        Task.objects.filter(id__in=task_ids)
+        .filter(
+            Q(annotations__completed_by=to_user.id)
+            | Q(annotation_users=to_user.id)
+            | Q(review_user=to_user.id)
+            | Q(super_check_user=to_user.id)
+        )
+        .values_list("id", flat=True)
+    )
+    return (
+        [task_id for task_id in task_ids if task_id not in conflicting_task_ids],
+        [task_id for task_id in task_ids if task_id in conflicting_task_ids],
+    )
+
+
+def _release_annotator_tasks(user, task_ids):
+    counts = empty_counts()
+    annotator_annotations = Annotation.objects.filter(
+        task_id__in=task_ids, completed_by=user.id, annotation_type=ANNOTATOR_ANNOTATION
+    )
+    reviewer_annotations = Annotation.objects.filter(
+        parent_annotation__in=annotator_annotations
+    )
+    # children first, parent_annotation protects the annotations being referenced
+    for annotations in (
+        Annotation.objects.filter(parent_annotation__in=reviewer_annotations),
+        reviewer_annotations,
+        annotator_annotations,
+    ):
+        counts["annotations_deleted"] += _deleted_annotations(annotations.delete())
+    counts["tasks_released"] = Task.objects.filter(id__in=task_ids).update(
+        super_check_user=None,
+        review_user=None,
+        revision_loop_count=default_revision_loop_count_value(),
+        task_status=INCOMPLETE,
+    )
+    AnnotationUsers.objects.filter(task_id__in=task_ids, user_id=user.id).delete()
+    return counts
+
+
+def _release_reviewer_tasks(user, task_ids):
+    counts = empty_counts()
+    reviewer_annotations = Annotation.objects.filter(
+        task_id__in=task_ids, completed_by=user.id, annotation_type=REVIEWER_ANNOTATION
+    )
+    counts["annotations_deleted"] += _deleted_annotations(
+        Annotation.objects.filter(parent_annotation__in=reviewer_annotations).delete()
+    )
+    # annotations sent back for revision are labeled again
+    counts["annotations_updated"] += Annotation.objects.filter(
+        id__in=reviewer_annotations.filter(annotation_status=TO_BE_REVISED).values(
+            "parent_annotation_id"
+        )
+    ).update(annotation_status=LABELED)
+    counts["annotations_deleted"] += _deleted_annotations(reviewer_annotations.delete())
+    counts["tasks_released"] = Task.objects.filter(id__in=task_ids).update(
+        super_check_user=None,
+        review_user=None,
+        revision_loop_count=default_revision_loop_count_value(),
+        task_status=ANNOTATED,
+    )
+    return counts
+
+
+def _release_superchecker_tasks(user, task_ids):
+    counts = empty_counts()
+    superchecker_annotations = Annotation.objects.filter(
+        task_id__in=task_ids,
+        completed_by=user.id,
+        annotation_type=SUPER_CHECKER_ANNOTATION,
+    )
+    # rejected reviews are accepted again and their annotations labeled again
+    rejected_review_ids = superchecker_annotations.filter(
+        annotation_status=REJECTED
+    ).values("parent_annotation_id")
+    counts["annotations_updated"] += Annotation.objects.filter(
+        id__in=Annotation.objects.filter(id__in=rejected_review_ids).values(
+            "parent_annotation_id"
+        )
+    ).update(annotation_status=LABELED)
+    counts["annotations_updated"] += Annotation.objects.filter(
+        id__in=rejected_review_ids
+    ).update(annotation_status=ACCEPTED)
+    counts["annotations_deleted"] += _deleted_annotations(
+        superchecker_annotations.delete()
+    )
+    counts["tasks_released"] = Task.objects.filter(id__in=task_ids).update(
+        super_check_user=None,
+        task_status=REVIEWED,
+        revision_loop_count=Func(
+            F("revision_loop_count"),
+            Value("{super_check_count}"),
+            Value("0"),
+            function="jsonb_set",
+            output_field=JSONField(),
+        ),
+    )
+    return counts
+
+
+def _reassign_tasks(user, role, to_user, task_ids):
+    counts = empty_counts()
+    if not task_ids:
+        return counts
+    annotation_type = {
+        ANNOTATOR: ANNOTATOR_ANNOTATION,
+        REVIEWER: REVIEWER_ANNOTATION,
+        SUPERCHECKER: SUPER_CHECKER_ANNOTATION,
+    }[role]
+    counts["annotations_updated"] = Annotation.objects.filter(
+        task_id__in=task_ids, completed_by=user.id, annotation_type=annotation_type
+    ).update(completed_by=to_user)
+    tasks = Task.objects.filter(id__in=task_ids)
+    if role == ANNOTATOR:
+        counts["tasks_reassigned"] = AnnotationUsers.objects.filter(
+            task_id__in=task_ids, user_id=user.id
+        ).update(user=to_user)
+    elif role == REVIEWER:
+        counts["tasks_reassigned"] = tasks.update(review_user=to_user)
+    else:
+        counts["tasks_reassigned"] = tasks.update(super_check_user=to_user)
+    return counts
+
+
+RELEASE_FUNCTIONS = {
+    ANNOTATOR: _release_annotator_tasks,
+    REVIEWER: _release_reviewer_tasks,
+    SUPERCHECKER: _release_superchecker_tasks,
+}
+
+
+def transfer_user_tasks(project_id, user, role, to_user=None):
+    """
+    Release the tasks of the user in the given role, or hand them over to
+    `to_user` when given. Tasks `to_user` already works on are released.
+    """
+    with transaction.atomic():
+        task_ids = list(
+            get_owned_tasks(project_id, user, role)
+            .select_for_update(of=("self",))
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        if not task_ids:
+            return empty_counts()
+        task_annotations = Annotation.objects.filter(task_id__in=task_ids)
+        rollup_keys = get_rollup_keys(task_annotations)
+        reassigned_task_ids, released_task_ids = _split_for_reassignment(
+            task_ids, to_user
+        )
+        counts = _reassign_tasks(user, role, to_user, reassigned_task_ids)
+        if released_task_ids:
+            add_counts(counts, RELEASE_FUNCTIONS[role](user, released_task_ids))
+        refresh_ready_queue(task_ids)
+        # the annotations are moved to other users and statuses with .update()
+        schedule_rollup_refresh(rollup_keys | get_rollup_keys(task_annotations))
+    return counts
+
+
+def remove_users_from_project(project, users, role, freeze_user=True, to_user=None):
+    """
+    Transfer the tasks of the users and freeze them in the project
+    """
+    counts = empty_counts()
+    for user in users:
+        add_counts(counts, transfer_user_tasks(project.id, user, role, to_user))
+    if freeze_user:
+        project.frozen_users.add(*users)
+    return counts
+
+
+def unassign_annotations(annotations, task_ids=None):
+    """
+    Unassign the annotator annotations along with their review and supercheck
+    annotations, and release the tasks (by default the annotated tasks) back
+    to the annotation queue
+    """
+    counts = empty_counts()
+    with transaction.atomic():
+        if task_ids is None:
+            task_ids = list(annotations.values_list("task_id", flat=True))
+        reviewer_annotations = Annotation.objects.filter(
+            parent_annotation__in=annotations
+        )
+        superchecker_annotations = Annotation.objects.filter(
+            parent_annotation__in=reviewer_annotations
+        )
+        reviewer_pulled_task_ids = list(
+            reviewer_annotations.values_list("task_id", flat=True)
+        )
+        supercheck_pulled_task_ids = list(
+            superchecker_annotations.values_list("task_id", flat=True)
+        )
+        for deleted_annotations in (
+            superchecker_annotations,
+            reviewer_annotations,
+            annotations,
+        ):
+            counts["annotations_deleted"] += _deleted_annotations(
+                deleted_annotations.delete()
+            )
+        Task.objects.filter(id__in=supercheck_pulled_task_ids).update(
+            super_check_user=None
+        )
+        Task.objects.filter(id__in=reviewer_pulled_task_ids).update(review_user=None)
+        counts["tasks_released"] = Task.objects.filter(id__in=task_ids).update(
+            revision_loop_count=default_revision_loop_count_value(),
+            task_status=INCOMPLETE,
+        )
+        AnnotationUsers.objects.filter(task_id__in=task_ids).delete()
+        refresh_ready_queue(
+            set(task_ids)
+            | set(reviewer_pulled_task_ids)
+            | set(supercheck_pulled_task_ids)
+        )
+    return counts
@@ -102,6 +102,16 @@ class ProjectRegistry:
             "fields": project["output_dataset"]["fields"],
         }
 
+    def get_display_fields(self, project_type):
+        """
+        For the given project type, get the input fields shown to the annotator
+        """
+        if project_type not in self.project_types:
+            return []
+        return self.project_types[project_type]["input_dataset"].get(
+            "display_fields", []
+        )
+
     def get_label_studio_jsx_payload(self, project_type):
         """
         For the given project type, get the annotation UI for label-studio-frontend
@@ -0,0 +1,214 @@
+"""
+Cached analytics reports.
+
+Reports are cached under a key made of the report kind, the workspace or
+organization they cover, their filters, the viewer and the "last modified"
+version of every project in scope. Annotation changes bump the version of their
+project when the annotation rollup is refreshed, task saves and membership
+changes bump it directly, so a changed project is never served from the cache
+again and its stale entries simply expire.
+
+Reports of a date range closed before today are cached without a timeout, the
+others for REPORT_CACHE_TTL. Hits and misses are counted per report kind, see
+`get_report_cache_stats` and the `report_cache_stats` command.
+"""
+import hashlib
+import json
+import time
+from datetime import date
+from functools import wraps
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from tasks.models import Task
+from users.models import User
+
+from .models import Project
+
+REPORT_CACHE_TTL = 60 * 15
+
+WORKSPACE_SCOPE = "workspace"
+ORGANIZATION_SCOPE = "organization"
+
+# request fields which make a report request do something else than return it
+UNCACHED_REQUEST_FIELDS = ("send_mail", "download_csv")
+
+HIT = "hits"
+MISS = "misses"
+
+_STATS_KINDS_KEY = "report_cache_stats:kinds"
+
+
+def _version_key(project_id):
+    return f"project_report_version:{project_id}"
+
+
+def _stats_key(kind, outcome):
+    return f"report_cache_stats:{kind}:{outcome}"
+
+
+def bump_report_versions(project_ids):
+    """
+    Mark the projects as modified, invalidating the cached reports covering them
+    """
+    # a timestamp never repeats a version lost by an eviction
+    version = time.time_ns()
+    cache.set_many(
+        {_version_key(project_id): version for project_id in set(project_ids)},
+        timeout=None,
+    )
+
+
+def get_report_versions(project_ids):
+    """
+    Returns a dict of project id to its report version
+    """
+    keys = {_version_key(project_id): project_id for project_id in project_ids}
+    versions = {
+        keys[key]: version for key, version in cache.get_many(list(keys)).items()
+    }
+    for key, project_id in keys.items():
+        if project_id not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[project_id] = cache.get(key)
+    return versions
+
+
+def get_scope_project_ids(scope, scope_id):
+    if scope == WORKSPACE_SCOPE:
+        projects = Project.objects.filter(workspace_id=scope_id)
+    else:
+        projects = Project.objects.filter(organization_id=scope_id)
+    return sorted(projects.values_list("id", flat=True))
+
+
+def get_viewer(user):
+    """
+    Part of the key depending on the user requesting the report: managers and
+    owners get the same reports, the other users only see their own.
+    """
+    if user.is_superuser:
+        return "superuser"
+    if getattr(user, "role", None) in (User.ORGANIZATION_OWNER, User.WORKSPACE_MANAGER):
+        return f"role:{user.role}"
+    return f"user:{user.id}"
+
+
+def get_report_cache_key(kind, scope, scope_id, filters, viewer):
+    project_ids = get_scope_project_ids(scope, scope_id)
+    versions = get_report_versions(project_ids)
+    digest = hashlib.sha1(
+        json.dumps(
+            {
+                "filters": filters,
+                "viewer": viewer,
+                "versions": [[pid, versions[pid]] for pid in project_ids],
+            },
+            sort_keys=True,
+            default=str,
+        ).encode()
+    ).hexdigest()
+    return f"report:{kind}:{scope}:{scope_id}:{digest}"
+
+
+def is_closed_date_range(filters):
+    """
+    Whether the report covers a date range which ended before today
+    """
+    to_date = filters.get("to_date")
+    if not to_date:
+        return False
+    try:
+        end = date.fromisoformat(str(to_date)[:10])
+    except ValueError:
+        return False
+    return end < timezone.localdate()
+
+
+def record_report_cache_access(kind, outcome):
+    try:
+        cache.incr(_stats_key(kind, outcome))
+    except ValueError:
+        if not cache.add(_stats_key(kind, outcome), 1, timeout=None):
+            cache.incr(_stats_key(kind, outcome))
+        kinds = cache.get(_STATS_KINDS_KEY) or set()
+        if kind not in kinds:
+            cache.set(_STATS_KINDS_KEY, kinds | {kind}, timeout=None)
+
+
+def get_report_cache_stats():
+    """
+    Returns a dict of report kind to its hits, misses and hit rate
+    """
+    stats = {}
+    for kind in sorted(cache.get(_STATS_KINDS_KEY) or ()):
+        hits = cache.get(_stats_key(kind, HIT), 0)
+        misses = cache.get(_stats_key(kind, MISS), 0)
+        total = hits + misses
+        stats[kind] = {
+            HIT: hits,
+            MISS: misses,
+            "hit_rate": hits / total if total else None,
+        }
+    return stats
+
+
+def reset_report_cache_stats():
+    for kind in cache.get(_STATS_KINDS_KEY) or ():
+        cache.delete_many([_stats_key(kind, HIT), _stats_key(kind, MISS)])
+    cache.delete(_STATS_KINDS_KEY)
+
+
+def cached_report(kind, scope):
+    """
+    Cache the successful responses of a report view of a workspace or an
+    organization (`scope`), whose pk is the scope id and whose filters are the
+    request data. Requests mailing or downloading the report are not cached.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(self, request, pk=None, *args, **kwargs):
+            filters = dict(request.data.items())
+            if any(filters.get(field) for field in UNCACHED_REQUEST_FIELDS):
+                return view(self, request, pk, *args, **kwargs)
+            key = get_report_cache_key(
+                kind, scope, pk, filters, get_viewer(request.user)
+            )
+            data = cache.get(key)
+            if data is not None:
+                record_report_cache_access(kind, HIT)
+                response = Response(data, status=status.HTTP_200_OK)
+                response["X-Report-Cache"] = "hit"
+                return response
+            record_report_cache_access(kind, MISS)
+            response = view(self, request, pk, *args, **kwargs)
+            if (
+                isinstance(response, Response)
+                and response.status_code == status.HTTP_200_OK
+            ):
+                timeout = None if is_closed_date_range(filters) else REPORT_CACHE_TTL
+                cache.set(key, response.data, timeout)
+                response["X-Report-Cache"] = "miss"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+@receiver(post_save, sender=Task)
+def invalidate_saved_task_reports(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    bump_report_versions([instance.project_id_id])
+
+
+@receiver(post_delete, sender=Task)
+def invalidate_deleted_task_reports(sender, instance, **kwargs):
+    bump_report_versions([instance.project_id_id])
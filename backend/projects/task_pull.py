@@ -0,0 +1,209 @@
+"""
+Task pulling engine for annotation tasks.
+
+Eligible tasks are claimed from the project's ready queue with row level
+``SELECT ... FOR UPDATE SKIP LOCKED`` instead of a project wide lock, so
+concurrent pulls on the same project never wait on each other: every request
+locks its own batch of queue entries, skips the entries already claimed by
+other requests and inserts the assignments in bulk.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from dataset.models import OCRDocument, SpeechConversation
+from tasks.models import (
+    Annotation,
+    ReadyQueueEntry,
+    Task,
+    ANNOTATOR_ANNOTATION,
+    INCOMPLETE,
+    UNLABELED,
+)
+from tasks.annotation_rollup import schedule_rollup_refresh
+from tasks.ready_queue import refresh_ready_queue
+from .models import ANNOTATION_STAGE
+from .utils import (
+    convert_prediction_json_to_annotation_result,
+    parse_json_for_ste,
+)
+
+logger = logging.getLogger(__name__)
+
+# Project types whose base annotation is prefilled from the data item predictions
+PREDICTION_BASED_PROJECT_TYPES = [
+    "AcousticNormalisedTranscriptionEditing",
+    "VerbatimTranscriptionCharacterTagging",
+    "AudioTranscriptionEditing",
+    "OCRTranscriptionEditing",
+    "OCRSegmentCategorizationEditing",
+    "StandardizedTranscriptionEditing",
+    "OCRSegmentCategorisationRelationMappingEditing",
+]
+
+AnnotationUsers = Task.annotation_users.through
+
+
+def get_pending_annotation_task_count(project_id, user):
+    """
+    Number of tasks of the project assigned to the user which are still unlabeled
+    """
+    return (
+        Task.objects.filter(
+            project_id=project_id,
+            annotation_users=user.id,
+            task_status__in=[INCOMPLETE, UNLABELED],
+            annotations__completed_by=user,
+            annotations__annotation_status=UNLABELED,
+        )
+        .distinct()
+        .count()
+    )
+
+
+def get_prediction_data_items(project_type, input_data_ids):
+    """
+    Load the data items holding the predictions of the tasks in one query.
+    Returns a dict of data item id to data item.
+    """
+    if project_type not in PREDICTION_BASED_PROJECT_TYPES:
+        return {}
+    if project_type.startswith("OCR"):
+        return OCRDocument.objects.in_bulk(input_data_ids)
+    return SpeechConversation.objects.in_bulk(input_data_ids)
+
+
+def get_base_annotation_result(task, project_type, data_item=None):
+    """
+    Prepare the result of the base annotation created for a newly pulled task.
+    Raises an exception if the prediction json of the data item is corrupt.
+    """
+    if project_type not in PREDICTION_BASED_PROJECT_TYPES:
+        return []
+    if project_type == "StandardizedTranscriptionEditing":
+        return parse_json_for_ste(task.input_data_id, data_item)
+    return convert_prediction_json_to_annotation_result(
+        task.input_data_id, project_type, data_item
+    )
+
+
+def claim_annotation_tasks(project, user, count):
+    """
+    Assign up to `count` unassigned tasks of the project to the user.
+
+    Returns the ids of the tasks assigned to the user.
+    """
+    if count <= 0:
+        return []
+    required_annotators = project.required_annotators_per_task
+
+    with transaction.atomic():
+        # Lock a batch of ready tasks, skipping entries locked by concurrent pulls
+        candidate_task_ids = list(
+            ReadyQueueEntry.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(project_id=project.id, stage=ANNOTATION_STAGE)
+            .exclude(task__annotation_users=user.id)
+            .order_by("task_id")
+            .values_list("task_id", flat=True)[:count]
+        )
+        if not candidate_task_ids:
+            return []
+
+        # Re-check the candidates now that the entries are locked, since a pull that
+        # committed while this one was selecting is not visible to the select above
+        assigned_counts = dict(
+            AnnotationUsers.objects.filter(task_id__in=candidate_task_ids)
+            .values("task_id")
+            .annotate(count=Count("id"))
+            .values_list("task_id", "count")
+        )
+        annotation_counts = dict(
+            Annotation.objects.filter(
+                task_id__in=candidate_task_ids, annotation_type=ANNOTATOR_ANNOTATION
+            )
+            .values("task_id")
+            .annotate(count=Count("id"))
+            .values_list("task_id", "count")
+        )
+        user_annotated_task_ids = set(
+            Annotation.objects.filter(
+                task_id__in=candidate_task_ids,
+                annotation_type=ANNOTATOR_ANNOTATION,
+                completed_by=user,
+            ).values_list("task_id", flat=True)
+        )
+        task_ids = [
+            task_id
+            for task_id in candidate_task_ids
+            if assigned_counts.get(task_id, 0) < required_annotators
+            and (
+                annotation_counts.get(task_id, 0) < required_annotators
+                or task_id in user_annotated_task_ids
+            )
+        ]
+
+        tasks = list(
+            Task.objects.filter(id__in=task_ids)
+            .order_by("id")
+            .only("id", "input_data_id")
+        )
+        data_items = get_prediction_data_items(
+            project.project_type,
+            [
+                task.input_data_id
+                for task in tasks
+                if task.id not in user_annotated_task_ids
+            ],
+        )
+        assigned_task_ids = []
+        base_annotations = []
+        corrupt_task_ids = []
+        for task in tasks:
+            if task.id not in user_annotated_task_ids:
+                try:
+                    result = get_base_annotation_result(
+                        task,
+                        project.project_type,
+                        data_items.get(task.input_data_id),
+                    )
+                except Exception:
+                    logger.warning(
+                        "The prediction json of the data item-%s is corrupt.",
+                        task.input_data_id,
+                        exc_info=True,
+                    )
+                    corrupt_task_ids.append(task.id)
+                    continue
+                base_annotations.append(
+                    Annotation(result=result, task_id=task.id, completed_by=user)
+                )
+            assigned_task_ids.append(task.id)
+
+        if corrupt_task_ids:
+            Task.objects.filter(id__in=corrupt_task_ids).delete()
+        AnnotationUsers.objects.bulk_create(
+            [
+                AnnotationUsers(task_id=task_id, user_id=user.id)
+                for task_id in assigned_task_ids
+            ],
+            ignore_conflicts=True,
+        )
+        Annotation.objects.bulk_create(base_annotations, ignore_conflicts=True)
+        if base_annotations:
+            schedule_rollup_refresh(
+                {
+                    (
+                        user.id,
+                        project.id,
+                        ANNOTATOR_ANNOTATION,
+                        UNLABELED,
+                        timezone.localdate(),
+                    )
+                }
+            )
+        # drop the tasks which have all their annotators from the ready queue
+        refresh_ready_queue(candidate_task_ids)
+
+    return assigned_task_ids
@@ -7,6 +7,7 @@ from urllib.parse import parse_qsl
 from celery import shared_task
 from celery.utils.log import get_task_logger
 from dataset import models as dataset_models
+from django.db import transaction
 from django.forms.models import model_to_dict
 from filters import filter
 from users.models import User
@@ -14,9 +15,18 @@ from users.models import User
 from tasks.models import Annotation as Annotation_model
 from tasks.models import *
 from tasks.models import Task
+from tasks.annotation_rollup import rollup_key, schedule_rollup_refresh
+from tasks.ready_queue import refresh_ready_queue
 from utils.monolingual.sentence_splitter import split_sentences
 from dataset.models import DatasetInstance
 from .models import *
+from .export_watermark import (
+    advance_export_watermark,
+    get_export_watermark,
+    get_next_changed_tasks,
+)
+from .in_place_export import export_tasks_in_place, get_accepted_tasks
+from .ownership import remove_users_from_project
 from .registry_helper import ProjectRegistry
 from .utils import (
     conversation_wordcount,
@@ -229,6 +239,7 @@ def create_tasks_from_dataitems(items, project):
         tasks.append(task)
     # Bulk create the tasks
     Task.objects.bulk_create(tasks)
+    refresh_ready_queue([task.id for task in tasks])
 
     if (
         project.metadata_json is not None
@@ -266,6 +277,9 @@ def create_tasks_from_dataitems(items, project):
         #
         # Prediction.objects.bulk_create(predictions)
         Annotation_model.objects.bulk_create(predictions)
+        schedule_rollup_refresh(
+            {rollup_key(prediction, project.id) for prediction in predictions}
+        )
     return tasks
 
 
@@ -386,295 +400,25 @@ def create_parameters_for_task_creation(
 
 @shared_task(queue="default")
 def export_project_in_place(
-    annotation_fields, project_id, project_type, get_request_data
+    annotation_fields, project_id, project_type, get_request_data, incremental=False
 ) -> None:
     """Function to export the output texts for a task into the dataset instance
 
+    The tasks are exported in chunks, every chunk is committed along with the
+    status of its tasks, so that an interrupted export can be run again.
+
     Args:
         annotation_fields (list): List of annotated fields to be exported
         project_id (int): ID of the project to which the tasks belong
         project_type (str): Type of project
         get_request_data (dict): Dictionary of the GET request data
+        incremental (bool): Only export the tasks changed since the last incremental export
     """
-
-    # Read registry to get output dataset model, and output fields
-    registry_helper = ProjectRegistry.get_instance()
-    output_dataset_info = registry_helper.get_output_dataset_and_fields(project_type)
-
-    dataset_model = getattr(dataset_models, output_dataset_info["dataset_type"])
-
-    # Get project object
     project = Project.objects.get(pk=project_id)
-
-    # Get all the accepted tasks for the project
-    if project.project_stage == REVIEW_STAGE:
-        tasks = Task.objects.filter(
-            project_id__exact=project, task_status__in=[REVIEWED]
-        )
-    elif project.project_stage == SUPERCHECK_STAGE:
-        tasks = Task.objects.filter(
-            project_id__exact=project, task_status__in=[SUPER_CHECKED]
-        )
-    else:
-        tasks = Task.objects.filter(
-            project_id__exact=project, task_status__in=[ANNOTATED]
-        )
-
-    data_items = []
-
-    # List for storing tasks fetched with modified data to the task_dict
-    tasks_list = []
-
-    # List for storing the annotated tasks that have been accepted as correct annotation
-    annotated_tasks = []
-    for task in tasks:
-        task_dict = model_to_dict(task)
-        # Rename keys to match label studio converter
-        # task_dict['id'] = task_dict['task_id']
-        # del task_dict['task_id']
-        if task.correct_annotation is not None:
-            annotated_tasks.append(task)
-            annotation_dict = model_to_dict(task.correct_annotation)
-            # annotation_dict['result'] = annotation_dict['result_json']
-            # del annotation_dict['result_json']
-            task_dict["annotations"] = [OrderedDict(annotation_dict)]
-
-        del task_dict["annotation_users"]
-        del task_dict["review_user"]
-        tasks_list.append(OrderedDict(task_dict))
-    if output_dataset_info["dataset_type"] == "Conversation":
-        tasks_annotations = tasks_list
-    else:
-        download_resources = True
-        tasks_df = DataExport.export_csv_file(
-            project, tasks_list, download_resources, get_request_data
-        )
-        tasks_annotations = json.loads(tasks_df.to_json(orient="records"))
-
-    export_excluded_task_ids = []
-
-    is_SpeechConversation = output_dataset_info["dataset_type"] == "SpeechConversation"
-    is_AcousticNormalisedTranscriptionEditing = project_type in (
-        "AcousticNormalisedTranscriptionEditing",
-        "VerbatimTranscriptionCharacterTagging",
-    )    
-    is_ConversationVerification = project.project_type == "ConversationVerification"
-    bboxes_relation_json = []
-    annotated_document_details_json = {}
-    for ta, tl, task in zip(tasks_annotations, tasks_list, annotated_tasks):
-        if is_SpeechConversation:
-            try:
-                ta_labels = json.loads(ta["labels"])
-            except Exception as error:
-                print(task.id)
-                print(error)
-                export_excluded_task_ids.append(task.id)
-                continue
-            if is_AcousticNormalisedTranscriptionEditing:
-                try:
-                    ta_transcribed_json = json.loads(ta["verbatim_transcribed_json"])
-                except json.JSONDecodeError:
-                    ta_transcribed_json = [ta["verbatim_transcribed_json"]]
-                except KeyError:
-                    ta_transcribed_json = len(ta_labels) * [""]
-                if len(ta_labels) != len(ta_transcribed_json):
-                    export_excluded_task_ids.append(task.id)
-                    continue
-                try:
-                    ta_acoustic_transcribed_json = json.loads(
-                        ta["acoustic_normalised_transcribed_json"]
-                    )
-                except json.JSONDecodeError:
-                    ta_acoustic_transcribed_json = [
-                        ta["acoustic_normalised_transcribed_json"]
-                    ]
-                except KeyError:
-                    ta_acoustic_transcribed_json = len(ta_labels) * [""]
-                if len(ta_labels) != len(ta_acoustic_transcribed_json):
-                    export_excluded_task_ids.append(task.id)
-                    continue
-            else:
-                try:
-                    ta_transcribed_json = json.loads(ta["transcribed_json"])
-                except json.JSONDecodeError:
-                    ta_transcribed_json = [ta["transcribed_json"]]
-                except KeyError:
-                    ta_transcribed_json = len(ta_labels) * [""]
-                if len(ta_labels) != len(ta_transcribed_json):
-                    export_excluded_task_ids.append(task.id)
-                    continue
-
-        task.output_data = task.input_data
-        task.save()
-        data_item = dataset_model.objects.get(id__exact=tl["input_data"])
-        try:
-            for field in annotation_fields:
-                # Check being done for rating as Label studio stores all the data in string format
-                # We need to store the rating in integer format
-                if field == "rating":
-                    setattr(data_item, field, int(ta[field]))
-                elif field == "transcribed_json" or field == "prediction_json":
-                    speakers_details = data_item.speakers_json
-                    for idx in range(len(ta_transcribed_json)):
-                        ta_labels[idx]["text"] = ta_transcribed_json[idx]
-                        speaker_id = next(
-                            speaker
-                            for speaker in speakers_details
-                            if speaker["name"] == ta_labels[idx]["labels"][0]
-                        )["speaker_id"]
-                        ta_labels[idx]["speaker_id"] = speaker_id
-                        del ta_labels[idx]["labels"]
-                        if is_AcousticNormalisedTranscriptionEditing:
-                            temp = deepcopy(ta_labels[idx])
-                            temp["text"] = ta_acoustic_transcribed_json[idx]
-                            ta_acoustic_transcribed_json[idx] = temp
-                    if is_AcousticNormalisedTranscriptionEditing:
-                        ta_transcribed_json = {
-                            "verbatim_transcribed_json": ta_labels,
-                            "acoustic_normalised_transcribed_json": ta_acoustic_transcribed_json,
-                            "standardised_transcription": "",
-                        }
-                        setattr(data_item, field, ta_transcribed_json)
-                    else:
-                        setattr(data_item, field, ta_labels)
-                elif field == "conversation_json":
-                    if is_ConversationVerification:
-                        conversation_json = data_item.unverified_conversation_json
-                    else:
-                        conversation_json = (
-                            data_item.machine_translated_conversation_json
-                        )
-                    for idx1 in range(len(conversation_json)):
-                        for idx2 in range(len(conversation_json[idx1]["sentences"])):
-                            conversation_json[idx1]["sentences"][idx2] = ""
-                    for result in tl["annotations"][0]["result"]:
-                        if result["to_name"] != "quality_status":
-                            to_name_list = result["to_name"].split("_")
-                            idx1 = int(to_name_list[1])
-                            idx2 = int(to_name_list[2])
-                            conversation_json[idx1]["sentences"][idx2] = ".".join(
-                                map(str, result["value"]["text"])
-                            )
-                    setattr(data_item, field, conversation_json)
-                elif field == "domain":
-                    setattr(
-                        data_item,
-                        field,
-                        ",".join(json.loads(ta[field])[0]["taxonomy"][0]),
-                    )
-                elif field == "conversation_quality_status":
-                    conversation_quality_status = ""
-                    for result in tl["annotations"][0]["result"]:
-                        if result["to_name"] == "quality_status":
-                            conversation_quality_status = result["value"]["choices"][0]
-                            break
-                    setattr(data_item, field, conversation_quality_status)
-                elif field == "ocr_transcribed_json":
-                    ta_ocr_transcribed_json = []
-                    ann = (
-                        json.loads(tl["annotations"])
-                        if isinstance(tl["annotations"], str)
-                        else tl["annotations"]
-                    )
-                    for idx in range(len(json.loads(ta["annotation_bboxes"]))):
-                        if ta["annotation_labels"] is not None and isinstance(
-                            json.loads(ta["annotation_labels"]), list
-                        ):
-                            ta_ocr_transcribed_json.append(
-                                json.loads(ta["annotation_labels"])[idx]
-                            )
-                        else:
-                            ta_ocr_transcribed_json.append(
-                                json.loads(ta["annotation_bboxes"])[idx]
-                            )
-                        # QUICKFIX for adjusting tasks_annotations
-                        ta["annotation_transcripts"] = (
-                            ta["ocr_transcribed_json"]
-                            if "ocr_transcribed_json" in ta
-                            else ""
-                        )
-                        if (
-                            len(json.loads(ta["annotation_bboxes"])) > 1
-                            and ta["annotation_transcripts"]
-                            and type(json.loads(ta["annotation_transcripts"])) == list
-                        ):
-                            try:
-                                ta_ocr_transcribed_json[-1]["text"] = json.loads(
-                                    ta["annotation_transcripts"]
-                                )[idx]
-                            except:
-                                ta_ocr_transcribed_json[-1]["text"] = ""
-                            ta_ocr_transcribed_json[-1]["id"] = (
-                                ann[0]["result"][idx * 2]["id"]
-                                if "id" in ann[0]["result"][idx * 2]
-                                else ""
-                            )
-                        else:
-                            try:
-                                ta_ocr_transcribed_json[-1]["text"] = ta[
-                                    "annotation_transcripts"
-                                ]
-                            except:
-                                ta_ocr_transcribed_json[-1]["text"] = ""
-                            ta_ocr_transcribed_json[-1]["id"] = (
-                                ann[0]["result"][idx * 2]["id"]
-                                if "id" in ann[0]["result"][idx * 2]
-                                else ""
-                            )
-                            ta_ocr_transcribed_json[-1]["parentID"] = (
-                                ann[0]["result"][idx * 2]["parentID"]
-                                if "parentID" in ann[0]["result"][idx * 2]
-                                else ""
-                            )
-                    bboxes_relation_json, annotated_document_details_json = [], []
-                    for r in ann[0]["result"]:
-                        if "type" in r and r["type"] == "relation":
-                            bboxes_relation_json.append(r)
-                    task_data = (
-                        json.loads(task.data)
-                        if isinstance(task.data, str)
-                        else task.data
-                    )
-                    if "language" in task_data or "ocr_domain" in task_data:
-                        language = (
-                            task_data["language"] if "language" in task_data else []
-                        )
-                        ocr_domain = (
-                            task_data["ocr_domain"] if "ocr_domain" in task_data else ""
-                        )
-                        annotated_document_details_json = {
-                            "language": language,
-                            "ocr_domain": ocr_domain,
-                        }
-                        setattr(
-                            data_item,
-                            "annotated_document_details_json",
-                            annotated_document_details_json,
-                        )
-                    if bboxes_relation_json:
-                        setattr(data_item, "bboxes_relation_json", bboxes_relation_json)
-                    setattr(data_item, field, ta_ocr_transcribed_json)
-                elif field == "final_transcribed_json":
-                    ta_transcribed_json = ann_result_for_ste(
-                        task.correct_annotation.result
-                    )
-                    setattr(data_item, field, ta_transcribed_json)
-                else:
-                    setattr(data_item, field, ta[field])
-            data_items.append(data_item)
-        except Exception as e:
-            export_excluded_task_ids.append(task.id)
-    # Write json to dataset columns
-    if bboxes_relation_json:
-        annotation_fields.append("bboxes_relation_json")
-    if annotated_document_details_json:
-        annotation_fields.append("annotated_document_details_json")
-    dataset_model.objects.bulk_update(data_items, annotation_fields)
-
-    tasks = tasks.exclude(id__in=export_excluded_task_ids)
-    tasks.update(task_status=EXPORTED)
-
-    return f"Exported {len(data_items)} items."
+    exported = export_tasks_in_place(
+        project, project_type, annotation_fields, incremental=incremental
+    )
+    return f"Exported {exported} items."
 
 
 @shared_task(queue="default")
@@ -685,6 +429,7 @@ def export_project_new_record(
     export_dataset_instance_id,
     task_annotation_fields,
     get_request_data,
+    incremental=False,
 ) -> None:
     """_summary_
 
@@ -695,6 +440,8 @@ def export_project_new_record(
         export_dataset_instance_id (int):ID of the dataset where the export is happening
         task_annotation_fields (list): List of annotated task
         get_request_data (dict): Dictionary of the GET request data
+        incremental (bool): Only export the tasks changed since the last incremental export
+            into the dataset instance, for annotation projects
     """
 
     # Read registry to get output dataset model, and output fields
@@ -711,21 +458,43 @@ def export_project_new_record(
     # Get project object
     project = Project.objects.get(pk=project_id)
 
-    # Get all the accepted tasks for the project
-
-    if project.project_stage == REVIEW_STAGE:
-        tasks = Task.objects.filter(
-            project_id__exact=project, task_status__in=[REVIEWED]
-        )
-    elif project.project_stage == SUPERCHECK_STAGE:
-        tasks = Task.objects.filter(
-            project_id__exact=project, task_status__in=[SUPER_CHECKED]
-        )
+    export_args = (
+        project,
+        dataset_model,
+        export_dataset_instance,
+        annotation_fields,
+        task_annotation_fields,
+        get_request_data,
+    )
+    if incremental and project.project_mode == Annotation:
+        # the changed tasks are exported in chunks, each committed along with
+        # the watermark of the export
+        watermark = get_export_watermark(project, export_dataset_instance)
+        while True:
+            chunk = get_next_changed_tasks(project, watermark)
+            if not chunk:
+                break
+            with transaction.atomic():
+                _export_new_record_tasks(
+                    Task.objects.filter(id__in=[task.id for task in chunk]),
+                    *export_args,
+                )
+                advance_export_watermark(watermark, chunk)
     else:
-        tasks = Task.objects.filter(
-            project_id__exact=project, task_status__in=[ANNOTATED]
-        )
+        # Get all the accepted tasks for the project
+        _export_new_record_tasks(get_accepted_tasks(project), *export_args)
 
+
+def _export_new_record_tasks(
+    tasks,
+    project,
+    dataset_model,
+    export_dataset_instance,
+    annotation_fields,
+    task_annotation_fields,
+    get_request_data,
+):
+    """Export the tasks into new (or their previously exported) data items of the dataset instance"""
     tasks_list = []
     annotated_tasks = []
     for task in tasks:
@@ -821,7 +590,9 @@ def export_project_new_record(
                 data_item.save()
                 task.output_data = data_item
                 task.save()
+    exported_task_ids = list(tasks.values_list("id", flat=True))
     tasks.update(task_status=EXPORTED)
+    refresh_ready_queue(exported_task_ids)
 
 
 @shared_task(queue="default")
@@ -838,3 +609,21 @@ def add_new_data_items_into_project(project_id, items):
     new_tasks = create_tasks_from_dataitems(items, project)
 
     return f"Pulled {len(new_tasks)} new data items into project {project.title}"
+
+
+@shared_task(queue="default")
+def remove_project_users(project_id, user_ids, role, freeze_user=True, to_user_id=None):
+    """Release or reassign the tasks of users removed from a project
+
+    Args:
+        project_id (int): ID of the project the users are removed from
+        user_ids (list): IDs of the removed users
+        role (str): Role the users are removed from (annotator/reviewer/superchecker)
+        freeze_user (bool): Whether the removed users are frozen in the project
+        to_user_id (int): ID of the user the tasks are reassigned to, if any
+    """
+    project = Project.objects.get(pk=project_id)
+    users = list(User.objects.filter(pk__in=user_ids))
+    to_user = User.objects.get(pk=to_user_id) if to_user_id else None
+    counts = remove_users_from_project(project, users, role, freeze_user, to_user)
+    return f"Removed {len(users)} {role}s from project {project.title}: {counts}"
@@ -1,3 +1,99 @@
-from django.test import TestCase
+import math
+from types import SimpleNamespace
 
-# Create your tests here.
+import sacrebleu
+from django.test import SimpleTestCase
+from jiwer import wer
+from rapidfuzz.distance import Levenshtein
+
+from .export_stream import get_export_record
+from .in_place_export import set_exported_fields
+from .metrics import bleu_scores, character_edit_distances, word_error_rates
+
+
+class SetExportedFieldsTestCase(SimpleTestCase):
+    def set_fields(self, annotation_fields, ta):
+        data_item = SimpleNamespace()
+        fields = set_exported_fields(
+            data_item, annotation_fields, None, ta, {}, None, (False, False)
+        )
+        return data_item, fields
+
+    def test_fields_are_copied_from_the_annotation(self):
+        data_item, fields = self.set_fields(
+            ["output_text", "rating"], {"output_text": "text", "rating": "4"}
+        )
+        self.assertEqual(data_item.output_text, "text")
+        self.assertEqual(data_item.rating, 4)
+        self.assertEqual(fields, {"output_text", "rating"})
+
+    def test_missing_output_field_is_exported_as_null(self):
+        data_item, fields = self.set_fields(
+            ["output_text", "labse_score"], {"output_text": "text"}
+        )
+        self.assertEqual(data_item.output_text, "text")
+        self.assertIsNone(data_item.labse_score)
+        self.assertEqual(fields, {"output_text", "labse_score"})
+
+
+class MetricsTestCase(SimpleTestCase):
+    pairs = [
+        ("the cat sat on the mat", "the cat sat on a mat"),
+        ("a  quick brown   fox ", "the quick brown fox jumps"),
+        ("नमस्ते दुनिया", "नमस्ते सारी दुनिया"),
+        ("Same text.", "Same text."),
+        ("", "not empty"),
+        ("not empty", ""),
+        ("", ""),
+    ]
+
+    def assertScoresEqual(self, scores, expected):
+        self.assertEqual(len(scores), len(expected))
+        for score, expected_score in zip(scores, expected):
+            if math.isnan(expected_score):
+                self.assertTrue(math.isnan(score))
+            else:
+                self.assertAlmostEqual(score, expected_score)
+
+    def test_character_edit_distances_match_levenshtein(self):
+        # the distance of an empty text could not be normalised
+        expected = [
+            Levenshtein.distance(text1, text2) / len(text1) if text1 else math.nan
+            for text1, text2 in self.pairs
+        ]
+        self.assertScoresEqual(character_edit_distances(self.pairs), expected)
+
+    def test_word_error_rates_match_jiwer(self):
+        # the word error rate of an empty text was reported as 0
+        expected = [
+            wer(text1, text2) if text1 and text2 else 0 for text1, text2 in self.pairs
+        ]
+        self.assertScoresEqual(word_error_rates(self.pairs), expected)
+
+    def test_bleu_scores_match_sacrebleu(self):
+        expected = [
+            sacrebleu.corpus_bleu([text1], [[text2]]).score
+            for text1, text2 in self.pairs
+        ]
+        self.assertScoresEqual(bleu_scores(self.pairs), expected)
+
+
+class ExportRecordTestCase(SimpleTestCase):
+    def test_outputs_are_flattened_like_the_converter_csv(self):
+        item = {
+            "input": {"text": "input"},
+            "id": 1,
+            "output": {
+                "choice": [{"type": "Choices", "choices": ["yes"]}],
+                "text": [{"type": "TextArea", "text": ["a", "b"]}],
+            },
+            "completed_by": {"email": "annotator@example.com"},
+            "annotation_id": 2,
+            "created_at": "created",
+            "updated_at": "updated",
+            "lead_time": 1.5,
+        }
+        record = get_export_record(item)
+        self.assertEqual(record["choice"], "yes")
+        self.assertEqual(record["text"], '[{"text": ["a", "b"]}]')
+        self.assertEqual(record["annotator"], "annotator@example.com")
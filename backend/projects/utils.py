@@ -13,18 +13,15 @@ from tasks.models import Annotation as Annotation_model
 from users.models import User
 from django.forms import model_to_dict
 
-from dataset.models import Conversation, SpeechConversation
-from tasks.models import (
-    Annotation,
-    ANNOTATED,
-    ANNOTATOR_ANNOTATION,
-    REVIEWED,
-    REVIEWER_ANNOTATION,
-)
+from dataset.models import Conversation, SpeechConversation, OCRDocument
 import datetime
 import yaml
 from yaml.loader import SafeLoader
-from jiwer import wer
+from .metrics import (
+    character_edit_distance,
+    get_transcription_text,
+    word_error_rate,
+)
 from users.utils import generate_random_string
 from utils.convert_result_to_chitralekha_format import (
     create_memory,
@@ -126,10 +123,6 @@ def conversation_sentence_count(conversations: list) -> int:
 
 
 def minor_major_accepted_task(annotation_objs):
-    from tasks.views import SentenceOperationViewSet
-
-    sentence_operation = SentenceOperationViewSet()
-
     minor, major = [], []
     for annot in annotation_objs:
         try:
@@ -142,16 +135,7 @@ def minor_major_accepted_task(annotation_objs):
 
             str1 = annotator_obj.result[0]["value"]["text"]
             str2 = reviewer_obj[0].result[0]["value"]["text"]
-            data = {"sentence1": str1[0], "sentence2": str2[0]}
-
-            char_level_distance = (
-                sentence_operation.calculate_normalized_character_level_edit_distance(
-                    data
-                )
-            )
-            char_score = char_level_distance.data[
-                "normalized_character_level_edit_distance"
-            ]
+            char_score = character_edit_distance(str1[0], str2[0])
             if char_score > 0.3:
                 major.append(annot)
             else:
@@ -218,43 +202,10 @@ def audio_word_count(annotation_result):
 def calculate_word_error_rate_between_two_audio_transcription_annotation(
     annotation_result1, annotation_result2, project_type
 ):
-    if "end" in annotation_result1[0]["value"]:
-        annotation_result1 = sorted(
-            annotation_result1, key=lambda i: (i["value"]["end"])
-        )
-        annotation_result2 = sorted(
-            annotation_result2, key=lambda i: (i["value"]["end"])
-        )
-
-    annotation_result1_text = ""
-    annotation_result2_text = ""
-
-    for result in annotation_result1:
-        if "type" in result and result["type"] == "textarea":
-            if (
-                "from_name" in result
-                and result["from_name"] != "acoustic_normalised_transcribed_json"
-            ):
-                try:
-                    for s in result["value"]["text"]:
-                        annotation_result1_text += s
-                except:
-                    pass
-
-    for result in annotation_result2:
-        if "type" in result and result["type"] == "textarea":
-            if (
-                "from_name" in result
-                and result["from_name"] != "acoustic_normalised_transcribed_json"
-            ):
-                try:
-                    for s in result["value"]["text"]:
-                        annotation_result2_text += s
-                except:
-                    pass
-    if len(annotation_result1_text) == 0 or len(annotation_result2_text) == 0:
-        return 0
-    return wer(annotation_result1_text, annotation_result2_text)
+    return word_error_rate(
+        get_transcription_text(annotation_result1),
+        get_transcription_text(annotation_result2),
+    )
 
 
 def ocr_word_count(annotation_result):
@@ -511,34 +462,41 @@ def process_ocr_results(
             }
 
 
-def process_task(
+# columns of the annotations which are not part of the exports
+ANNOTATION_EXPORT_EXCLUDED_FIELDS = [
+    "result_word_count",
+    "result_segment_count",
+    "result_audio_duration",
+    "result_not_null_audio_duration",
+    "result_metrics_computed",
+]
+
+
+def build_export_task(
     task,
     export_type,
-    include_input_data_metadata_json,
-    dataset_model,
+    correct_annotation,
     is_audio_project_type,
+    include_input_data_metadata_json=False,
+    metadata_json=None,
 ):
-    task_dict = model_to_dict(task)
+    """
+    Exported dict of a task given its correct annotation and, when it is
+    included, the metadata json of its input data item
+    """
+    task_dict = model_to_dict(task, exclude=["annotation_users", "review_user"])
     if export_type != "JSON":
         task_dict["data"]["task_status"] = task.task_status
 
-    correct_annotation = task.correct_annotation
-    if correct_annotation is None and task.task_status in [ANNOTATED]:
-        correct_annotation = task.annotations.all().filter(
-            annotation_type=ANNOTATOR_ANNOTATION
-        )[0]
-    if correct_annotation is None and task.task_status in [REVIEWED]:
-        correct_annotation = task.annotations.all().filter(
-            annotation_type=REVIEWER_ANNOTATION
-        )[0]
-
     annotator_email = ""
     if correct_annotation is not None:
         try:
             annotator_email = correct_annotation.completed_by.email
         except:
             pass
-        annotation_dict = model_to_dict(correct_annotation)
+        annotation_dict = model_to_dict(
+            correct_annotation, exclude=ANNOTATION_EXPORT_EXCLUDED_FIELDS
+        )
         annotation_dict["created_at"] = str(correct_annotation.created_at)
         annotation_dict["updated_at"] = str(correct_annotation.updated_at)
         task_dict["annotations"] = [OrderedDict(annotation_dict)]
@@ -547,13 +505,8 @@ def process_task(
 
     task_dict["data"]["annotator_email"] = annotator_email
 
-    if include_input_data_metadata_json and dataset_model:
-        task_dict["data"]["input_data_metadata_json"] = dataset_model.objects.get(
-            pk=task_dict["input_data"]
-        ).metadata_json
-
-    del task_dict["annotation_users"]
-    del task_dict["review_user"]
+    if include_input_data_metadata_json:
+        task_dict["data"]["input_data_metadata_json"] = metadata_json
 
     if is_audio_project_type:
         data = task_dict["data"]
@@ -563,6 +516,232 @@ def process_task(
     return OrderedDict(task_dict)
 
 
+def get_processed_task_data_keys(project_type, dataset_type):
+    """
+    Keys added to the task data of the exported tasks by process_exported_task
+    """
+    if project_type in (
+        "ConversationTranslation",
+        "ConversationTranslationEditing",
+        "ConversationVerification",
+    ):
+        if project_type == "ConversationVerification":
+            return ["conversation_quality_status", "verified_conversation_json"]
+        return ["conversation_quality_status", "translated_conversation_json"]
+    if dataset_type == "SpeechConversation":
+        if project_type == "AudioSegmentation":
+            return ["prediction_json"]
+        if project_type == "StandardizedTranscriptionEditing":
+            return ["final_transcribed_json", "transcribed_json"]
+        return ["transcribed_json"]
+    if dataset_type == "OCRDocument":
+        if project_type in (
+            "OCRSegmentCategorization",
+            "OCRSegmentCategorizationEditing",
+            "OCRSegmentCategorisationRelationMappingEditing",
+        ):
+            return [
+                "ocr_transcribed_json",
+                "bboxes_relation_json",
+                "annotated_document_details_json",
+            ]
+        return ["ocr_transcribed_json"]
+    return []
+
+
+def process_exported_task(task_dict, project_type, dataset_type):
+    """
+    Convert the annotation result of an exported task of a conversation,
+    speech or OCR project into the output json of its task data
+    """
+    if project_type in (
+        "ConversationTranslation",
+        "ConversationTranslationEditing",
+        "ConversationVerification",
+    ):
+        process_conversation_tasks(
+            task_dict,
+            project_type == "ConversationTranslation",
+            project_type == "ConversationVerification",
+        )
+    elif dataset_type == "SpeechConversation":
+        process_speech_tasks(
+            task_dict, project_type == "AudioSegmentation", project_type
+        )
+    elif dataset_type == "OCRDocument":
+        process_ocr_tasks(
+            task_dict,
+            project_type == "OCRSegmentCategorization",
+            project_type == "OCRSegmentCategorizationEditing",
+            project_type == "OCRSegmentCategorisationRelationMappingEditing",
+        )
+
+
+def convert_prediction_json_to_annotation_result(pk, proj_type, data_item=None):
+    """
+    Build the base annotation result from the predictions of the data item,
+    `data_item` can be passed when it is already loaded
+    """
+    result = []
+    if (
+        proj_type == "AudioTranscriptionEditing"
+        or proj_type == "AcousticNormalisedTranscriptionEditing"
+        or proj_type == "VerbatimTranscriptionCharacterTagging"
+    ):
+        if data_item is None:
+            data_item = SpeechConversation.objects.get(pk=pk)
+        prediction_json = (
+            json.loads(data_item.prediction_json)
+            if isinstance(data_item.prediction_json, str)
+            else data_item.prediction_json
+        )
+        speakers_json = data_item.speakers_json
+        audio_duration = data_item.audio_duration
+        # converting prediction_json to result (wherever it exists) for every task.
+        if prediction_json == None:
+            return result
+        for idx, val in enumerate(prediction_json):
+            label_dict = {
+                "origin": "manual",
+                "to_name": "audio_url",
+                "from_name": "labels",
+                "original_length": audio_duration,
+            }
+            text_dict = {
+                "origin": "manual",
+                "to_name": "audio_url",
+                "from_name": "transcribed_json",
+                "original_length": audio_duration,
+            }
+            if (
+                proj_type == "AcousticNormalisedTranscriptionEditing"
+                or proj_type == "VerbatimTranscriptionCharacterTagging"
+            ):
+                text_dict["from_name"] = "verbatim_transcribed_json"
+            id = f"shoonya_{idx}s{generate_random_string(13 - len(str(idx)))}"
+            label_dict["id"] = id
+            text_dict["id"] = id
+            label_dict["type"] = "labels"
+            text_dict["type"] = "textarea"
+
+            value_labels = {
+                "start": val["start"],
+                "end": val["end"],
+                "labels": [
+                    next(
+                        speaker
+                        for speaker in speakers_json
+                        if speaker["speaker_id"] == val["speaker_id"]
+                    )["name"]
+                ],
+            }
+            value_text = {
+                "start": val["start"],
+                "end": val["end"],
+                "text": [val["text"]],
+            }
+
+            label_dict["value"] = value_labels
+            text_dict["value"] = value_text
+            # mainly label_dict and text_dict are sent as result
+            result.append(label_dict)
+            result.append(text_dict)
+    elif proj_type in [
+        "OCRTranscriptionEditing",
+        "OCRSegmentCategorizationEditing",
+        "OCRSegmentCategorisationRelationMappingEditing",
+    ]:
+        if data_item is None:
+            data_item = OCRDocument.objects.get(pk=pk)
+        ocr_prediction_json = (
+            json.loads(data_item.ocr_prediction_json)
+            if isinstance(data_item.ocr_prediction_json, str)
+            else data_item.ocr_prediction_json
+        )
+        if ocr_prediction_json == None:
+            return result
+        is_OCRSegmentCategorisationRelationMappingEditing = (
+            proj_type == "OCRSegmentCategorisationRelationMappingEditing"
+        )
+        id_set = set()
+        for idx, val in enumerate(ocr_prediction_json):
+            image_rotation = (
+                ocr_prediction_json["image_rotation"]
+                if "image_rotation" in ocr_prediction_json
+                else 0
+            )
+            custom_id = f"shoonya_{idx}s{generate_random_string(13 - len(str(idx)))}"
+            if is_OCRSegmentCategorisationRelationMappingEditing:
+                id_set.add(custom_id)
+            # creating values
+            common_value = {
+                "x": val["x"],
+                "y": val["y"],
+                "width": val["width"],
+                "height": val["height"],
+                "rotation": val["rotation"],
+            }
+            # assigning common values to all
+            value_rectangle = common_value.copy()
+            value_labels = common_value.copy()
+            value_text = common_value.copy()
+            value_labels["labels"] = val["labels"]
+            value_text["text"] = [val["text"]]
+
+            rectangle_dict = {
+                "id": custom_id,
+                "origin": "manual",
+                "to_name": "image_url",
+                "from_name": "annotation_bboxes",
+                "type": "rectangle",
+                "image_rotation": image_rotation,
+                "original_width": val["original_width"],
+                "original_height": val["original_height"],
+                "value": value_rectangle,
+            }
+            label_dict = {
+                "id": custom_id,
+                "origin": "manual",
+                "to_name": "image_url",
+                "from_name": "annotation_labels",
+                "type": "labels",
+                "image_rotation": image_rotation,
+                "original_width": val["original_width"],
+                "original_height": val["original_height"],
+                "value": value_labels,
+            }
+            text_dict = {
+                "id": custom_id,
+                "origin": "manual",
+                "to_name": "image_url",
+                "from_name": "ocr_transcribed_json",
+                "type": "textarea",
+                "image_rotation": image_rotation,
+                "original_width": val["original_width"],
+                "original_height": val["original_height"],
+                "value": value_text,
+            }
+
+            result.append(rectangle_dict)
+            result.append(label_dict)
+            result.append(text_dict)
+        bboxes_relation_prediction_json = (
+            json.loads(data_item.bboxes_relation_prediction_json)
+            if isinstance(data_item.bboxes_relation_prediction_json, str)
+            else data_item.bboxes_relation_prediction_json
+        )
+        bboxes_relation_prediction_json = (
+            []
+            if bboxes_relation_prediction_json is None
+            else bboxes_relation_prediction_json
+        )
+        for b in bboxes_relation_prediction_json:
+            if "from_id" in b and "to_id" in b:
+                if b["from_id"] in id_set and b["to_id"] in id_set:
+                    result.append(b)
+    return result
+
+
 def convert_time_to_seconds(time_str):
     # Split the time string into hours, minutes, seconds, and milliseconds
     hours, minutes, seconds_milliseconds = time_str.split(":")
@@ -580,8 +759,9 @@ def convert_time_to_seconds(time_str):
     return total_seconds
 
 
-def parse_json_for_ste(input_data_id):
-    data_item = SpeechConversation.objects.get(pk=input_data_id)
+def parse_json_for_ste(input_data_id, data_item=None):
+    if data_item is None:
+        data_item = SpeechConversation.objects.get(pk=input_data_id)
     data = (
         json.loads(data_item.transcribed_json)
         if isinstance(data_item.transcribed_json, str)
@@ -1,7 +1,6 @@
 import re
 from collections import OrderedDict
 from datetime import datetime
-from time import sleep
 import pandas as pd
 import ast
 import csv
@@ -10,7 +9,7 @@ import math
 from django.core.files import File
 from django.db.models import Count, Q, F, Case, When
 from django.forms.models import model_to_dict
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 
 import notifications
 from shoonya_backend.pagination import CustomPagination
@@ -21,14 +20,11 @@ from .utils import (
     get_status_from_query_params,
     get_annotations_for_project,
     ocr_word_count,
-    process_conversation_tasks,
-    process_speech_tasks,
-    process_ocr_tasks,
-    process_task,
     convert_time_to_seconds,
     parse_json_for_ste,
+    convert_prediction_json_to_annotation_result,
 )
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
@@ -36,7 +32,8 @@ from rest_framework.response import Response
 from users.models import LANG_CHOICES
 from users.serializers import UserEmailSerializer
 from dataset.serializers import TaskResultSerializer
-from utils.search import process_search_query
+from utils.columnar_export import is_columnar_export_type
+from utils.search import process_search_query, extract_search_params
 from django_celery_results.models import TaskResult
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -52,9 +49,33 @@ from projects.serializers import (
 from tasks.models import Annotation as Annotation_model
 from tasks.models import *
 from tasks.models import Task
-from tasks.serializers import TaskSerializer
+from tasks.serializers import TaskSerializer, AnnotationSerializer
+from tasks.utils import get_project_task_data_keys
+from tasks.ready_queue import get_ready_queue, refresh_ready_queue, rebuild_ready_queue
 from .models import *
+from .locks import ProjectLockTimeout, project_lock
+from .membership import (
+    ANNOTATORS,
+    FROZEN_USERS,
+    REVIEWERS,
+    SUPERCHECKERS,
+    is_annotator,
+    is_frozen,
+    is_member,
+    is_reviewer,
+    is_superchecker,
+    member_ids,
+)
 from .registry_helper import ProjectRegistry
+from .task_pull import claim_annotation_tasks, get_pending_annotation_task_count
+from .export_stream import (
+    STREAMING_EXPORT_TYPES,
+    get_export_content_type,
+    get_export_filename,
+    iter_export_tasks,
+    stream_project_export,
+)
+from .export_watermark import has_changed_tasks, reset_export_watermark
 from dataset import models as dataset_models
 
 from dataset.models import (
@@ -71,6 +92,15 @@ from .tasks import (
     export_project_in_place,
     export_project_new_record,
     filter_data_items,
+    remove_project_users,
+)
+from .ownership import (
+    ANNOTATOR,
+    REVIEWER,
+    SUPERCHECKER,
+    get_owned_tasks,
+    remove_users_from_project,
+    unassign_annotations,
 )
 
 from .decorators import (
@@ -127,7 +157,7 @@ def get_review_reports(proj_id, userid, start_date, end_date):
     is_translation_project = True if "translation" in proj_type_lower else False
     total_tasks = Task.objects.filter(project_id=proj_id, review_user=userid)
 
-    if user in project_obj.frozen_users.all():
+    if is_frozen(proj_id, user):
         userName = userName + "*"
 
     total_task_count = total_tasks.count()
@@ -451,7 +481,7 @@ def get_supercheck_reports(proj_id, userid, start_date, end_date):
     is_translation_project = True if "translation" in proj_type_lower else False
     total_tasks = Task.objects.filter(project_id=proj_id, super_check_user=userid)
 
-    if user in project_obj.frozen_users.all():
+    if is_frozen(proj_id, user):
         userName = userName + "*"
 
     total_task_count = total_tasks.count()
@@ -846,171 +876,148 @@ def get_project_creation_status(pk) -> str:
 
 
 def get_task_count_unassigned(pk, user):
-    project = Project.objects.get(pk=pk)
-    required_annotators_per_task = project.required_annotators_per_task
-
-    proj_tasks = Task.objects.filter(project_id=pk).exclude(annotation_users=user)
-    proj_tasks_unassigned = (
-        proj_tasks.annotate(num_annotators=Count("annotation_users"))
-    ).filter(num_annotators__lt=required_annotators_per_task)
-
-    return len(proj_tasks_unassigned)
+    return (
+        get_ready_queue(pk, ANNOTATION_STAGE)
+        .exclude(task__annotation_users=user)
+        .count()
+    )
 
 
-def convert_prediction_json_to_annotation_result(pk, proj_type):
-    result = []
+def get_reassign_user(request, project, role, removed_user_ids):
+    """
+    User the tasks of the removed users are reassigned to, passed as `reassign_to`
+    """
+    to_user_id = request.data.get("reassign_to")
+    if not to_user_id:
+        return None, None
+    role_members = {
+        ANNOTATOR: ANNOTATORS,
+        REVIEWER: REVIEWERS,
+        SUPERCHECKER: SUPERCHECKERS,
+    }[role]
+    try:
+        to_user_id = int(to_user_id)
+    except (TypeError, ValueError):
+        to_user_id = None
     if (
-        proj_type == "AudioTranscriptionEditing"
-        or proj_type == "AcousticNormalisedTranscriptionEditing" or 
-        proj_type == "VerbatimTranscriptionCharacterTagging"
+        to_user_id not in member_ids(project.id, role_members)
+        or str(to_user_id) in map(str, removed_user_ids)
+        or is_frozen(project.id, to_user_id)
     ):
-        data_item = SpeechConversation.objects.get(pk=pk)
-        prediction_json = (
-            json.loads(data_item.prediction_json)
-            if isinstance(data_item.prediction_json, str)
-            else data_item.prediction_json
+        return None, Response(
+            {"message": f"Tasks can only be reassigned to an active {role}"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
-        speakers_json = data_item.speakers_json
-        audio_duration = data_item.audio_duration
-        # converting prediction_json to result (wherever it exists) for every task.
-        if prediction_json == None:
-            return result
-        for idx, val in enumerate(prediction_json):
-            label_dict = {
-                "origin": "manual",
-                "to_name": "audio_url",
-                "from_name": "labels",
-                "original_length": audio_duration,
-            }
-            text_dict = {
-                "origin": "manual",
-                "to_name": "audio_url",
-                "from_name": "transcribed_json",
-                "original_length": audio_duration,
-            }
-            if proj_type == "AcousticNormalisedTranscriptionEditing" or proj_type == "VerbatimTranscriptionCharacterTagging":
-                text_dict["from_name"] = "verbatim_transcribed_json"
-            id = f"shoonya_{idx}s{generate_random_string(13 - len(str(idx)))}"
-            label_dict["id"] = id
-            text_dict["id"] = id
-            label_dict["type"] = "labels"
-            text_dict["type"] = "textarea"
-
-            value_labels = {
-                "start": val["start"],
-                "end": val["end"],
-                "labels": [
-                    next(
-                        speaker
-                        for speaker in speakers_json
-                        if speaker["speaker_id"] == val["speaker_id"]
-                    )["name"]
-                ],
-            }
-            value_text = {
-                "start": val["start"],
-                "end": val["end"],
-                "text": [val["text"]],
-            }
+    return User.objects.get(pk=to_user_id), None
 
-            label_dict["value"] = value_labels
-            text_dict["value"] = value_text
-            # mainly label_dict and text_dict are sent as result
-            result.append(label_dict)
-            result.append(text_dict)
-    elif proj_type in [
-        "OCRTranscriptionEditing",
-        "OCRSegmentCategorizationEditing",
-        "OCRSegmentCategorisationRelationMappingEditing",
-    ]:
-        data_item = OCRDocument.objects.get(pk=pk)
-        ocr_prediction_json = (
-            json.loads(data_item.ocr_prediction_json)
-            if isinstance(data_item.ocr_prediction_json, str)
-            else data_item.ocr_prediction_json
+
+def remove_project_members(project, users, role, freeze_user, to_user=None):
+    """
+    Release or reassign the tasks of the users removed from the role.
+    Removals touching many tasks are run as a celery job.
+    """
+    affected_tasks = sum(
+        get_owned_tasks(project.id, user, role).count() for user in users
+    )
+    if affected_tasks > settings.TASK_OWNERSHIP_ASYNC_THRESHOLD:
+        job = remove_project_users.delay(
+            project_id=project.id,
+            user_ids=[user.id for user in users],
+            role=role,
+            freeze_user=freeze_user,
+            to_user_id=to_user.id if to_user else None,
         )
-        if ocr_prediction_json == None:
-            return result
-        is_OCRSegmentCategorisationRelationMappingEditing = (
-            proj_type == "OCRSegmentCategorisationRelationMappingEditing"
+        return Response(
+            {
+                "message": "Users are being removed from the project, "
+                "their tasks will be updated shortly",
+                "task_id": job.id,
+                "tasks": affected_tasks,
+            },
+            status=status.HTTP_202_ACCEPTED,
         )
-        id_set = set()
-        for idx, val in enumerate(ocr_prediction_json):
-            image_rotation = (
-                ocr_prediction_json["image_rotation"]
-                if "image_rotation" in ocr_prediction_json
-                else 0
-            )
-            custom_id = f"shoonya_{idx}s{generate_random_string(13 - len(str(idx)))}"
-            if is_OCRSegmentCategorisationRelationMappingEditing:
-                id_set.add(custom_id)
-            # creating values
-            common_value = {
-                "x": val["x"],
-                "y": val["y"],
-                "width": val["width"],
-                "height": val["height"],
-                "rotation": val["rotation"],
-            }
-            # assigning common values to all
-            value_rectangle = common_value.copy()
-            value_labels = common_value.copy()
-            value_text = common_value.copy()
-            value_labels["labels"] = val["labels"]
-            value_text["text"] = [val["text"]]
-
-            rectangle_dict = {
-                "id": custom_id,
-                "origin": "manual",
-                "to_name": "image_url",
-                "from_name": "annotation_bboxes",
-                "type": "rectangle",
-                "image_rotation": image_rotation,
-                "original_width": val["original_width"],
-                "original_height": val["original_height"],
-                "value": value_rectangle,
-            }
-            label_dict = {
-                "id": custom_id,
-                "origin": "manual",
-                "to_name": "image_url",
-                "from_name": "annotation_labels",
-                "type": "labels",
-                "image_rotation": image_rotation,
-                "original_width": val["original_width"],
-                "original_height": val["original_height"],
-                "value": value_labels,
-            }
-            text_dict = {
-                "id": custom_id,
-                "origin": "manual",
-                "to_name": "image_url",
-                "from_name": "ocr_transcribed_json",
-                "type": "textarea",
-                "image_rotation": image_rotation,
-                "original_width": val["original_width"],
-                "original_height": val["original_height"],
-                "value": value_text,
-            }
+    counts = remove_users_from_project(project, users, role, freeze_user, to_user)
+    return Response({"message": "User removed from the project", **counts})
+
 
-            result.append(rectangle_dict)
-            result.append(label_dict)
-            result.append(text_dict)
-        bboxes_relation_prediction_json = (
-            json.loads(data_item.bboxes_relation_prediction_json)
-            if isinstance(data_item.bboxes_relation_prediction_json, str)
-            else data_item.bboxes_relation_prediction_json
+def get_annotation_pull_count(request, project, user):
+    """
+    Number of tasks the annotator can pull from the project in this request
+    """
+    if not project.is_published:
+        return 0, Response(
+            {"message": "This project is not yet published"},
+            status=status.HTTP_403_FORBIDDEN,
         )
-        bboxes_relation_prediction_json = (
-            []
-            if bboxes_relation_prediction_json is None
-            else bboxes_relation_prediction_json
+    # verify if user belongs in project annotators
+    if not is_annotator(project.id, user):
+        return 0, Response(
+            {"message": "You are not assigned to this project"},
+            status=status.HTTP_403_FORBIDDEN,
         )
-        for b in bboxes_relation_prediction_json:
-            if "from_id" in b and "to_id" in b:
-                if b["from_id"] in id_set and b["to_id"] in id_set:
-                    result.append(b)
-    return result
+    # check if user has pending tasks
+    pending_tasks = get_pending_annotation_task_count(project.id, user)
+    if pending_tasks >= project.max_pending_tasks_per_user:
+        return 0, Response(
+            {"message": "Your pending task count is too high"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    tasks_to_be_assigned = project.max_pending_tasks_per_user - pending_tasks
+
+    if "num_tasks" in dict(request.data):
+        task_pull_count = request.data["num_tasks"]
+    else:
+        task_pull_count = project.tasks_pull_count_per_batch
+    return min(tasks_to_be_assigned, int(task_pull_count)), None
+
+
+def stream_assigned_tasks(project, user, task_ids):
+    """
+    Yield a JSON array of the assigned tasks, each with its data, the display
+    fields and the base annotation of the user
+    """
+    display_fields = ProjectRegistry.get_instance().get_display_fields(
+        project.project_type
+    )
+    annotations = {
+        annotation["task_id"]: annotation
+        for annotation in Annotation_model.objects.filter(
+            task_id__in=task_ids,
+            completed_by=user,
+            annotation_type=ANNOTATOR_ANNOTATION,
+        ).values("id", "task_id", "result", "annotation_status")
+    }
+    tasks = (
+        Task.objects.filter(id__in=task_ids)
+        .order_by("id")
+        .values("id", "data", "input_data_id", "task_status", "metadata_json")
+    )
+    yield "["
+    for idx, task in enumerate(tasks.iterator()):
+        data = task["data"] or {}
+        annotation = annotations.get(task["id"])
+        task_payload = {
+            "id": task["id"],
+            "project_id": project.id,
+            "input_data": task["input_data_id"],
+            "task_status": task["task_status"],
+            "metadata_json": task["metadata_json"],
+            "data": data,
+            "display_fields": {
+                field: data[field] for field in display_fields if field in data
+            },
+            "annotation": (
+                {
+                    "id": annotation["id"],
+                    "result": annotation["result"],
+                    "annotation_status": annotation["annotation_status"],
+                }
+                if annotation
+                else None
+            ),
+        }
+        yield ("," if idx else "") + json.dumps(task_payload, default=str)
+    yield "]"
 
 
 def convert_annotation_result_to_formatted_json(
@@ -1501,44 +1508,21 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     {"message": "Project does not exist"},
                     status=status.HTTP_404_NOT_FOUND,
                 )
-            for user_id in ids:
-                user = User.objects.get(pk=user_id)
-                if user in project.frozen_users.all():
-                    return Response(
-                        {"message": "User is already frozen"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                tasks = Task.objects.filter(
-                    Q(project_id=project.id) & Q(annotation_users__in=[user])
-                ).filter(Q(task_status="incomplete"))
-                annotator_annotation = Annotation_model.objects.filter(
-                    Q(completed_by=user)
-                    & Q(task__in=tasks)
-                    & Q(annotation_type=ANNOTATOR_ANNOTATION)
-                )
-                reviewer_annotation = Annotation_model.objects.filter(
-                    parent_annotation__in=annotator_annotation
-                )
-                superchecker_annotation = Annotation_model.objects.filter(
-                    parent_annotation__in=reviewer_annotation
+            users = list(User.objects.filter(pk__in=ids))
+            if len(users) != len(set(ids)):
+                raise User.DoesNotExist
+            # check if the user is already frozen
+            if any(is_frozen(project.id, user) for user in users):
+                return Response(
+                    {"message": "User is already frozen"},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-                superchecker_annotation.delete()
-                reviewer_annotation.delete()
-                annotator_annotation.delete()
-                for task in tasks:
-                    task.super_check_user = None
-                    task.review_user = None
-                    task.annotation_users.remove(user)
-                    task.revision_loop_count = {
-                        "super_check_count": 0,
-                        "review_count": 0,
-                    }
-                    task.save()
-                tasks.update(task_status="incomplete")  # unassign user from tasks
-                # project.annotators.remove(user)
-                if freeze_user == True:
-                    project.frozen_users.add(user)
-                project.save()
+            to_user, response = get_reassign_user(request, project, ANNOTATOR, ids)
+            if response != None:
+                return response
+            response = remove_project_members(
+                project, users, ANNOTATOR, freeze_user, to_user
+            )
 
             # Creating Notification
             title = f"{project.title}:{project.id} Some annotators have been removed from this project"
@@ -1554,10 +1538,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
             notification_ids_set = list(set(notification_ids))
             createNotification(title, notification_type, notification_ids_set, pk)
 
-            return Response(
-                {"message": "User removed from project"},
-                status=status.HTTP_201_CREATED,
-            )
+            if response.status_code == status.HTTP_200_OK:
+                response.status_code = status.HTTP_201_CREATED
+            return response
 
         except User.DoesNotExist:
             return Response(
@@ -1696,49 +1679,21 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-            for user_id in ids:
-                user = User.objects.get(pk=user_id)
-                # check if the user is already frozen
-                if user in project.frozen_users.all():
-                    return Response(
-                        {"message": "User is already frozen"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                tasks = (
-                    Task.objects.filter(project_id=project.id)
-                    .filter(review_user=user)
-                    .filter(task_status__in=[ANNOTATED])
-                )
-                reviewer_annotation = Annotation_model.objects.filter(
-                    Q(completed_by=user)
-                    & Q(task__in=tasks)
-                    & Q(annotation_type=REVIEWER_ANNOTATION)
-                )
-                superchecker_annotation = Annotation_model.objects.filter(
-                    parent_annotation__in=reviewer_annotation
+            users = list(User.objects.filter(pk__in=ids))
+            if len(users) != len(set(ids)):
+                raise User.DoesNotExist
+            # check if the user is already frozen
+            if any(is_frozen(project.id, user) for user in users):
+                return Response(
+                    {"message": "User is already frozen"},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-                superchecker_annotation.delete()
-                for an in reviewer_annotation:
-                    if an.annotation_status == TO_BE_REVISED:
-                        parent = an.parent_annotation
-                        parent.annotation_status = LABELED
-                        parent.save(update_fields=["annotation_status"])
-                    an.parent_annotation = None
-                    an.save()
-                    an.delete()
-
-                for task in tasks:
-                    task.super_check_user = None
-                    task.review_user = None
-                    task.revision_loop_count = {
-                        "super_check_count": 0,
-                        "review_count": 0,
-                    }
-                    task.task_status = ANNOTATED
-                    task.save()
-                if freeze_user == True:
-                    project.frozen_users.add(user)
-                project.save()
+            to_user, response = get_reassign_user(request, project, REVIEWER, ids)
+            if response != None:
+                return response
+            response = remove_project_members(
+                project, users, REVIEWER, freeze_user, to_user
+            )
 
             # Creating Notification
             title = f"{project.title}:{project.id} Some reviewers have been removed from this project"
@@ -1756,9 +1711,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 title, notification_type, notification_ids_set, project.id
             )
 
-            return Response(
-                {"message": "User removed from the project"}, status=status.HTTP_200_OK
-            )
+            return response
         except User.DoesNotExist:
             return Response(
                 {"message": "User does not exist"}, status=status.HTTP_404_NOT_FOUND
@@ -1782,46 +1735,21 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-            for user_id in ids:
-                user = User.objects.get(pk=user_id)
-                # check if the user is already frozen
-                if user in project.frozen_users.all():
-                    return Response(
-                        {"message": "User is already frozen"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                tasks = (
-                    Task.objects.filter(project_id=project.id)
-                    .filter(super_check_user=user)
-                    .filter(task_status__in=[REVIEWED])
-                )
-                superchecker_annotation = Annotation_model.objects.filter(
-                    Q(completed_by=user)
-                    & Q(task__in=tasks)
-                    & Q(annotation_type=SUPER_CHECKER_ANNOTATION)
+            users = list(User.objects.filter(pk__in=ids))
+            if len(users) != len(set(ids)):
+                raise User.DoesNotExist
+            # check if the user is already frozen
+            if any(is_frozen(project.id, user) for user in users):
+                return Response(
+                    {"message": "User is already frozen"},
+                    status=status.HTTP_400_BAD_REQUEST,
                 )
-                for an in superchecker_annotation:
-                    if an.annotation_status == REJECTED:
-                        parent = an.parent_annotation
-                        grand_parent = parent.parent_annotation
-                        parent.annotation_status = ACCEPTED
-                        grand_parent.annotation_status = LABELED
-                        parent.save(update_fields=["annotation_status"])
-                        grand_parent.save(update_fields=["annotation_status"])
-                    an.parent_annotation = None
-                    an.save()
-                    an.delete()
-
-                for task in tasks:
-                    task.super_check_user = None
-                    rev_loop_count = task.revision_loop_count
-                    rev_loop_count["super_check_count"] = 0
-                    task.revision_loop_count = rev_loop_count
-                    task.task_status = REVIEWED
-                    task.save()
-                if freeze_user == True:
-                    project.frozen_users.add(user)
-                project.save()
+            to_user, response = get_reassign_user(request, project, SUPERCHECKER, ids)
+            if response != None:
+                return response
+            response = remove_project_members(
+                project, users, SUPERCHECKER, freeze_user, to_user
+            )
             # Creating Notification
             title = f"{project.title}:{project.id} Some supercheckers have been removed from this project"
             notification_type = "remove_member"
@@ -1836,9 +1764,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             notification_ids_set = list(set(notification_ids))
             createNotification(title, notification_type, notification_ids_set, pk)
 
-            return Response(
-                {"message": "User removed from the project"}, status=status.HTTP_200_OK
-            )
+            return response
         except User.DoesNotExist:
             return Response(
                 {"message": "User does not exist"}, status=status.HTTP_404_NOT_FOUND
@@ -1860,10 +1786,10 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     {"message": "Project does not exist"},
                     status=status.HTTP_404_NOT_FOUND,
                 )
-            for user_id in ids:
-                user = User.objects.get(pk=user_id)
-                project.frozen_users.remove(user)
-                project.save()
+            users = list(User.objects.filter(pk__in=ids))
+            if len(users) != len(set(ids)):
+                raise User.DoesNotExist
+            project.frozen_users.remove(*users)
             return Response(
                 {"message": "Frozen User removed from the project"},
                 status=status.HTTP_200_OK,
@@ -1930,185 +1856,67 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 }
                 return Response(resp_dict, status=status.HTTP_403_FORBIDDEN)
 
-        if annotation_status != None:
-            if (
-                request.user in project.annotation_reviewers.all()
-                or request.user in project.annotators.all()
-                or request.user in project.review_supercheckers.all()
-            ):
-                if mode == "review":
-                    annotations = Annotation_model.objects.filter(
-                        task__project_id=pk,
-                        annotation_status=annotation_status,
-                        annotation_type=REVIEWER_ANNOTATION,
-                        completed_by=request.user.id,
-                    )
-                elif mode == "annotation":
-                    annotations = Annotation_model.objects.filter(
-                        task__project_id=pk,
-                        annotation_status=annotation_status,
-                        annotation_type=ANNOTATOR_ANNOTATION,
-                        completed_by=request.user.id,
-                    )
-                else:
-                    annotations = Annotation_model.objects.filter(
-                        task__project_id=pk,
-                        annotation_status=annotation_status,
-                        annotation_type=SUPER_CHECKER_ANNOTATION,
-                        completed_by=request.user.id,
-                    )
-            else:
-                if mode == "review":
-                    annotations = Annotation_model.objects.filter(
-                        task__project_id=pk,
-                        annotation_status=annotation_status,
-                        annotation_type=REVIEWER_ANNOTATION,
-                    )
-                elif mode == "annotation":
-                    annotations = Annotation_model.objects.filter(
-                        task__project_id=pk,
-                        annotation_status=annotation_status,
-                        annotation_type=ANNOTATOR_ANNOTATION,
-                    )
-                else:
-                    annotations = Annotation_model.objects.filter(
-                        task__project_id=pk,
-                        annotation_status=annotation_status,
-                        annotation_type=SUPER_CHECKER_ANNOTATION,
-                    )
-
-            tasks = Task.objects.filter(annotations__in=annotations)
-            tasks = tasks.distinct()
-            if len(tasks):
-                tasks = tasks.filter(
-                    **process_search_query(
-                        request.GET, "data", list(tasks.first().data.keys())
-                    )
-                )
-            ann_filter1 = annotations.filter(task__in=tasks)
-            task_ids = [an.task_id for an in ann_filter1]
-
-            queryset = Task.objects.filter(id__in=task_ids).order_by("id")
-
-            if current_task_id != None:
-                queryset = queryset.filter(id__gt=current_task_id)
-            for task in queryset:
-                task_dict = TaskSerializer(task, many=False).data
-                return Response(task_dict)
-            ret_dict = {"message": "No more tasks available!"}
-            ret_status = status.HTTP_204_NO_CONTENT
-            return Response(ret_dict, status=ret_status)
-        # Check if task_status is passed
-        if task_status != None:
-            if (
-                request.user in project.annotation_reviewers.all()
-                or request.user in project.annotators.all()
-                or request.user in project.review_supercheckers.all()
-            ):
-                if mode == "review":
-                    tasks = Task.objects.filter(
-                        project_id__exact=project.id,
-                        review_user=request.user.id,
-                        task_status=task_status,
-                    )
-                elif mode == "annotation":
-                    tasks = Task.objects.filter(
-                        project_id__exact=project.id,
-                        annotation_users=request.user.id,
-                        task_status=task_status,
-                    )
-                else:
-                    tasks = Task.objects.filter(
-                        project_id__exact=project.id,
-                        super_check_user=request.user.id,
-                        task_status=task_status,
-                    )
-            else:
-                tasks = Task.objects.filter(
-                    project_id__exact=project.id,
-                    task_status=task_status,
-                )
-
-            if len(tasks):
-                tasks = tasks.filter(
-                    **process_search_query(
-                        request.GET, "data", list(tasks.first().data.keys())
-                    )
-                )
-
-            queryset = tasks.order_by("id")
-
-            if current_task_id != None:
-                queryset = queryset.filter(id__gt=current_task_id)
-            for task in queryset:
-                task_dict = TaskSerializer(task, many=False).data
-                return Response(task_dict)
-            ret_dict = {"message": "No more tasks available!"}
-            ret_status = status.HTTP_204_NO_CONTENT
-            return Response(ret_dict, status=ret_status)
+        is_project_member = is_member(project.id, request.user)
+        if mode == "review":
+            annotation_type, user_field = REVIEWER_ANNOTATION, "review_user"
+            default_task_status = ANNOTATED
+        elif mode == "annotation":
+            annotation_type, user_field = ANNOTATOR_ANNOTATION, "annotation_users"
+            default_task_status = INCOMPLETE
+        else:
+            annotation_type, user_field = SUPER_CHECKER_ANNOTATION, "super_check_user"
+            default_task_status = REVIEWED
 
+        tasks = Task.objects.filter(project_id=project.id)
+        if annotation_status != None:
+            annotation_filter = {
+                "annotations__annotation_status": annotation_status,
+                "annotations__annotation_type": annotation_type,
+            }
+            if is_project_member:
+                annotation_filter["annotations__completed_by"] = request.user.id
+            tasks = tasks.filter(**annotation_filter)
+            empty_message = "No more tasks available!"
+        elif task_status != None:
+            tasks = tasks.filter(task_status=task_status)
+            if is_project_member:
+                tasks = tasks.filter(**{user_field: request.user.id})
+            empty_message = "No more tasks available!"
         else:
             # Check if there are unattended tasks
-            if (
-                request.user in project.annotation_reviewers.all()
-                or request.user in project.annotators.all()
-                or request.user in project.review_supercheckers.all()
-            ) and not request.user.is_superuser:
-                # Filter Tasks based on whether the request is in review mode or not
-                if mode == "review":
-                    tasks = Task.objects.filter(
-                        project_id__exact=project.id,
-                        review_user=request.user.id,
-                        task_status=ANNOTATED,
-                    )
-                elif mode == "annotation":
-                    tasks = Task.objects.filter(
-                        project_id__exact=project.id,
-                        annotation_users=request.user.id,
-                        task_status=INCOMPLETE,
-                    )
-                else:
-                    tasks = Task.objects.filter(
-                        project_id__exact=project.id,
-                        super_check_user=request.user.id,
-                        task_status=REVIEWED,
-                    )
-            else:
-                # TODO : Refactor code to reduce DB calls
-                # Filter Tasks based on whether the request is in review mode or not
-                if mode == "review":
-                    tasks = Task.objects.filter(
-                        project_id__exact=project.id,
-                        task_status=ANNOTATED,
-                    )
-                elif mode == "annotation":
-                    tasks = Task.objects.filter(
-                        project_id__exact=project.id,
-                        task_status=INCOMPLETE,
-                    )
-                else:
-                    tasks = Task.objects.filter(
-                        project_id__exact=project.id,
-                        task_status=REVIEWED,
-                    )
+            tasks = tasks.filter(task_status=default_task_status)
+            if is_project_member and not request.user.is_superuser:
+                tasks = tasks.filter(**{user_field: request.user.id})
+            empty_message = "No more unlabeled tasks!"
 
-            if len(tasks):
-                tasks = tasks.filter(
-                    **process_search_query(
-                        request.GET, "data", list(tasks.first().data.keys())
-                    )
+        if extract_search_params(request.GET):
+            tasks = tasks.filter(
+                **process_search_query(
+                    request.GET, "data", get_project_task_data_keys(project.id)
                 )
-
-            unattended_tasks = tasks.order_by("id")
-
-            if current_task_id != None:
-                unattended_tasks = unattended_tasks.filter(id__gt=current_task_id)
-            for task in unattended_tasks:
-                task_dict = TaskSerializer(task, many=False).data
-                return Response(task_dict)
-            ret_dict = {"message": "No more unlabeled tasks!"}
-            ret_status = status.HTTP_204_NO_CONTENT
-            return Response(ret_dict, status=ret_status)
+            )
+        # keyset pagination over the task ids
+        if current_task_id != None:
+            tasks = tasks.filter(id__gt=current_task_id)
+        task = (
+            tasks.order_by("id")
+            .prefetch_related("annotation_users", "annotations")
+            .first()
+        )
+        if task is None:
+            return Response(
+                {"message": empty_message}, status=status.HTTP_204_NO_CONTENT
+            )
+        # only the annotations of the mode, members only get their own
+        annotations = [
+            annotation
+            for annotation in task.annotations.all()
+            if annotation.annotation_type == annotation_type
+            and (not is_project_member or annotation.completed_by_id == request.user.id)
+        ]
+        task_dict = TaskSerializer(task, many=False).data
+        task_dict["annotations"] = AnnotationSerializer(annotations, many=True).data
+        return Response(task_dict)
 
     @is_organization_owner_or_workspace_manager
     def create(self, request, *args, **kwargs):
@@ -2307,152 +2115,76 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """
         cur_user = request.user
         project = Project.objects.get(pk=pk)
-        if not project.is_published:
-            return Response(
-                {"message": "This project is not yet published"},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-        serializer = ProjectUsersSerializer(project, many=False)
-        annotators = serializer.data["annotators"]
-        annotator_ids = set()
-        for annotator in annotators:
-            annotator_ids.add(annotator["id"])
-        # verify if user belongs in project annotators
-        if not cur_user.id in annotator_ids:
-            return Response(
-                {"message": "You are not assigned to this project"},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-        # check if user has pending tasks
-        # the below logic will work only for required_annotators_per_task=1
-        # TO-DO Modify and use the commented logic to cover all cases
-        proj_annotations = Annotation_model.objects.filter(task__project_id=pk).filter(
-            annotation_status__exact=UNLABELED, completed_by=cur_user
+        tasks_to_be_assigned, response = get_annotation_pull_count(
+            request, project, cur_user
         )
-        annotation_tasks = [anno.task.id for anno in proj_annotations]
-        pending_tasks = (
-            Task.objects.filter(project_id=pk)
-            .filter(annotation_users=cur_user.id)
-            .filter(task_status__in=[INCOMPLETE, UNLABELED])
-            .filter(id__in=annotation_tasks)
-            .count()
+        if response is not None:
+            return response
+
+        # claim eligible tasks with row level locks, concurrent pulls skip each other's rows
+        assigned_task_ids = claim_annotation_tasks(
+            project, cur_user, tasks_to_be_assigned
         )
-        # assigned_tasks_queryset = Task.objects.filter(project_id=pk).filter(annotation_users=cur_user.id)
-        # assigned_tasks = assigned_tasks_queryset.count()
-        # completed_tasks = Annotation_model.objects.filter(task__in=assigned_tasks_queryset).filter(completed_by__exact=cur_user.id).count()
-        # pending_tasks = assigned_tasks - completed_tasks
-        if pending_tasks >= project.max_pending_tasks_per_user:
+        if not assigned_task_ids:
             return Response(
-                {"message": "Your pending task count is too high"},
-                status=status.HTTP_403_FORBIDDEN,
+                {"message": "No tasks left for assignment in this project"},
+                status=status.HTTP_404_NOT_FOUND,
             )
-        tasks_to_be_assigned = project.max_pending_tasks_per_user - pending_tasks
+        return Response(
+            {"message": "Tasks assigned successfully"}, status=status.HTTP_200_OK
+        )
 
-        if "num_tasks" in dict(request.data):
-            task_pull_count = request.data["num_tasks"]
-        else:
-            task_pull_count = project.tasks_pull_count_per_batch
-        tasks_to_be_assigned = min(tasks_to_be_assigned, task_pull_count)
+    @swagger_auto_schema(
+        method="post",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "num_tasks": openapi.Schema(
+                    type=openapi.TYPE_INTEGER,
+                    description="Number of tasks to assign, defaults to the batch size of the project",
+                ),
+            },
+        ),
+        responses={
+            200: "JSON array of the assigned tasks with their base annotations",
+            403: "Project not published, user not an annotator or too many pending tasks",
+            404: "No tasks left for assignment",
+        },
+    )
+    @action(
+        detail=True,
+        methods=["POST"],
+        name="Assign new tasks to user and fetch them",
+        url_name="assign_and_fetch_tasks",
+    )
+    @project_is_archived
+    def assign_and_fetch_tasks(self, request, pk, *args, **kwargs):
+        """
+        Pull a new batch of unassigned tasks for this project, assign them to the
+        user and stream back the tasks along with their base annotations, so the
+        whole batch can be worked through without fetching every task
+        """
+        cur_user = request.user
+        project = Project.objects.get(pk=pk)
+        tasks_to_be_assigned, response = get_annotation_pull_count(
+            request, project, cur_user
+        )
+        if response is not None:
+            return response
 
-        lock_set = False
-        while lock_set == False:
-            if project.is_locked(ANNOTATION_LOCK):
-                sleep(settings.PROJECT_LOCK_RETRY_INTERVAL)
-                continue
-            else:
-                try:
-                    project.set_lock(cur_user, ANNOTATION_LOCK)
-                    lock_set = True
-                except Exception as e:
-                    continue
-        # check if the project contains eligible tasks to pull
-        tasks = Task.objects.filter(project_id=pk)
-        tasks = tasks.order_by("id")
-        tasks = (
-            tasks.filter(task_status__in=[INCOMPLETE, UNLABELED])
-            .exclude(annotation_users=cur_user.id)
-            .annotate(annotator_count=Count("annotation_users"))
+        # the base annotation results are prepared once here, while claiming
+        assigned_task_ids = claim_annotation_tasks(
+            project, cur_user, tasks_to_be_assigned
         )
-        tasks = tasks.filter(
-            annotator_count__lt=project.required_annotators_per_task
-        ).distinct()
-        if not tasks:
-            project.release_lock(ANNOTATION_LOCK)
+        if not assigned_task_ids:
             return Response(
                 {"message": "No tasks left for assignment in this project"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        tasks = tasks[:tasks_to_be_assigned]
-        # tasks = tasks.order_by("id")
-        for task in tasks:
-            task.annotation_users.add(cur_user)
-            task.save()
-            result = []
-            if project.project_type in [
-                "AcousticNormalisedTranscriptionEditing",
-                "VerbatimTranscriptionCharacterTagging",
-                "AudioTranscriptionEditing",
-                "OCRTranscriptionEditing",
-                "OCRSegmentCategorizationEditing",
-                "StandardizedTranscriptionEditing",
-                "OCRSegmentCategorisationRelationMappingEditing",
-            ]:
-                if project.project_type == "StandardizedTranscriptionEditing":
-                    try:
-                        # gather trascribed_json
-                        result = parse_json_for_ste(task.input_data.id)
-                    except Exception as e:
-                        print(
-                            f"The final_transcribed_json json of the data item-{task.input_data.id} is corrupt."
-                        )
-                        task.delete()
-                        continue
-                else:
-                    try:
-                        result = convert_prediction_json_to_annotation_result(
-                            task.input_data.id, project.project_type
-                        )
-                    except Exception as e:
-                        print(
-                            f"The prediction json of the data item-{task.input_data.id} is corrupt."
-                        )
-                        task.delete()
-                        continue
-            annotator_anno_count = Annotation_model.objects.filter(
-                task_id=task, annotation_type=ANNOTATOR_ANNOTATION
-            ).count()
-
-            if annotator_anno_count < project.required_annotators_per_task:
-                cur_user_anno_count = Annotation_model.objects.filter(
-                    task_id=task,
-                    annotation_type=ANNOTATOR_ANNOTATION,
-                    completed_by=cur_user,
-                ).count()
-                if cur_user_anno_count == 0:
-                    base_annotation_obj = Annotation_model(
-                        result=result,
-                        task=task,
-                        completed_by=cur_user,
-                    )
-                    try:
-                        base_annotation_obj.save()
-                    except IntegrityError as e:
-                        print(
-                            f"Task and completed_by fields are same while assigning new task "
-                            f"for project id-{project.id}, user-{cur_user.email}"
-                        )
-            else:
-                cur_user_anno_count = Annotation_model.objects.filter(
-                    task_id=task,
-                    annotation_type=ANNOTATOR_ANNOTATION,
-                    completed_by=cur_user,
-                ).count()
-                if cur_user_anno_count == 0:
-                    task.annotation_users.remove(cur_user)
-                    task.save()
-        project.release_lock(ANNOTATION_LOCK)
-        return Response(
-            {"message": "Tasks assigned successfully"}, status=status.HTTP_200_OK
+        return StreamingHttpResponse(
+            stream_assigned_tasks(project, cur_user, assigned_task_ids),
+            status=status.HTTP_200_OK,
+            content_type="application/json",
         )
 
     @action(
@@ -2492,65 +2224,10 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if response != None:
             return response
         if ann != None:
-            review_annotations_ids = []
-            reviewer_pulled_tasks = []
-            for ann1 in ann:
-                try:
-                    review_annotation_obj = Annotation_model.objects.get(
-                        parent_annotation=ann1
-                    )
-                    review_annotations_ids.append(review_annotation_obj.id)
-                    reviewer_pulled_tasks.append(review_annotation_obj.task_id)
-                except:
-                    pass
-            if task_ids == None:
-                task_ids = [an.task_id for an in ann]
-            print(task_ids)
-            review_annotations = Annotation_model.objects.filter(
-                id__in=review_annotations_ids
-            )
-
-            super_check_annotations_ids = []
-            supercheck_pulled_tasks = []
-            for ann2 in review_annotations:
-                try:
-                    super_check_annotation_obj = Annotation_model.objects.get(
-                        parent_annotation=ann2
-                    )
-                    super_check_annotations_ids.append(super_check_annotation_obj.id)
-                    supercheck_pulled_tasks.append(super_check_annotation_obj.task_id)
-                except:
-                    pass
-
-            super_check_annotations = Annotation_model.objects.filter(
-                id__in=super_check_annotations_ids
-            )
-            super_check_annotations.delete()
-            super_check_tasks = Task.objects.filter(id__in=supercheck_pulled_tasks)
-            if super_check_tasks.count() > 0:
-                super_check_tasks.update(super_check_user=None)
-
-            review_annotations.delete()
-            reviewed_tasks = Task.objects.filter(id__in=reviewer_pulled_tasks)
-            if reviewed_tasks.count() > 0:
-                reviewed_tasks.update(review_user=None)
-
-            ann.delete()
-
-            tasks = Task.objects.filter(id__in=task_ids)
-            if tasks.count() > 0:
-                for task in tasks:
-                    task.revision_loop_count = {
-                        "super_check_count": 0,
-                        "review_count": 0,
-                    }
-                    # task.unassign(user)
-                    task.annotation_users.clear()
-                    task.task_status = INCOMPLETE
-                    task.save()
-
+            counts = unassign_annotations(ann, task_ids)
+            if counts["tasks_released"] > 0:
                 return Response(
-                    {"message": "Tasks unassigned"}, status=status.HTTP_200_OK
+                    {"message": "Tasks unassigned", **counts}, status=status.HTTP_200_OK
                 )
             return Response(
                 {"message": "No tasks to unassign"}, status=status.HTTP_200_OK
@@ -2631,91 +2308,74 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 {"message": "Task reviews are disabled for this project"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        serializer = ProjectUsersSerializer(project, many=False)
-        annotation_reviewers = serializer.data["annotation_reviewers"]
-        reviewer_ids = set()
-        for annotation_reviewer in annotation_reviewers:
-            reviewer_ids.add(annotation_reviewer["id"])
         # verify if user belongs in annotation_reviewers for this project
-        if not cur_user.id in reviewer_ids:
+        if not is_reviewer(project.id, cur_user):
             return Response(
                 {"message": "You are not assigned to review this project"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        lock_set = False
-        while lock_set == False:
-            if project.is_locked(REVIEW_LOCK):
-                sleep(settings.PROJECT_LOCK_RETRY_INTERVAL)
-                continue
-            else:
-                try:
-                    project.set_lock(cur_user, REVIEW_LOCK)
-                    lock_set = True
-                except Exception as e:
-                    continue
-        # check if the project contains eligible tasks to pull
-        tasks = (
-            Task.objects.filter(project_id=pk)
-            .filter(task_status=ANNOTATED)
-            .filter(review_user__isnull=True)
-            .exclude(annotation_users=cur_user.id)
-            .distinct()
-        )
-        if not tasks:
-            project.release_lock(REVIEW_LOCK)
-            return Response(
-                {"message": "No tasks available for review in this project"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-        task_pull_count = project.tasks_pull_count_per_batch
-        if "num_tasks" in dict(request.data):
-            task_pull_count = request.data["num_tasks"]
-        # Sort by most recently updated annotation; temporary change
-        task_ids = (
-            Annotation_model.objects.filter(task__in=tasks)
-            .filter(annotation_type=ANNOTATOR_ANNOTATION)
-            .distinct()
-            .order_by("-updated_at")
-            .values_list("task", flat=True)
-        )
-        # tasks = tasks.order_by("id")
-        task_ids = list(task_ids)
-        task_ids = task_ids[:task_pull_count]
-        for task_id in task_ids:
-            task = Task.objects.get(pk=task_id)
-            task.review_user = cur_user
-            task.save()
-            rec_ann = (
-                Annotation_model.objects.filter(task_id=task_id)
-                .filter(annotation_type=ANNOTATOR_ANNOTATION)
-                .order_by("-updated_at")
-            )
-            reviewer_anno = Annotation_model.objects.filter(
-                task_id=task_id, annotation_type=REVIEWER_ANNOTATION
-            )
-            reviewer_anno_count = Annotation_model.objects.filter(
-                task_id=task_id, annotation_type=REVIEWER_ANNOTATION
-            ).count()
-            if reviewer_anno_count == 0:
-                base_annotation_obj = Annotation_model(
-                    result=[],
-                    task=task,
-                    completed_by=cur_user,
-                    annotation_status="unreviewed",
-                    parent_annotation=rec_ann[0],
-                    annotation_type=REVIEWER_ANNOTATION,
+        try:
+            with transaction.atomic(), project_lock(project.id, REVIEW_LOCK):
+                # check if the project contains eligible tasks to pull
+                ready_tasks = get_ready_queue(pk, REVIEW_STAGE).exclude(
+                    task__annotation_users=cur_user.id
                 )
-                try:
-                    base_annotation_obj.save()
-                except IntegrityError as e:
-                    print(
-                        f"Task and completed_by fields are same while assigning new review task "
-                        f"for project id-{project.id}, user-{cur_user.email}"
+                if not ready_tasks.exists():
+                    return Response(
+                        {"message": "No tasks available for review in this project"},
+                        status=status.HTTP_404_NOT_FOUND,
                     )
-            else:
-                task.review_user = reviewer_anno[0].completed_by
-                task.save()
-        project.release_lock(REVIEW_LOCK)
+                task_pull_count = project.tasks_pull_count_per_batch
+                if "num_tasks" in dict(request.data):
+                    task_pull_count = request.data["num_tasks"]
+                # Sort by most recently annotated tasks
+                task_ids = list(
+                    ready_tasks.order_by("-enqueued_at").values_list(
+                        "task_id", flat=True
+                    )[: int(task_pull_count)]
+                )
+                for task_id in task_ids:
+                    task = Task.objects.get(pk=task_id)
+                    task.review_user = cur_user
+                    task.save()
+                    rec_ann = (
+                        Annotation_model.objects.filter(task_id=task_id)
+                        .filter(annotation_type=ANNOTATOR_ANNOTATION)
+                        .order_by("-updated_at")
+                    )
+                    reviewer_anno = Annotation_model.objects.filter(
+                        task_id=task_id, annotation_type=REVIEWER_ANNOTATION
+                    )
+                    reviewer_anno_count = Annotation_model.objects.filter(
+                        task_id=task_id, annotation_type=REVIEWER_ANNOTATION
+                    ).count()
+                    if reviewer_anno_count == 0:
+                        base_annotation_obj = Annotation_model(
+                            result=[],
+                            task=task,
+                            completed_by=cur_user,
+                            annotation_status="unreviewed",
+                            parent_annotation=rec_ann[0],
+                            annotation_type=REVIEWER_ANNOTATION,
+                        )
+                        try:
+                            with transaction.atomic():
+                                base_annotation_obj.save()
+                        except IntegrityError as e:
+                            print(
+                                f"Task and completed_by fields are same while assigning new review task "
+                                f"for project id-{project.id}, user-{cur_user.email}"
+                            )
+                    else:
+                        task.review_user = reviewer_anno[0].completed_by
+                        task.save()
+        except ProjectLockTimeout:
+            return Response(
+                {
+                    "message": "Too many task requests for this project, please try again"
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         return Response(
             {"message": "Tasks assigned successfully"}, status=status.HTTP_200_OK
         )
@@ -2782,6 +2442,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             supercheck_annotations.delete()
             if len(supercheck_tasks) > 0:
                 supercheck_tasks.update(super_check_user=None)
+                refresh_ready_queue(supercheck_pulled_tasks)
 
             for an in ann:
                 if an.annotation_status == TO_BE_REVISED:
@@ -2797,6 +2458,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 tasks.update(review_user=None)
                 tasks.update(revision_loop_count=default_revision_loop_count_value())
                 tasks.update(task_status=ANNOTATED)
+                refresh_ready_queue(task_ids)
                 return Response(
                     {"message": "Tasks unassigned"}, status=status.HTTP_200_OK
                 )
@@ -2832,117 +2494,103 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 {"message": "Task superchecks are disabled for this project"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        serializer = ProjectUsersSerializer(project, many=False)
-        review_supercheckers = serializer.data["review_supercheckers"]
-        superchecker_ids = set()
-        for review_superchecker in review_supercheckers:
-            superchecker_ids.add(review_superchecker["id"])
-        # verify if user belongs in annotation_reviewers for this project
-        if not cur_user.id in superchecker_ids:
+        # verify if user belongs in review_supercheckers for this project
+        if not is_superchecker(project.id, cur_user):
             return Response(
                 {"message": "You are not assigned to supercheck this project"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        lock_set = False
-        while lock_set == False:
-            if project.is_locked(SUPERCHECK_LOCK):
-                sleep(settings.PROJECT_LOCK_RETRY_INTERVAL)
-                continue
-            else:
-                try:
-                    project.set_lock(cur_user, SUPERCHECK_LOCK)
-                    lock_set = True
-                except Exception as e:
-                    continue
-        # check if the project contains eligible tasks to pull
-        tasks = (
-            Task.objects.filter(project_id=pk)
-            .filter(task_status=REVIEWED)
-            .filter(super_check_user__isnull=True)
-            .exclude(annotation_users=cur_user.id)
-            .exclude(review_user=cur_user.id)
-            .distinct()
-        )
-        if not tasks:
-            project.release_lock(SUPERCHECK_LOCK)
-            return Response(
-                {"message": "No tasks available for supercheck in this project"},
-                status=status.HTTP_404_NOT_FOUND,
-            )
-        task_pull_count = project.tasks_pull_count_per_batch
-        if "num_tasks" in dict(request.data):
-            task_pull_count = request.data["num_tasks"]
-
-        sup_exp_rev_tasks_count = (
-            Task.objects.filter(project_id=pk)
-            .filter(task_status__in=[REVIEWED, EXPORTED, SUPER_CHECKED])
-            .distinct()
-            .count()
-        )
-        sup_exp_tasks_count = (
-            Task.objects.filter(project_id=pk)
-            .filter(task_status__in=[SUPER_CHECKED, EXPORTED])
-            .distinct()
-            .count()
-        )
+        try:
+            with transaction.atomic(), project_lock(project.id, SUPERCHECK_LOCK):
+                # check if the project contains eligible tasks to pull
+                ready_tasks = (
+                    get_ready_queue(pk, SUPERCHECK_STAGE)
+                    .exclude(task__annotation_users=cur_user.id)
+                    .exclude(task__review_user=cur_user.id)
+                )
+                if not ready_tasks.exists():
+                    return Response(
+                        {
+                            "message": "No tasks available for supercheck in this project"
+                        },
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
+                task_pull_count = project.tasks_pull_count_per_batch
+                if "num_tasks" in dict(request.data):
+                    task_pull_count = request.data["num_tasks"]
+
+                sup_exp_rev_tasks_count = (
+                    Task.objects.filter(project_id=pk)
+                    .filter(task_status__in=[REVIEWED, EXPORTED, SUPER_CHECKED])
+                    .distinct()
+                    .count()
+                )
+                sup_exp_tasks_count = (
+                    Task.objects.filter(project_id=pk)
+                    .filter(task_status__in=[SUPER_CHECKED, EXPORTED])
+                    .distinct()
+                    .count()
+                )
 
-        max_super_check_tasks_count = math.ceil(
-            (project.k_value) * sup_exp_rev_tasks_count / 100
-        )
-        if sup_exp_tasks_count >= max_super_check_tasks_count:
-            return Response(
-                {"message": "Maximum supercheck tasks limit reached!"},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-        task_pull_count = min(
-            task_pull_count, max_super_check_tasks_count - sup_exp_tasks_count
-        )
-        # Sort by most recently updated annotation; temporary change
-        task_ids = (
-            Annotation_model.objects.filter(task__in=tasks)
-            .filter(annotation_type=REVIEWER_ANNOTATION)
-            .distinct()
-            .order_by("-updated_at")
-            .values_list("task", flat=True)
-        )
-        # tasks = tasks.order_by("id")
-        task_ids = list(task_ids)
-        task_ids = task_ids[:task_pull_count]
-        for task_id in task_ids:
-            task = Task.objects.get(pk=task_id)
-            task.super_check_user = cur_user
-            task.save()
-            rec_ann = (
-                Annotation_model.objects.filter(task_id=task_id)
-                .filter(annotation_type=REVIEWER_ANNOTATION)
-                .order_by("-updated_at")
-            )
-            superchecker_anno = Annotation_model.objects.filter(
-                task_id=task_id, annotation_type=SUPER_CHECKER_ANNOTATION
-            )
-            superchecker_anno_count = Annotation_model.objects.filter(
-                task_id=task_id, annotation_type=SUPER_CHECKER_ANNOTATION
-            ).count()
-            if superchecker_anno_count == 0:
-                base_annotation_obj = Annotation_model(
-                    result=[],
-                    task=task,
-                    completed_by=cur_user,
-                    annotation_status="unvalidated",
-                    parent_annotation=rec_ann[0],
-                    annotation_type=SUPER_CHECKER_ANNOTATION,
+                max_super_check_tasks_count = math.ceil(
+                    (project.k_value) * sup_exp_rev_tasks_count / 100
                 )
-                try:
-                    base_annotation_obj.save()
-                except IntegrityError as e:
-                    print(
-                        f"Task and completed_by fields are same while assigning super-check task for "
-                        f"project id-{project.id}, user-{cur_user.email}"
+                if sup_exp_tasks_count >= max_super_check_tasks_count:
+                    return Response(
+                        {"message": "Maximum supercheck tasks limit reached!"},
+                        status=status.HTTP_403_FORBIDDEN,
                     )
-            else:
-                task.super_check_user = superchecker_anno[0].completed_by
-                task.save()
-        project.release_lock(SUPERCHECK_LOCK)
+                task_pull_count = min(
+                    task_pull_count, max_super_check_tasks_count - sup_exp_tasks_count
+                )
+                # Sort by most recently reviewed tasks
+                task_ids = list(
+                    ready_tasks.order_by("-enqueued_at").values_list(
+                        "task_id", flat=True
+                    )[: int(task_pull_count)]
+                )
+                for task_id in task_ids:
+                    task = Task.objects.get(pk=task_id)
+                    task.super_check_user = cur_user
+                    task.save()
+                    rec_ann = (
+                        Annotation_model.objects.filter(task_id=task_id)
+                        .filter(annotation_type=REVIEWER_ANNOTATION)
+                        .order_by("-updated_at")
+                    )
+                    superchecker_anno = Annotation_model.objects.filter(
+                        task_id=task_id, annotation_type=SUPER_CHECKER_ANNOTATION
+                    )
+                    superchecker_anno_count = Annotation_model.objects.filter(
+                        task_id=task_id, annotation_type=SUPER_CHECKER_ANNOTATION
+                    ).count()
+                    if superchecker_anno_count == 0:
+                        base_annotation_obj = Annotation_model(
+                            result=[],
+                            task=task,
+                            completed_by=cur_user,
+                            annotation_status="unvalidated",
+                            parent_annotation=rec_ann[0],
+                            annotation_type=SUPER_CHECKER_ANNOTATION,
+                        )
+                        try:
+                            with transaction.atomic():
+                                base_annotation_obj.save()
+                        except IntegrityError as e:
+                            print(
+                                f"Task and completed_by fields are same while assigning super-check task for "
+                                f"project id-{project.id}, user-{cur_user.email}"
+                            )
+                    else:
+                        task.super_check_user = superchecker_anno[0].completed_by
+                        task.save()
+        except ProjectLockTimeout:
+            return Response(
+                {
+                    "message": "Too many task requests for this project, please try again"
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         return Response(
             {"message": "Tasks assigned successfully"}, status=status.HTTP_200_OK
         )
@@ -3117,8 +2765,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
         if reports_type == "review_reports":
             if proj_obj.project_stage > ANNOTATION_STAGE:
-                reviewer_names_list = proj_obj.annotation_reviewers.all()
-                reviewer_ids = [name.id for name in reviewer_names_list]
+                reviewer_ids = sorted(member_ids(proj_obj.id, REVIEWERS))
                 final_reports = []
                 if (
                     request.user.role == User.ORGANIZATION_OWNER
@@ -3141,8 +2788,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 return Response(result)
         elif reports_type == "superchecker_reports":
             if proj_obj.project_stage > REVIEW_STAGE:
-                superchecker_names_list = proj_obj.review_supercheckers.all()
-                superchecker_ids = [name.id for name in superchecker_names_list]
+                superchecker_ids = sorted(member_ids(proj_obj.id, SUPERCHECKERS))
                 final_reports = []
                 if (
                     request.user.role == User.ORGANIZATION_OWNER
@@ -3192,7 +2838,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             user_mails = [request.user.email]
         for index, each_annotator in enumerate(users_ids):
             user_name = user_names[index]
-            if (User.objects.get(id=each_annotator)) in (proj_obj.frozen_users.all()):
+            if is_frozen(proj_obj.id, each_annotator):
                 user_name = user_name + "*"
 
             usermail = user_mails[index]
@@ -3619,7 +3265,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
             for annotator in annotators:
                 # check if annotator is already added to project
-                if annotator in project.annotators.all():
+                if is_annotator(project.id, annotator):
                     return Response(
                         {"message": "Annotator already added to project"},
                         status=status.HTTP_400_BAD_REQUEST,
@@ -3684,7 +3330,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_403_FORBIDDEN,
                     )
                 # check if user is already added to project
-                if user in project.annotation_reviewers.all():
+                if is_reviewer(project.id, user):
                     return Response(
                         {"message": "User already added to project"},
                         status=status.HTTP_400_BAD_REQUEST,
@@ -3749,7 +3395,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_403_FORBIDDEN,
                     )
                 # check if user is already added to project
-                if user in project.review_supercheckers.all():
+                if is_superchecker(project.id, user):
                     return Response(
                         {"message": "User already added to project"},
                         status=status.HTTP_400_BAD_REQUEST,
@@ -3823,6 +3469,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     # change all reviewed task status from "reviewed" to "annotate"
                     reviewed_tasks.update(task_status=ANNOTATED)
                     tasks.update(review_user=None)
+                    rebuild_ready_queue(project.id)
                     for tas in ann_rew_exp_tasks:
                         anns = Annotation_model.objects.filter(
                             task_id=tas.id, annotation_type=ANNOTATOR_ANNOTATION
@@ -3891,6 +3538,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     )
                     super_checked_tasks.update(task_status=REVIEWED)
                     tasks.update(super_check_user=None)
+                    rebuild_ready_queue(project.id)
                     for tas in rev_exp_sup_tasks:
                         anns = Annotation_model.objects.filter(
                             task_id=tas.id, annotation_type=REVIEWER_ANNOTATION
@@ -4090,7 +3738,6 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """
         try:
             project = Project.objects.get(pk=pk)
-            project_type = dict(PROJECT_TYPE_CHOICES)[project.project_type]
 
             include_input_data_metadata_json = request.query_params.get(
                 "include_input_data_metadata_json", False
@@ -4111,76 +3758,36 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 task_status = task_status.split(",")
                 tasks = tasks.filter(task_status__in=task_status)
 
-            if len(tasks) == 0:
+            if not tasks.exists():
                 ret_dict = {"message": "No tasks in project!"}
                 ret_status = status.HTTP_200_OK
                 return Response(ret_dict, status=ret_status)
-            tasks_list = []
-            is_audio_project_type = (
-                True if project_type in get_audio_project_types() else False
-            )
-            dataset_model = ""
-            if include_input_data_metadata_json:
-                dataset_type = project.dataset_id.all()[0].dataset_type
-                dataset_model = getattr(dataset_models, dataset_type)
-            dataset_type = project.dataset_id.all()[0].dataset_type
-            is_ConversationTranslation = project_type == "ConversationTranslation"
-            is_ConversationTranslationEditing = (
-                project_type == "ConversationTranslationEditing"
-            )
-            is_ConversationVerification = project_type == "ConversationVerification"
-            is_AudioSegmentation = project_type == "AudioSegmentation"
-            is_OCRSegmentCategorizationEditing = (
-                project_type == "OCRSegmentCategorizationEditing"
-            )
-            is_OCRSegmentCategorization = project_type == "OCRSegmentCategorization"
-            is_OCRSegmentCategorisationRelationMappingEditing = (
-                project_type == "OCRSegmentCategorisationRelationMappingEditing"
+
+            if export_type in STREAMING_EXPORT_TYPES or is_columnar_export_type(
+                export_type
+            ):
+                filename = get_export_filename(project, export_type)
+                response = StreamingHttpResponse(
+                    stream_project_export(
+                        project, tasks, export_type, include_input_data_metadata_json
+                    ),
+                    content_type=get_export_content_type(export_type),
+                )
+                response["Content-Disposition"] = 'attachment; filename="%s"' % filename
+                response["filename"] = filename
+                return response
+
+            # the other formats are converted by the label studio converter
+            tasks_list = list(
+                iter_export_tasks(
+                    project, tasks, export_type, include_input_data_metadata_json
+                )
             )
-            for task in tasks:
-                try:
-                    curr_task = process_task(
-                        task,
-                        export_type,
-                        include_input_data_metadata_json,
-                        dataset_model,
-                        is_audio_project_type,
-                    )
-                    if (
-                        is_ConversationTranslation
-                        or is_ConversationTranslationEditing
-                        or is_ConversationVerification
-                    ):
-                        process_conversation_tasks(
-                            curr_task,
-                            is_ConversationTranslation,
-                            is_ConversationVerification,
-                        )
-                    elif dataset_type in ["SpeechConversation", "OCRDocument"]:
-                        is_SpeechConversation = dataset_type == "SpeechConversation"
-                        if is_SpeechConversation:
-                            process_speech_tasks(
-                                curr_task, is_AudioSegmentation, project_type
-                            )
-                        else:
-                            process_ocr_tasks(
-                                curr_task,
-                                is_OCRSegmentCategorization,
-                                is_OCRSegmentCategorizationEditing,
-                            )
-                except Exception as e:
-                    continue
-                tasks_list.append(curr_task)
             download_resources = True
             export_stream, content_type, filename = DataExport.generate_export_file(
                 project, tasks_list, export_type, download_resources, request.GET
             )
 
-            if export_type == "TSV":
-                content_type = "application/.tsv"
-                filename = filename.split(".")
-                filename[-1] = "tsv"
-                filename = ".".join(filename)
             response = HttpResponse(File(export_stream), content_type=content_type)
             response["Content-Disposition"] = 'attachment; filename="%s"' % filename
             response["filename"] = filename
@@ -4206,6 +3813,22 @@ class ProjectViewSet(viewsets.ModelViewSet):
             },
             description="Optional Post request body for projects which have save_type == new_record",
         ),
+        manual_parameters=[
+            openapi.Parameter(
+                "incremental",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+                description="Only export the tasks whose annotation changed since the last incremental export",
+            ),
+            openapi.Parameter(
+                "full",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                required=False,
+                description="With incremental, export every accepted task again and restart the incremental exports from them",
+            ),
+        ],
         responses={
             200: "No tasks to export! or SUCCESS!",
             404: "Project does not exist! or User does not exist!",
@@ -4221,6 +3844,8 @@ class ProjectViewSet(viewsets.ModelViewSet):
         try:
             project = Project.objects.get(pk=pk)
             project_type = dict(PROJECT_TYPE_CHOICES)[project.project_type]
+            incremental = request.query_params.get("incremental", False) == "true"
+            full = request.query_params.get("full", False) == "true"
 
             # Read registry to get output dataset model, and output fields
             registry_helper = ProjectRegistry.get_instance()
@@ -4245,7 +3870,13 @@ class ProjectViewSet(viewsets.ModelViewSet):
                         project_id__exact=project, task_status__in=[ANNOTATED]
                     )
 
-                if len(tasks) == 0:
+                if incremental:
+                    if full:
+                        reset_export_watermark(project)
+                    no_tasks = not has_changed_tasks(project)
+                else:
+                    no_tasks = len(tasks) == 0
+                if no_tasks:
                     ret_dict = {"message": "No tasks to export!"}
                     ret_status = status.HTTP_200_OK
                     return Response(ret_dict, status=ret_status)
@@ -4256,6 +3887,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     project_id=pk,
                     project_type=project_type,
                     get_request_data=dict(request.GET),
+                    incremental=incremental,
                 )
             # If save_type is 'new_record'
             elif output_dataset_info["save_type"] == "new_record":
@@ -4292,7 +3924,15 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     tasks = Task.objects.filter(
                         project_id__exact=project, task_status__in=[ANNOTATED]
                     )
-                if len(tasks) == 0:
+                if incremental and project.project_mode == Annotation:
+                    if full:
+                        reset_export_watermark(project, export_dataset_instance_id)
+                    no_tasks = not has_changed_tasks(
+                        project, export_dataset_instance_id
+                    )
+                else:
+                    no_tasks = len(tasks) == 0
+                if no_tasks:
                     ret_dict = {"message": "No tasks to export!"}
                     ret_status = status.HTTP_200_OK
                     return Response(ret_dict, status=ret_status)
@@ -4303,6 +3943,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
                     export_dataset_instance_id=export_dataset_instance_id,
                     task_annotation_fields=task_annotation_fields,
                     get_request_data=dict(request.GET),
+                    incremental=incremental,
                 )
 
                 # data_items.append(data_item)
@@ -4336,11 +3977,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             project = Project.objects.get(pk=pk)
             if project.is_published:
                 return Response(PROJECT_IS_PUBLISHED_ERROR, status=status.HTTP_200_OK)
-            serializer = ProjectUsersSerializer(project, many=False)
-            # ret_dict = serializer.data
-            annotators = serializer.data["annotators"]
-            reviewers = serializer.data["annotation_reviewers"]
-            super_checkers = serializer.data["review_supercheckers"]
+            annotators = member_ids(project.id, ANNOTATORS)
             if len(annotators) < project.required_annotators_per_task:
                 ret_dict = {
                     "message": "Number of annotators is less than required annotators per task"
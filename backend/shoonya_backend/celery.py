@@ -39,6 +39,14 @@ celery_app.conf.beat_schedule = {
         "task": "check_size",
         "schedule": crontab(minute=0, hour=0),  # every mid night
     },
+    "refresh-organization-task-summaries": {
+        "task": "refresh_organization_task_summaries",
+        "schedule": crontab(minute=30),  # every hour
+    },
+    "delete-expired-report-job-results": {
+        "task": "delete_expired_report_job_results",
+        "schedule": crontab(minute=15, hour=1),  # every day at 1:15 am
+    },
 }
 
 # Celery Task related settings
@@ -1,134 +1,188 @@
 import os
-import json
+import threading
+import uuid
 import redis
-import time
-import logging
 from dotenv import load_dotenv
 
 """
-The locks are stored in redis with the format
-userid: {
-    taskname1:validity,
-    taskname2:validity
-}
-userid is the key in redis, and the python dictionary is stored as a JSON string
+Every lock is stored in redis as its own key
+lock:<userid>:<taskname> -> token
+set with SET NX PX, so acquiring a lock is a single atomic command and
+redis expires the key once the lock times out.
+
+The token identifies the Lock instance holding the lock. Releasing or
+extending a lock through the instance which acquired it only succeeds while
+the key still holds its token (checked in a Lua script), so an instance whose
+lock has expired never releases a lock acquired by someone else since.
+Releasing through another instance, e.g. a celery task freeing the lock set
+by the view which scheduled it, deletes the key unconditionally.
+"""
+
+LOCK_KEY_PREFIX = "lock"
+
+# Delete/extend the key only if it still holds the token of the caller
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+EXTEND_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
 """
 
+_connection_pool = None
+_connection_pool_lock = threading.Lock()
+
+
+def get_redis_connection():
+    """
+    Redis client using a connection pool shared by all the locks of the process
+    """
+    global _connection_pool
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                load_dotenv()
+                _connection_pool = redis.ConnectionPool(
+                    host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), db=0
+                )
+    return redis.StrictRedis(connection_pool=_connection_pool)
+
 
 class LockException(Exception):
     pass
 
 
 class Lock:
-    def __init__(self, user_id, task_name):
-        load_dotenv()
-        self.redis_host = os.getenv("REDIS_HOST")
-        self.redis_port = os.getenv("REDIS_PORT")
-        self.redis_connection = redis.StrictRedis(
-            host=self.redis_host, port=self.redis_port, db=0
-        )
+    def __init__(
+        self,
+        user_id,
+        task_name,
+        timeout=None,
+        heartbeat_interval=None,
+        redis_connection=None,
+    ):
+        """
+        timeout (seconds) and heartbeat_interval (seconds) are used when the
+        lock is acquired as a context manager. With a heartbeat interval the
+        lock is extended to `timeout` every interval while it is held.
+        """
+        self.redis_connection = redis_connection or get_redis_connection()
         self.user_id = user_id
         self.task_name = task_name
-        # self.logger = logging.getLogger(f"Lock-{self.user_id}-{self.task_name}")
-        # self.logger.setLevel(logging.INFO)
+        self.key = f"{LOCK_KEY_PREFIX}:{user_id}:{task_name}"
+        self.token = None
+        self.timeout = timeout
+        self.heartbeat_interval = heartbeat_interval
+        self._heartbeat_stop = None
+        self._heartbeat_thread = None
 
     # Return 1 if the lock is set and 0 if lock is not set
     def lockStatus(self):
         try:
-            retrieved_json_str = self.redis_connection.get(self.user_id)
-            if retrieved_json_str:
-                retrieved_dict = json.loads(retrieved_json_str.decode("utf-8"))
-                if self.task_name in retrieved_dict:
-                    validity = retrieved_dict[self.task_name]
-                    if time.time() > validity:
-                        return 0  # Lock has expired
-                    else:
-                        return 1  # Lock is valid
-                else:
-                    return 0  # Task name doesn't exist in locks
-            else:
-                return 0  # user id doesn't exist in Redis
+            return 1 if self.redis_connection.exists(self.key) else 0
         except Exception as e:
-            raise LockException(f"Error setting lock: {str(e)}")
+            raise LockException(f"Error getting lock status: {str(e)}")
 
     def setLock(self, timeout):
+        """
+        Acquire the lock for `timeout` seconds.
+        Returns True if the lock was acquired and False if it is already held.
+        """
+        token = uuid.uuid4().hex
         try:
-            if self.lockStatus() == 0:
-                retrieved_json_str = self.redis_connection.get(self.user_id)
-                if retrieved_json_str:
-                    # JSON for user already exists, append the task name and validity
-                    retrieved_dict = json.loads(retrieved_json_str.decode("utf-8"))
-                    retrieved_dict[self.task_name] = time.time() + timeout
-                    new_json_str = json.dumps(retrieved_dict)
-                    self.redis_connection.set(self.user_id, new_json_str)
-                    # self.logger.info(f"Lock set for task {self.task_name} and user {self.user_id} for {timeout} seconds")
-
-                else:
-                    # create new JSON for redis entry
-                    new_dict = {self.task_name: time.time() + timeout}
-                    new_json_str = json.dumps(new_dict)
-                    self.redis_connection.set(self.user_id, new_json_str)
-                    # self.logger.info(f"Lock set for task {self.task_name} and user {self.user_id} for {timeout} seconds")
+            acquired = self.redis_connection.set(
+                self.key, token, nx=True, px=max(int(timeout * 1000), 1)
+            )
         except Exception as e:
             raise LockException(f"Error setting lock: {str(e)}")
+        if acquired:
+            self.token = token
+        return bool(acquired)
 
     def releaseLock(self):
+        """
+        Release the lock. Returns True if a lock was released.
+        """
+        self._stop_heartbeat()
         try:
-            if self.lockStatus() == 1:
-                retrieved_json_str = self.redis_connection.get(self.user_id)
-                retrieved_dict = json.loads(retrieved_json_str.decode("utf-8"))
-                if len(retrieved_dict) > 1:
-                    del retrieved_dict[self.task_name]
-                    new_json_str = json.dumps(retrieved_dict)
-                    self.redis_connection.set(self.user_id, new_json_str)
-                    # self.logger.info(f"Lock released for task {self.task_name} and user {self.user_id}")
-                else:
-                    self.redis_connection.delete(self.user_id)
-                    # self.logger.info(f"Lock released for task {self.task_name} and user {self.user_id}")
+            if self.token is None:
+                released = self.redis_connection.delete(self.key)
+            else:
+                released = self.redis_connection.eval(
+                    RELEASE_SCRIPT, 1, self.key, self.token
+                )
         except Exception as e:
             raise LockException(f"Error releasing lock: {str(e)}")
+        self.token = None
+        return bool(released)
+
+    def extendLock(self, timeout):
+        """
+        Reset the remaining time of a lock held by this instance to `timeout`
+        seconds. Returns False if the lock is no longer held by this instance.
+        """
+        if self.token is None:
+            return False
+        try:
+            extended = self.redis_connection.eval(
+                EXTEND_SCRIPT, 1, self.key, self.token, max(int(timeout * 1000), 1)
+            )
+        except Exception as e:
+            raise LockException(f"Error extending lock: {str(e)}")
+        return bool(extended)
 
     def getRemainingTimeForLock(self):
+        """
+        Remaining time of the lock in seconds, None if the lock is not set
+        """
         try:
-            if self.lockStatus() == 1:
-                retrieved_json_str = self.redis_connection.get(self.user_id)
-                retrieved_dict = json.loads(retrieved_json_str.decode("utf-8"))
-                remaining_time = retrieved_dict[self.task_name] - time.time()
-                return remaining_time
+            remaining_ms = self.redis_connection.pttl(self.key)
         except Exception as e:
             raise LockException(f"Error getting remaining time for lock: {str(e)}")
+        if remaining_ms is None or remaining_ms < 0:
+            return None
+        return remaining_ms / 1000
+
+    def _heartbeat(self, stop):
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                if not self.extendLock(self.timeout):
+                    return
+            except LockException as e:
+                print(f"Error while extending the lock {self.key}: {str(e)}")
+
+    def _start_heartbeat(self):
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat, args=(self._heartbeat_stop,), daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def _stop_heartbeat(self):
+        if self._heartbeat_thread is None:
+            return
+        self._heartbeat_stop.set()
+        if self._heartbeat_thread is not threading.current_thread():
+            self._heartbeat_thread.join()
+        self._heartbeat_thread = None
+        self._heartbeat_stop = None
 
+    def __enter__(self):
+        if self.timeout is None:
+            raise LockException("A timeout is needed to acquire the lock")
+        if not self.setLock(self.timeout):
+            raise LockException(
+                f"Lock for {self.task_name} is already held by user {self.user_id}"
+            )
+        if self.heartbeat_interval:
+            self._start_heartbeat()
+        return self
 
-# testing
-# if __name__ == '__main__':
-#     user_id = "user123"
-#     task_name = "task1"
-#
-#     #test 1
-#     lock = Lock(user_id, task_name)
-#     print(f"Before setting the lock the lock status is {lock.lockStatus()}")
-#
-#     lock.setLock(30)
-#     print(f"After setting the lock the lock status is {lock.lockStatus()}")
-#
-#     time.sleep(31)
-#     print(f"After waiting 30sec the lock status is {lock.lockStatus()}")
-#
-#     lock.releaseLock()
-#     print(f"after releasing the lock the lock status is {lock.lockStatus()}")
-#
-#     #test2 part 1
-#     lock = Lock(user_id, task_name)
-#     print(f"Before setting the lock for 200sec the lock status is {lock.lockStatus()}")
-#     lock.setLock(200)
-#     print(f"Just after setting the lock for 200sec the lock status is {lock.lockStatus()}")
-#
-#     #test2 part2
-#     lock = Lock(user_id, task_name)
-#     print(f"few seconds after setting the lock for 200sec the lock status is {lock.lockStatus()}")
-#
-#     #test 3 for testing remanining time
-#     lock =Lock(user_id,task_name)
-#     lock.setLock(100)
-#     time.sleep(10)
-#     print(f"remaining time = {lock.getRemainingTimeForLock()}")
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.releaseLock()
+        return False
@@ -127,6 +127,16 @@ DATABASES = {
     }
 }
 
+# Cache shared by all the web and celery processes, falls back to the local
+# memory cache when redis is not configured
+if os.getenv("REDIS_HOST"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": f"redis://{os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}/1",
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -307,6 +317,8 @@ CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
 
-# Project lock TTL for task pulling(in seconds)
-PROJECT_LOCK_TTL = 5
-PROJECT_LOCK_RETRY_INTERVAL = 1
+# Maximum wait for the project lock while pulling tasks(in seconds)
+PROJECT_LOCK_TIMEOUT = 5
+
+# Task ownership changes touching more tasks than this run as a celery job
+TASK_OWNERSHIP_ASYNC_THRESHOLD = 5000
@@ -0,0 +1,113 @@
+"""
+Metrics of the annotation results stored on the annotations.
+
+The reports need the word count, segment count and audio durations of the
+annotation results. `Annotation.save` computes them whenever the result is
+saved and stores them in the `result_*` columns of the annotation, so that the
+reports can sum them in SQL instead of loading and parsing every result.
+
+Annotations created with `bulk_create()` are left with
+`result_metrics_computed` unset, as are the annotations which existed before
+the columns; code paths changing results with `.update()` must unset it too.
+`compute_pending_metrics`
+(exposed through the `backfill_annotation_metrics` command) fills them in
+batches and can be interrupted and resumed at any time. Readers fall back to
+parsing the result of these annotations.
+"""
+from django.db import transaction
+from django.db.models import Case, F, JSONField, When
+
+from projects.utils import (
+    get_audio_segments_count,
+    get_audio_transcription_duration,
+    get_not_null_audio_transcription_duration,
+    ocr_word_count,
+)
+from .models import Annotation
+
+METRICS_BATCH_SIZE = 500
+
+RESULT_METRIC_FUNCTIONS = {
+    "result_word_count": lambda result, annotation_id: ocr_word_count(result),
+    "result_segment_count": lambda result, annotation_id: get_audio_segments_count(
+        result
+    ),
+    "result_audio_duration": lambda result, annotation_id: (
+        get_audio_transcription_duration(result)
+    ),
+    "result_not_null_audio_duration": get_not_null_audio_transcription_duration,
+}
+
+# the result of an annotation whose metrics are not stored yet, null otherwise
+PENDING_RESULT = Case(
+    When(result_metrics_computed=False, then=F("result")), output_field=JSONField()
+)
+
+
+def get_result_metrics(result, annotation_id=None):
+    """
+    Returns a dict of result metric field to its value for the annotation
+    result, None for the metrics which can not be computed from it
+    """
+    metrics = {}
+    for field, function in RESULT_METRIC_FUNCTIONS.items():
+        try:
+            metrics[field] = function(result, annotation_id)
+        except Exception:
+            metrics[field] = None
+    return metrics
+
+
+def get_result_metric(row, field, result_key="result"):
+    """
+    Metric of an annotation read with `.values()` along with its metric field,
+    `result_metrics_computed` and `id`, computed from its result (under
+    `result_key`, see PENDING_RESULT) when it is not stored yet. Raises an
+    exception when the metric can not be computed, like the metric functions.
+    """
+    if not row["result_metrics_computed"]:
+        return RESULT_METRIC_FUNCTIONS[field](row[result_key], row["id"])
+    if row[field] is None:
+        raise ValueError(f"The {field} of annotation {row['id']} is not computable")
+    return row[field]
+
+
+def set_result_metrics(annotation):
+    """
+    Compute the result metrics of the annotation, without saving them
+    """
+    for field, value in get_result_metrics(annotation.result, annotation.id).items():
+        setattr(annotation, field, value)
+    annotation.result_metrics_computed = True
+
+
+def compute_pending_metrics(batch_size=METRICS_BATCH_SIZE, limit=None, after_id=0):
+    """
+    Compute and store the metrics of the annotations which do not have them,
+    in batches of increasing ids starting after `after_id`, at most `limit`
+    annotations. Yields the number of annotations updated and the last id of
+    every batch, which is where a later run can resume.
+    """
+    done = 0
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        with transaction.atomic():
+            annotations = list(
+                Annotation.objects.filter(
+                    result_metrics_computed=False, id__gt=after_id
+                )
+                .order_by("id")
+                .select_for_update(skip_locked=True)
+                .only("id", "result")[:size]
+            )
+            if not annotations:
+                return
+            for annotation in annotations:
+                set_result_metrics(annotation)
+            Annotation.objects.bulk_update(
+                annotations,
+                [*RESULT_METRIC_FUNCTIONS, "result_metrics_computed"],
+            )
+        done += len(annotations)
+        after_id = annotations[-1].id
+        yield len(annotations), after_id
@@ -0,0 +1,465 @@
+"""
+Per user, per project, per day rollup of the annotations used by the reports.
+
+Each `AnnotationRollup` row holds the totals of the annotations of a user in a
+project with a given type and status, last updated on a given day: their count,
+lead time, word count, segment count and audio durations. The reports aggregate
+these rows instead of loading and parsing every annotation.
+
+Annotation saves and deletes refresh the rows of the buckets they leave and
+enter through signals, once the transaction commits, and invalidate the cached
+reports of their project. Code paths that modify annotations with `.update()`
+or `bulk_create()` call `schedule_rollup_refresh` themselves and
+`rebuild_annotation_rollup` (exposed through the `backfill_annotation_rollup`
+command) rebuilds the rows of a project from scratch.
+
+The rows of a user in a project are recomputed and replaced in one transaction
+holding an advisory lock of the user in the project, and a rebuild holds the
+lock of the whole project, so concurrent refreshes never interleave.
+"""
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+
+from django.db import connection, transaction
+from django.db.models import Count, FloatField, Q, Sum, Value
+from django.db.models.fields.json import KeyTransform
+from django.db.models.functions import Coalesce, TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from projects.models import Project
+from projects.report_cache import bump_report_versions
+from projects.utils import (
+    get_audio_project_types,
+    get_audio_segments_count,
+    get_audio_transcription_duration,
+    ocr_word_count,
+)
+from .models import Annotation, AnnotationRollup, Task, DRAFT, SKIPPED, UNLABELED
+
+ROLLUP_BATCH_SIZE = 2000
+
+# Only the number of annotations in these statuses is reported,
+# their results are not parsed
+COUNT_ONLY_STATUSES = (UNLABELED, DRAFT, SKIPPED)
+
+METRIC_FIELDS = (
+    "word_count",
+    "segment_count",
+    "audio_duration",
+    "raw_audio_duration",
+)
+
+ROLLUP_KEY_FIELDS = (
+    "completed_by_id",
+    "task__project_id",
+    "annotation_type",
+    "annotation_status",
+    "day",
+)
+
+_pending = threading.local()
+
+
+def rollup_key(annotation, project_id):
+    return (
+        annotation.completed_by_id,
+        project_id,
+        annotation.annotation_type,
+        annotation.annotation_status,
+        timezone.localdate(annotation.updated_at),
+    )
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else 0
+
+
+def get_annotation_metrics(result, project_type, audio_project_types, task_data):
+    """
+    Word count, segment count, transcribed duration and raw audio duration
+    counted in the reports for an annotation
+    """
+    metrics = dict.fromkeys(METRIC_FIELDS, 0)
+    if "OCRTranscription" in project_type:
+        try:
+            metrics["word_count"] = ocr_word_count(result)
+        except Exception:
+            pass
+    else:
+        metrics["word_count"] = _number(task_data.get("word_count"))
+    if project_type in audio_project_types:
+        try:
+            metrics["audio_duration"] = get_audio_transcription_duration(result)
+            metrics["segment_count"] = get_audio_segments_count(result)
+        except Exception:
+            pass
+        metrics["raw_audio_duration"] = _number(task_data.get("audio_duration"))
+    return metrics
+
+
+def compute_rollups(annotations):
+    """
+    Returns a dict of rollup key to the totals of the annotations of the queryset
+    """
+    annotations = annotations.annotate(day=TruncDate("updated_at"))
+    rollups = {}
+    counts = annotations.values(*ROLLUP_KEY_FIELDS).annotate(
+        annotation_count=Count("id"),
+        lead_time_sum=Coalesce(Sum("lead_time"), Value(0.0), output_field=FloatField()),
+    )
+    for row in counts:
+        key = tuple(row[field] for field in ROLLUP_KEY_FIELDS)
+        rollups[key] = {
+            "annotation_count": row["annotation_count"],
+            "lead_time": row["lead_time_sum"],
+            **dict.fromkeys(METRIC_FIELDS, 0),
+        }
+    if not rollups:
+        return rollups
+
+    project_types = dict(
+        Project.objects.filter(id__in={key[1] for key in rollups}).values_list(
+            "id", "project_type"
+        )
+    )
+    audio_project_types = get_audio_project_types()
+    measured = annotations.exclude(annotation_status__in=COUNT_ONLY_STATUSES)
+
+    # metrics of the tasks
+    task_metrics = measured.annotate(
+        task_word_count=KeyTransform("word_count", "task__data"),
+        task_audio_duration=KeyTransform("audio_duration", "task__data"),
+    ).values_list(*ROLLUP_KEY_FIELDS, "task_word_count", "task_audio_duration")
+    for *key, word_count, audio_duration in task_metrics.iterator(
+        chunk_size=ROLLUP_BATCH_SIZE
+    ):
+        key = tuple(key)
+        project_type = project_types[key[1]]
+        if "OCRTranscription" not in project_type:
+            rollups[key]["word_count"] += _number(word_count)
+        if project_type in audio_project_types:
+            rollups[key]["raw_audio_duration"] += _number(audio_duration)
+
+    # metrics of the results stored on the annotations, the segments are only
+    # counted along with a computable duration
+    stored_metrics = (
+        measured.filter(result_metrics_computed=True)
+        .values(*ROLLUP_KEY_FIELDS)
+        .annotate(
+            result_word_count_sum=Sum("result_word_count"),
+            result_audio_duration_sum=Sum("result_audio_duration"),
+            result_segment_count_sum=Sum(
+                "result_segment_count",
+                filter=Q(result_audio_duration__isnull=False),
+            ),
+        )
+    )
+    for row in stored_metrics:
+        key = tuple(row[field] for field in ROLLUP_KEY_FIELDS)
+        project_type = project_types[key[1]]
+        if "OCRTranscription" in project_type:
+            rollups[key]["word_count"] += row["result_word_count_sum"] or 0
+        if project_type in audio_project_types:
+            rollups[key]["audio_duration"] += row["result_audio_duration_sum"] or 0
+            rollups[key]["segment_count"] += row["result_segment_count_sum"] or 0
+
+    # results of the annotations whose metrics are not stored yet
+    pending_results = measured.filter(result_metrics_computed=False).values_list(
+        *ROLLUP_KEY_FIELDS, "result"
+    )
+    for *key, result in pending_results.iterator(chunk_size=ROLLUP_BATCH_SIZE):
+        key = tuple(key)
+        project_type = project_types[key[1]]
+        if not (
+            "OCRTranscription" in project_type or project_type in audio_project_types
+        ):
+            continue
+        metrics = get_annotation_metrics(
+            result or [], project_type, audio_project_types, {}
+        )
+        for field in ("audio_duration", "segment_count"):
+            rollups[key][field] += metrics[field]
+        if "OCRTranscription" in project_type:
+            rollups[key]["word_count"] += metrics["word_count"]
+    return rollups
+
+
+def _lock_rollups(project_id, user_id=None):
+    """
+    Lock the rollup rows of the user in the project, or of the whole project,
+    until the end of the current transaction
+    """
+    project_key = f"annotation_rollup:{project_id}"
+    with connection.cursor() as cursor:
+        if user_id is None:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [project_key])
+            return
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock_shared(hashtext(%s))", [project_key]
+        )
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s))", [f"{project_key}:{user_id}"]
+        )
+
+
+def _replace_rollups(stale_rollups, rollups):
+    with transaction.atomic():
+        stale_rollups.delete()
+        AnnotationRollup.objects.bulk_create(
+            [
+                AnnotationRollup(
+                    user_id=user_id,
+                    project_id=project_id,
+                    annotation_type=annotation_type,
+                    annotation_status=annotation_status,
+                    day=day,
+                    **totals,
+                )
+                for (
+                    user_id,
+                    project_id,
+                    annotation_type,
+                    annotation_status,
+                    day,
+                ), totals in rollups.items()
+            ],
+            batch_size=ROLLUP_BATCH_SIZE,
+        )
+
+
+def _refresh_user_rollups(user_id, project_id, user_keys):
+    days = {key[4] for key in user_keys}
+    annotations = Annotation.objects.filter(
+        completed_by_id=user_id,
+        task__project_id=project_id,
+        annotation_type__in={key[2] for key in user_keys},
+        annotation_status__in={key[3] for key in user_keys},
+        updated_at__date__in=days,
+    )
+    rollups = {
+        key: totals
+        for key, totals in compute_rollups(annotations).items()
+        if key in user_keys
+    }
+    stale_ids = [
+        rollup_id
+        for rollup_id, *key in AnnotationRollup.objects.filter(
+            user_id=user_id, project_id=project_id, day__in=days
+        ).values_list(
+            "id",
+            "user_id",
+            "project_id",
+            "annotation_type",
+            "annotation_status",
+            "day",
+        )
+        if tuple(key) in user_keys
+    ]
+    _replace_rollups(AnnotationRollup.objects.filter(id__in=stale_ids), rollups)
+
+
+def refresh_annotation_rollup(keys):
+    """
+    Recompute the rollup rows of the given keys from their annotations
+    """
+    keys_by_user_project = defaultdict(set)
+    for key in keys:
+        keys_by_user_project[key[:2]].add(key)
+    # in a consistent order, in case the caller holds a transaction
+    for (user_id, project_id), user_keys in sorted(keys_by_user_project.items()):
+        with transaction.atomic():
+            _lock_rollups(project_id, user_id)
+            _refresh_user_rollups(user_id, project_id, user_keys)
+    bump_report_versions({key[1] for key in keys_by_user_project})
+
+
+def rebuild_annotation_rollup(project_id, start_date=None, end_date=None):
+    """
+    Rebuild the rollup of a project, optionally only for the days in the range.
+    Returns the number of rollup rows written.
+    """
+    annotations = Annotation.objects.filter(task__project_id=project_id)
+    stale_rollups = AnnotationRollup.objects.filter(project_id=project_id)
+    if start_date is not None:
+        annotations = annotations.filter(updated_at__date__gte=start_date)
+        stale_rollups = stale_rollups.filter(day__gte=start_date)
+    if end_date is not None:
+        annotations = annotations.filter(updated_at__date__lte=end_date)
+        stale_rollups = stale_rollups.filter(day__lte=end_date)
+    with transaction.atomic():
+        _lock_rollups(project_id)
+        rollups = compute_rollups(annotations)
+        _replace_rollups(stale_rollups, rollups)
+    bump_report_versions([project_id])
+    return len(rollups)
+
+
+def get_rollup_keys(annotations):
+    """
+    Rollup keys of the annotations of the queryset
+    """
+    return set(
+        annotations.annotate(day=TruncDate("updated_at"))
+        .values_list(
+            "completed_by_id",
+            "task__project_id",
+            "annotation_type",
+            "annotation_status",
+            "day",
+        )
+        .distinct()
+    )
+
+
+def _get_deleted_keys(deleted_keys):
+    """
+    Rollup keys holding the deleted annotations, given their keys without the
+    project, which can not be looked up once the task is deleted
+    """
+    keys = set()
+    days_by_user = defaultdict(set)
+    for user_id, annotation_type, annotation_status, day in deleted_keys:
+        days_by_user[user_id].add(day)
+    for user_id, days in days_by_user.items():
+        for key in AnnotationRollup.objects.filter(
+            user_id=user_id, day__in=days
+        ).values_list(
+            "user_id", "project_id", "annotation_type", "annotation_status", "day"
+        ):
+            if (key[0], key[2], key[3], key[4]) in deleted_keys:
+                keys.add(key)
+    return keys
+
+
+def _flush_pending_refresh():
+    keys = getattr(_pending, "keys", None) or set()
+    deleted_keys = getattr(_pending, "deleted_keys", None) or set()
+    if not keys and not deleted_keys:
+        return
+    _pending.keys = set()
+    _pending.deleted_keys = set()
+    refresh_annotation_rollup(keys | _get_deleted_keys(deleted_keys))
+
+
+def _schedule(name, keys):
+    if not keys:
+        return
+    if getattr(_pending, name, None) is None:
+        setattr(_pending, name, set())
+    getattr(_pending, name).update(keys)
+    # the keys of every callback are flushed by the first one, the rest are no-ops
+    transaction.on_commit(_flush_pending_refresh)
+
+
+def schedule_rollup_refresh(keys):
+    """
+    Refresh the rollup rows of the keys once the current transaction commits.
+    Keys scheduled within a transaction are refreshed together.
+    """
+    _schedule("keys", keys)
+
+
+@receiver(pre_save, sender=Annotation)
+def remember_rollup_key(sender, instance, raw=False, **kwargs):
+    instance._previous_rollup_key = None
+    if raw or instance.pk is None:
+        return
+    previous = (
+        Annotation.objects.filter(pk=instance.pk)
+        .annotate(day=TruncDate("updated_at"))
+        .values_list(
+            "completed_by_id",
+            "task__project_id",
+            "annotation_type",
+            "annotation_status",
+            "day",
+        )
+        .first()
+    )
+    instance._previous_rollup_key = previous
+
+
+@receiver(post_save, sender=Annotation)
+def refresh_saved_annotation(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_key = getattr(instance, "_previous_rollup_key", None)
+    if previous_key:
+        project_id = previous_key[1]
+    else:
+        project_id = (
+            Task.objects.filter(id=instance.task_id)
+            .values_list("project_id", flat=True)
+            .first()
+        )
+    keys = {rollup_key(instance, project_id)}
+    if previous_key:
+        keys.add(previous_key)
+    schedule_rollup_refresh(keys)
+
+
+@receiver(post_delete, sender=Annotation)
+def refresh_deleted_annotation(sender, instance, **kwargs):
+    user_id, _, annotation_type, annotation_status, day = rollup_key(instance, None)
+    _schedule("deleted_keys", {(user_id, annotation_type, annotation_status, day)})
+
+
+ROLLUP_TOTALS = {
+    "annotation_count": Coalesce(Sum("annotation_count"), 0),
+    "lead_time": Coalesce(Sum("lead_time"), 0.0),
+    "word_count": Coalesce(Sum("word_count"), 0),
+    "segment_count": Coalesce(Sum("segment_count"), 0),
+    "audio_duration": Coalesce(Sum("audio_duration"), 0.0),
+    "raw_audio_duration": Coalesce(Sum("raw_audio_duration"), 0.0),
+}
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        # "YYYY-MM-DD" optionally followed by a time
+        return date.fromisoformat(value[:10])
+    return value.date() if isinstance(value, datetime) else value
+
+
+def get_annotation_rollups(
+    users, project_ids, annotation_type, statuses=None, start_date=None, end_date=None
+):
+    """
+    Rollup rows of the users (a user, user id or list of ids) in the projects,
+    for the days between start_date and end_date (dates or datetimes)
+    """
+    if isinstance(users, (list, tuple, set)):
+        rollups = AnnotationRollup.objects.filter(user_id__in=users)
+    else:
+        rollups = AnnotationRollup.objects.filter(user_id=getattr(users, "id", users))
+    rollups = rollups.filter(
+        project_id__in=project_ids, annotation_type=annotation_type
+    )
+    if statuses is not None:
+        rollups = rollups.filter(annotation_status__in=statuses)
+    if start_date is not None:
+        rollups = rollups.filter(day__gte=_as_date(start_date))
+    if end_date is not None:
+        rollups = rollups.filter(day__lte=_as_date(end_date))
+    return rollups
+
+
+def get_rollup_totals(rollups):
+    """
+    Totals of the rollup rows, see ROLLUP_TOTALS
+    """
+    return rollups.aggregate(**ROLLUP_TOTALS)
+
+
+def get_rollup_status_counts(rollups):
+    """
+    Returns a dict of annotation status to the number of annotations
+    """
+    return dict(
+        rollups.values("annotation_status")
+        .annotate(count=Sum("annotation_count"))
+        .values_list("annotation_status", "count")
+    )
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TasksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tasks"
+
+    def ready(self):
+        # Register the signal handlers keeping the ready queue and
+        # the annotation rollup in sync
+        from . import annotation_rollup, ready_queue  # noqa: F401
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from tasks.annotation_metrics import METRICS_BATCH_SIZE, compute_pending_metrics
+
+
+class Command(BaseCommand):
+    """
+    Computes the result metrics of the annotations which do not have them yet,
+    in batches of increasing ids. Every batch is committed on its own, so the
+    command can be stopped at any time: a later run picks up the annotations
+    still pending, or starts after the last reported id with --after-id.
+    """
+
+    help = "Backfill the word count, segment count and durations of annotations"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=METRICS_BATCH_SIZE)
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Maximum number of annotations to update",
+        )
+        parser.add_argument(
+            "--after-id",
+            type=int,
+            default=0,
+            help="Only update the annotations with a greater id",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for updated, last_id in compute_pending_metrics(
+            options["batch_size"], options["limit"], options["after_id"]
+        ):
+            total += updated
+            self.stdout.write(f"Updated {total} annotations, last id {last_id}")
+        self.stdout.write(f"Done, updated {total} annotations")
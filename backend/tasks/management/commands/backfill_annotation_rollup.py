@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.models import Project
+from tasks.annotation_rollup import rebuild_annotation_rollup
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the annotation rollup of the given projects (all projects by
+    default) from their annotations, optionally only for a range of days.
+    Used to fill the rollup of existing annotations and to fix any drift.
+    """
+
+    help = "Backfill the per user, per project, per day annotation rollup"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_ids", nargs="*", type=int)
+        parser.add_argument("--from-date", type=parse_date, default=None)
+        parser.add_argument("--to-date", type=parse_date, default=None)
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        if options["project_ids"]:
+            projects = projects.filter(id__in=options["project_ids"])
+            if len(projects) != len(set(options["project_ids"])):
+                raise CommandError("Some of the projects do not exist")
+        for project_id in projects.order_by("id").values_list("id", flat=True):
+            written = rebuild_annotation_rollup(
+                project_id, options["from_date"], options["to_date"]
+            )
+            self.stdout.write(f"Project {project_id}: wrote {written} rollup rows")
@@ -0,0 +1,125 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from projects.models import Project
+from tasks.models import Annotation, Task, ANNOTATED, LABELED
+from tasks.views import TaskViewSet
+from users.models import User
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    """
+    Seeds a benchmark project with annotated tasks for a user and times the
+    task list endpoint for the first, middle and last pages of the project.
+    Page fetches should take about the same time irrespective of the page.
+    """
+
+    help = "Benchmark the task list endpoint on a large seeded project"
+
+    def add_arguments(self, parser):
+        parser.add_argument("user_email", type=str)
+        parser.add_argument("--num-tasks", type=int, default=100000)
+        parser.add_argument("--records", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--project-type", type=str, default="ContextualTranslationEditing"
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the seeded benchmark project",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options["user_email"])
+        except User.DoesNotExist:
+            raise CommandError("User does not exist")
+
+        project = self.seed_project(user, options["num_tasks"], options["project_type"])
+        try:
+            num_pages = -(-options["num_tasks"] // options["records"])
+            for page in sorted({1, (num_pages + 1) // 2, num_pages}):
+                timings = [
+                    self.fetch_page(
+                        user, project.id, page, options["records"], "annotation_status"
+                    )
+                    for _ in range(options["repeat"])
+                ]
+                self.stdout.write(
+                    f"Page {page}/{num_pages}: "
+                    f"median {statistics.median(timings) * 1000:.1f} ms"
+                )
+        finally:
+            if not options["keep"]:
+                project.delete()
+                self.stdout.write("Benchmark project deleted")
+
+    def seed_project(self, user, num_tasks, project_type):
+        with transaction.atomic():
+            project = Project.objects.create(
+                title="Task list benchmark",
+                project_type=project_type,
+                project_mode="Annotation",
+                created_by=user,
+                organization_id=user.organization,
+                is_published=True,
+            )
+            project.annotators.add(user)
+            for start in range(0, num_tasks, BATCH_SIZE):
+                tasks = Task.objects.bulk_create(
+                    [
+                        Task(
+                            project_id=project,
+                            task_status=ANNOTATED,
+                            data={
+                                "input_text": f"Benchmark sentence {i}",
+                                "machine_translation": f"Benchmark translation {i}",
+                            },
+                        )
+                        for i in range(start, min(start + BATCH_SIZE, num_tasks))
+                    ]
+                )
+                Task.annotation_users.through.objects.bulk_create(
+                    [
+                        Task.annotation_users.through(task_id=task.id, user_id=user.id)
+                        for task in tasks
+                    ]
+                )
+                Annotation.objects.bulk_create(
+                    [
+                        Annotation(
+                            task=task,
+                            completed_by=user,
+                            annotation_status=LABELED,
+                            result=[],
+                        )
+                        for task in tasks
+                    ]
+                )
+        self.stdout.write(f"Seeded project {project.id} with {num_tasks} tasks")
+        return project
+
+    def fetch_page(self, user, project_id, page, records, status_param):
+        request = APIRequestFactory().get(
+            "/task/",
+            {
+                "project_id": project_id,
+                "page": page,
+                "records": records,
+                status_param: "['labeled']",
+            },
+        )
+        force_authenticate(request, user=user)
+        started = time.perf_counter()
+        response = TaskViewSet.as_view({"get": "list"})(request)
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise CommandError(f"Task list failed: {response.data}")
+        return elapsed
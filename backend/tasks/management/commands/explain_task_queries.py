@@ -0,0 +1,157 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.timezone import now
+
+from projects.models import Project, ANNOTATION_STAGE
+from tasks.models import (
+    Annotation,
+    ReadyQueueEntry,
+    Task,
+    ANNOTATED,
+    ANNOTATOR_ANNOTATION,
+    INCOMPLETE,
+    LABELED,
+    REVIEWED,
+    REVIEWER_ANNOTATION,
+    SUPER_CHECKER_ANNOTATION,
+    UNLABELED,
+)
+from users.models import User
+
+SEQ_SCAN_PATTERN = re.compile(r"Seq Scan on (\w+)")
+
+
+class Command(BaseCommand):
+    """
+    Replays the canonical task and annotation queries of a project with
+    EXPLAIN (ANALYZE, BUFFERS) and flags the queries which scan a table
+    sequentially. Meant to be run against a seeded local database, for
+    example a project created with `benchmark_task_list --keep`.
+    """
+
+    help = "Explain the hot task and annotation queries of a project"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument(
+            "--user-email",
+            type=str,
+            default=None,
+            help="User the queries are made for, defaults to a project annotator",
+        )
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Print the full plan of every query",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("EXPLAIN (ANALYZE, BUFFERS) needs a PostgreSQL database")
+        try:
+            project = Project.objects.get(pk=options["project_id"])
+        except Project.DoesNotExist:
+            raise CommandError("Project does not exist")
+        if options["user_email"]:
+            user = User.objects.filter(email=options["user_email"]).first()
+        else:
+            user = project.annotators.first()
+        if user is None:
+            raise CommandError("No user to run the queries for")
+
+        flagged = 0
+        for name, queryset in self.canonical_queries(project, user):
+            plan = queryset.explain(analyze=True, buffers=True)
+            seq_scans = sorted(set(SEQ_SCAN_PATTERN.findall(plan)))
+            if seq_scans:
+                flagged += 1
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{name}: sequential scan on {', '.join(seq_scans)}"
+                    )
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            if seq_scans or options["verbose_plans"]:
+                self.stdout.write(plan)
+
+        self.stdout.write(f"{flagged} queries with sequential scans")
+
+    def canonical_queries(self, project, user):
+        yesterday = now() - timedelta(days=1)
+        return [
+            (
+                "Annotation pull candidates",
+                ReadyQueueEntry.objects.filter(
+                    project_id=project.id, stage=ANNOTATION_STAGE
+                )
+                .exclude(task__annotation_users=user.id)
+                .order_by("task_id")[:10],
+            ),
+            (
+                "Tasks open for annotation",
+                Task.objects.filter(
+                    project_id=project.id, task_status__in=[INCOMPLETE, UNLABELED]
+                ),
+            ),
+            (
+                "Tasks by status",
+                Task.objects.filter(project_id=project.id, task_status=ANNOTATED),
+            ),
+            (
+                "Reviewer tasks",
+                Task.objects.filter(
+                    project_id=project.id, review_user=user, task_status=ANNOTATED
+                ),
+            ),
+            (
+                "Superchecker tasks",
+                Task.objects.filter(
+                    project_id=project.id,
+                    super_check_user=user,
+                    task_status=REVIEWED,
+                ),
+            ),
+            (
+                "Next task",
+                Task.objects.filter(project_id=project.id, id__gt=0).order_by("id")[:1],
+            ),
+            (
+                "Task data search",
+                Task.objects.filter(
+                    project_id=project.id, data__input_text__icontains="the"
+                ),
+            ),
+            (
+                "Annotator annotations",
+                Annotation.objects.filter(
+                    task__project_id=project.id,
+                    annotation_type=ANNOTATOR_ANNOTATION,
+                    annotation_status=LABELED,
+                    completed_by=user,
+                ),
+            ),
+            (
+                "Review annotations of the project",
+                Annotation.objects.filter(
+                    task__project_id=project.id,
+                    annotation_type=REVIEWER_ANNOTATION,
+                ),
+            ),
+            (
+                "User annotations updated in a period",
+                Annotation.objects.filter(
+                    completed_by=user,
+                    annotation_type__in=[
+                        ANNOTATOR_ANNOTATION,
+                        REVIEWER_ANNOTATION,
+                        SUPER_CHECKER_ANNOTATION,
+                    ],
+                    annotation_status=LABELED,
+                    updated_at__gte=yesterday,
+                ),
+            ),
+        ]
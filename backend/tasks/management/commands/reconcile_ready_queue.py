@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.models import Project
+from tasks.ready_queue import rebuild_ready_queue
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the ready queue of the given projects (all projects by default)
+    from their tasks, fixing any drift between the queue and the tasks.
+    """
+
+    help = "Reconcile the task ready queue of projects"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_ids", nargs="*", type=int)
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+        if options["project_ids"]:
+            projects = projects.filter(id__in=options["project_ids"])
+            if len(projects) != len(set(options["project_ids"])):
+                raise CommandError("Some of the projects do not exist")
+        for project_id in projects.order_by("id").values_list("id", flat=True):
+            removed, added = rebuild_ready_queue(project_id)
+            self.stdout.write(
+                f"Project {project_id}: removed {removed}, added {added} entries"
+            )
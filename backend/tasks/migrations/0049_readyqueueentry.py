@@ -0,0 +1,109 @@
+# Generated by Django 3.2.14 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_ready_queue(apps, schema_editor):
+    Task = apps.get_model("tasks", "Task")
+    ReadyQueueEntry = apps.get_model("tasks", "ReadyQueueEntry")
+    AnnotationUsers = Task.annotation_users.through
+
+    annotator_counts = dict(
+        AnnotationUsers.objects.values("task_id")
+        .annotate(count=models.Count("id"))
+        .values_list("task_id", "count")
+    )
+    entries = []
+
+    def enqueue(task_id, project_id, stage):
+        entries.append(
+            ReadyQueueEntry(task_id=task_id, project_id=project_id, stage=stage)
+        )
+        if len(entries) >= 5000:
+            ReadyQueueEntry.objects.bulk_create(entries)
+            entries.clear()
+
+    annotation_ready = Task.objects.filter(
+        task_status__in=["incomplete", "unlabeled"]
+    ).values_list("id", "project_id", "project_id__required_annotators_per_task")
+    for task_id, project_id, required in annotation_ready.iterator(chunk_size=5000):
+        if annotator_counts.get(task_id, 0) < required:
+            enqueue(task_id, project_id, 1)
+    review_ready = Task.objects.filter(
+        task_status="annotated", review_user__isnull=True
+    ).values_list("id", "project_id")
+    for task_id, project_id in review_ready.iterator(chunk_size=5000):
+        enqueue(task_id, project_id, 2)
+    supercheck_ready = Task.objects.filter(
+        task_status="reviewed", super_check_user__isnull=True
+    ).values_list("id", "project_id")
+    for task_id, project_id in supercheck_ready.iterator(chunk_size=5000):
+        enqueue(task_id, project_id, 3)
+    ReadyQueueEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("projects", "0054_alter_project_project_type"),
+        ("tasks", "0048_alter_annotation_unique_together"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReadyQueueEntry",
+            fields=[
+                (
+                    "task",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ready_queue_entry",
+                        serialize=False,
+                        to="tasks.task",
+                        verbose_name="ready_task",
+                    ),
+                ),
+                (
+                    "stage",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (1, "Annotation Only"),
+                            (2, "Review Enabled"),
+                            (3, "Supercheck Enabled"),
+                        ],
+                        default=1,
+                    ),
+                ),
+                (
+                    "enqueued_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="ready_queue_enqueued_at"
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ready_queue",
+                        to="projects.project",
+                        verbose_name="ready_queue_project",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="readyqueueentry",
+            index=models.Index(
+                fields=["project", "stage", "task"], name="ready_queue_pull_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="readyqueueentry",
+            index=models.Index(
+                fields=["project", "stage", "-enqueued_at"],
+                name="ready_queue_recent_idx",
+            ),
+        ),
+        migrations.RunPython(populate_ready_queue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 3.2.14 on 2026-10-18 11:02
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+import django.db.models.fields.json
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    # the indexes are built concurrently so that the task tables stay writable
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0049_readyqueueentry"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                fields=["project_id", "task_status"], name="task_project_status_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                fields=["project_id", "review_user", "task_status"],
+                name="task_project_review_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                fields=["project_id", "super_check_user", "task_status"],
+                name="task_project_supercheck_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("task_status__in", ["incomplete", "unlabeled"])),
+                fields=["project_id", "id"],
+                name="task_pending_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="task",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper(
+                        django.db.models.functions.comparison.Cast(
+                            django.db.models.fields.json.KeyTextTransform(
+                                "input_text", "data"
+                            ),
+                            models.TextField(),
+                        )
+                    ),
+                    name="gin_trgm_ops",
+                ),
+                name="task_input_text_trgm_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="annotation",
+            index=models.Index(
+                fields=["task", "annotation_type", "annotation_status"],
+                name="annotation_task_type_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="annotation",
+            index=models.Index(
+                fields=[
+                    "completed_by",
+                    "annotation_type",
+                    "annotation_status",
+                    "updated_at",
+                ],
+                name="annotation_user_status_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 3.2.14 on 2026-10-18 14:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("projects", "0055_delete_projecttaskrequestlock"),
+        ("tasks", "0050_task_annotation_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnnotationRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "annotation_type",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (1, "Annotator's Annotation"),
+                            (2, "Reviewer's Annotation"),
+                            (3, "Super Checker's Annotation"),
+                        ]
+                    ),
+                ),
+                (
+                    "annotation_status",
+                    models.CharField(
+                        choices=[
+                            ("unlabeled", "unlabeled"),
+                            ("labeled", "labeled"),
+                            ("skipped", "skipped"),
+                            ("draft", "draft"),
+                            ("unreviewed", "unreviewed"),
+                            ("accepted", "accepted"),
+                            ("to_be_revised", "to_be_revised"),
+                            (
+                                "accepted_with_minor_changes",
+                                "accepted_with_minor_changes",
+                            ),
+                            (
+                                "accepted_with_major_changes",
+                                "accepted_with_major_changes",
+                            ),
+                            ("unvalidated", "unvalidated"),
+                            ("validated", "validated"),
+                            ("validated_with_changes", "validated_with_changes"),
+                            ("rejected", "rejected"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="rollup_day")),
+                ("annotation_count", models.PositiveIntegerField(default=0)),
+                (
+                    "lead_time",
+                    models.FloatField(default=0.0, verbose_name="rollup_lead_time_sum"),
+                ),
+                ("word_count", models.BigIntegerField(default=0)),
+                ("segment_count", models.BigIntegerField(default=0)),
+                (
+                    "audio_duration",
+                    models.FloatField(
+                        default=0.0,
+                        help_text="Duration of the transcribed segments in seconds",
+                        verbose_name="rollup_audio_duration",
+                    ),
+                ),
+                (
+                    "raw_audio_duration",
+                    models.FloatField(
+                        default=0.0,
+                        help_text="Duration of the audio of the tasks in seconds",
+                        verbose_name="rollup_raw_audio_duration",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="rollup_updated_at"
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="annotation_rollups",
+                        to="projects.project",
+                        verbose_name="rollup_project",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="annotation_rollups",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="rollup_user",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {
+                    ("user", "project", "annotation_type", "annotation_status", "day")
+                },
+            },
+        ),
+        migrations.AddIndex(
+            model_name="annotationrollup",
+            index=models.Index(
+                fields=["project", "annotation_type", "annotation_status", "day"],
+                name="rollup_project_day_idx",
+            ),
+        ),
+    ]
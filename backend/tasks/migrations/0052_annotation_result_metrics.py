@@ -0,0 +1,63 @@
+# Generated by Django 3.2.14 on 2026-10-18 14:41
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the index is built concurrently so that the annotation table stays writable
+    atomic = False
+
+    dependencies = [
+        ("tasks", "0051_annotationrollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="annotation",
+            name="result_word_count",
+            field=models.IntegerField(
+                blank=True, null=True, verbose_name="annotation_result_word_count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="annotation",
+            name="result_segment_count",
+            field=models.IntegerField(
+                blank=True, null=True, verbose_name="annotation_result_segment_count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="annotation",
+            name="result_audio_duration",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="annotation_result_audio_duration"
+            ),
+        ),
+        migrations.AddField(
+            model_name="annotation",
+            name="result_not_null_audio_duration",
+            field=models.FloatField(
+                blank=True,
+                null=True,
+                verbose_name="annotation_result_not_null_audio_duration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="annotation",
+            name="result_metrics_computed",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether the result metrics are up to date with the result",
+                verbose_name="annotation_result_metrics_computed",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="annotation",
+            index=models.Index(
+                condition=models.Q(("result_metrics_computed", False)),
+                fields=["id"],
+                name="annotation_metrics_pending_idx",
+            ),
+        ),
+    ]
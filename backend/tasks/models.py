@@ -17,11 +17,15 @@ from label_studio_tools.core.label_config import parse_config
 from django.conf import settings
 import pandas as pd
 
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models import Q, TextField
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Upper
 
 from users.models import User
 from dataset.models import DatasetBase, DatasetInstance
-from projects.models import Project
+from projects.models import Project, PROJECT_STAGE_CHOICES, ANNOTATION_STAGE
 
 # Create your models here.
 
@@ -199,6 +203,35 @@ class Task(models.Model):
     def __str__(self):
         return str(self.id)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project_id", "task_status"], name="task_project_status_idx"
+            ),
+            models.Index(
+                fields=["project_id", "review_user", "task_status"],
+                name="task_project_review_idx",
+            ),
+            models.Index(
+                fields=["project_id", "super_check_user", "task_status"],
+                name="task_project_supercheck_idx",
+            ),
+            # tasks which are still open for annotation
+            models.Index(
+                fields=["project_id", "id"],
+                condition=Q(task_status__in=[INCOMPLETE, UNLABELED]),
+                name="task_pending_idx",
+            ),
+            # serves the `data__input_text__icontains` task search
+            GinIndex(
+                OpClass(
+                    Upper(Cast(KeyTextTransform("input_text", "data"), TextField())),
+                    name="gin_trgm_ops",
+                ),
+                name="task_input_text_trgm_idx",
+            ),
+        ]
+
 
 class Annotation(models.Model):
     """
@@ -260,15 +293,168 @@ class Annotation(models.Model):
         verbose_name="annotation_annotated_at",
         help_text=("Time when the annotation was first labeled/accepted/validated"),
     )
+    # Metrics of the result used by the reports, computed when the annotation
+    # is saved (see tasks.annotation_metrics). A metric is null when it can not
+    # be computed from the result.
+    result_word_count = models.IntegerField(
+        blank=True, null=True, verbose_name="annotation_result_word_count"
+    )
+    result_segment_count = models.IntegerField(
+        blank=True, null=True, verbose_name="annotation_result_segment_count"
+    )
+    result_audio_duration = models.FloatField(
+        blank=True, null=True, verbose_name="annotation_result_audio_duration"
+    )
+    result_not_null_audio_duration = models.FloatField(
+        blank=True,
+        null=True,
+        verbose_name="annotation_result_not_null_audio_duration",
+    )
+    result_metrics_computed = models.BooleanField(
+        default=False,
+        verbose_name="annotation_result_metrics_computed",
+        help_text=("Whether the result metrics are up to date with the result"),
+    )
 
     def __str__(self):
         return str(self.id)
 
+    def save(self, *args, **kwargs):
+        from .annotation_metrics import RESULT_METRIC_FUNCTIONS, set_result_metrics
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "result" in update_fields:
+            set_result_metrics(self)
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    *RESULT_METRIC_FUNCTIONS,
+                    "result_metrics_computed",
+                }
+        super().save(*args, **kwargs)
+
     class Meta:
         unique_together = (
             "task",
             "completed_by",
         )
+        indexes = [
+            models.Index(
+                fields=["task", "annotation_type", "annotation_status"],
+                name="annotation_task_type_idx",
+            ),
+            models.Index(
+                fields=[
+                    "completed_by",
+                    "annotation_type",
+                    "annotation_status",
+                    "updated_at",
+                ],
+                name="annotation_user_status_idx",
+            ),
+            models.Index(
+                fields=["id"],
+                condition=Q(result_metrics_computed=False),
+                name="annotation_metrics_pending_idx",
+            ),
+        ]
+
+
+class ReadyQueueEntry(models.Model):
+    """
+    Tasks of a project which are ready to be pulled in a stage.
+    A task is in at most one stage queue at a time.
+    """
+
+    task = models.OneToOneField(
+        Task,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="ready_queue_entry",
+        verbose_name="ready_task",
+    )
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="ready_queue",
+        verbose_name="ready_queue_project",
+    )
+    stage = models.PositiveSmallIntegerField(
+        choices=PROJECT_STAGE_CHOICES, default=ANNOTATION_STAGE
+    )
+    enqueued_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="ready_queue_enqueued_at"
+    )
+
+    def __str__(self):
+        return str(self.task_id)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["project", "stage", "task"], name="ready_queue_pull_idx"
+            ),
+            models.Index(
+                fields=["project", "stage", "-enqueued_at"],
+                name="ready_queue_recent_idx",
+            ),
+        ]
+
+
+class AnnotationRollup(models.Model):
+    """
+    Daily totals of the annotations of a user in a project,
+    per annotation type and status. Days are taken from `updated_at`.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="annotation_rollups",
+        verbose_name="rollup_user",
+    )
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name="annotation_rollups",
+        verbose_name="rollup_project",
+    )
+    annotation_type = models.PositiveSmallIntegerField(choices=ANNOTATION_TYPE)
+    annotation_status = models.CharField(choices=ANNOTATION_STATUS, max_length=100)
+    day = models.DateField(verbose_name="rollup_day")
+    annotation_count = models.PositiveIntegerField(default=0)
+    lead_time = models.FloatField(default=0.0, verbose_name="rollup_lead_time_sum")
+    word_count = models.BigIntegerField(default=0)
+    segment_count = models.BigIntegerField(default=0)
+    audio_duration = models.FloatField(
+        default=0.0,
+        verbose_name="rollup_audio_duration",
+        help_text=("Duration of the transcribed segments in seconds"),
+    )
+    raw_audio_duration = models.FloatField(
+        default=0.0,
+        verbose_name="rollup_raw_audio_duration",
+        help_text=("Duration of the audio of the tasks in seconds"),
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="rollup_updated_at")
+
+    def __str__(self):
+        return f"{self.user_id}-{self.project_id}-{self.annotation_status}-{self.day}"
+
+    class Meta:
+        unique_together = (
+            "user",
+            "project",
+            "annotation_type",
+            "annotation_status",
+            "day",
+        )
+        indexes = [
+            models.Index(
+                fields=["project", "annotation_type", "annotation_status", "day"],
+                name="rollup_project_day_idx",
+            ),
+        ]
 
 
 class Prediction(models.Model):
@@ -0,0 +1,188 @@
+"""
+Per project "ready queue" of the tasks which can be pulled in each stage.
+
+A task is ready in the
+    annotation stage when it is incomplete and has less annotators than required,
+    review stage when it is annotated and has no reviewer,
+    supercheck stage when it is reviewed and has no superchecker.
+
+Task saves, annotator changes and changes of the number of annotators
+required by a project keep the queue in sync through signals,
+code paths that modify tasks with `.update()` or `bulk_create()` call
+`refresh_ready_queue` themselves and `rebuild_ready_queue` (exposed through the
+`reconcile_ready_queue` command) rebuilds the queue of a project from scratch.
+"""
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_save, pre_save
+from django.dispatch import receiver
+
+from projects.models import (
+    Project,
+    ANNOTATION_STAGE,
+    REVIEW_STAGE,
+    SUPERCHECK_STAGE,
+)
+from .models import (
+    ReadyQueueEntry,
+    Task,
+    ANNOTATED,
+    INCOMPLETE,
+    REVIEWED,
+    UNLABELED,
+)
+
+READY_QUEUE_BATCH_SIZE = 5000
+
+
+def annotator_count_subquery():
+    """
+    Number of annotators assigned to the task, usable in filters
+    without grouping the outer queryset
+    """
+    return Coalesce(
+        Subquery(
+            Task.annotation_users.through.objects.filter(task_id=OuterRef("pk"))
+            .values("task_id")
+            .annotate(count=Count("id"))
+            .values("count")[:1],
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def get_ready_tasks(tasks):
+    """
+    Returns a dict of task id to (project id, stage) for the tasks of
+    the queryset which are ready to be pulled
+    """
+    ready_tasks = {}
+    annotation_ready = (
+        tasks.filter(task_status__in=[INCOMPLETE, UNLABELED])
+        .annotate(annotator_count=annotator_count_subquery())
+        .values_list(
+            "id",
+            "project_id",
+            "annotator_count",
+            "project_id__required_annotators_per_task",
+        )
+    )
+    for task_id, project_id, annotator_count, required in annotation_ready.iterator(
+        chunk_size=READY_QUEUE_BATCH_SIZE
+    ):
+        if annotator_count < required:
+            ready_tasks[task_id] = (project_id, ANNOTATION_STAGE)
+
+    review_ready = tasks.filter(
+        task_status=ANNOTATED, review_user__isnull=True
+    ).values_list("id", "project_id")
+    for task_id, project_id in review_ready.iterator(chunk_size=READY_QUEUE_BATCH_SIZE):
+        ready_tasks[task_id] = (project_id, REVIEW_STAGE)
+
+    supercheck_ready = tasks.filter(
+        task_status=REVIEWED, super_check_user__isnull=True
+    ).values_list("id", "project_id")
+    for task_id, project_id in supercheck_ready.iterator(
+        chunk_size=READY_QUEUE_BATCH_SIZE
+    ):
+        ready_tasks[task_id] = (project_id, SUPERCHECK_STAGE)
+    return ready_tasks
+
+
+def _sync_ready_queue(ready_tasks, current_entries):
+    stale_task_ids = [
+        task_id
+        for task_id, stage in current_entries.items()
+        if task_id not in ready_tasks or ready_tasks[task_id][1] != stage
+    ]
+    new_entries = [
+        ReadyQueueEntry(task_id=task_id, project_id=project_id, stage=stage)
+        for task_id, (project_id, stage) in ready_tasks.items()
+        if current_entries.get(task_id) != stage
+    ]
+    with transaction.atomic():
+        for i in range(0, len(stale_task_ids), READY_QUEUE_BATCH_SIZE):
+            ReadyQueueEntry.objects.filter(
+                task_id__in=stale_task_ids[i : i + READY_QUEUE_BATCH_SIZE]
+            ).delete()
+        ReadyQueueEntry.objects.bulk_create(
+            new_entries, batch_size=READY_QUEUE_BATCH_SIZE, ignore_conflicts=True
+        )
+    return len(stale_task_ids), len(new_entries)
+
+
+def refresh_ready_queue(task_ids):
+    """
+    Recompute the ready queue membership of the given tasks
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return
+    ready_tasks = get_ready_tasks(Task.objects.filter(id__in=task_ids))
+    current_entries = dict(
+        ReadyQueueEntry.objects.filter(task_id__in=task_ids).values_list(
+            "task_id", "stage"
+        )
+    )
+    _sync_ready_queue(ready_tasks, current_entries)
+
+
+def rebuild_ready_queue(project_id):
+    """
+    Rebuild the ready queue of a project from its tasks.
+    Returns the number of removed and added entries.
+    """
+    ready_tasks = get_ready_tasks(Task.objects.filter(project_id=project_id))
+    current_entries = dict(
+        ReadyQueueEntry.objects.filter(project_id=project_id).values_list(
+            "task_id", "stage"
+        )
+    )
+    return _sync_ready_queue(ready_tasks, current_entries)
+
+
+def get_ready_queue(project_id, stage):
+    return ReadyQueueEntry.objects.filter(project_id=project_id, stage=stage)
+
+
+@receiver(post_save, sender=Task)
+def refresh_saved_task(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_ready_queue([instance.id])
+
+
+@receiver(m2m_changed, sender=Task.annotation_users.through)
+def refresh_annotator_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        refresh_ready_queue([instance.id])
+    elif pk_set:
+        refresh_ready_queue(pk_set)
+
+
+@receiver(pre_save, sender=Project)
+def remember_required_annotators(sender, instance, raw=False, **kwargs):
+    instance._previous_required_annotators = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_required_annotators = (
+        Project.objects.filter(pk=instance.pk)
+        .values_list("required_annotators_per_task", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Project)
+def rebuild_on_required_annotators_change(
+    sender, instance, created, raw=False, **kwargs
+):
+    if raw or created:
+        return
+    previous = getattr(instance, "_previous_required_annotators", None)
+    if previous is not None and previous != instance.required_annotators_per_task:
+        project_id = instance.id
+        transaction.on_commit(lambda: rebuild_ready_queue(project_id))
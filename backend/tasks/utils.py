@@ -2,10 +2,18 @@ import os
 from requests import RequestException
 import requests
 from dotenv import load_dotenv
+from django.core.cache import cache
+
+from tasks.models import Task
+
+PROJECT_TASK_DATA_KEYS_CACHE_TTL = 24 * 60 * 60
 
 Queued_Task_name = {
+    "build_daily_report_mail": "Build Daily User Report Mail",
     "dataset.tasks.deduplicate_dataset_instance_items": "Deduplicate Dataset Instance Items",
     "dataset.tasks.upload_data_to_data_instance": "Upload Data to Dataset Instance",
+    "delete_expired_report_job_results": "Delete Expired Report Job Results",
+    "export_project_for_download_all": "Export Project for Download All Projects",
     "functions.tasks.conversation_data_machine_translation": "Generate Machine Translations for Conversation Dataset",
     "functions.tasks.generate_asr_prediction_json": "Generate ASR Predictions for SpeechConversation Dataset",
     "functions.tasks.generate_ocr_prediction_json": "Generate OCR Prediction for OCR Document Dataset",
@@ -22,11 +30,14 @@ Queued_Task_name = {
     "projects.tasks.create_parameters_for_task_creation": "Create Tasks for new Project",
     "projects.tasks.export_project_in_place": "Export Project In Place",
     "projects.tasks.export_project_new_record": "Export Project New Record",
+    "refresh_organization_task_summaries": "Refresh Organization Task Summaries",
+    "send_daily_report_mails": "Send Daily User Report Mails",
     "send_mail_task": "Daily User Mails Scheduler",
     "send_user_reports_mail": "Send User Reports Mail ",
     "workspaces.tasks.send_project_analysis_reports_mail_ws": "Send Project Analysis Reports Mail At Workspace Level",
     "workspaces.tasks.send_user_analysis_reports_mail_ws": "Send User Analysis Reports Mail At Workspace Level",
     "workspaces.tasks.send_user_reports_mail_ws": "Send User Payment Reports Mail At Workspace Level",
+    "zip_projects_for_download_all": "Zip Projects for Download All Projects",
 }
 
 
@@ -60,3 +71,21 @@ def query_flower(filters=None):
             return {"error": "Failed to retrieve tasks from Flower"}
     except RequestException as e:
         return {"error": f" failed to connect to flower API, {str(e)}"}
+
+
+def get_project_task_data_keys(project_id):
+    """
+    Searchable keys of the task data of a project, cached per project
+    """
+    cache_key = f"project_task_data_keys_{project_id}"
+    keys = cache.get(cache_key)
+    if keys is None:
+        data = (
+            Task.objects.filter(project_id=project_id)
+            .values_list("data", flat=True)
+            .first()
+        )
+        keys = list(data.keys()) if data else []
+        if keys:
+            cache.set(cache_key, keys, PROJECT_TASK_DATA_KEYS_CACHE_TTL)
+    return keys
@@ -9,7 +9,8 @@ from requests.exceptions import RequestException
 from dotenv import load_dotenv
 from tasks.utils import Queued_Task_name
 from django.utils import timezone
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger, InvalidPage
+from django.db.models import Exists, F, OuterRef, Q, Subquery
 import json
 from celery import Celery
 
@@ -30,7 +31,9 @@ from django.core.paginator import Paginator
 from drf_yasg.utils import swagger_auto_schema
 from shoonya_backend.pagination import CustomPagination
 from projects.decorators import is_org_owner
-from projects.utils import get_ocr_project_types
+from projects.membership import is_annotator, is_member, is_reviewer, is_superchecker
+from projects import metrics
+from projects.utils import get_audio_project_types, get_ocr_project_types
 from tasks.models import *
 from tasks.serializers import (
     TaskSerializer,
@@ -38,7 +41,7 @@ from tasks.serializers import (
     PredictionSerializer,
     TaskAnnotationSerializer,
 )
-from tasks.utils import query_flower
+from tasks.utils import query_flower, get_project_task_data_keys
 from notifications.views import createNotification
 from notifications.utils import get_userids_from_project_id
 
@@ -49,13 +52,11 @@ from utils.convert_result_to_chitralekha_format import (
     convert_result_to_chitralekha_format,
 )
 
-from utils.search import process_search_query
+from utils.search import process_search_query, extract_search_params
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
-from rapidfuzz.distance import Levenshtein
-import sacrebleu
 
 from utils.date_time_conversions import utc_to_ist
 from django.db import IntegrityError
@@ -79,6 +80,130 @@ def annotation_result_compare(base_annotation_result, review_annotation_result):
     return is_modified
 
 
+def build_annotation_task_rows(
+    annotation_ids, status_param, statuses, project_type, detailed
+):
+    """
+    Builds the task list rows for a page of annotations, fetching the
+    annotations and their tasks of the page in two queries.
+    """
+    annotation_rows = list(
+        Annotation.objects.filter(id__in=annotation_ids)
+        .order_by("task_id", "id")
+        .values(
+            "task_id",
+            "annotation_status",
+            "result",
+            user_mail=F("completed_by__email"),
+            parent_mail=F("parent_annotation__completed_by__email"),
+            parent_result=F("parent_annotation__result"),
+            grand_parent_mail=F(
+                "parent_annotation__parent_annotation__completed_by__email"
+            ),
+            first_annotator_result=Subquery(
+                Annotation.objects.filter(
+                    task_id=OuterRef("task_id"),
+                    annotation_type=ANNOTATOR_ANNOTATION,
+                )
+                .order_by("id")
+                .values("result")[:1]
+            ),
+        )
+    )
+    task_values = {
+        task["id"]: task
+        for task in Task.objects.filter(
+            id__in={row["task_id"] for row in annotation_rows}
+        ).values()
+    }
+    is_annotator_status = status_param == "annotation_status"
+    is_review_status = status_param == "review_status"
+    ordered_tasks = []
+    for row in annotation_rows:
+        tas = dict(task_values[row["task_id"]])
+        if tas["data"] is not None:
+            tas["data"] = dict(tas["data"])
+        tas[status_param] = row["annotation_status"]
+        tas["user_mail"] = row["user_mail"]
+        if detailed and is_review_status:
+            tas["annotator_mail"] = row["parent_mail"] or "-"
+        elif detailed and not is_annotator_status:
+            tas["reviewer_mail"] = row["parent_mail"] or "-"
+            tas["annotator_mail"] = row["grand_parent_mail"] or "-"
+        if (
+            detailed
+            and project_type == "ContextualTranslationEditing"
+            and (
+                not is_annotator_status
+                or statuses[0] in ["labeled", "draft", "to_be_revised"]
+            )
+        ):
+            if is_annotator_status:
+                output_result = row["result"]
+            elif is_review_status:
+                if statuses[0] in [
+                    "draft",
+                    "accepted",
+                    "accepted_with_major_changes",
+                    "accepted_with_minor_changes",
+                ]:
+                    output_result = row["result"]
+                elif row["parent_result"] is not None:
+                    output_result = row["parent_result"]
+                elif statuses[0] in ["unreviewed", "skipped"]:
+                    output_result = row["first_annotator_result"]
+                else:
+                    output_result = None
+            elif statuses[0] in ["draft", "validated", "Validated_with_changes"]:
+                output_result = row["result"]
+            else:
+                output_result = row["parent_result"]
+            try:
+                tas["data"]["output_text"] = output_result[0]["value"]["text"][0]
+            except:
+                tas["data"]["output_text"] = "-"
+            tas["data"].pop("machine_translation", None)
+        ordered_tasks.append(tas)
+    return ordered_tasks
+
+
+def paginated_task_list_response(
+    rows_queryset, build_rows, page_number, records, project_type
+):
+    """
+    Paginates the rows in the database and builds the response rows
+    only for the requested page.
+    """
+    final_dict = {}
+    if page_number is None:
+        ordered_tasks = build_rows(rows_queryset)
+        final_dict["total_count"] = len(ordered_tasks)
+        final_dict["result"] = ordered_tasks
+        return Response(final_dict)
+
+    try:
+        page_items = Paginator(rows_queryset, records).page(page_number)
+    except (InvalidPage, ValueError):
+        return Response(
+            {"message": "page not available"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    final_dict["total_count"] = page_items.paginator.count
+    ordered_tasks = build_rows(page_items.object_list)
+    media_field = None
+    if project_type in get_audio_project_types():
+        media_field = "audio_url"
+    elif project_type in get_ocr_project_types():
+        media_field = "image_url"
+    if media_field is not None:
+        for tas in ordered_tasks:
+            if tas["data"] and media_field in tas["data"]:
+                tas["data"] = dict(tas["data"])
+                del tas["data"][media_field]
+    final_dict["result"] = ordered_tasks
+    return Response(final_dict)
+
+
 class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
     """
     Model Viewset for Tasks. All Basic CRUD operations are covered here.
@@ -130,7 +255,7 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
         annotations = Annotation.objects.filter(task=task)
         project = Project.objects.get(id=task.project_id.id)
         annotator = request.user
-        annotators_of_this_project = project.annotators.all()
+        is_project_annotator = is_annotator(project.id, annotator)
         if (annotator.role == User.ANNOTATOR) or (
             (
                 annotator.role == User.REVIEWER
@@ -139,10 +264,10 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
                 or annotator.role == User.ORGANIZATION_OWNER
                 or annotator.role == User.ADMIN
             )
-            and (annotator in annotators_of_this_project)
+            and is_project_annotator
         ):
             if annotator != task.review_user and annotator != task.super_check_user:
-                if annotator in annotators_of_this_project:
+                if is_project_annotator:
                     ann_annotations = annotations.filter(completed_by=annotator)
                     annotations1 = list(ann_annotations)
                     if len(ann_annotations) > 0:
@@ -188,865 +313,134 @@ class TaskViewSet(viewsets.ModelViewSet, mixins.ListModelMixin):
         if "records" in dict(request.query_params):
             records = request.query_params["records"]
 
-        if "project_id" in dict(request.query_params):
-            proj_id = request.query_params["project_id"]
-            proj_objs = Project.objects.filter(id=proj_id)
-            if len(proj_objs) == 0:
-                return Response(
-                    {"message": " this project not  exist"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            proj_annotators = proj_objs[0].annotators.all()
-            proj_reviewers = proj_objs[0].annotation_reviewers.all()
-            proj_supercheckers = proj_objs[0].review_supercheckers.all()
+        if "project_id" not in dict(request.query_params):
+            return Response(
+                {"message": "please provide project_id as a query_params "},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        proj_id = request.query_params["project_id"]
+        project = Project.objects.filter(id=proj_id).first()
+        if project is None:
+            return Response(
+                {"message": " this project not  exist"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        is_manager = (
+            user.role == User.ORGANIZATION_OWNER
+            or user.role == User.WORKSPACE_MANAGER
+            or user.is_superuser
+        )
+        is_project_member = is_member(project.id, user)
+        managerial_view = is_manager and not is_project_member
+        if managerial_view and "req_user" in dict(request.query_params):
+            user_id = int(request.query_params["req_user"])
+        # managers see the annotations of all the users unless req_user is passed
+        all_users_view = managerial_view and not (
+            "req_user" in dict(request.query_params)
+        )
 
-            view = "user_view"
-            exist_req_user = 0
-            if (
-                user.role == User.ORGANIZATION_OWNER
-                or user.role == User.WORKSPACE_MANAGER
-                or user.is_superuser
-            ):
-                if not (
-                    (user in proj_annotators)
-                    or (user in proj_reviewers)
-                    or (user in proj_supercheckers)
-                ):
-                    view = "managerial_view"
-
-                    if "req_user" in dict(request.query_params):
-                        exist_req_user = 1
-                        req_user = request.query_params["req_user"]
-
-            if exist_req_user:
-                user_id = int(req_user)
-            from projects.utils import get_audio_project_types
-
-            if "annotation_status" in dict(request.query_params):
-                ann_status = request.query_params["annotation_status"]
-                ann_status = ast.literal_eval(ann_status)
-
-                if view == "managerial_view":
-                    if not ("req_user" in dict(request.query_params)):
-                        ann = Annotation.objects.filter(
-                            task__project_id_id=proj_id,
-                            annotation_status__in=ann_status,
-                            annotation_type=ANNOTATOR_ANNOTATION,
-                        )
-                        if (
-                            "rejected" in request.query_params
-                            and request.query_params["rejected"] == "True"
-                        ):
-                            tasks = Task.objects.filter(
-                                annotations__in=ann,
-                                revision_loop_count__review_count__gte=1,
-                            )
-                        else:
-                            tasks = Task.objects.filter(annotations__in=ann)
-                        tasks = tasks.distinct()
-                        # Handle search query (if any)
-                        if len(tasks):
-                            tasks = tasks.filter(
-                                **process_search_query(
-                                    request.GET, "data", list(tasks.first().data.keys())
-                                )
-                            )
-                        ann_filter1 = ann.filter(task__in=tasks).order_by("id")
-
-                        task_objs = []
-                        for an in ann_filter1:
-                            task_obj = {}
-                            task_obj["id"] = an.task_id
-                            task_obj["annotation_status"] = an.annotation_status
-                            task_obj["user_mail"] = an.completed_by.email
-                            task_objs.append(task_obj)
-                        task_objs.sort(key=lambda x: x["id"])
-                        final_dict = {}
-                        ordered_tasks = []
-                        for task_obj in task_objs:
-                            tas = Task.objects.filter(id=task_obj["id"])
-                            tas = tas.values()[0]
-                            tas["annotation_status"] = task_obj["annotation_status"]
-                            tas["user_mail"] = task_obj["user_mail"]
-                            ordered_tasks.append(tas)
-                        if page_number is not None:
-                            page_object = Paginator(ordered_tasks, records)
-                            try:
-                                final_dict["total_count"] = len(ordered_tasks)
-                                page_items = page_object.page(page_number)
-                                ordered_tasks = page_items.object_list
-                                if (
-                                    proj_objs[0].project_type
-                                    in get_audio_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "audio_url" in tas["data"]:
-                                            del data["audio_url"]
-                                        tas["data"] = data
-                                elif (
-                                    proj_objs[0].project_type in get_ocr_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "image_url" in tas["data"]:
-                                            del data["image_url"]
-                                        tas["data"] = data
-                                final_dict["result"] = ordered_tasks
-                                return Response(final_dict)
-                            except:
-                                return Response(
-                                    {"message": "page not available"},
-                                    status=status.HTTP_400_BAD_REQUEST,
-                                )
-
-                        final_dict["total_count"] = len(ordered_tasks)
-                        final_dict["result"] = ordered_tasks
-                        return Response(final_dict)
-                ann = Annotation.objects.filter(
-                    task__project_id_id=proj_id,
-                    annotation_status__in=ann_status,
-                    annotation_type=ANNOTATOR_ANNOTATION,
-                    completed_by=user_id,
+        search_filter = None
+        if extract_search_params(request.GET):
+            search_filter = process_search_query(
+                request.GET, "data", get_project_task_data_keys(proj_id)
+            )
+        rejected = (
+            "rejected" in request.query_params
+            and request.query_params["rejected"] == "True"
+        )
+        editable = None
+        if "editable" in dict(request.query_params):
+            editable = request.query_params["editable"] in ["true", "True"]
+
+        for status_param, annotation_type in (
+            ("annotation_status", ANNOTATOR_ANNOTATION),
+            ("review_status", REVIEWER_ANNOTATION),
+            ("supercheck_status", SUPER_CHECKER_ANNOTATION),
+        ):
+            if status_param not in dict(request.query_params):
+                continue
+            statuses = ast.literal_eval(request.query_params[status_param])
+            annotations = Annotation.objects.filter(
+                task__project_id_id=proj_id,
+                annotation_status__in=statuses,
+                annotation_type=annotation_type,
+            )
+            if not all_users_view:
+                annotations = annotations.filter(completed_by=user_id)
+            if rejected and annotation_type == ANNOTATOR_ANNOTATION:
+                annotations = annotations.filter(
+                    task__revision_loop_count__review_count__gte=1
                 )
-                if (
-                    "rejected" in request.query_params
-                    and request.query_params["rejected"] == "True"
-                ):
-                    tasks = Task.objects.filter(
-                        annotations__in=ann,
-                        revision_loop_count__review_count__gte=1,
-                    )
-                else:
-                    tasks = Task.objects.filter(annotations__in=ann)
-                tasks = tasks.distinct()
-                # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
-                # editable filter
-                if "editable" in dict(request.query_params):
-                    editable = False
-                    if request.query_params["editable"] in ["true", "True"]:
-                        editable = True
-                    tasks_editable_filter_list = []
-                    for task in tasks:
-                        annos = Annotation.objects.filter(
-                            task=task,
-                            annotation_type=REVIEWER_ANNOTATION,
-                        )
-                        if len(annos) == 0:
-                            tasks_editable_filter_list.append(task.id)
-                    if editable:
-                        tasks = tasks.filter(id__in=tasks_editable_filter_list)
-                    else:
-                        tasks = tasks.exclude(id__in=tasks_editable_filter_list)
-
-                ann_filter1 = ann.filter(task__in=tasks).order_by("id")
-
-                task_objs = []
-                for an in ann_filter1:
-                    task_obj = {}
-                    task_obj["id"] = an.task_id
-                    task_obj["annotation_status"] = an.annotation_status
-                    task_obj["user_mail"] = an.completed_by.email
-                    task_obj["annotation_result_json"] = an.result
-                    task_objs.append(task_obj)
-                task_objs.sort(key=lambda x: x["id"])
-                final_dict = {}
-                ordered_tasks = []
-                proj_type = proj_objs[0].project_type
-                for task_obj in task_objs:
-                    tas = Task.objects.filter(id=task_obj["id"])
-                    tas = tas.values()[0]
-                    tas["annotation_status"] = task_obj["annotation_status"]
-                    tas["user_mail"] = task_obj["user_mail"]
-                    if (ann_status[0] in ["labeled", "draft", "to_be_revised"]) and (
-                        proj_type == "ContextualTranslationEditing"
-                    ):
-                        try:
-                            tas["data"]["output_text"] = task_obj[
-                                "annotation_result_json"
-                            ][0]["value"]["text"][0]
-                        except:
-                            tas["data"]["output_text"] = "-"
-                        del tas["data"]["machine_translation"]
-                    ordered_tasks.append(tas)
-
-                if page_number is not None:
-                    page_object = Paginator(ordered_tasks, records)
-
-                    try:
-                        final_dict["total_count"] = len(ordered_tasks)
-                        page_items = page_object.page(page_number)
-                        ordered_tasks = page_items.object_list
-                        if proj_objs[0].project_type in get_audio_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "audio_url" in tas["data"]:
-                                    del data["audio_url"]
-                                tas["data"] = data
-                        elif proj_objs[0].project_type in get_ocr_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "image_url" in tas["data"]:
-                                    del data["image_url"]
-                                tas["data"] = data
-                        final_dict["result"] = ordered_tasks
-                        return Response(final_dict)
-                    except:
-                        return Response(
-                            {"message": "page not available"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                final_dict["total_count"] = len(ordered_tasks)
-                final_dict["result"] = ordered_tasks
-                return Response(final_dict)
-
-            if "review_status" in dict(request.query_params):
-                rew_status = request.query_params["review_status"]
-                rew_status = ast.literal_eval(rew_status)
-
-                if view == "managerial_view":
-                    if not ("req_user" in dict(request.query_params)):
-                        ann = Annotation.objects.filter(
-                            task__project_id_id=proj_id,
-                            annotation_status__in=rew_status,
-                            annotation_type=REVIEWER_ANNOTATION,
-                        )
-                        if (
-                            "rejected" in request.query_params
-                            and request.query_params["rejected"] == "True"
-                        ):
-                            tasks = Task.objects.filter(
-                                annotations__in=ann,
-                                revision_loop_count__super_check_count__gte=1,
-                            )
-                        else:
-                            tasks = Task.objects.filter(annotations__in=ann)
-                        tasks = tasks.distinct()
-                        # Handle search query (if any)
-                        if len(tasks):
-                            tasks = tasks.filter(
-                                **process_search_query(
-                                    request.GET, "data", list(tasks.first().data.keys())
-                                )
-                            )
-                        ann_filter1 = ann.filter(task__in=tasks).order_by("id")
-
-                        task_objs = []
-                        for an in ann_filter1:
-                            task_obj = {}
-                            task_obj["id"] = an.task_id
-                            task_obj["annotation_status"] = an.annotation_status
-                            task_obj["user_mail"] = an.completed_by.email
-                            task_objs.append(task_obj)
-                        task_objs.sort(key=lambda x: x["id"])
-                        ordered_tasks = []
-                        final_dict = {}
-                        for task_obj in task_objs:
-                            tas = Task.objects.filter(id=task_obj["id"])
-                            tas = tas.values()[0]
-                            tas["review_status"] = task_obj["annotation_status"]
-                            tas["user_mail"] = task_obj["user_mail"]
-                            ordered_tasks.append(tas)
-
-                        if page_number is not None:
-                            page_object = Paginator(ordered_tasks, records)
-
-                            try:
-                                final_dict["total_count"] = len(ordered_tasks)
-                                page_items = page_object.page(page_number)
-                                ordered_tasks = page_items.object_list
-                                if (
-                                    proj_objs[0].project_type
-                                    in get_audio_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "audio_url" in tas["data"]:
-                                            del data["audio_url"]
-                                        tas["data"] = data
-                                elif (
-                                    proj_objs[0].project_type in get_ocr_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "image_url" in tas["data"]:
-                                            del data["image_url"]
-                                        tas["data"] = data
-                                final_dict["result"] = ordered_tasks
-                                return Response(final_dict)
-                            except:
-                                return Response(
-                                    {"message": "page not available"},
-                                    status=status.HTTP_400_BAD_REQUEST,
-                                )
-
-                        final_dict["total_count"] = len(ordered_tasks)
-                        final_dict["result"] = ordered_tasks
-                        return Response(final_dict)
-
-                ann = Annotation.objects.filter(
-                    task__project_id_id=proj_id,
-                    annotation_status__in=rew_status,
-                    annotation_type=REVIEWER_ANNOTATION,
-                    completed_by=user_id,
+            elif rejected and annotation_type == REVIEWER_ANNOTATION:
+                annotations = annotations.filter(
+                    task__revision_loop_count__super_check_count__gte=1
                 )
-                if (
-                    "rejected" in request.query_params
-                    and request.query_params["rejected"] == "True"
-                ):
-                    tasks = Task.objects.filter(
-                        annotations__in=ann,
-                        revision_loop_count__super_check_count__gte=1,
-                    )
-                else:
-                    tasks = Task.objects.filter(annotations__in=ann)
-                tasks = tasks.distinct()
-                tasks = tasks.order_by("id")
-                # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
-
-                # editable filter
-                if "editable" in dict(request.query_params):
-                    editable = False
-                    if request.query_params["editable"] in ["true", "True"]:
-                        editable = True
-                    tasks_editable_filter_list = []
-                    for task in tasks:
-                        annos = Annotation.objects.filter(
-                            task=task,
-                            annotation_type=SUPER_CHECKER_ANNOTATION,
-                        )
-                        if len(annos) == 0:
-                            tasks_editable_filter_list.append(task.id)
-                    if editable:
-                        tasks = tasks.filter(id__in=tasks_editable_filter_list)
-                    else:
-                        tasks = tasks.exclude(id__in=tasks_editable_filter_list)
-
-                ann_filter1 = ann.filter(task__in=tasks).order_by("id")
-                proj_type = proj_objs[0].project_type
-
-                task_objs = []
-                for an in ann_filter1:
-                    task_obj = {}
-                    parent_annotator_object = Annotation.objects.filter(
-                        id=an.parent_annotation_id
-                    )
-                    first_annotator_object = Annotation.objects.filter(
-                        task=an.task,
-                        annotation_type=ANNOTATOR_ANNOTATION,
-                    )
-                    task_obj["id"] = an.task_id
-                    task_obj["annotation_status"] = an.annotation_status
-                    task_obj["user_mail"] = an.completed_by.email
-                    task_obj["reviewer_annotation"] = an.result
-                    task_obj["first_annotator_annotation"] = (
-                        parent_annotator_object[0].result
-                        if first_annotator_object
-                        else "-"
-                    )
-                    task_obj["parent_annotator_annotation"] = (
-                        parent_annotator_object[0].result
-                        if parent_annotator_object
-                        else "-"
-                    )
-                    task_obj["parent_annotator_mail"] = (
-                        parent_annotator_object[0].completed_by.email
-                        if parent_annotator_object
-                        else "-"
-                    )
-                    task_objs.append(task_obj)
-                task_objs.sort(key=lambda x: x["id"])
-                ordered_tasks = []
-                final_dict = {}
-                for task_obj in task_objs:
-                    tas = Task.objects.filter(id=task_obj["id"])
-                    tas = tas.values()[0]
-                    tas["review_status"] = task_obj["annotation_status"]
-                    tas["user_mail"] = task_obj["user_mail"]
-                    tas["annotator_mail"] = task_obj["parent_annotator_mail"]
-                    if proj_type == "ContextualTranslationEditing":
-                        if rew_status[0] in [
-                            "draft",
-                            "accepted",
-                            "accepted_with_major_changes",
-                            "accepted_with_minor_changes",
-                        ]:
-                            if task_obj["reviewer_annotation"] is not None:
-                                try:
-                                    tas["data"]["output_text"] = task_obj[
-                                        "reviewer_annotation"
-                                    ][0]["value"]["text"][0]
-                                except:
-                                    tas["data"]["output_text"] = "-"
-                            else:
-                                tas["data"]["output_text"] = "-"
-                        elif rew_status[0] in [
-                            "unreviewed",
-                            "skipped",
-                        ]:
-                            if task_obj["parent_annotator_annotation"] != "-":
-                                try:
-                                    tas["data"]["output_text"] = task_obj[
-                                        "parent_annotator_annotation"
-                                    ][0]["value"]["text"][0]
-                                except:
-                                    tas["data"]["output_text"] = "-"
-                            else:
-                                tas["data"]["output_text"] = task_obj[
-                                    "first_annotator_annotation"
-                                ][0]["value"]["text"][0]
-                        else:
-                            if task_obj["parent_annotator_annotation"] != "-":
-                                try:
-                                    tas["data"]["output_text"] = task_obj[
-                                        "parent_annotator_annotation"
-                                    ][0]["value"]["text"][0]
-                                except:
-                                    tas["data"]["output_text"] = "-"
-                            else:
-                                tas["data"]["output_text"] = "-"
-                        del tas["data"]["machine_translation"]
-                    ordered_tasks.append(tas)
-                if page_number is not None:
-                    page_object = Paginator(ordered_tasks, records)
-
-                    try:
-                        final_dict["total_count"] = len(ordered_tasks)
-                        page_items = page_object.page(page_number)
-                        ordered_tasks = page_items.object_list
-                        if proj_objs[0].project_type in get_audio_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "audio_url" in tas["data"]:
-                                    del data["audio_url"]
-                                tas["data"] = data
-                        elif proj_objs[0].project_type in get_ocr_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "image_url" in tas["data"]:
-                                    del data["image_url"]
-                                tas["data"] = data
-                        final_dict["result"] = ordered_tasks
-                        return Response(final_dict)
-                    except:
-                        return Response(
-                            {"message": "page not available"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                final_dict["total_count"] = len(ordered_tasks)
-                final_dict["result"] = ordered_tasks
-                return Response(final_dict)
-
-            if "supercheck_status" in dict(request.query_params):
-                supercheck_status = request.query_params["supercheck_status"]
-                supercheck_status = ast.literal_eval(supercheck_status)
-
-                if view == "managerial_view":
-                    if not ("req_user" in dict(request.query_params)):
-                        ann = Annotation.objects.filter(
-                            task__project_id_id=proj_id,
-                            annotation_status__in=supercheck_status,
-                            annotation_type=SUPER_CHECKER_ANNOTATION,
-                        )
-                        tasks = Task.objects.filter(annotations__in=ann)
-                        tasks = tasks.distinct()
-                        # Handle search query (if any)
-                        if len(tasks):
-                            tasks = tasks.filter(
-                                **process_search_query(
-                                    request.GET, "data", list(tasks.first().data.keys())
-                                )
-                            )
-                        ann_filter1 = ann.filter(task__in=tasks)
-                        task_objs = []
-                        for an in ann_filter1:
-                            task_obj = {}
-                            task_obj["id"] = an.task_id
-                            task_obj["annotation_status"] = an.annotation_status
-                            task_obj["user_mail"] = an.completed_by.email
-                            task_objs.append(task_obj)
-                        task_objs.sort(key=lambda x: x["id"])
-                        ordered_tasks = []
-                        final_dict = {}
-                        for task_obj in task_objs:
-                            tas = Task.objects.filter(id=task_obj["id"])
-                            tas = tas.values()[0]
-                            tas["supercheck_status"] = task_obj["annotation_status"]
-                            tas["user_mail"] = task_obj["user_mail"]
-                            ordered_tasks.append(tas)
-
-                        if page_number is not None:
-                            page_object = Paginator(ordered_tasks, records)
-
-                            try:
-                                final_dict["total_count"] = len(ordered_tasks)
-                                page_items = page_object.page(page_number)
-                                ordered_tasks = page_items.object_list
-                                if (
-                                    proj_objs[0].project_type
-                                    in get_audio_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "audio_url" in tas["data"]:
-                                            del data["audio_url"]
-                                        tas["data"] = data
-                                elif (
-                                    proj_objs[0].project_type in get_ocr_project_types()
-                                ):
-                                    for tas in ordered_tasks:
-                                        data = tas["data"]
-                                        if "image_url" in tas["data"]:
-                                            del data["image_url"]
-                                        tas["data"] = data
-                                final_dict["result"] = ordered_tasks
-                                return Response(final_dict)
-                            except:
-                                return Response(
-                                    {"message": "page not available"},
-                                    status=status.HTTP_400_BAD_REQUEST,
-                                )
-
-                        final_dict["total_count"] = len(ordered_tasks)
-                        final_dict["result"] = ordered_tasks
-                        return Response(final_dict)
-
-                ann = Annotation.objects.filter(
-                    task__project_id_id=proj_id,
-                    annotation_status__in=supercheck_status,
-                    annotation_type=SUPER_CHECKER_ANNOTATION,
-                    completed_by=user_id,
+            if search_filter:
+                annotations = annotations.filter(
+                    task__in=Task.objects.filter(project_id=proj_id, **search_filter)
                 )
-                tasks = Task.objects.filter(annotations__in=ann)
-                tasks = tasks.distinct()
-                # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
-                ann_filter1 = ann.filter(task__in=tasks).order_by("id")
-
-                task_objs = []
-                for an in ann_filter1:
-                    task_obj = {}
-                    reviewer_object = Annotation.objects.filter(
-                        id=an.parent_annotation_id
-                    )
-                    annotator_object = Annotation.objects.filter(
-                        id=an.parent_annotation.parent_annotation_id
-                    )
-                    task_obj["id"] = an.task_id
-                    task_obj["annotation_status"] = an.annotation_status
-                    task_obj["user_mail"] = an.completed_by.email
-                    task_obj["superchecker_annotation"] = an.result
-                    task_obj["reviewer_mail"] = (
-                        reviewer_object[0].completed_by.email
-                        if reviewer_object
-                        else "-"
-                    )
-                    task_obj["reviewer_annotation"] = (
-                        reviewer_object[0].result if reviewer_object else "-"
-                    )
-                    task_obj["annotator_mail"] = (
-                        annotator_object[0].completed_by.email
-                        if annotator_object
-                        else "-"
-                    )
-                    task_objs.append(task_obj)
-
-                task_objs.sort(key=lambda x: x["id"])
-                ordered_tasks = []
-                final_dict = {}
-                proj_type = proj_objs[0].project_type
-                for task_obj in task_objs:
-                    tas = Task.objects.filter(id=task_obj["id"])
-                    tas = tas.values()[0]
-                    tas["supercheck_status"] = task_obj["annotation_status"]
-                    tas["user_mail"] = task_obj["user_mail"]
-                    tas["reviewer_mail"] = task_obj["reviewer_mail"]
-                    tas["annotator_mail"] = task_obj["annotator_mail"]
-                    if proj_type == "ContextualTranslationEditing":
-                        if supercheck_status[0] in [
-                            "draft",
-                            "validated",
-                            "Validated_with_changes",
-                        ]:
-                            if task_obj["superchecker_annotation"] is not None:
-                                tas["data"]["output_text"] = task_obj[
-                                    "superchecker_annotation"
-                                ][0]["value"]["text"][0]
-                            else:
-                                tas["data"]["output_text"] = "-"
-                        else:
-                            if task_obj["reviewer_annotation"] != "-":
-                                tas["data"]["output_text"] = task_obj[
-                                    "reviewer_annotation"
-                                ][0]["value"]["text"][0]
-                            else:
-                                tas["data"]["output_text"] = "-"
-                        del tas["data"]["machine_translation"]
-                    ordered_tasks.append(tas)
-                if page_number is not None:
-                    page_object = Paginator(ordered_tasks, records)
-
-                    try:
-                        final_dict["total_count"] = len(ordered_tasks)
-                        page_items = page_object.page(page_number)
-                        ordered_tasks = page_items.object_list
-                        if proj_objs[0].project_type in get_audio_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "audio_url" in tas["data"]:
-                                    del data["audio_url"]
-                                tas["data"] = data
-                        elif proj_objs[0].project_type in get_ocr_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "image_url" in tas["data"]:
-                                    del data["image_url"]
-                                tas["data"] = data
-                        final_dict["result"] = ordered_tasks
-                        return Response(final_dict)
-                    except:
-                        return Response(
-                            {"message": "page not available"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                final_dict["total_count"] = len(ordered_tasks)
-                final_dict["result"] = ordered_tasks
-                return Response(final_dict)
-
-            tas_status = ["incomplete"]
-            if "task_status" in dict(request.query_params):
-                tas_status = request.query_params["task_status"]
-                tas_status = ast.literal_eval(tas_status)
-
+            # tasks without any annotation of the next stage are editable
             if (
-                user.role == User.ORGANIZATION_OWNER
-                or user.role == User.WORKSPACE_MANAGER
-                or user.is_superuser
+                editable is not None
+                and not all_users_view
+                and annotation_type != SUPER_CHECKER_ANNOTATION
             ):
-                if not ("req_user" in dict(request.query_params)):
-                    tasks = Task.objects.filter(
-                        project_id__exact=proj_id,
-                        task_status__in=tas_status,
+                has_next_stage_annotation = Exists(
+                    Annotation.objects.filter(
+                        task_id=OuterRef("task_id"),
+                        annotation_type=annotation_type + 1,
                     )
-
-                    # Handle search query (if any)
-                    if len(tasks):
-                        tasks = tasks.filter(
-                            **process_search_query(
-                                request.GET, "data", list(tasks.first().data.keys())
-                            )
-                        )
-
-                    ordered_tasks = list(tasks.values())
-                    final_dict = {}
-                    if page_number is not None:
-                        page_object = Paginator(ordered_tasks, records)
-
-                        try:
-                            final_dict["total_count"] = len(ordered_tasks)
-                            page_items = page_object.page(page_number)
-                            ordered_tasks = page_items.object_list
-                            if proj_objs[0].project_type in get_audio_project_types():
-                                for tas in ordered_tasks:
-                                    data = tas["data"]
-                                    if "audio_url" in tas["data"]:
-                                        del data["audio_url"]
-                                    tas["data"] = data
-                            elif proj_objs[0].project_type in get_ocr_project_types():
-                                for tas in ordered_tasks:
-                                    data = tas["data"]
-                                    if "image_url" in tas["data"]:
-                                        del data["image_url"]
-                                    tas["data"] = data
-                            final_dict["result"] = ordered_tasks
-                            return Response(final_dict)
-                        except:
-                            return Response(
-                                {"message": "page not available"},
-                                status=status.HTTP_400_BAD_REQUEST,
-                            )
-
-                    final_dict["total_count"] = len(ordered_tasks)
-                    final_dict["result"] = ordered_tasks
-                    return Response(final_dict)
-            proj_annotators_ids = [an.id for an in proj_annotators]
-            proj_reviewers_ids = [an.id for an in proj_reviewers]
-            proj_superchecker_ids = [an.id for an in proj_supercheckers]
-
-            if user_id in proj_annotators_ids:
-                tasks = Task.objects.filter(
-                    project_id__exact=proj_id,
-                    task_status__in=tas_status,
-                    annotation_users=user_id,
                 )
-
-                # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
-
-                ordered_tasks = list(tasks.values())
-                final_dict = {}
-                if page_number is not None:
-                    page_object = Paginator(ordered_tasks, records)
-
-                    try:
-                        final_dict["total_count"] = len(ordered_tasks)
-                        page_items = page_object.page(page_number)
-                        ordered_tasks = page_items.object_list
-                        if proj_objs[0].project_type in get_audio_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "audio_url" in tas["data"]:
-                                    del data["audio_url"]
-                                tas["data"] = data
-                        elif proj_objs[0].project_type in get_ocr_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "image_url" in tas["data"]:
-                                    del data["image_url"]
-                                tas["data"] = data
-                        final_dict["result"] = ordered_tasks
-                        return Response(final_dict)
-                    except:
-                        return Response(
-                            {"message": "page not available"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                final_dict["total_count"] = len(ordered_tasks)
-                final_dict["result"] = ordered_tasks
-                return Response(final_dict)
-
-            if user_id in proj_reviewers_ids:
-                tasks = Task.objects.filter(
-                    project_id__exact=proj_id,
-                    task_status__in=tas_status,
-                    review_user_id=user_id,
+                annotations = annotations.filter(
+                    ~has_next_stage_annotation
+                    if editable
+                    else has_next_stage_annotation
                 )
+            annotation_ids = annotations.order_by("task_id", "id").values_list(
+                "id", flat=True
+            )
 
-                # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
-
-                ordered_tasks = list(tasks.values())
-                final_dict = {}
-                if page_number is not None:
-                    page_object = Paginator(ordered_tasks, records)
-
-                    try:
-                        final_dict["total_count"] = len(ordered_tasks)
-                        page_items = page_object.page(page_number)
-                        ordered_tasks = page_items.object_list
-                        if proj_objs[0].project_type in get_audio_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "audio_url" in tas["data"]:
-                                    del data["audio_url"]
-                                tas["data"] = data
-                        elif proj_objs[0].project_type in get_ocr_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "image_url" in tas["data"]:
-                                    del data["image_url"]
-                                tas["data"] = data
-                        final_dict["result"] = ordered_tasks
-                        return Response(final_dict)
-                    except:
-                        return Response(
-                            {"message": "page not available"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                final_dict["total_count"] = len(ordered_tasks)
-                final_dict["result"] = ordered_tasks
-                return Response(final_dict)
-
-            if user_id in proj_superchecker_ids:
-                tasks = Task.objects.filter(
-                    project_id__exact=proj_id,
-                    task_status__in=tas_status,
-                    super_checker_user_id=user_id,
+            def build_rows(
+                page_annotation_ids, status_param=status_param, statuses=statuses
+            ):
+                return build_annotation_task_rows(
+                    page_annotation_ids,
+                    status_param,
+                    statuses,
+                    project.project_type,
+                    detailed=not all_users_view,
                 )
-                tasks = tasks.order_by("id")
-
-                # Handle search query (if any)
-                if len(tasks):
-                    tasks = tasks.filter(
-                        **process_search_query(
-                            request.GET, "data", list(tasks.first().data.keys())
-                        )
-                    )
-
-                ordered_tasks = list(tasks.values())
-                final_dict = {}
-                if page_number is not None:
-                    page_object = Paginator(ordered_tasks, records)
 
-                    try:
-                        final_dict["total_count"] = len(ordered_tasks)
-                        page_items = page_object.page(page_number)
-                        ordered_tasks = page_items.object_list
-                        if proj_objs[0].project_type in get_audio_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "audio_url" in tas["data"]:
-                                    del data["audio_url"]
-                                tas["data"] = data
-                        elif proj_objs[0].project_type in get_ocr_project_types():
-                            for tas in ordered_tasks:
-                                data = tas["data"]
-                                if "image_url" in tas["data"]:
-                                    del data["image_url"]
-                                tas["data"] = data
-                        final_dict["result"] = ordered_tasks
-                        return Response(final_dict)
-                    except:
-                        return Response(
-                            {"message": "page not available"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
+            return paginated_task_list_response(
+                annotation_ids, build_rows, page_number, records, project.project_type
+            )
 
-                final_dict["total_count"] = len(ordered_tasks)
-                final_dict["result"] = ordered_tasks
-                return Response(final_dict)
+        tas_status = ["incomplete"]
+        if "task_status" in dict(request.query_params):
+            tas_status = request.query_params["task_status"]
+            tas_status = ast.literal_eval(tas_status)
 
-            return Response(
-                {"message": " this user not part of this project"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        else:
-            return Response(
-                {"message": "please provide project_id as a query_params "},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        tasks = Task.objects.filter(
+            project_id__exact=proj_id, task_status__in=tas_status
+        )
+        if not (is_manager and not ("req_user" in dict(request.query_params))):
+            if is_annotator(project.id, user_id):
+                tasks = tasks.filter(annotation_users=user_id)
+            elif is_reviewer(project.id, user_id):
+                tasks = tasks.filter(review_user_id=user_id)
+            elif is_superchecker(project.id, user_id):
+                tasks = tasks.filter(super_check_user_id=user_id)
+            else:
+                return Response(
+                    {"message": " this user not part of this project"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        if search_filter:
+            tasks = tasks.filter(**search_filter)
+        tasks = tasks.order_by("id").values()
+        return paginated_task_list_response(
+            tasks, list, page_number, records, project.project_type
+        )
 
     def partial_update(self, request, pk=None):
         task_response = super().partial_update(request)
@@ -2557,9 +1951,8 @@ class SentenceOperationViewSet(viewsets.ViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
         try:
-            character_level_edit_distance = Levenshtein.distance(sentence1, sentence2)
-            normalized_character_level_edit_distance = (
-                character_level_edit_distance / len(sentence1)
+            normalized_character_level_edit_distance = metrics.character_edit_distance(
+                sentence1, sentence2
             )
 
             return Response(
@@ -2617,12 +2010,7 @@ class SentenceOperationViewSet(viewsets.ViewSet):
                             status=status.HTTP_400_BAD_REQUEST,
                         )
         try:
-            sentence1 = [sentence1]
-            sentence2 = [[sentence2]]
-
-            bleu = sacrebleu.corpus_bleu(sentence1, sentence2)
-
-            bleu_score = bleu.score
+            bleu_score = metrics.bleu_score(sentence1, sentence2)
 
             return Response(
                 {"bleu_score": str(bleu_score)},
@@ -2630,46 +2018,10 @@ class SentenceOperationViewSet(viewsets.ViewSet):
             )
         except:
             try:
-                if "end" in annotation_result1[0]["value"]:
-                    annotation_result1 = sorted(
-                        annotation_result1, key=lambda i: (i["value"]["end"])
-                    )
-                    annotation_result2 = sorted(
-                        annotation_result2, key=lambda i: (i["value"]["end"])
-                    )
-
-                annotation_result1_text = ""
-                annotation_result2_text = ""
-
-                for result in annotation_result1:
-                    if "type" in result and result["type"] == "textarea":
-                        if (
-                            "from_name" in result
-                            and result["from_name"]
-                            != "acoustic_normalised_transcribed_json"
-                        ):
-                            try:
-                                for s in result["value"]["text"]:
-                                    annotation_result1_text += s
-                            except:
-                                pass
-
-                for result in annotation_result2:
-                    if "type" in result and result["type"] == "textarea":
-                        if (
-                            "from_name" in result
-                            and result["from_name"]
-                            != "acoustic_normalised_transcribed_json"
-                        ):
-                            try:
-                                for s in result["value"]["text"]:
-                                    annotation_result2_text += s
-                            except:
-                                pass
-                bleu = sacrebleu.corpus_bleu(
-                    [annotation_result1_text], [[annotation_result2_text]]
+                bleu_score = metrics.bleu_score(
+                    metrics.get_transcription_text(annotation_result1),
+                    metrics.get_transcription_text(annotation_result2),
                 )
-                bleu_score = bleu.score
                 return Response(
                     {"bleu_score": str(bleu_score)},
                     status=status.HTTP_200_OK,
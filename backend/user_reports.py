@@ -3,330 +3,236 @@ import django
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shoonya_backend.settings")
 django.setup()
-import schedule
-import requests
-import time
-from requests.auth import HTTPBasicAuth
-import json
 from users.models import User
 from projects.models import Project
-from datetime import datetime, timedelta
-from users.views import AnalyticsViewSet
-from django.db.models import Q
+from datetime import datetime
+from users.views import summarize_user_analytics
+from tasks.annotation_rollup import ROLLUP_TOTALS
+from tasks.models import (
+    AnnotationRollup,
+    ANNOTATOR_ANNOTATION,
+    REVIEWER_ANNOTATION,
+    SUPER_CHECKER_ANNOTATION,
+    LABELED,
+    ACCEPTED,
+    ACCEPTED_WITH_MINOR_CHANGES,
+    ACCEPTED_WITH_MAJOR_CHANGES,
+    VALIDATED,
+    VALIDATED_WITH_CHANGES,
+)
+from django.db.models import Exists, OuterRef, Q
 import pandas as pd
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
 from pretty_html_table import build_table
-import numpy as np
 
-
-def calculate_reports():
-    analytics = AnalyticsViewSet()
-    proj = Project.objects.all()
-
-    use = User.objects.filter(
-        role__in=[User.ANNOTATOR, User.REVIEWER, User.SUPER_CHECKER]
+REPORT_MAIL_SUBJECT = "Daily Annotation and Review Reports"
+
+# number of mails sent at once over the SMTP connection
+REPORT_MAIL_BATCH_SIZE = 100
+
+# reports type, title, project role, annotation type and statuses of the
+# annotations counted, and colors of the project wise and total tables
+DAILY_REPORTS = (
+    (
+        "annotation",
+        "Annotation",
+        "annotators",
+        ANNOTATOR_ANNOTATION,
+        [LABELED],
+        ("orange_light", "orange_dark"),
+    ),
+    (
+        "review",
+        "Review",
+        "annotation_reviewers",
+        REVIEWER_ANNOTATION,
+        [ACCEPTED, ACCEPTED_WITH_MINOR_CHANGES, ACCEPTED_WITH_MAJOR_CHANGES],
+        ("green_light", "green_dark"),
+    ),
+    (
+        "supercheck",
+        "SuperCheck",
+        "review_supercheckers",
+        SUPER_CHECKER_ANNOTATION,
+        [VALIDATED, VALIDATED_WITH_CHANGES],
+        ("blue_light", "blue_dark"),
+    ),
+)
+
+
+def _has_role(role, **lookups):
+    return Exists(
+        getattr(Project, role).through.objects.filter(
+            **{key: OuterRef(value) for key, value in lookups.items()}
+        )
     )
 
-    all_annotators = [list(proj1.annotators.all()) for proj1 in proj]
-    all_annotators_flat_list = [num for sublist in all_annotators for num in sublist]
-    final_annot_unique_list = list(set(all_annotators_flat_list))
-    final_annot_unique_list = [
-        annot for annot in final_annot_unique_list if annot in use
-    ]
-
-    all_reviewers = [list(proj1.annotation_reviewers.all()) for proj1 in proj]
-    all_reviewers_flat_list = [num for sublist in all_reviewers for num in sublist]
-    final_reviewer_unique_list = list(set(all_reviewers_flat_list))
-    final_reviewer_unique_list = [
-        reviewer for reviewer in final_reviewer_unique_list if reviewer in use
-    ]
-
-    all_supercheckers = [list(proj1.review_supercheckers.all()) for proj1 in proj]
-    all_supercheckers_flat_list = [
-        num for sublist in all_supercheckers for num in sublist
-    ]
-    final_superchecker_unique_list = list(set(all_supercheckers_flat_list))
-    final_superchecker_unique_list = [
-        superchecker
-        for superchecker in final_superchecker_unique_list
-        if superchecker in use
-    ]
-
-    yest_date = f"{(datetime.now() - timedelta(days = 1) ):%Y-%m-%d}"
 
-    final_user_unique_list = list(
-        set(
-            final_annot_unique_list
-            + final_reviewer_unique_list
-            + final_superchecker_unique_list
+def get_report_users():
+    """
+    The users receiving the daily reports with the reports types of their
+    project roles, computed in a single query
+    """
+    users = (
+        User.objects.filter(
+            role__in=[User.ANNOTATOR, User.REVIEWER, User.SUPER_CHECKER],
+            enable_mail=True,
         )
-    )  # list of all annotators and reviewers
-
-    for user in final_user_unique_list:
-        user1 = User.objects.get(id=user.id)
-
-        if not user1.enable_mail:
-            continue
-
-        userId = user.id
-
-        if user in final_annot_unique_list:
-            data = {
-                "user_id": userId,
-                "project_type": "all",
-                "reports_type": "annotation",
-                "start_date": yest_date,
-                "end_date": yest_date,
+        .annotate(
+            **{
+                f"is_{reports_type}": _has_role(role, user_id="id")
+                for reports_type, _, role, *_ in DAILY_REPORTS
             }
-            try:
-                res = analytics.get_user_analytics(data)
-            except:
-                continue
-
-            final_data = res.data
-            if "total_summary" not in final_data or "project_summary" not in final_data:
-                continue
-
-            if len(final_data["project_summary"]) > 0:
-                df = pd.DataFrame.from_records(final_data["project_summary"])
-                blankIndex = [""] * len(df)
-                df.index = blankIndex
-                html_table_df_annotation = build_table(
-                    df,
-                    "orange_light",
-                    font_size="medium",
-                    text_align="left",
-                    width="auto",
-                    index=False,
-                )
-
-            else:
-                html_table_df_annotation = ""
-
-            df1 = pd.DataFrame.from_records(final_data["total_summary"])
-            blankIndex = [""] * len(df1)
-            df1.index = blankIndex
-
-            html_table_df1_annotation = build_table(
-                df1,
-                "orange_dark",
-                font_size="medium",
-                text_align="left",
-                width="auto",
-                index=False,
-            )
-
-        if user in final_reviewer_unique_list:
-            data = {
-                "user_id": userId,
-                "project_type": "all",
-                "reports_type": "review",
-                "start_date": yest_date,
-                "end_date": yest_date,
-            }
-            try:
-                res = analytics.get_user_analytics(data)
-            except:
-                continue
-
-            final_data = res.data
-            if "total_summary" not in final_data or "project_summary" not in final_data:
-                continue
-
-            if len(final_data["project_summary"]) > 0:
-                df = pd.DataFrame.from_records(final_data["project_summary"])
-                blankIndex = [""] * len(df)
-                df.index = blankIndex
-                html_table_df_review = build_table(
-                    df,
-                    "green_light",
-                    font_size="medium",
-                    text_align="left",
-                    width="auto",
-                    index=False,
-                )
-
-            else:
-                html_table_df_review = ""
+        )
+        .filter(Q(is_annotation=True) | Q(is_review=True) | Q(is_supercheck=True))
+        .values(
+            "id", "username", "email", "is_annotation", "is_review", "is_supercheck"
+        )
+    )
+    return [
+        {
+            "id": user["id"],
+            "username": user["username"],
+            "email": user["email"],
+            "reports_types": [
+                reports_type
+                for reports_type, *_ in DAILY_REPORTS
+                if user[f"is_{reports_type}"]
+            ],
+        }
+        for user in users
+    ]
 
-            df1 = pd.DataFrame.from_records(final_data["total_summary"])
-            blankIndex = [""] * len(df1)
-            df1.index = blankIndex
 
-            html_table_df1_review = build_table(
-                df1,
-                "green_dark",
-                font_size="medium",
-                text_align="left",
-                width="auto",
-                index=False,
+def get_daily_report_dataset(day):
+    """
+    Returns a dict of user id to a dict of reports type to the (project title,
+    project type, rollup totals) of the projects worked on during the day, in
+    which the user still has the role of the report
+    """
+    condition = Q()
+    role_flags = {}
+    for reports_type, _, role, annotation_type, statuses, _ in DAILY_REPORTS:
+        role_flags[f"in_{reports_type}"] = _has_role(
+            role, user_id="user_id", project_id="project_id"
+        )
+        condition |= Q(
+            annotation_type=annotation_type,
+            annotation_status__in=statuses,
+            **{f"in_{reports_type}": True},
+        )
+    reports_types = {
+        annotation_type: reports_type
+        for reports_type, _, _, annotation_type, *_ in DAILY_REPORTS
+    }
+    rows = (
+        AnnotationRollup.objects.filter(day=day)
+        .annotate(**role_flags)
+        .filter(condition)
+        .values(
+            "user_id",
+            "project__title",
+            "project__project_type",
+            "annotation_type",
+        )
+        .annotate(**ROLLUP_TOTALS)
+    )
+    dataset = {}
+    for row in rows:
+        user_reports = dataset.setdefault(row["user_id"], {})
+        user_reports.setdefault(reports_types[row["annotation_type"]], []).append(
+            (
+                row["project__title"],
+                row["project__project_type"],
+                {field: row[field] for field in ROLLUP_TOTALS},
             )
+        )
+    return dataset
+
+
+def _html_table(records, color):
+    df = pd.DataFrame.from_records(records)
+    df.index = [""] * len(df)
+    return build_table(
+        df,
+        color,
+        font_size="medium",
+        text_align="left",
+        width="auto",
+        index=False,
+    )
 
-        if user in final_superchecker_unique_list:
-            data = {
-                "user_id": userId,
-                "project_type": "all",
-                "reports_type": "supercheck",
-                "start_date": yest_date,
-                "end_date": yest_date,
-            }
-
-            try:
-                res = analytics.get_user_analytics(data)
-            except:
-                continue
-
-            final_data = res.data
-            if "total_summary" not in final_data or "project_summary" not in final_data:
-                continue
-
-            if len(final_data["project_summary"]) > 0:
-                df = pd.DataFrame.from_records(final_data["project_summary"])
-                blankIndex = [""] * len(df)
-                df.index = blankIndex
-                html_table_df_supercheck = build_table(
-                    df,
-                    "blue_light",
-                    font_size="medium",
-                    text_align="left",
-                    width="auto",
-                    index=False,
-                )
-
-            else:
-                html_table_df_supercheck = ""
-
-            df1 = pd.DataFrame.from_records(final_data["total_summary"])
-            blankIndex = [""] * len(df1)
-            df1.index = blankIndex
-
-            html_table_df1_supercheck = build_table(
-                df1,
-                "blue_dark",
-                font_size="medium",
-                text_align="left",
-                width="auto",
-                index=False,
-            )
 
-        message = (
-            "Dear "
-            + str(user.username)
-            + ",\n Your progress reports for "
-            + f"{(datetime.now() - timedelta(days = 1) ):%d-%m-%Y}"
-            + " are ready.\n Thanks for contributing on Shoonya!"
+def build_user_report_mail(user, user_reports, day):
+    """
+    Returns the recipient, text and html of the daily reports mail of a user,
+    given the reports of the user in the daily report dataset
+    """
+    sections = []
+    for reports_type, title, _, _, _, colors in DAILY_REPORTS:
+        if reports_type not in user["reports_types"]:
+            continue
+        summary = summarize_user_analytics(
+            user_reports.get(reports_type, []), reports_type, "all"
         )
-
-        if (
-            user in final_annot_unique_list
-            and user in final_reviewer_unique_list
-            and user in final_superchecker_unique_list
-        ):
-            email_to_send = (
-                "<p>"
-                + message
-                + "</p><br><h1><b>Annotation Reports</b></h1>"
-                + "<br><h2><b>Total Reports</b></h2>"
-                + html_table_df1_annotation
-                + "<br><h2><b>Project-wise Reports</b></h2>"
-                + html_table_df_annotation
-                + "<br><br><hr>"
-                + "</p><br><br><h1><b>Review Reports</b></h1>"
-                + "<br><h2><b>Total Reports</b></h2>"
-                + html_table_df1_review
-                + "<br><h2><b>Project-wise Reports</b></h2>"
-                + html_table_df_review
-                + "<br><br><hr>"
-                + "</p><br><br><h1><b>SuperCheck Reports</b></h1>"
-                + "<br><h2><b>Total Reports</b></h2>"
-                + html_table_df1_supercheck
-                + "<br><h2><b>Project-wise Reports</b></h2>"
-                + html_table_df_supercheck
-            )
-        elif user in final_annot_unique_list and user in final_reviewer_unique_list:
-            email_to_send = (
-                "<p>"
-                + message
-                + "</p><br><h1><b>Annotation Reports</b></h1>"
-                + "<br><h2><b>Total Reports</b></h2>"
-                + html_table_df1_annotation
-                + "<br><h2><b>Project-wise Reports</b></h2>"
-                + html_table_df_annotation
-                + "<br><br><hr>"
-                + "</p><br><br><h1><b>Review Reports</b></h1>"
-                + "<br><h2><b>Total Reports</b></h2>"
-                + html_table_df1_review
-                + "<br><h2><b>Project-wise Reports</b></h2>"
-                + html_table_df_review
-            )
-        elif user in final_annot_unique_list and user in final_superchecker_unique_list:
-            email_to_send = (
-                "<p>"
-                + message
-                + "</p><br><h1><b>Annotation Reports</b></h1>"
-                + "<br><h2><b>Total Reports</b></h2>"
-                + html_table_df1_annotation
-                + "<br><h2><b>Project-wise Reports</b></h2>"
-                + html_table_df_annotation
-                + "<br><br><hr>"
-                + "</p><br><br><h1><b>SuperCheck Reports</b></h1>"
-                + "<br><h2><b>Total Reports</b></h2>"
-                + html_table_df1_supercheck
-                + "<br><h2><b>Project-wise Reports</b></h2>"
-                + html_table_df_supercheck
-            )
-        elif (
-            user in final_reviewer_unique_list
-            and user in final_superchecker_unique_list
-        ):
-            email_to_send = (
-                "<p>"
-                + message
-                + "</p><br><h1><b>Review Reports</b></h1>"
-                + "<br><h2><b>Total Reports</b></h2>"
-                + html_table_df1_review
-                + "<br><h2><b>Project-wise Reports</b></h2>"
-                + html_table_df_review
-                + "<br><br><hr>"
-                + "</p><br><br><h1><b>SuperCheck Reports</b></h1>"
+        project_table = (
+            _html_table(summary["project_summary"], colors[0])
+            if summary["project_summary"]
+            else ""
+        )
+        total_table = _html_table(summary["total_summary"], colors[1])
+        sections.append((title, total_table, project_table))
+
+    message = (
+        "Dear "
+        + str(user["username"])
+        + ",\n Your progress reports for "
+        + f"{datetime.strptime(day, '%Y-%m-%d'):%d-%m-%Y}"
+        + " are ready.\n Thanks for contributing on Shoonya!"
+    )
+    if len(sections) == 1:
+        _, total_table, project_table = sections[0]
+        html_message = (
+            "<p>"
+            + message
+            + "</p><br><h><b>Total Reports</b></h>"
+            + total_table
+            + "<br><h><b>Project-wise Reports</b></h>"
+            + project_table
+        )
+    else:
+        html_message = "<p>" + message
+        for index, (title, total_table, project_table) in enumerate(sections):
+            html_message += (
+                ("<br><br><hr></p><br><br>" if index else "</p><br>")
+                + f"<h1><b>{title} Reports</b></h1>"
                 + "<br><h2><b>Total Reports</b></h2>"
-                + html_table_df1_supercheck
+                + total_table
                 + "<br><h2><b>Project-wise Reports</b></h2>"
-                + html_table_df_supercheck
-            )
-        elif user in final_annot_unique_list:
-            email_to_send = (
-                "<p>"
-                + message
-                + "</p><br><h><b>Total Reports</b></h>"
-                + html_table_df1_annotation
-                + "<br><h><b>Project-wise Reports</b></h>"
-                + html_table_df_annotation
-            )
-        elif user in final_superchecker_unique_list:
-            email_to_send = (
-                "<p>"
-                + message
-                + "</p><br><h><b>Total Reports</b></h>"
-                + html_table_df1_supercheck
-                + "<br><h><b>Project-wise Reports</b></h>"
-                + html_table_df_supercheck
+                + project_table
             )
-        else:
-            email_to_send = (
-                "<p>"
-                + message
-                + "</p><br><h><b>Total Reports</b></h>"
-                + html_table_df1_review
-                + "<br><h><b>Project-wise Reports</b></h>"
-                + html_table_df_review
-            )
-
-        send_mail(
-            "Daily Annotation and Review Reports",
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            html_message=email_to_send,
-        )
+    return {"to": user["email"], "message": message, "html_message": html_message}
+
+
+def send_report_mails(mails):
+    """
+    Send the report mails in batches over a single SMTP connection,
+    returns the number of mails sent
+    """
+    sent = 0
+    with get_connection() as connection:
+        for start in range(0, len(mails), REPORT_MAIL_BATCH_SIZE):
+            messages = []
+            for mail in mails[start : start + REPORT_MAIL_BATCH_SIZE]:
+                email = EmailMultiAlternatives(
+                    REPORT_MAIL_SUBJECT,
+                    mail["message"],
+                    settings.DEFAULT_FROM_EMAIL,
+                    [mail["to"]],
+                    connection=connection,
+                )
+                email.attach_alternative(mail["html_message"], "text/html")
+                messages.append(email)
+            sent += connection.send_messages(messages) or 0
+    return sent
@@ -1,11 +1,50 @@
-from celery import shared_task
+import logging
+from datetime import datetime, timedelta
+
+from celery import chord, shared_task
 from django.conf import settings
 from django.core.mail import send_mail
 from celery.schedules import crontab
 from shoonya_backend.celery import celery_app
-from user_reports import calculate_reports
+from user_reports import (
+    build_user_report_mail,
+    get_daily_report_dataset,
+    get_report_users,
+    send_report_mails,
+)
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task(name="send_mail_task")
 def send_mail_task():
-    calculate_reports()
+    """
+    Mail the reports of the previous day to every annotator, reviewer and
+    superchecker: the mails of the users are built in parallel from the same
+    dataset and sent together once they are all ready, a mail which cannot be
+    built is skipped
+    """
+    day = f"{datetime.now() - timedelta(days=1):%Y-%m-%d}"
+    users = get_report_users()
+    if not users:
+        return
+    dataset = get_daily_report_dataset(day)
+    chord(
+        build_daily_report_mail.s(user, dataset.get(user["id"], {}), day)
+        for user in users
+    )(send_daily_report_mails.s())
+
+
+@shared_task(name="build_daily_report_mail", queue="reports")
+def build_daily_report_mail(user, user_reports, day):
+    # a failure would keep the chord from sending the mails of the other users
+    try:
+        return build_user_report_mail(user, user_reports, day)
+    except Exception:
+        logger.exception("Could not build the daily reports mail of %s", user["id"])
+        return None
+
+
+@shared_task(name="send_daily_report_mails", queue="reports")
+def send_daily_report_mails(mails):
+    return send_report_mails([mail for mail in mails if mail is not None])
@@ -37,7 +37,14 @@ from tasks.models import (
     ANNOTATOR_ANNOTATION,
     REVIEWER_ANNOTATION,
     SUPER_CHECKER_ANNOTATION,
+    ACCEPTED,
+    ACCEPTED_WITH_MINOR_CHANGES,
+    ACCEPTED_WITH_MAJOR_CHANGES,
+    LABELED,
+    VALIDATED,
+    VALIDATED_WITH_CHANGES,
 )
+from tasks.annotation_rollup import ROLLUP_TOTALS, get_annotation_rollups
 from workspaces.models import Workspace
 from projects.models import Project
 from tasks.models import Annotation
@@ -71,6 +78,130 @@ regex = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"
 load_dotenv()
 
 
+def summarize_user_analytics(project_totals, reports_type, project_type):
+    """
+    Total and project wise summaries of the work of a user for a report type,
+    given the (project title, project type, rollup totals) of its projects
+    """
+    review_reports = reports_type == "review"
+    supercheck_reports = reports_type == "supercheck"
+    project_type_lower = project_type.lower()
+    all_annotated_lead_time = 0
+    all_annotated_lead_time_count = 0
+    total_annotated_tasks_count = 0
+    all_tasks_word_count = 0
+    all_projects_total_duration = 0
+    project_wise_summary = []
+    for project_name, proj_type, totals in project_totals:
+        is_textual_project = False if proj_type in get_audio_project_types() else True
+
+        annotated_tasks_count = totals["annotation_count"]
+        total_annotated_tasks_count += annotated_tasks_count
+
+        avg_lead_time = 0
+        all_annotated_lead_time += totals["lead_time"]
+        if annotated_tasks_count > 0:
+            avg_lead_time = round(totals["lead_time"] / annotated_tasks_count, 2)
+
+        total_word_count = 0
+        if "OCRTranscription" in proj_type or is_textual_project:
+            total_word_count = totals["word_count"]
+        all_tasks_word_count += total_word_count
+
+        total_duration = "00:00:00"
+        if proj_type in get_audio_project_types():
+            total_duration = convert_seconds_to_hours(totals["audio_duration"])
+            all_projects_total_duration += totals["audio_duration"]
+
+        result = {
+            "Project Name": project_name,
+            (
+                "Reviewed Tasks"
+                if review_reports
+                else ("SuperChecked Tasks" if supercheck_reports else "Annotated Tasks")
+            ): annotated_tasks_count,
+            "Word Count": total_word_count,
+            "Total Segments Duration": total_duration,
+            (
+                "Avg Review Time (sec)"
+                if review_reports
+                else (
+                    "Avg SuperCheck Time (sec)"
+                    if supercheck_reports
+                    else "Avg Annotation Time (sec)"
+                )
+            ): avg_lead_time,
+        }
+
+        if proj_type in get_audio_project_types():
+            del result["Word Count"]
+        elif is_textual_project:
+            del result["Total Segments Duration"]
+        else:
+            del result["Word Count"]
+            del result["Total Segments Duration"]
+
+        if annotated_tasks_count > 0:
+            project_wise_summary.append(result)
+
+    project_wise_summary = sorted(
+        project_wise_summary,
+        key=lambda x: x[
+            (
+                "Reviewed Tasks"
+                if review_reports
+                else ("SuperChecked Tasks" if supercheck_reports else "Annotated Tasks")
+            )
+        ],
+        reverse=True,
+    )
+
+    if total_annotated_tasks_count > 0:
+        all_annotated_lead_time_count = (
+            all_annotated_lead_time / total_annotated_tasks_count
+        )
+        all_annotated_lead_time_count = round(all_annotated_lead_time_count, 2)
+
+    # total_summary = {}
+    # if is_translation_project or project_type == "SemanticTextualSimilarity_Scale5":
+
+    total_result = {
+        (
+            "Reviewed Tasks"
+            if review_reports
+            else ("SuperChecked Tasks" if supercheck_reports else "Annotated Tasks")
+        ): total_annotated_tasks_count,
+        "Word Count": all_tasks_word_count,
+        "Total Segments Duration": convert_seconds_to_hours(
+            all_projects_total_duration
+        ),
+        (
+            "Avg Review Time (sec)"
+            if review_reports
+            else (
+                "Avg SuperCheck Time (sec)"
+                if supercheck_reports
+                else "Avg Annotation Time (sec)"
+            )
+        ): round(all_annotated_lead_time_count, 2),
+    }
+    is_textual_project = False if project_type in get_audio_project_types() else True
+    if project_type_lower != "all" and project_type in get_audio_project_types():
+        del total_result["Word Count"]
+    elif project_type_lower != "all" and is_textual_project:
+        del total_result["Total Segments Duration"]
+    elif project_type_lower != "all":
+        del total_result["Word Count"]
+        del total_result["Total Segments Duration"]
+
+    total_summary = [total_result]
+
+    return {
+        "total_summary": total_summary,
+        "project_summary": project_wise_summary,
+    }
+
+
 class InviteViewSet(viewsets.ViewSet):
     @swagger_auto_schema(request_body=InviteGenerationSerializer)
     @permission_classes((IsAuthenticated,))
@@ -1128,11 +1259,6 @@ class AnalyticsViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        project_type_lower = project_type.lower()
-        is_textual_project = (
-            False if project_type in get_audio_project_types() else True
-        )  # flag for distinguishing between textual and audio projects
-
         try:
             user = User.objects.get(id=user_id)
         except User.DoesNotExist:
@@ -1171,235 +1297,49 @@ class AnalyticsViewSet(viewsets.ViewSet):
                     project_type=project_type,
                 )
 
-        all_annotated_lead_time_list = []
-        all_annotated_lead_time_count = 0
-        total_annotated_tasks_count = 0
-        all_tasks_word_count = 0
-        all_projects_total_duration = 0
-        project_wise_summary = []
-        for proj in project_objs:
-            project_name = proj.title
-            project_type = proj.project_type
-            is_textual_project = (
-                False if project_type in get_audio_project_types() else True
-            )
-            annotated_labeled_tasks = []
-            if review_reports:
-                labeld_tasks_objs = Task.objects.filter(
-                    Q(project_id=proj.id)
-                    & Q(review_user=user_id)
-                    & Q(
-                        task_status__in=[
-                            "reviewed",
-                            "exported",
-                            "super_checked",
-                        ]
-                    )
-                )
-
-                annotated_task_ids = list(
-                    labeld_tasks_objs.values_list("id", flat=True)
-                )
-                annotated_labeled_tasks = Annotation.objects.filter(
-                    task_id__in=annotated_task_ids,
-                    annotation_type=REVIEWER_ANNOTATION,
-                    updated_at__range=[start_date, end_date],
-                    completed_by=user_id,
-                ).exclude(annotation_status__in=["to_be_revised", "draft", "skipped"])
-            elif supercheck_reports:
-                labeld_tasks_objs = Task.objects.filter(
-                    Q(project_id=proj.id)
-                    & Q(super_check_user=user_id)
-                    & Q(
-                        task_status__in=[
-                            "exported",
-                            "super_checked",
-                        ]
-                    )
-                )
-
-                annotated_task_ids = list(
-                    labeld_tasks_objs.values_list("id", flat=True)
-                )
-                annotated_labeled_tasks = Annotation.objects.filter(
-                    task_id__in=annotated_task_ids,
-                    annotation_type=SUPER_CHECKER_ANNOTATION,
-                    updated_at__range=[start_date, end_date],
-                    completed_by=user_id,
-                )
-            else:
-                labeld_tasks_objs = Task.objects.filter(
-                    Q(project_id=proj.id)
-                    & Q(annotation_users=user_id)
-                    & Q(
-                        task_status__in=[
-                            "annotated",
-                            "reviewed",
-                            "exported",
-                            "super_checked",
-                        ]
-                    )
-                )
-                annotated_task_ids = list(
-                    labeld_tasks_objs.values_list("id", flat=True)
-                )
-                annotated_labeled_tasks = Annotation.objects.filter(
-                    task_id__in=annotated_task_ids,
-                    annotation_type=ANNOTATOR_ANNOTATION,
-                    updated_at__range=[start_date, end_date],
-                    completed_by=user_id,
-                )
-
-            annotated_tasks_count = annotated_labeled_tasks.count()
-            total_annotated_tasks_count += annotated_tasks_count
-
-            avg_lead_time = 0
-            lead_time_annotated_tasks = [
-                eachtask.lead_time for eachtask in annotated_labeled_tasks
+        if review_reports:
+            annotation_type = REVIEWER_ANNOTATION
+            annotation_statuses = [
+                ACCEPTED,
+                ACCEPTED_WITH_MINOR_CHANGES,
+                ACCEPTED_WITH_MAJOR_CHANGES,
             ]
-            all_annotated_lead_time_list.extend(lead_time_annotated_tasks)
-            if len(lead_time_annotated_tasks) > 0:
-                avg_lead_time = sum(lead_time_annotated_tasks) / len(
-                    lead_time_annotated_tasks
-                )
-                avg_lead_time = round(avg_lead_time, 2)
-
-            total_word_count = 0
-            if "OCRTranscription" in project_type:
-                for each_anno in annotated_labeled_tasks:
-                    total_word_count += ocr_word_count(each_anno.result)
-            elif is_textual_project:
-                total_word_count_list = []
-                for each_task in annotated_labeled_tasks:
-                    try:
-                        total_word_count_list.append(each_task.task.data["word_count"])
-                    except:
-                        pass
-
-                total_word_count = sum(total_word_count_list)
-            all_tasks_word_count += total_word_count
-
-            total_duration = "00:00:00"
-            if project_type in get_audio_project_types():
-                total_duration_list = []
-                for each_task in annotated_labeled_tasks:
-                    try:
-                        total_duration_list.append(
-                            get_audio_transcription_duration(each_task.result)
-                        )
-                    except:
-                        pass
-                total_duration = convert_seconds_to_hours(sum(total_duration_list))
-                all_projects_total_duration += sum(total_duration_list)
-
-            result = {
-                "Project Name": project_name,
-                (
-                    "Reviewed Tasks"
-                    if review_reports
-                    else (
-                        "SuperChecked Tasks"
-                        if supercheck_reports
-                        else "Annotated Tasks"
-                    )
-                ): annotated_tasks_count,
-                "Word Count": total_word_count,
-                "Total Segments Duration": total_duration,
-                (
-                    "Avg Review Time (sec)"
-                    if review_reports
-                    else (
-                        "Avg SuperCheck Time (sec)"
-                        if supercheck_reports
-                        else "Avg Annotation Time (sec)"
-                    )
-                ): avg_lead_time,
-            }
-
-            if project_type in get_audio_project_types():
-                del result["Word Count"]
-            elif is_textual_project:
-                del result["Total Segments Duration"]
-            else:
-                del result["Word Count"]
-                del result["Total Segments Duration"]
-
-            if (
-                result[
-                    (
-                        "Reviewed Tasks"
-                        if review_reports
-                        else (
-                            "SuperChecked Tasks"
-                            if supercheck_reports
-                            else "Annotated Tasks"
-                        )
-                    )
-                ]
-                > 0
-            ):
-                project_wise_summary.append(result)
+        elif supercheck_reports:
+            annotation_type = SUPER_CHECKER_ANNOTATION
+            annotation_statuses = [VALIDATED, VALIDATED_WITH_CHANGES]
+        else:
+            annotation_type = ANNOTATOR_ANNOTATION
+            annotation_statuses = [LABELED]
+        projects = {
+            proj.id: proj for proj in project_objs.only("id", "title", "project_type")
+        }
+        project_totals = (
+            get_annotation_rollups(
+                user_id,
+                list(projects),
+                annotation_type,
+                annotation_statuses,
+                start_date,
+                end_date,
+            )
+            .values("project_id")
+            .annotate(**ROLLUP_TOTALS)
+        )
 
-        project_wise_summary = sorted(
-            project_wise_summary,
-            key=lambda x: x[
+        return Response(
+            summarize_user_analytics(
                 (
-                    "Reviewed Tasks"
-                    if review_reports
-                    else (
-                        "SuperChecked Tasks"
-                        if supercheck_reports
-                        else "Annotated Tasks"
+                    (
+                        projects[totals["project_id"]].title,
+                        projects[totals["project_id"]].project_type,
+                        totals,
                     )
-                )
-            ],
-            reverse=True,
-        )
-
-        if total_annotated_tasks_count > 0:
-            all_annotated_lead_time_count = (
-                sum(all_annotated_lead_time_list) / total_annotated_tasks_count
+                    for totals in project_totals
+                ),
+                reports_type,
+                project_type,
             )
-            all_annotated_lead_time_count = round(all_annotated_lead_time_count, 2)
-
-        # total_summary = {}
-        # if is_translation_project or project_type == "SemanticTextualSimilarity_Scale5":
-
-        total_result = {
-            (
-                "Reviewed Tasks"
-                if review_reports
-                else ("SuperChecked Tasks" if supercheck_reports else "Annotated Tasks")
-            ): total_annotated_tasks_count,
-            "Word Count": all_tasks_word_count,
-            "Total Segments Duration": convert_seconds_to_hours(
-                all_projects_total_duration
-            ),
-            (
-                "Avg Review Time (sec)"
-                if review_reports
-                else (
-                    "Avg SuperCheck Time (sec)"
-                    if supercheck_reports
-                    else "Avg Annotation Time (sec)"
-                )
-            ): round(all_annotated_lead_time_count, 2),
-        }
-        if project_type_lower != "all" and project_type in get_audio_project_types():
-            del total_result["Word Count"]
-        elif project_type_lower != "all" and is_textual_project:
-            del total_result["Total Segments Duration"]
-        elif project_type_lower != "all":
-            del total_result["Word Count"]
-            del total_result["Total Segments Duration"]
-
-        total_summary = [total_result]
-
-        final_result = {
-            "total_summary": total_summary,
-            "project_summary": project_wise_summary,
-        }
-        return Response(final_result)
+        )
 
     @action(
         detail=True,
@@ -0,0 +1,181 @@
+"""
+Columnar (Parquet and Arrow IPC) exports.
+
+The rows of an export are converted to record batches of a fixed schema,
+COLUMNAR_ROW_GROUP_SIZE rows at a time, and every batch is written as a row
+group of the Parquet file or a record batch of the Arrow file and sent right
+away, so the memory used does not depend on the size of the export. JSON
+values are written as JSON strings, the other values keep their type.
+"""
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+COLUMNAR_ROW_GROUP_SIZE = 1000
+
+# export type: (file extension, content type)
+COLUMNAR_EXPORT_TYPES = {
+    "PARQUET": ("parquet", "application/vnd.apache.parquet"),
+    "ARROW": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# arrow types of the model fields, by their internal type, other fields
+# (decimal fields aside) are written as strings
+FIELD_TYPES = {
+    "AutoField": pa.int32(),
+    "BigAutoField": pa.int64(),
+    "BigIntegerField": pa.int64(),
+    "BooleanField": pa.bool_(),
+    "DateField": pa.date32(),
+    "DateTimeField": pa.timestamp("us", tz="UTC"),
+    "FloatField": pa.float64(),
+    "IntegerField": pa.int32(),
+    "PositiveIntegerField": pa.int64(),
+    "PositiveSmallIntegerField": pa.int32(),
+    "SmallIntegerField": pa.int16(),
+    "TimeField": pa.time64("us"),
+}
+
+
+class _StreamSink:
+    """
+    Write-only file keeping what is written until it is taken
+    """
+
+    closed = False
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = bytes(self.buffer)
+        self.buffer = bytearray()
+        return data
+
+
+def is_columnar_export_type(export_type):
+    return export_type.upper() in COLUMNAR_EXPORT_TYPES
+
+
+def to_json_string(value):
+    """
+    A JSON value as written to a string column
+    """
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def get_model_field_type(field):
+    if field.get_internal_type() == "JSONField":
+        return pa.string()
+    if field.is_relation:
+        return get_model_field_type(field.target_field)
+    if field.get_internal_type() == "DecimalField":
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    return FIELD_TYPES.get(field.get_internal_type(), pa.string())
+
+
+def is_string_field(field):
+    """
+    Whether the values of the field are written as strings, JSON values aside
+    """
+    return (
+        field.get_internal_type() != "JSONField"
+        and get_model_field_type(field) == pa.string()
+    )
+
+
+def get_model_fields(model, exclude=()):
+    """
+    The concrete fields of the model exported in its columnar exports
+    """
+    return [field for field in model._meta.concrete_fields if field.name not in exclude]
+
+
+def get_model_schema(fields):
+    return pa.schema(
+        [pa.field(field.name, get_model_field_type(field)) for field in fields]
+    )
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_columnar_export(
+    schema, rows, export_type, row_group_size=COLUMNAR_ROW_GROUP_SIZE
+):
+    """
+    Yields the pieces of the export of the rows (dicts of column to value) in
+    one of the COLUMNAR_EXPORT_TYPES
+    """
+    sink = _StreamSink()
+    output = pa.PythonFile(sink, mode="w")
+    if export_type.upper() == "PARQUET":
+        writer = pq.ParquetWriter(output, schema, compression="snappy")
+        write_batch = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        writer = pa.ipc.new_file(output, schema)
+        write_batch = writer.write_batch
+    for chunk in _chunks(rows, row_group_size):
+        write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+        data = sink.take()
+        if data:
+            yield data
+    writer.close()
+    yield sink.take()
+
+
+def iter_queryset_rows(queryset, fields, chunk_size=COLUMNAR_ROW_GROUP_SIZE):
+    """
+    Yields the rows of the model instances of the queryset, read in chunks of
+    increasing primary keys
+    """
+    json_fields = [
+        field.name for field in fields if field.get_internal_type() == "JSONField"
+    ]
+    # the values of the other fields written as strings may be of any type
+    string_fields = [field.name for field in fields if is_string_field(field)]
+    values = {field.attname: field.name for field in fields}
+    queryset = queryset.order_by("pk")
+    last_pk = None
+    while True:
+        chunk_queryset = (
+            queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        )
+        chunk = list(chunk_queryset.values("pk", *values)[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1]["pk"]
+        for item in chunk:
+            row = {name: item[attname] for attname, name in values.items()}
+            for name in json_fields:
+                row[name] = to_json_string(row[name])
+            for name in string_fields:
+                if row[name] is not None:
+                    row[name] = str(row[name])
+            yield row
@@ -6,7 +6,9 @@ from django.conf import settings
 from django.core.mail import EmailMessage
 from organizations.models import Organization
 from tasks.models import Task
-from django.db.models import Q
+from django.db.models import Count, Q
+from django.db.models.fields.json import KeyTransform
+import numpy as np
 
 from tasks.models import (
     Annotation,
@@ -16,9 +18,14 @@ from tasks.models import (
     ACCEPTED,
     ACCEPTED_WITH_MINOR_CHANGES,
     ACCEPTED_WITH_MAJOR_CHANGES,
+    LABELED,
+    TO_BE_REVISED,
+    SKIPPED,
+    DRAFT,
     VALIDATED,
     VALIDATED_WITH_CHANGES,
 )
+from tasks.annotation_rollup import get_annotation_rollups, get_rollup_totals
 from .models import Workspace
 from users.models import User
 from projects.models import Project, ANNOTATION_STAGE, REVIEW_STAGE, SUPERCHECK_STAGE
@@ -31,19 +38,14 @@ from projects.utils import (
     get_audio_segments_count,
     ocr_word_count,
 )
-from tasks.views import SentenceOperationViewSet
+from projects.metrics import compute_text_metrics, get_transcription_text
 
 
-def get_all_annotation_reports(
-    proj_ids,
-    userid,
-    project_type,
-    start_date=None,
-    end_date=None,
-):
-    user = User.objects.get(pk=userid)
-    participation_type = user.participation_type
-    participation_type = (
+REPORT_BATCH_SIZE = 2000
+
+
+def get_participation_type_name(participation_type):
+    return (
         "Full Time"
         if participation_type == 1
         else "Part Time"
@@ -52,156 +54,218 @@ def get_all_annotation_reports(
         if participation_type == 4
         else "N/A"
     )
-    role = get_role_name(user.role)
-    userName = user.username
-    email = user.email
-    user_lang = user.languages
 
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status="labeled",
-            task__project_id__in=proj_ids,
-            annotation_type=ANNOTATOR_ANNOTATION,
-            completed_by=userid,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status="labeled",
-            task__project_id__in=proj_ids,
-            annotation_type=ANNOTATOR_ANNOTATION,
-            completed_by=userid,
-            updated_at__range=[start_date, end_date],
-        )
-    (
-        number_of_tasks_contributed_for_ar_wer,
-        number_of_tasks_contributed_for_as_wer,
-        number_of_tasks_contributed_for_ar_bleu,
-    ) = (
-        0,
-        0,
-        0,
-    )
-    ar_wer_score, as_wer_score, ar_bleu_score = 0, 0, 0
-    tasks_and_rejection_count_map_ar, number_of_tasks_that_has_review_annotations = (
-        {},
-        0,
-    )
-    for ann in submitted_tasks:
-        all_annotations = Annotation.objects.filter(task_id=ann.task_id)
-        try:
-            task = ann.task
-            revision_loop_count = task.revision_loop_count
-            r_count = revision_loop_count["review_count"]
-            tasks_and_rejection_count_map_ar[r_count] = (
-                tasks_and_rejection_count_map_ar.get(r_count, 0) + 1
-            )
-        except Exception as e:
-            pass
-        ar_done, as_done = False, False
-        ann_ann, rev_ann, sup_ann = "", "", ""
-        for a in all_annotations:
-            if a.annotation_type == REVIEWER_ANNOTATION and a.annotation_status in [
-                ACCEPTED,
-                ACCEPTED_WITH_MINOR_CHANGES,
-                ACCEPTED_WITH_MAJOR_CHANGES,
-            ]:
-                rev_ann = a
-            elif (
-                a.annotation_type == SUPER_CHECKER_ANNOTATION
-                and a.annotation_status in [VALIDATED, VALIDATED_WITH_CHANGES]
-            ):
-                sup_ann = a
-            elif a.annotation_type == ANNOTATOR_ANNOTATION:
-                ann_ann = a
-            if a.annotation_type == REVIEWER_ANNOTATION:
-                number_of_tasks_that_has_review_annotations += 1
-            if ann_ann and rev_ann and not ar_done:
-                try:
-                    ar_wer_score += calculate_word_error_rate_between_two_audio_transcription_annotation(
-                        rev_ann.result, ann_ann.result, project_type
-                    )
-                    number_of_tasks_contributed_for_ar_wer += 1
-                    ar_done = True
-                except Exception as e:
-                    pass
-                try:
-                    s1 = SentenceOperationViewSet()
-                    sampleRequest = {
-                        "annotation_result1": rev_ann.result,
-                        "annotation_result2": ann_ann.result,
-                    }
-                    ar_bleu_score += float(
-                        s1.calculate_bleu_score(sampleRequest).data["bleu_score"]
-                    )
-                    number_of_tasks_contributed_for_ar_bleu += 1
-                except Exception as e:
-                    pass
-            if ann_ann and sup_ann and not as_done:
-                try:
-                    as_wer_score += calculate_word_error_rate_between_two_audio_transcription_annotation(
-                        sup_ann.result, ann_ann.result, project_type
-                    )
-                    number_of_tasks_contributed_for_as_wer += 1
-                    as_done = True
-                except Exception as e:
-                    pass
 
-    submitted_tasks_count = submitted_tasks.count()
+def get_annotation_text(result):
+    """
+    Transcription text of an annotation result, None if it can not be compared
+    """
+    try:
+        return get_transcription_text(result)
+    except Exception:
+        return None
+
 
-    project_type_lower = project_type.lower()
-    is_translation_project = True if "translation" in project_type_lower else False
-    is_CT_OR_CTE = (
-        True
-        if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
-        else False
+def score_annotation_pairs(pairs, with_bleu=False):
+    """
+    Word error rate (and bleu score) of every pair of annotation texts, the
+    first text of a pair being the one of the later stage.
+    Returns the sum and the number of scored pairs of each metric.
+    """
+    pairs = [
+        (text1, text2)
+        for text1, text2 in pairs
+        if text1 is not None and text2 is not None
+    ]
+    scores = compute_text_metrics(pairs, ("wer", "bleu") if with_bleu else ("wer",))
+    wer_scores = scores["wer"][~np.isnan(scores["wer"])]
+    bleu_scores = scores.get("bleu", np.empty(0))
+    bleu_scores = bleu_scores[~np.isnan(bleu_scores)]
+    return (
+        float(wer_scores.sum()),
+        len(wer_scores),
+        float(bleu_scores.sum()),
+        len(bleu_scores),
     )
-    total_audio_duration_list = []
-    total_raw_audio_duration_list = []
-    total_word_count_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                total_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            total_word_count_list.append(ocr_word_count(anno.result))
-    elif (
+
+
+def collect_submitted_annotations(submitted_tasks, project_type):
+    """
+    Read the submitted annotations of a report in one pass.
+    Returns the texts of the annotations by task, the revision loop counts of
+    their tasks and the word count and audio durations of the work.
+    """
+    is_translation_project = "translation" in project_type.lower()
+    is_ocr_project = "OCRTranscription" in project_type
+    is_audio_project = (
         project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
+    )
+    collected = {
+        "texts": {},
+        "revision_loop_counts": [],
+        "word_count": 0,
+        "audio_duration": 0,
+        "raw_audio_duration": 0,
+        "only_tasks": not (
+            is_translation_project or is_ocr_project or is_audio_project
+        ),
+    }
+    rows = submitted_tasks.values(
+        "task_id",
+        "result",
+        "task__revision_loop_count",
+        task_word_count=KeyTransform("word_count", "task__data"),
+        task_audio_duration=KeyTransform("audio_duration", "task__data"),
+    )
+    for row in rows.iterator(chunk_size=REPORT_BATCH_SIZE):
+        collected["texts"][row["task_id"]] = get_annotation_text(row["result"])
+        collected["revision_loop_counts"].append(row["task__revision_loop_count"])
+        if is_translation_project:
+            if isinstance(row["task_word_count"], (int, float)):
+                collected["word_count"] += row["task_word_count"]
+        elif is_ocr_project:
+            collected["word_count"] += ocr_word_count(row["result"])
+        elif is_audio_project:
             try:
-                total_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
+                collected["audio_duration"] += get_audio_transcription_duration(
+                    row["result"]
                 )
-                total_raw_audio_duration_list.append(anno.task.data["audio_duration"])
-            except:
+                collected["raw_audio_duration"] += row["task_audio_duration"]
+            except Exception:
                 pass
+    return collected
+
+
+def get_cumulative_rejection_score(revision_loop_counts, count_key):
+    """
+    Sum of the number of times the tasks were sent back at the given stage
+    """
+    cumulative_rejection_score = 0
+    for revision_loop_count in revision_loop_counts:
+        try:
+            cumulative_rejection_score += revision_loop_count[count_key]
+        except Exception:
+            pass
+    return cumulative_rejection_score
+
+
+def get_related_annotations(task_ids, annotation_type):
+    """
+    (task id, annotation status, result text) of the annotations of the type
+    on the tasks, loaded in one query
+    """
+    annotations = Annotation.objects.filter(
+        task_id__in=task_ids, annotation_type=annotation_type
+    ).values_list("task_id", "annotation_status", "result")
+    for task_id, annotation_status, result in annotations.iterator(
+        chunk_size=REPORT_BATCH_SIZE
+    ):
+        yield task_id, annotation_status, result
+
+
+def drop_unused_report_columns(result, project_type, only_tasks):
+    is_CT_OR_CTE = project_type in [
+        "ConversationTranslationEditing",
+        "ConversationTranslation",
+    ]
+    if project_type in get_audio_project_types() or project_type == "AllAudioProjects":
+        del result["Word Count"]
+    elif only_tasks or is_CT_OR_CTE:
+        del result["Total Segments Duration"]
+        del result["Total Raw Audio Duration"]
+        del result["Word Count"]
     else:
-        only_tasks = True
+        del result["Total Segments Duration"]
+        del result["Total Raw Audio Duration"]
+    return result
+
 
-    total_word_count = sum(total_word_count_list)
-    total_audio_duration = convert_seconds_to_hours(sum(total_audio_duration_list))
-    total_raw_audio_duration = convert_seconds_to_hours(
-        sum(total_raw_audio_duration_list)
+def get_user_report_details(userid):
+    user = User.objects.get(pk=userid)
+    return {
+        "Name": user.username,
+        "Email": user.email,
+        "Participation Type": get_participation_type_name(user.participation_type),
+        "Role": get_role_name(user.role),
+    }, user.languages
+
+
+def get_all_annotation_reports(
+    proj_ids,
+    userid,
+    project_type,
+    start_date=None,
+    end_date=None,
+):
+    user_details, user_lang = get_user_report_details(userid)
+
+    submitted_tasks = Annotation.objects.filter(
+        annotation_status="labeled",
+        task__project_id__in=proj_ids,
+        annotation_type=ANNOTATOR_ANNOTATION,
+        completed_by=userid,
+    )
+    if start_date:
+        submitted_tasks = submitted_tasks.filter(
+            updated_at__range=[start_date, end_date]
+        )
+    submitted = collect_submitted_annotations(submitted_tasks, project_type)
+    annotator_texts = submitted["texts"]
+
+    # review and supercheck annotations of all the submitted tasks at once
+    reviewer_texts, superchecker_texts = {}, {}
+    number_of_tasks_that_has_review_annotations = 0
+    for task_id, annotation_status, result in get_related_annotations(
+        submitted_tasks.values("task_id"), REVIEWER_ANNOTATION
+    ):
+        number_of_tasks_that_has_review_annotations += 1
+        if annotation_status in [
+            ACCEPTED,
+            ACCEPTED_WITH_MINOR_CHANGES,
+            ACCEPTED_WITH_MAJOR_CHANGES,
+        ]:
+            reviewer_texts[task_id] = get_annotation_text(result)
+    for task_id, annotation_status, result in get_related_annotations(
+        submitted_tasks.values("task_id"), SUPER_CHECKER_ANNOTATION
+    ):
+        if annotation_status in [VALIDATED, VALIDATED_WITH_CHANGES]:
+            superchecker_texts[task_id] = get_annotation_text(result)
+
+    (
+        ar_wer_score,
+        number_of_tasks_contributed_for_ar_wer,
+        ar_bleu_score,
+        number_of_tasks_contributed_for_ar_bleu,
+    ) = score_annotation_pairs(
+        [
+            (reviewer_text, annotator_texts[task_id])
+            for task_id, reviewer_text in reviewer_texts.items()
+            if task_id in annotator_texts
+        ],
+        with_bleu=True,
+    )
+    as_wer_score, number_of_tasks_contributed_for_as_wer, _, _ = score_annotation_pairs(
+        [
+            (superchecker_text, annotator_texts[task_id])
+            for task_id, superchecker_text in superchecker_texts.items()
+            if task_id in annotator_texts
+        ]
+    )
+    cumulative_rejection_score_ar = get_cumulative_rejection_score(
+        submitted["revision_loop_counts"], "review_count"
     )
-    cumulative_rejection_score_ar = 0
-    if tasks_and_rejection_count_map_ar:
-        for task, rc in tasks_and_rejection_count_map_ar.items():
-            cumulative_rejection_score_ar += task * rc
 
     result = {
-        "Name": userName,
-        "Email": email,
-        "Participation Type": participation_type,
-        "Role": role,
+        **user_details,
         "Type of Work": "Annotator",
-        "Total Segments Duration": total_audio_duration,
-        "Total Raw Audio Duration": total_raw_audio_duration,
-        "Word Count": total_word_count,
-        "Submitted Tasks": submitted_tasks_count,
+        "Total Segments Duration": convert_seconds_to_hours(
+            submitted["audio_duration"]
+        ),
+        "Total Raw Audio Duration": convert_seconds_to_hours(
+            submitted["raw_audio_duration"]
+        ),
+        "Word Count": submitted["word_count"],
+        "Submitted Tasks": len(submitted["revision_loop_counts"]),
         "Language": user_lang,
         "Average Word Error Rate Annotator Vs Reviewer": ar_wer_score
         / number_of_tasks_contributed_for_ar_wer
@@ -226,22 +290,7 @@ def get_all_annotation_reports(
         if number_of_tasks_that_has_review_annotations
         else 0,
     }
-
-    if project_type in get_audio_project_types() or project_type == "AllAudioProjects":
-        del result["Word Count"]
-    elif only_tasks:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    elif is_CT_OR_CTE:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    else:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-
-    return result
+    return drop_unused_report_columns(result, project_type, submitted["only_tasks"])
 
 
 def get_all_review_reports(
@@ -251,167 +300,66 @@ def get_all_review_reports(
     start_date=None,
     end_date=None,
 ):
-    user = User.objects.get(pk=userid)
-    participation_type = user.participation_type
-    participation_type = (
-        "Full Time"
-        if participation_type == 1
-        else "Part Time"
-        if participation_type == 2
-        else "Contract Basis"
-        if participation_type == 4
-        else "N/A"
-    )
-    role = get_role_name(user.role)
-    userName = user.username
-    email = user.email
-    user_lang = user.languages
+    user_details, user_lang = get_user_report_details(userid)
 
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=[
-                "accepted",
-                "to_be_revised",
-                "accepted_with_minor_changes",
-                "accepted_with_major_changes",
-            ],
-            task__project_id__in=proj_ids,
-            task__review_user=userid,
-            annotation_type=REVIEWER_ANNOTATION,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=[
-                "accepted",
-                "to_be_revised",
-                "accepted_with_minor_changes",
-                "accepted_with_major_changes",
-            ],
-            task__project_id__in=proj_ids,
-            task__review_user=userid,
-            annotation_type=REVIEWER_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-        )
-    number_of_tasks_contributed_for_rs_wer, number_of_tasks_contributed_for_rs_bleu = (
-        0,
-        0,
+    submitted_tasks = Annotation.objects.filter(
+        annotation_status__in=[
+            "accepted",
+            "to_be_revised",
+            "accepted_with_minor_changes",
+            "accepted_with_major_changes",
+        ],
+        task__project_id__in=proj_ids,
+        task__review_user=userid,
+        annotation_type=REVIEWER_ANNOTATION,
     )
-    rs_wer_score, rs_bleu_score = 0, 0
+    if start_date:
+        submitted_tasks = submitted_tasks.filter(
+            updated_at__range=[start_date, end_date]
+        )
+    submitted = collect_submitted_annotations(submitted_tasks, project_type)
+    submitted_tasks_count = len(submitted["revision_loop_counts"])
+    reviewer_texts = submitted["texts"]
+
+    superchecker_texts = {}
+    number_of_tasks_that_has_sup_annotations = 0
+    for task_id, annotation_status, result in get_related_annotations(
+        submitted_tasks.values("task_id"), SUPER_CHECKER_ANNOTATION
+    ):
+        number_of_tasks_that_has_sup_annotations += 1
+        if annotation_status in [VALIDATED, VALIDATED_WITH_CHANGES]:
+            superchecker_texts[task_id] = get_annotation_text(result)
+
     (
-        tasks_and_rejection_count_map_ar,
-        tasks_and_rejection_count_map_rs,
-        number_of_tasks_that_has_sup_annotations,
-    ) = ({}, {}, 0)
-    for ann in submitted_tasks:
-        all_annotations = Annotation.objects.filter(task_id=ann.task_id)
-        task = ann.task
-        revision_loop_count = task.revision_loop_count
-        try:
-            r_count = revision_loop_count["review_count"]
-            tasks_and_rejection_count_map_ar[r_count] = (
-                tasks_and_rejection_count_map_ar.get(r_count, 0) + 1
-            )
-        except Exception as e:
-            pass
-        try:
-            s_count = revision_loop_count["super_check_count"]
-            tasks_and_rejection_count_map_rs[s_count] = (
-                tasks_and_rejection_count_map_rs.get(s_count, 0) + 1
-            )
-        except Exception as e:
-            pass
-        rs_done = False  # for duplicate annotations
-        sup_ann, rev_ann = "", ""
-        for a in all_annotations:
-            if (
-                a.annotation_type == SUPER_CHECKER_ANNOTATION
-                and a.annotation_status in [VALIDATED, VALIDATED_WITH_CHANGES]
-            ):
-                sup_ann = a
-            elif a.annotation_type == REVIEWER_ANNOTATION:
-                rev_ann = a
-            if a.annotation_type == SUPER_CHECKER_ANNOTATION:
-                number_of_tasks_that_has_sup_annotations += 1
-            if rev_ann and sup_ann and not rs_done:
-                try:
-                    rs_wer_score += calculate_word_error_rate_between_two_audio_transcription_annotation(
-                        sup_ann.result, rev_ann.result, project_type
-                    )
-                    number_of_tasks_contributed_for_rs_wer += 1
-                    rs_done = True
-                except Exception as e:
-                    pass
-                try:
-                    s1 = SentenceOperationViewSet()
-                    sampleRequest = {
-                        "annotation_result1": sup_ann.result,
-                        "annotation_result2": rev_ann.result,
-                    }
-                    rs_bleu_score += float(
-                        s1.calculate_bleu_score(sampleRequest).data["bleu_score"]
-                    )
-                    number_of_tasks_contributed_for_rs_bleu += 1
-                except Exception as e:
-                    pass
-    submitted_tasks_count = submitted_tasks.count()
-
-    project_type_lower = project_type.lower()
-    is_translation_project = True if "translation" in project_type_lower else False
-    is_CT_OR_CTE = (
-        True
-        if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
-        else False
+        rs_wer_score,
+        number_of_tasks_contributed_for_rs_wer,
+        rs_bleu_score,
+        number_of_tasks_contributed_for_rs_bleu,
+    ) = score_annotation_pairs(
+        [
+            (superchecker_text, reviewer_texts[task_id])
+            for task_id, superchecker_text in superchecker_texts.items()
+            if task_id in reviewer_texts
+        ],
+        with_bleu=True,
     )
-    total_audio_duration_list = []
-    total_raw_audio_duration_list = []
-    total_word_count_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                total_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            total_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                total_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                total_raw_audio_duration_list.append(anno.task.data["audio_duration"])
-            except:
-                pass
-    else:
-        only_tasks = True
-    total_word_count = sum(total_word_count_list)
-    total_audio_duration = convert_seconds_to_hours(sum(total_audio_duration_list))
-    total_raw_audio_duration = convert_seconds_to_hours(
-        sum(total_raw_audio_duration_list)
+    cumulative_rejection_score_ar = get_cumulative_rejection_score(
+        submitted["revision_loop_counts"], "review_count"
+    )
+    cumulative_rejection_score_rs = get_cumulative_rejection_score(
+        submitted["revision_loop_counts"], "super_check_count"
     )
-    cumulative_rejection_score_ar = 0
-    if tasks_and_rejection_count_map_ar:
-        for task, rc in tasks_and_rejection_count_map_ar.items():
-            cumulative_rejection_score_ar += task * rc
-
-    cumulative_rejection_score_rs = 0
-    if tasks_and_rejection_count_map_rs:
-        for task, rc in tasks_and_rejection_count_map_rs.items():
-            cumulative_rejection_score_rs += task * rc
 
     result = {
-        "Name": userName,
-        "Email": email,
-        "Participation Type": participation_type,
-        "Role": role,
+        **user_details,
         "Type of Work": "Review",
-        "Total Segments Duration": total_audio_duration,
-        "Total Raw Audio Duration": total_raw_audio_duration,
-        "Word Count": total_word_count,
+        "Total Segments Duration": convert_seconds_to_hours(
+            submitted["audio_duration"]
+        ),
+        "Total Raw Audio Duration": convert_seconds_to_hours(
+            submitted["raw_audio_duration"]
+        ),
+        "Word Count": submitted["word_count"],
         "Submitted Tasks": submitted_tasks_count,
         "Language": user_lang,
         "Average Word Error Rate Reviewer Vs Superchecker": rs_wer_score
@@ -434,128 +382,40 @@ def get_all_review_reports(
         if number_of_tasks_that_has_sup_annotations
         else 0,
     }
-
-    if project_type in get_audio_project_types() or project_type == "AllAudioProjects":
-        del result["Word Count"]
-    elif only_tasks:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    elif is_CT_OR_CTE:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    else:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-
-    return result
+    return drop_unused_report_columns(result, project_type, submitted["only_tasks"])
 
 
 def get_all_supercheck_reports(
     proj_ids, userid, project_type, start_date=None, end_date=None
 ):
-    user = User.objects.get(pk=userid)
-    participation_type = (
-        "Full Time"
-        if user.participation_type == 1
-        else "Part Time"
-        if user.participation_type == 2
-        else "Contract Basis"
-        if user.participation_type == 4
-        else "N/A"
-    )
-    role = get_role_name(user.role)
-    userName = user.username
-    email = user.email
-    user_lang = user.languages
-
-    if not start_date:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=["validated", "validated_with_changes", "rejected"],
-            task__project_id__in=proj_ids,
-            task__super_check_user=userid,
-            annotation_type=SUPER_CHECKER_ANNOTATION,
-        )
-    else:
-        submitted_tasks = Annotation.objects.filter(
-            annotation_status__in=["validated", "validated_with_changes", "rejected"],
-            task__project_id__in=proj_ids,
-            task__super_check_user=userid,
-            annotation_type=SUPER_CHECKER_ANNOTATION,
-            updated_at__range=[start_date, end_date],
-        )
-    tasks_and_rejection_count_map_rs = {}
-    for ann in submitted_tasks:
-        task = ann.task
-        revision_loop_count = task.revision_loop_count
-        try:
-            s_count = revision_loop_count["super_check_count"]
-            tasks_and_rejection_count_map_rs[s_count] = (
-                tasks_and_rejection_count_map_rs.get(s_count, 0) + 1
-            )
-        except Exception as e:
-            pass
-
-    submitted_tasks_count = submitted_tasks.count()
+    user_details, user_lang = get_user_report_details(userid)
 
-    project_type_lower = project_type.lower()
-    is_translation_project = True if "translation" in project_type_lower else False
-    is_CT_OR_CTE = (
-        True
-        if project_type in ["ConversationTranslationEditing", "ConversationTranslation"]
-        else False
-    )
-    validated_word_count_list = []
-    validated_audio_duration_list = []
-    validated_raw_audio_duration_list = []
-    only_tasks = False
-    if is_translation_project:
-        for anno in submitted_tasks:
-            try:
-                validated_word_count_list.append(anno.task.data["word_count"])
-            except:
-                pass
-    elif "OCRTranscription" in project_type:
-        for anno in submitted_tasks:
-            validated_word_count_list.append(ocr_word_count(anno.result))
-    elif (
-        project_type in get_audio_project_types() or project_type == "AllAudioProjects"
-    ):
-        for anno in submitted_tasks:
-            try:
-                validated_audio_duration_list.append(
-                    get_audio_transcription_duration(anno.result)
-                )
-                validated_raw_audio_duration_list.append(
-                    anno.task.data["audio_duration"]
-                )
-            except:
-                pass
-    else:
-        only_tasks = True
-
-    validated_word_count = sum(validated_word_count_list)
-    validated_audio_duration = convert_seconds_to_hours(
-        sum(validated_audio_duration_list)
+    submitted_tasks = Annotation.objects.filter(
+        annotation_status__in=["validated", "validated_with_changes", "rejected"],
+        task__project_id__in=proj_ids,
+        task__super_check_user=userid,
+        annotation_type=SUPER_CHECKER_ANNOTATION,
     )
-    validated_raw_audio_duration = convert_seconds_to_hours(
-        sum(validated_raw_audio_duration_list)
+    if start_date:
+        submitted_tasks = submitted_tasks.filter(
+            updated_at__range=[start_date, end_date]
+        )
+    submitted = collect_submitted_annotations(submitted_tasks, project_type)
+    submitted_tasks_count = len(submitted["revision_loop_counts"])
+    cumulative_rejection_score_rs = get_cumulative_rejection_score(
+        submitted["revision_loop_counts"], "super_check_count"
     )
-    cumulative_rejection_score_rs = 0
-    if tasks_and_rejection_count_map_rs:
-        for task, rc in tasks_and_rejection_count_map_rs.items():
-            cumulative_rejection_score_rs += task * rc
 
     result = {
-        "Name": userName,
-        "Email": email,
-        "Participation Type": participation_type,
-        "Role": role,
+        **user_details,
         "Type of Work": "Supercheck",
-        "Total Segments Duration": validated_audio_duration,
-        "Total Raw Audio Duration": validated_raw_audio_duration,
-        "Word Count": validated_word_count,
+        "Total Segments Duration": convert_seconds_to_hours(
+            submitted["audio_duration"]
+        ),
+        "Total Raw Audio Duration": convert_seconds_to_hours(
+            submitted["raw_audio_duration"]
+        ),
+        "Word Count": submitted["word_count"],
         "Submitted Tasks": submitted_tasks_count,
         "Language": user_lang,
         "Average Rejection Count Reviewer Vs Superchecker": cumulative_rejection_score_rs
@@ -563,22 +423,7 @@ def get_all_supercheck_reports(
         if submitted_tasks_count
         else 0,
     }
-
-    if project_type in get_audio_project_types() or project_type == "AllAudioProjects":
-        del result["Word Count"]
-    elif only_tasks:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    elif is_CT_OR_CTE:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-        del result["Word Count"]
-    else:
-        del result["Total Segments Duration"]
-        del result["Total Raw Audio Duration"]
-
-    return result
+    return drop_unused_report_columns(result, project_type, submitted["only_tasks"])
 
 
 @shared_task(queue="reports")
@@ -1750,157 +1595,195 @@ def get_review_reports(
     return result
 
 
-def un_pack_annotation_tasks(
+def get_labeled_annotation_summary(
     proj_ids,
-    each_annotation_user,
+    annotator,
     start_date,
     end_date,
     is_translation_project,
     project_type,
 ):
-    annotations_of_reviewer_accepted = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="accepted",
-        annotation_type=REVIEWER_ANNOTATION,
-        parent_annotation__updated_at__range=[start_date, end_date],
-    )
-    parent_anno_ids = [
-        ann.parent_annotation_id for ann in annotations_of_reviewer_accepted
-    ]
-    accepted = Annotation.objects.filter(
-        id__in=parent_anno_ids,
-        annotation_type=ANNOTATOR_ANNOTATION,
-        completed_by=each_annotation_user,
-    )
-
-    annotations_of_reviewer_to_be_revised = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="to_be_revised",
-        annotation_type=REVIEWER_ANNOTATION,
-        parent_annotation__updated_at__range=[start_date, end_date],
-    )
-    parent_anno_ids_of_to_be_revised = [
-        ann.parent_annotation_id for ann in annotations_of_reviewer_to_be_revised
-    ]
-    to_be_revised = Annotation.objects.filter(
-        id__in=parent_anno_ids_of_to_be_revised,
-        annotation_type=ANNOTATOR_ANNOTATION,
-        completed_by=each_annotation_user,
+    """
+    Totals of the labeled annotations of the annotator in the projects,
+    read from the annotation rollup
+    """
+    totals = get_rollup_totals(
+        get_annotation_rollups(
+            annotator,
+            proj_ids,
+            ANNOTATOR_ANNOTATION,
+            [LABELED],
+            start_date,
+            end_date,
+        )
     )
+    annotated_tasks = totals["annotation_count"]
+    avg_lead_time = 0
+    if annotated_tasks > 0:
+        avg_lead_time = totals["lead_time"] / annotated_tasks
+    total_word_count = 0
+    if (
+        is_translation_project
+        or project_type == "SemanticTextualSimilarity_Scale5"
+        or "OCRTranscription" in project_type
+    ):
+        total_word_count = totals["word_count"]
 
-    # accepted with minor change
-
-    annotations_of_reviewer_minor = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="accepted_with_minor_changes",
-        annotation_type=REVIEWER_ANNOTATION,
-        parent_annotation__updated_at__range=[start_date, end_date],
+    total_duration = "0:00:00"
+    total_raw_duration = 0.0
+    avg_segment_duration = 0
+    avg_segments_per_task = 0
+    if project_type in get_audio_project_types():
+        total_duration = convert_seconds_to_hours(totals["audio_duration"])
+        total_raw_duration = convert_seconds_to_hours(totals["raw_audio_duration"])
+        if totals["segment_count"] > 0:
+            avg_segment_duration = totals["audio_duration"] / totals["segment_count"]
+            # the rollup does not count the annotations whose duration could
+            # be computed, the segments are averaged over all of them
+            avg_segments_per_task = totals["segment_count"] / annotated_tasks
+    return (
+        annotated_tasks,
+        avg_lead_time,
+        total_word_count,
+        total_duration,
+        total_raw_duration,
+        avg_segment_duration,
+        avg_segments_per_task,
     )
 
-    parent_anno_ids_of_minor = [
-        ann.parent_annotation_id for ann in annotations_of_reviewer_minor
-    ]
-    accepted_wt_minor_changes = Annotation.objects.filter(
-        id__in=parent_anno_ids_of_minor,
-        annotation_type=ANNOTATOR_ANNOTATION,
-        completed_by=each_annotation_user,
-    )
 
-    # accepted with Major changes
+REVIEW_OUTCOMES = {
+    "accepted": ACCEPTED,
+    "to_be_revised": TO_BE_REVISED,
+    "accepted_wt_minor_changes": ACCEPTED_WITH_MINOR_CHANGES,
+    "accepted_wt_major_changes": ACCEPTED_WITH_MAJOR_CHANGES,
+}
 
-    annotations_of_reviewer_major = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="accepted_with_major_changes",
-        annotation_type=REVIEWER_ANNOTATION,
-        parent_annotation__updated_at__range=[start_date, end_date],
-    )
 
-    parent_anno_ids_of_major = [
-        ann.parent_annotation_id for ann in annotations_of_reviewer_major
-    ]
-    accepted_wt_major_changes = Annotation.objects.filter(
-        id__in=parent_anno_ids_of_major,
-        annotation_type=ANNOTATOR_ANNOTATION,
-        completed_by=each_annotation_user,
+def get_review_outcome_counts(proj_ids, annotators, start_date, end_date):
+    """
+    Review outcomes of the annotations of the annotators in the projects, in a
+    single query grouping the reviewer annotations by the annotator and the
+    project of their parent annotation.
+
+    Returns a dict of (annotator id, project id) to the number of annotations
+    updated between the dates which were accepted, to be revised, accepted with
+    minor or with major changes, and the number of reviews of the annotations
+    still labeled (see REVIEW_OUTCOMES and "reviewed").
+    """
+    in_range = Q(parent_annotation__updated_at__range=[start_date, end_date])
+    counts = (
+        Annotation.objects.filter(
+            task__project_id__in=proj_ids,
+            annotation_type=REVIEWER_ANNOTATION,
+            parent_annotation__annotation_type=ANNOTATOR_ANNOTATION,
+            parent_annotation__completed_by__in=annotators,
+        )
+        .values("parent_annotation__completed_by", "task__project_id")
+        .annotate(
+            **{
+                outcome: Count(
+                    "parent_annotation_id",
+                    distinct=True,
+                    filter=in_range & Q(annotation_status=annotation_status),
+                )
+                for outcome, annotation_status in REVIEW_OUTCOMES.items()
+            },
+            reviewed=Count(
+                "id",
+                filter=in_range
+                & Q(parent_annotation__annotation_status=LABELED)
+                & ~Q(annotation_status__in=[SKIPPED, DRAFT]),
+            ),
+        )
     )
+    return {
+        (
+            row.pop("parent_annotation__completed_by"),
+            row.pop("task__project_id"),
+        ): row
+        for row in counts
+    }
 
-    # labeled task count
 
-    labeled_annotations = Annotation.objects.filter(
-        task__project_id__in=proj_ids,
-        annotation_status="labeled",
-        annotation_type=ANNOTATOR_ANNOTATION,
-        updated_at__range=[start_date, end_date],
-        completed_by=each_annotation_user,
+def get_report_review_outcome_counts(
+    projects,
+    annotators,
+    project_type,
+    project_progress_stage,
+    tgt_language,
+    start_date,
+    end_date,
+):
+    """
+    get_review_outcome_counts of the annotators in the projects of a user
+    report matching its filters, None for the reports of annotation stage
+    projects, which have no review outcomes
+    """
+    if project_progress_stage == None or project_progress_stage <= ANNOTATION_STAGE:
+        return None
+    projects = projects.filter(
+        project_type=project_type, project_stage=project_progress_stage
     )
-    labeled_annotation_ids = [ann.id for ann in labeled_annotations]
-
-    reviewed_ann = (
-        Annotation.objects.filter(
-            parent_annotation_id__in=labeled_annotation_ids,
-            annotation_type=REVIEWER_ANNOTATION,
-        )
-        .exclude(annotation_status__in=["skipped", "draft"])
-        .count()
+    if tgt_language != None:
+        projects = projects.filter(tgt_language=tgt_language)
+    return get_review_outcome_counts(
+        projects.values("id"), annotators, start_date, end_date
     )
 
-    labeled = len(labeled_annotations) - reviewed_ann
 
-    lead_time_annotated_tasks = [eachtask.lead_time for eachtask in labeled_annotations]
-    avg_lead_time = 0
-    if len(lead_time_annotated_tasks) > 0:
-        avg_lead_time = sum(lead_time_annotated_tasks) / len(lead_time_annotated_tasks)
-    total_word_count = 0
-    if is_translation_project or project_type == "SemanticTextualSimilarity_Scale5":
-        total_word_count_list = []
-        for each_task in labeled_annotations:
-            try:
-                total_word_count_list.append(each_task.task.data["word_count"])
-            except:
-                pass
+def _sum_review_outcome_counts(review_counts, annotator, proj_ids):
+    annotator_id = getattr(annotator, "id", annotator)
+    totals = dict.fromkeys([*REVIEW_OUTCOMES, "reviewed"], 0)
+    for proj_id in proj_ids:
+        for outcome, count in review_counts.get((annotator_id, proj_id), {}).items():
+            totals[outcome] += count
+    return totals
 
-        total_word_count = sum(total_word_count_list)
-    elif "OCRTranscription" in project_type:
-        total_word_count = 0
-        for each_anno in labeled_annotations:
-            total_word_count += ocr_word_count(each_anno.result)
 
-    total_duration = "0:00:00"
-    total_raw_duration = 0.0
-    avg_segment_duration = 0
-    avg_segments_per_task = 0
-    if project_type in get_audio_project_types():
-        total_duration_list = []
-        total_raw_duration_list = []
-        total_audio_segments_list = []
-        for each_task in labeled_annotations:
-            try:
-                total_duration_list.append(
-                    get_audio_transcription_duration(each_task.result)
-                )
-                total_raw_duration_list.append(each_task.task.data["audio_duration"])
-                total_audio_segments_list.append(
-                    get_audio_segments_count(each_task.result)
-                )
-            except:
-                pass
-        total_duration = convert_seconds_to_hours(sum(total_duration_list))
-        total_raw_duration = convert_seconds_to_hours(sum(total_raw_duration_list))
-        total_audio_segments = sum(total_audio_segments_list)
-        try:
-            avg_segment_duration = sum(total_duration_list) / total_audio_segments
-            avg_segments_per_task = total_audio_segments / len(
-                total_audio_segments_list
-            )
-        except:
-            avg_segment_duration = 0
-            avg_segments_per_task = 0
+def un_pack_annotation_tasks(
+    proj_ids,
+    each_annotation_user,
+    start_date,
+    end_date,
+    is_translation_project,
+    project_type,
+    review_counts=None,
+):
+    """
+    Review outcomes and totals of the labeled annotations of the annotator in
+    the projects. Reports covering many annotators pass the `review_counts` of
+    get_review_outcome_counts computed for all of them at once.
+    """
+    if review_counts is None:
+        review_counts = get_review_outcome_counts(
+            proj_ids, [each_annotation_user], start_date, end_date
+        )
+    outcomes = _sum_review_outcome_counts(review_counts, each_annotation_user, proj_ids)
+
+    (
+        annotated_tasks,
+        avg_lead_time,
+        total_word_count,
+        total_duration,
+        total_raw_duration,
+        avg_segment_duration,
+        avg_segments_per_task,
+    ) = get_labeled_annotation_summary(
+        proj_ids,
+        each_annotation_user,
+        start_date,
+        end_date,
+        is_translation_project,
+        project_type,
+    )
+    labeled = annotated_tasks - outcomes["reviewed"]
 
     return (
-        accepted.count(),
-        to_be_revised.count(),
-        accepted_wt_minor_changes.count(),
-        accepted_wt_major_changes.count(),
+        outcomes["accepted"],
+        outcomes["to_be_revised"],
+        outcomes["accepted_wt_minor_changes"],
+        outcomes["accepted_wt_major_changes"],
         labeled,
         avg_lead_time,
         total_word_count,
@@ -2059,6 +1942,15 @@ def send_user_analysis_reports_mail_ws(
         user_name = [user.username for user in ws.members.all()]
         users_id = [user.id for user in ws.members.all()]
 
+        review_counts = get_report_review_outcome_counts(
+            Project.objects.filter(workspace_id=pk),
+            users_id,
+            project_type,
+            project_progress_stage,
+            tgt_language,
+            start_date,
+            end_date,
+        )
         selected_language = "-"
         for index, each_annotation_user in enumerate(users_id):
             name = user_name[index]
@@ -2133,6 +2025,7 @@ def send_user_analysis_reports_mail_ws(
                     end_date,
                     is_translation_project,
                     project_type,
+                    review_counts,
                 )
 
             else:
@@ -17,7 +17,12 @@ from tasks.models import (
     ANNOTATOR_ANNOTATION,
     REVIEWER_ANNOTATION,
     SUPER_CHECKER_ANNOTATION,
+    DRAFT,
+    SKIPPED,
+    UNLABELED,
 )
+from tasks.annotation_rollup import get_annotation_rollups, get_rollup_status_counts
+from projects.report_cache import WORKSPACE_SCOPE, cached_report
 from projects.utils import is_valid_date
 from datetime import datetime, timezone, timedelta
 import pandas as pd
@@ -58,6 +63,8 @@ from .tasks import (
     send_project_analysis_reports_mail_ws,
     send_user_analysis_reports_mail_ws,
     un_pack_annotation_tasks,
+    get_report_review_outcome_counts,
+    get_labeled_annotation_summary,
     get_review_reports,
     get_supercheck_reports,
 )
@@ -410,6 +417,7 @@ class WorkspaceCustomViewSet(viewsets.ViewSet):
         url_name="project_analytics",
     )
     @is_particular_workspace_manager
+    @cached_report("workspace_project_analytics", WORKSPACE_SCOPE)
     def project_analytics(self, request, pk=None):
         """
         API for getting project_analytics of a workspace
@@ -810,6 +818,7 @@ class WorkspaceCustomViewSet(viewsets.ViewSet):
         url_path="user_analytics",
         url_name="user_analytics",
     )
+    @cached_report("workspace_user_analytics", WORKSPACE_SCOPE)
     def user_analytics(self, request, pk=None):
         """
         API for getting user_analytics of a workspace
@@ -1107,6 +1116,15 @@ class WorkspaceCustomViewSet(viewsets.ViewSet):
             user_name = [user.username for user in ws.members.all()]
             users_id = [user.id for user in ws.members.all()]
 
+            review_counts = get_report_review_outcome_counts(
+                Project.objects.filter(workspace_id=pk),
+                users_id,
+                project_type,
+                project_progress_stage,
+                tgt_language,
+                start_date,
+                end_date,
+            )
             selected_language = "-"
             final_reports = []
             for index, each_annotation_user in enumerate(users_id):
@@ -1183,107 +1201,40 @@ class WorkspaceCustomViewSet(viewsets.ViewSet):
                         end_date,
                         is_translation_project,
                         project_type,
+                        review_counts,
                     )
 
                 else:
-                    labeled_annotations = Annotation.objects.filter(
-                        task__project_id__in=proj_ids,
-                        annotation_status="labeled",
-                        annotation_type=ANNOTATOR_ANNOTATION,
-                        updated_at__range=[start_date, end_date],
-                        completed_by=each_annotation_user,
+                    (
+                        annotated_tasks,
+                        avg_lead_time,
+                        total_word_count,
+                        total_duration,
+                        total_raw_duration,
+                        avg_segment_duration,
+                        avg_segments_per_task,
+                    ) = get_labeled_annotation_summary(
+                        proj_ids,
+                        each_annotation_user,
+                        start_date,
+                        end_date,
+                        is_translation_project,
+                        project_type,
                     )
 
-                    annotated_tasks = labeled_annotations.count()
-                    lead_time_annotated_tasks = [
-                        eachtask.lead_time for eachtask in labeled_annotations
-                    ]
-                    avg_lead_time = 0
-                    if len(lead_time_annotated_tasks) > 0:
-                        avg_lead_time = sum(lead_time_annotated_tasks) / len(
-                            lead_time_annotated_tasks
-                        )
-                    total_word_count = 0
-                    if (
-                        is_translation_project
-                        or project_type == "SemanticTextualSimilarity_Scale5"
-                    ):
-                        total_word_count_list = []
-                        for each_task in labeled_annotations:
-                            try:
-                                total_word_count_list.append(
-                                    each_task.task.data["word_count"]
-                                )
-                            except:
-                                pass
-
-                        total_word_count = sum(total_word_count_list)
-                    elif "OCRTranscription" in project_type:
-                        total_word_count = 0
-                        for each_anno in labeled_annotations:
-                            total_word_count += ocr_word_count(each_anno.result)
-
-                    total_duration = "0:00:00"
-                    total_raw_duration = "0:00:00"
-                    avg_segment_duration = 0
-                    avg_segments_per_task = 0
-                    if project_type in get_audio_project_types():
-                        total_duration_list = []
-                        total_raw_duration_list = []
-                        total_audio_segments_list = []
-                        for each_task in labeled_annotations:
-                            try:
-                                total_duration_list.append(
-                                    get_audio_transcription_duration(each_task.result)
-                                )
-                                total_audio_segments_list.append(
-                                    get_audio_segments_count(each_task.result)
-                                )
-                                total_raw_duration_list.append(
-                                    each_task.task.data["audio_duration"]
-                                )
-                            except:
-                                pass
-                        total_duration = convert_seconds_to_hours(
-                            sum(total_duration_list)
-                        )
-                        total_raw_duration = convert_seconds_to_hours(
-                            sum(total_raw_duration_list)
-                        )
-                        total_audio_segments = sum(total_audio_segments_list)
-                        try:
-                            avg_segment_duration = (
-                                sum(total_duration_list) / total_audio_segments
-                            )
-                            avg_segments_per_task = total_audio_segments / len(
-                                labeled_annotations
-                            )
-                        except:
-                            avg_segment_duration = 0
-                            avg_segments_per_task = 0
-
-                total_skipped_tasks = Annotation.objects.filter(
-                    task__project_id__in=proj_ids,
-                    annotation_status="skipped",
-                    annotation_type=ANNOTATOR_ANNOTATION,
-                    updated_at__range=[start_date, end_date],
-                    completed_by=each_annotation_user,
-                ).count()
-                all_pending_tasks_in_project = Annotation.objects.filter(
-                    task__project_id__in=proj_ids,
-                    annotation_status="unlabeled",
-                    annotation_type=ANNOTATOR_ANNOTATION,
-                    updated_at__range=[start_date, end_date],
-                    completed_by=each_annotation_user,
-                ).count()
-
-                all_draft_tasks_in_project = Annotation.objects.filter(
-                    task__project_id__in=proj_ids,
-                    annotation_status="draft",
-                    annotation_type=ANNOTATOR_ANNOTATION,
-                    updated_at__range=[start_date, end_date],
-                    completed_by=each_annotation_user,
-                ).count()
+                status_counts = get_rollup_status_counts(
+                    get_annotation_rollups(
+                        each_annotation_user,
+                        proj_ids,
+                        ANNOTATOR_ANNOTATION,
+                        [SKIPPED, UNLABELED, DRAFT],
+                        start_date,
+                        end_date,
+                    )
+                )
+                total_skipped_tasks = status_counts.get(SKIPPED, 0)
+                all_pending_tasks_in_project = status_counts.get(UNLABELED, 0)
+                all_draft_tasks_in_project = status_counts.get(DRAFT, 0)
 
                 if (
                     project_progress_stage != None